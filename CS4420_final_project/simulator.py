@@ -1,40 +1,150 @@
-import queue
-from collections import Counter, OrderedDict
+import csv
 import random
-import matplotlib.pyplot as plt
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Binary trace layout written by src/utils/frame_tracer.py
+TRACE_MAGIC = b'EVATRACE'
+TRACE_HEADER_SIZE = 32
+TRACE_RECORD = np.dtype([('event', '<u1'),
+                         ('frame_id', '<i8'),
+                         ('table_id', '<i4'),
+                         ('timestamp', '<u8')])
+TRACE_UNFIX, TRACE_FIX = 0, 1
+
+
+def load_binary_trace(filename):
+    """
+    Reads a binary frame trace with np.fromfile and keeps the fix/unfix
+    events, returning the same arrays as load_trace.
+    """
+    records = np.fromfile(filename, dtype=TRACE_RECORD,
+                          offset=TRACE_HEADER_SIZE)
+    records = records[records['event'] <= TRACE_FIX]
+    return records['event'] == TRACE_FIX, records['frame_id'].astype(np.int64)
+
+
+def load_trace(filename):
+    """
+    Parses a CSV trace (uuid, True|False, frame_id, "timestamp") once into
+    two compact arrays: a bool array of fix/unfix events and an int64 array
+    of frame ids. Non numeric frame ids are mapped to dense integer codes.
+    Binary traces are detected by their magic and read directly.
+    """
+    with open(filename, "rb") as fp:
+        if fp.read(len(TRACE_MAGIC)) == TRACE_MAGIC:
+            return load_binary_trace(filename)
+    fixes = []
+    frame_ids = []
+    with open(filename, "r", newline="") as fp:
+        for row in csv.reader(fp):
+            if len(row) < 3:
+                continue
+            fixes.append(row[1] == "True")
+            frame_ids.append(row[2])
+    fixes = np.array(fixes, dtype=np.bool_)
+    try:
+        frame_ids = np.array(frame_ids, dtype=np.int64)
+    except ValueError:
+        _, frame_ids = np.unique(np.array(frame_ids), return_inverse=True)
+        frame_ids = frame_ids.astype(np.int64)
+    return fixes, frame_ids
+
 
 class Simulator:
-    def __init__(self, filename):
+    def __init__(self, filename=None, fixes=None, frame_ids=None):
         self.filename = filename
-        itemList = []
-        with open(filename, "r") as fp:
-            lines = fp.readlines()
-            for l in lines:
-                itemList.append(Line(l.split(",")))
-        self.lines = itemList
-    
+        if filename is not None:
+            fixes, frame_ids = load_trace(filename)
+        self.fixes = np.asarray(fixes, dtype=np.bool_)
+        self.frame_ids = np.asarray(frame_ids, dtype=np.int64)
+
+    @property
+    def lines(self):
+        return [Line([None, str(fix), frame_id, None])
+                for fix, frame_id in zip(self.fixes.tolist(),
+                                         self.frame_ids.tolist())]
+
     def simulate(self, bufferPolicy):
         self.hits = 0
         self.misses = 0
         self.total = 0
         self.seen_misses = 0
         self.worst_case = 0
-        self.seen = []
-        for l in self.lines:
-            frame_id = l.frame_id
-            if l.fix:
+        self.seen = set()
+        fix_frame = bufferPolicy.fix
+        unfix_frame = bufferPolicy.unfix
+        seen = self.seen
+        for fix, frame_id in zip(self.fixes.tolist(),
+                                 self.frame_ids.tolist()):
+            if fix:
                 self.total += 1
-                hit = bufferPolicy.fix(l.frame_id)
+                hit = fix_frame(frame_id)
+                was_seen = frame_id in seen
                 self.hits += hit
                 self.misses += not hit
-                self.seen_misses += (not hit) and (frame_id in self.seen)
-                self.worst_case += (frame_id in self.seen)
-                self.seen.append(frame_id)
+                self.seen_misses += (not hit) and was_seen
+                self.worst_case += was_seen
+                seen.add(frame_id)
             else:
-                bufferPolicy.unfix(l.frame_id)
+                unfix_frame(frame_id)
         # print(f"Hits: {self.hits}\nMisses: {self.misses}\nSeen Misses: {self.seen_misses}\nWorst Case: {self.worst_case}\nTotal: {self.total}")
-        
-            
+
+    def lru_stack_distances(self):
+        """
+        Single pass Mattson stack distance computation over the fix events.
+        Returns an array with, for every fix, the number of distinct frames
+        referenced since the previous fix of the same frame (-1 for a first
+        reference). Uses a Fenwick tree over event positions, so the whole
+        trace is processed in O(n log n).
+        """
+        accesses = self.frame_ids[self.fixes].tolist()
+        n = len(accesses)
+        tree = [0] * (n + 1)
+        last = {}
+        distances = np.full(n, -1, dtype=np.int64)
+
+        def prefix(i):
+            total = 0
+            while i > 0:
+                total += tree[i]
+                i -= i & -i
+            return total
+
+        def update(i, delta):
+            while i <= n:
+                tree[i] += delta
+                i += i & -i
+
+        for t, frame_id in enumerate(accesses, 1):
+            p = last.get(frame_id)
+            if p is not None:
+                distances[t - 1] = prefix(t - 1) - prefix(p)
+                update(p, -1)
+            update(t, 1)
+            last[frame_id] = t
+        return distances
+
+    def lru_hit_rate_curve(self, sizes):
+        """
+        Hit rate of an LRU buffer for every size in sizes, computed from a
+        single pass over the trace. A fix hits a buffer of size c when its
+        stack distance is smaller than c. The result matches LRU.simulate as
+        long as the least recently used frame is not pinned when an eviction
+        happens.
+        """
+        distances = self.lru_stack_distances()
+        total = len(distances)
+        if total == 0:
+            return np.zeros(len(sizes))
+        reused = distances[distances >= 0]
+        hits_at = np.cumsum(np.bincount(reused, minlength=max(sizes) + 1))
+        sizes = np.asarray(sizes, dtype=np.int64)
+        hits = np.where(sizes > 0, hits_at[np.maximum(sizes - 1, 0)], 0)
+        return hits / total
+
+
 class Line:
     def __init__(self, itemList):
         self.frame_id = itemList[2]
@@ -45,11 +155,11 @@ class Policy():
 
     def __init__(self):
         self.name = "BasePolicy"
-    
+
     def fix(self, frame_id):
         raise NotImplementedError
         # return bool
-    
+
     def unfix(self, frame_id):
         raise NotImplementedError
         # No Return
@@ -61,10 +171,10 @@ class TestPolicy1(Policy):
 
     def fix(self, frame_id):
         return False
-    
+
     def unfix(self, frame_id):
         # count calls
-        self.counter += 1 
+        self.counter += 1
 
 class TestPolicy2(Policy):
     def __init__(self):
@@ -73,37 +183,47 @@ class TestPolicy2(Policy):
 
     def fix(self, frame_id):
         return True
-    
+
     def unfix(self, frame_id):
         # count calls
         self.counter += 1
 
+
+def first_unfixed(keys, fixed):
+    """
+    Returns the first key whose fix count is zero. Only pinned keys are
+    skipped, so this is O(1) unless the head of the queue is pinned.
+    """
+    for key in keys:
+        if fixed[key] == 0:
+            return key
+    return None
+
+
 class FIFO(Policy):
     "Notice that things close to 0 are closer to being evicted"
     def __init__(self, buffer_size):
         self.name = "FIFO"
         self.size = buffer_size
-        self.queue = []
+        self._queue = OrderedDict()
         self.fixed = Counter()
 
+    @property
+    def queue(self):
+        return list(self._queue)
+
     def fix(self, frame_id):
-        if frame_id in self.queue:
+        if frame_id in self._queue:
             self.fixed[frame_id] += 1
             return True
-        else:
-            if len(self.queue) == self.size:
-                for id in self.queue:
-                    if self.fixed[id] == 0:
-                        self.queue.remove(id)
-                        self.queue.append(frame_id)
-                        self.fixed[frame_id] += 1
-                        break
-                else:
-                    raise Exception("All items in queue are fixed")
-            else:
-                self.fixed[frame_id] += 1
-                self.queue.append(frame_id)
-            return False
+        if len(self._queue) == self.size:
+            victim = first_unfixed(self._queue, self.fixed)
+            if victim is None:
+                raise Exception("All items in queue are fixed")
+            del self._queue[victim]
+        self._queue[frame_id] = None
+        self.fixed[frame_id] += 1
+        return False
 
     def unfix(self, frame_id):
         self.fixed[frame_id] -= 1
@@ -120,67 +240,79 @@ class LRU(Policy):
             self.fixed[frame_id] += 1
             self.queue.move_to_end(frame_id)
             return True
-        else:
-            if len(self.queue) == self.size:
-                for id in self.queue:
-                    if self.fixed[id] == 0:
-                        del self.queue[id]
-                        self.queue[frame_id] = None
-                        self.fixed[frame_id] += 1
-                        break
-                else:
-                    raise Exception("All items in queue are fixed")
-            else:
-                self.fixed[frame_id] += 1
-                self.queue[frame_id] = None
-            return False
+        if len(self.queue) == self.size:
+            victim = first_unfixed(self.queue, self.fixed)
+            if victim is None:
+                raise Exception("All items in queue are fixed")
+            del self.queue[victim]
+        self.queue[frame_id] = None
+        self.fixed[frame_id] += 1
+        return False
 
     def unfix(self, frame_id):
         self.fixed[frame_id] -= 1
 
 class RR(Policy):
+    """
+    Random replacement. The resident frames with a zero fix count are kept
+    in an array plus position map, so a victim is drawn in O(1) and removed
+    with a swap-pop.
+    """
     def __init__(self, buffer_size):
         self.name = "RR"
         self.size = buffer_size
-        self.queue = []
+        self._queue = OrderedDict()
         self.fixed = Counter()
+        self._unfixed = []
+        self._unfixed_pos = {}
+
+    @property
+    def queue(self):
+        return list(self._queue)
+
+    def _update_unfixed(self, frame_id):
+        evictable = frame_id in self._queue and self.fixed[frame_id] == 0
+        if evictable and frame_id not in self._unfixed_pos:
+            self._unfixed_pos[frame_id] = len(self._unfixed)
+            self._unfixed.append(frame_id)
+        elif not evictable and frame_id in self._unfixed_pos:
+            pos = self._unfixed_pos.pop(frame_id)
+            last = self._unfixed.pop()
+            if pos < len(self._unfixed):
+                self._unfixed[pos] = last
+                self._unfixed_pos[last] = pos
 
     def fix(self, frame_id):
-        if frame_id in self.queue:
+        if frame_id in self._queue:
             self.fixed[frame_id] += 1
+            self._update_unfixed(frame_id)
             return True
-        else:
-            if len(self.queue) == self.size:
-                unfixed = []
-                for id in self.queue:
-                    if self.fixed[id] == 0:
-                        unfixed.append(id)
-                if unfixed:
-                    id = random.choice(unfixed)
-                    self.queue.remove(id)
-                    self.queue.append(frame_id)
-                    self.fixed[frame_id] += 1
-                else:
-                    raise Exception("All items in queue are fixed")
-
-            
-            else:
-                self.fixed[frame_id] += 1
-                self.queue.append(frame_id)
-            return False
+        if len(self._queue) == self.size:
+            if not self._unfixed:
+                raise Exception("All items in queue are fixed")
+            victim = random.choice(self._unfixed)
+            del self._queue[victim]
+            self._update_unfixed(victim)
+        self._queue[frame_id] = None
+        self.fixed[frame_id] += 1
+        self._update_unfixed(frame_id)
+        return False
 
     def unfix(self, frame_id):
         self.fixed[frame_id] -= 1
+        self._update_unfixed(frame_id)
 
 class TwoQ(Policy):
     def __init__(self, buffer_size):
         self.name = "2Q"
         self.size = buffer_size
-        self.fifo = []
-        # self.queue = []
+        self._fifo = OrderedDict()
         self.fixed = Counter()
         self.lru = OrderedDict()
-        self.lru_fixed = Counter()
+
+    @property
+    def fifo(self):
+        return list(self._fifo)
 
     def fix(self, frame_id):
         if frame_id in self.lru:
@@ -188,102 +320,130 @@ class TwoQ(Policy):
             self.lru.move_to_end(frame_id)
             return True
         ## Try to add to lru
-        if frame_id in self.fifo:
+        if frame_id in self._fifo:
             self.fixed[frame_id] += 1
             self.lru[frame_id] = None
-            self.fifo.remove(frame_id)
+            del self._fifo[frame_id]
             return True
         ## Add to FIFO
-        if len(self.fifo) + len(self.lru) >= self.size:
-            inserted = False
-            for id in self.fifo:
-                if self.fixed[id] == 0:
-                    self.fifo.remove(id)
-                    self.fifo.append(frame_id)
-                    self.fixed[frame_id] += 1
-                    inserted = True
-                    break
-            if not inserted:
-                for id in self.lru.keys():
-                    if self.fixed[id] == 0:
-                        del self.lru[id]
-                        self.fifo.append(frame_id)
-                        self.fixed[frame_id] += 1
-                        inserted = True
-                        break
-                else:
+        if len(self._fifo) + len(self.lru) >= self.size:
+            victim = first_unfixed(self._fifo, self.fixed)
+            if victim is not None:
+                del self._fifo[victim]
+            else:
+                victim = first_unfixed(self.lru, self.fixed)
+                if victim is None:
                     raise Exception("All items in queue are fixed")
-        else:
-            self.fixed[frame_id] += 1
-            self.fifo.append(frame_id)
+                del self.lru[victim]
+        self._fifo[frame_id] = None
+        self.fixed[frame_id] += 1
         return False
-        
+
     def unfix(self, frame_id):
-        self.fixed[frame_id] -= 1 
-                
+        self.fixed[frame_id] -= 1
+
 
 
 class LFU(Policy):
+    """
+    LFU with frequency buckets: every access count maps to an OrderedDict of
+    the frames with that count. A frame whose count is bumped moves to the
+    front of its new bucket, a newly admitted frame goes to the back. This is
+    the order the previous sort-on-every-access implementation produced.
+    """
     def __init__(self, buffer_size):
         self.name = "LFU"
         self.size = buffer_size
-        self.queue = {}
+        self.freq = {}
+        self.buckets = {}
         self.fixed = Counter()
         self.history = Counter()
 
+    @property
+    def queue(self):
+        return {frame_id: freq
+                for freq in sorted(self.buckets)
+                for frame_id in self.buckets[freq]}
+
+    def __len__(self):
+        return len(self.freq)
+
+    def _insert(self, frame_id, freq, front=False):
+        self.freq[frame_id] = freq
+        bucket = self.buckets.get(freq)
+        if bucket is None:
+            bucket = self.buckets[freq] = OrderedDict()
+        bucket[frame_id] = None
+        if front:
+            bucket.move_to_end(frame_id, last=False)
+
+    def _remove(self, frame_id):
+        freq = self.freq.pop(frame_id)
+        bucket = self.buckets[freq]
+        del bucket[frame_id]
+        if not bucket:
+            del self.buckets[freq]
+        return freq
+
+    def _victim(self):
+        for freq in sorted(self.buckets):
+            victim = first_unfixed(self.buckets[freq], self.fixed)
+            if victim is not None:
+                return victim
+        return None
+
     def fix(self, frame_id):
-        if frame_id in self.queue:
+        if frame_id in self.freq:
             self.fixed[frame_id] += 1
-            self.queue[frame_id] += 1
-            self.queue = {k:v for k, v in sorted(self.queue.items(), key=lambda item: item[1])}
+            self._insert(frame_id, self._remove(frame_id) + 1, front=True)
             return True
-        else:
-            if len(self.queue) == self.size:
-                for id in self.queue.keys():
-                    if self.fixed[id] == 0:
-                        
-                        self.history[id] = self.queue[id]
-                        del self.queue[id]
-                        self.queue[frame_id] = 1 + self.history[frame_id]
-                        self.queue = {k:v for k, v in sorted(self.queue.items(), key=lambda item: item[1])}
-                        self.fixed[frame_id] += 1
-                        break
-                else:
-                    raise Exception("All items in queue are fixed")
-            else:
-                self.fixed[frame_id] += 1
-                self.queue[frame_id] = 1 + self.history[frame_id]
-                self.queue = {k:v for k, v in sorted(self.queue.items(), key=lambda item: item[1])}
-                self.history[frame_id] = 0
-            return False
+        if len(self.freq) == self.size:
+            victim = self._victim()
+            if victim is None:
+                raise Exception("All items in queue are fixed")
+            self.history[victim] = self._remove(victim)
+        self._insert(frame_id, 1 + self.history.pop(frame_id, 0))
+        self.fixed[frame_id] += 1
+        return False
 
     def unfix(self, frame_id):
         self.fixed[frame_id] -= 1
 
 
-if __name__ == "__main__":
-    # raise Exception
+def hit_rate_curve(simulator, policy_class, sizes, single_pass=False):
+    """
+    Hit rate of policy_class for every buffer size, replaying the already
+    parsed trace once per size. Sizes where every frame ends up pinned
+    report a hit rate of 0. With single_pass, LRU is answered from the stack
+    distance curve instead, which ignores pinning.
+    """
+    if single_pass and policy_class is LRU:
+        return list(simulator.lru_hit_rate_curve(sizes))
     hit_rate = []
-    for file in ["ftrace_combined.csv"]:        
-        for p in [TwoQ, RR, FIFO, LRU, LFU]:
-            hit_rate = []
-            for i in range(6, 400):
-                try:
-                    policy = p(i)
-                    simulator = Simulator(file)
-                    simulator.simulate(policy)
-                    hit_rate.append(float(simulator.hits)/simulator.total)
-                except Exception as e:
-                    hit_rate.append(0)
+    for size in sizes:
+        try:
+            simulator.simulate(policy_class(size))
+            hit_rate.append(float(simulator.hits) / simulator.total)
+        except Exception:
+            hit_rate.append(0)
+    return hit_rate
 
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    sizes = list(range(6, 400))
+    for file in ["ftrace_combined.csv"]:
+        simulator = Simulator(file)
+        for p in [TwoQ, RR, FIFO, LRU, LFU]:
+            hit_rate = hit_rate_curve(simulator, p, sizes)
             print(hit_rate)
-            plt.scatter(range(6, 400), hit_rate, label=policy.name, s=3)
+            plt.scatter(sizes, hit_rate, label=p(1).name, s=3)
 
         plt.title("Buffer Size versus Hit Rate")
         plt.xlabel("Buffer Size (# Video Frames)")
         plt.ylabel("Hit Rate (proportion)")
-        
+
         plt.legend()
         plt.savefig(f'{file[:-4]}-results')
         plt.clf()
-        break
\ No newline at end of file
@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
-from simulator import Simulator, TestPolicy1, TestPolicy2, Line, FIFO, LRU, RR, TwoQ, LFU, Policy
+
+import numpy as np
+from simulator import Simulator, TestPolicy1, TestPolicy2, Line, FIFO, LRU, RR, TwoQ, LFU, Policy, hit_rate_curve, TRACE_MAGIC, TRACE_RECORD
 
 class TestSimulator(unittest.TestCase):
     
@@ -30,6 +34,35 @@ class TestSimulator(unittest.TestCase):
         self.assertEqual(simulator.worst_case, 0)
         self.assertEqual(policy.counter, 1)
 
+    def testTraceIsParsedOnce(self):
+        simulator = Simulator('unit_test.csv')
+        self.assertEqual(list(simulator.fixes), [True, False])
+        self.assertEqual(list(simulator.frame_ids), [1, 1])
+
+    def testBinaryTrace(self):
+        records = np.zeros(3, dtype=TRACE_RECORD)
+        records['event'] = [1, 3, 0]
+        records['frame_id'] = [7, 7, 7]
+        with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as fp:
+            fp.write(TRACE_MAGIC + bytes(24) + records.tobytes())
+        simulator = Simulator(fp.name)
+        os.remove(fp.name)
+        self.assertEqual(list(simulator.fixes), [True, False])
+        self.assertEqual(list(simulator.frame_ids), [7, 7])
+
+    def testLRUHitRateCurve(self):
+        frame_ids = [1, 2, 3, 1, 4, 2, 5, 1, 2, 3, 4, 5, 1, 1, 3]
+        simulator = Simulator(fixes=[True, False] * len(frame_ids),
+                              frame_ids=[f for f in frame_ids for _ in (0, 1)])
+        sizes = [1, 2, 3, 4, 5, 6]
+        curve = simulator.lru_hit_rate_curve(sizes)
+        for size, hit_rate in zip(sizes, curve):
+            simulator.simulate(LRU(size))
+            self.assertEqual(hit_rate, simulator.hits / simulator.total)
+        self.assertEqual(hit_rate_curve(simulator, LRU, sizes),
+                         hit_rate_curve(simulator, LRU, sizes,
+                                        single_pass=True))
+
 class TestLine(unittest.TestCase):
     
     def testInitMethod1(self):
@@ -17,6 +17,7 @@ import asyncio
 
 from src.server.server import start_server
 from src.udfs.udf_bootstrap_queries import init_builtin_udfs
+from src.udfs.udf_registry import UdfRegistry
 from src.configuration.configuration_manager import ConfigurationManager
 from src.utils.logging_manager import LoggingManager
 from src.utils.logging_manager import LoggingLevel
@@ -37,6 +38,9 @@ def eva():
     loop = asyncio.new_event_loop()
     stop_server_future = loop.create_future()
 
+    # load the configured models before accepting queries
+    UdfRegistry().warm_up()
+
     # Launch server
     try:
         asyncio.run(start_server(host=hostname,
@@ -13,18 +13,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from src.catalog.column_type import ColumnType, NdArrayType
 from src.catalog.models.base_model import init_db, drop_db
 from src.catalog.models.df_column import DataFrameColumn
 from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.df_row_group import DataFrameRowGroup
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.models.pp_filter import PPFilterMetadata
 from src.catalog.models.udf import UdfMetadata
 from src.catalog.models.udf_io import UdfIO
+from src.catalog.models.udf_profile import UdfProfile
 from src.catalog.services.df_column_service import DatasetColumnService
 from src.catalog.services.df_service import DatasetService
+from src.catalog.services.df_row_group_service import DatasetRowGroupService
+from src.catalog.services.df_statistics_service import \
+    DatasetStatisticsService
+from src.catalog.services.pp_filter_service import PPFilterService
 from src.catalog.services.udf_service import UdfService
 from src.catalog.services.udf_io_service import UdfIOService
+from src.catalog.services.udf_profile_service import UdfProfileService
 from src.utils.logging_manager import LoggingLevel
 from src.utils.logging_manager import LoggingManager
 
@@ -43,8 +52,12 @@ class CatalogManager(object):
     def __init__(self):
         self._dataset_service = DatasetService()
         self._column_service = DatasetColumnService()
+        self._row_group_service = DatasetRowGroupService()
+        self._statistics_service = DatasetStatisticsService()
         self._udf_service = UdfService()
         self._udf_io_service = UdfIOService()
+        self._udf_profile_service = UdfProfileService()
+        self._pp_filter_service = PPFilterService()
 
     def reset(self):
         """
@@ -297,8 +310,147 @@ class CatalogManager(object):
            True if successfully deleted else False
         """
         metadata_id = self._dataset_service.dataset_by_name(table_name)
+        self._row_group_service.delete_row_groups_by_dataset_id(metadata_id)
+        self._statistics_service.delete_statistics_by_dataset_id(metadata_id)
+        self._pp_filter_service.delete_filters_by_dataset_id(metadata_id)
         return self._dataset_service.delete_dataset_by_id(metadata_id)
 
+    def add_row_group_statistics(self, metadata_id: int,
+                                 row_groups: List[DataFrameRowGroup]) -> \
+            List[DataFrameRowGroup]:
+        """Persists the statistics of newly written row groups of a table
+
+        Arguments:
+            metadata_id (int): metadata id of the table
+            row_groups (List[DataFrameRowGroup]): statistics to be added
+
+        Returns:
+            The persisted DataFrameRowGroup objects
+        """
+        for row_group in row_groups:
+            row_group.metadata_id = metadata_id
+        return self._row_group_service.create_row_groups(row_groups)
+
+    def get_row_group_statistics(self, metadata_id: int) -> \
+            List[DataFrameRowGroup]:
+        """Returns the row group statistics of a table, ordered by file
+        and row group
+
+        Arguments:
+            metadata_id (int): metadata id of the table
+        """
+        return self._row_group_service.row_groups_by_dataset_id(metadata_id)
+
+    def delete_row_group_statistics(self, metadata_id: int):
+        """Drops the row group statistics of a table, e.g. when its data is
+        recreated
+
+        Arguments:
+            metadata_id (int): metadata id of the table
+        """
+        self._row_group_service.delete_row_groups_by_dataset_id(metadata_id)
+
+    def update_table_statistics(self, metadata_id: int, num_rows: int,
+                                frame_dims: List[int] = None,
+                                histograms: Dict[str, Dict] = None) -> \
+            DataFrameStatistics:
+        """Replaces the statistics of a table
+
+        Arguments:
+            metadata_id (int): metadata id of the table
+            num_rows (int): number of rows of the table
+            frame_dims (List[int]): dimensions of a frame, None if the table
+                has no frames
+            histograms (Dict[str, Dict]): column name to histogram of the
+                numeric scalar columns
+
+        Returns:
+            The persisted DataFrameStatistics object
+        """
+        return self._statistics_service.update_statistics(
+            metadata_id, num_rows, frame_dims, histograms)
+
+    def get_table_statistics(self, metadata_id: int) -> DataFrameStatistics:
+        """Returns the statistics of a table, None if none were collected
+
+        Arguments:
+            metadata_id (int): metadata id of the table
+        """
+        return self._statistics_service.statistics_by_dataset_id(metadata_id)
+
+    def add_udf_profile(self, udf_name: str, device: str,
+                        calls: List[Tuple[int, float]]) -> UdfProfile:
+        """Accumulates profiled calls of a udf into its cost profile
+
+        Arguments:
+            udf_name (str): name of the udf
+            device (str): device the calls ran on
+            calls (List[Tuple[int, float]]): (number of frames, elapsed
+                milliseconds) of every call
+
+        Returns:
+            The persisted UdfProfile object, None if the udf is unknown
+        """
+        udf = self._udf_service.udf_by_name(udf_name)
+        if udf is None:
+            return None
+        return self._udf_profile_service.add_calls(udf.id, device, calls)
+
+    def get_udf_profile(self, udf_name: str, device: str) -> UdfProfile:
+        """Returns the cost profile of a udf on a device, None if it was
+        never profiled there
+
+        Arguments:
+            udf_name (str): name of the udf
+            device (str): device the udf runs on
+        """
+        udf = self._udf_service.udf_by_name(udf_name)
+        if udf is None:
+            return None
+        return self._udf_profile_service.profile_by_udf_id(udf.id, device)
+
+    def add_pp_filter(self, udf_name: str, metadata_id: int, output: str,
+                      label: str, accuracy: float, reduction: float,
+                      model: bytes) -> PPFilterMetadata:
+        """Stores the probabilistic predicate trained on a table for a label
+        of a udf output, replacing any previous one
+
+        Arguments:
+            udf_name (str): name of the udf
+            metadata_id (int): metadata id of the table
+            output (str): output column of the udf
+            label (str): label the filter predicts
+            accuracy (float): fraction of the frames with the label passing
+            reduction (float): fraction of the frames filtered out
+            model (bytes): serialized classifier
+
+        Returns:
+            The persisted PPFilterMetadata object, None if the udf is
+            unknown
+        """
+        udf = self._udf_service.udf_by_name(udf_name)
+        if udf is None:
+            return None
+        return self._pp_filter_service.update_filter(
+            udf.id, metadata_id, output, label, accuracy, reduction, model)
+
+    def get_pp_filter(self, udf_name: str, metadata_id: int, output: str,
+                      label: str) -> PPFilterMetadata:
+        """Returns the probabilistic predicate trained on a table for a
+        label of a udf output, None if there is none
+
+        Arguments:
+            udf_name (str): name of the udf
+            metadata_id (int): metadata id of the table
+            output (str): output column of the udf
+            label (str): label the filter predicts
+        """
+        udf = self._udf_service.udf_by_name(udf_name)
+        if udf is None:
+            return None
+        return self._pp_filter_service.filter_by_udf_id(
+            udf.id, metadata_id, output, label)
+
     def delete_udf(self, udf_name: str) -> bool:
         """
         This method drops the udf entry from the catalog
@@ -309,6 +461,10 @@ class CatalogManager(object):
         Returns:
            True if successfully deleted else False
         """
+        udf = self._udf_service.udf_by_name(udf_name)
+        if udf is not None:
+            self._udf_profile_service.delete_profiles_by_udf_id(udf.id)
+            self._pp_filter_service.delete_filters_by_udf_id(udf.id)
         return self._udf_service.delete_udf_by_name(udf_name)
 
     def get_udf_io_by_name(self, udf: UdfMetadata, udf_io_name: str) -> UdfIO:
@@ -0,0 +1,98 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from sqlalchemy import Column, String, Integer, BigInteger, \
+    UniqueConstraint, ForeignKey
+
+from src.catalog.models.base_model import BaseModel
+
+
+class DataFrameRowGroup(BaseModel):
+    """
+    Statistics of one row group of a parquet file of a table: the number
+    of rows and the min/max value of the identifier column. Scans use them
+    to skip the row groups an id range predicate cannot match.
+    """
+    __tablename__ = 'df_row_group'
+
+    _file_name = Column('file_name', String(200))
+    _row_group = Column('row_group', Integer)
+    _num_rows = Column('num_rows', BigInteger)
+    _min_id = Column('min_id', BigInteger, nullable=True)
+    _max_id = Column('max_id', BigInteger, nullable=True)
+    _metadata_id = Column('metadata_id', Integer,
+                          ForeignKey('df_metadata.id'))
+
+    __table_args__ = (
+        UniqueConstraint('metadata_id', 'file_name', 'row_group'), {}
+    )
+
+    def __init__(self,
+                 file_name: str,
+                 row_group: int,
+                 num_rows: int,
+                 min_id: int = None,
+                 max_id: int = None,
+                 metadata_id: int = None):
+        self._file_name = file_name
+        self._row_group = row_group
+        self._num_rows = num_rows
+        self._min_id = min_id
+        self._max_id = max_id
+        self._metadata_id = metadata_id
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    @property
+    def row_group(self):
+        return self._row_group
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    @property
+    def min_id(self):
+        return self._min_id
+
+    @property
+    def max_id(self):
+        return self._max_id
+
+    @property
+    def metadata_id(self):
+        return self._metadata_id
+
+    @metadata_id.setter
+    def metadata_id(self, value):
+        self._metadata_id = value
+
+    def __str__(self):
+        return "RowGroup: (%s, %s, %s rows, id [%s, %s])" % (
+            self._file_name, self._row_group, self._num_rows,
+            self._min_id, self._max_id)
+
+    def __eq__(self, other):
+        return self.metadata_id == other.metadata_id and \
+            self.file_name == other.file_name and \
+            self.row_group == other.row_group and \
+            self.num_rows == other.num_rows and \
+            self.min_id == other.min_id and \
+            self.max_id == other.max_id
@@ -0,0 +1,82 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from typing import Dict, List
+
+from sqlalchemy import Column, Integer, BigInteger, Text, ForeignKey
+
+from src.catalog.models.base_model import BaseModel
+
+
+class DataFrameStatistics(BaseModel):
+    """
+    Statistics of a table used by the optimizer cost model: the number of
+    rows, the dimensions of its frames and an equi-width histogram of every
+    numeric scalar column. Collected by LOAD DATA and INSERT.
+
+    A histogram is stored as {'bounds': [b0, ..., bn], 'counts':
+    [c1, ..., cn]}, bucket i holding the c(i+1) values in [bi, bi+1).
+    """
+    __tablename__ = 'df_statistics'
+
+    _num_rows = Column('num_rows', BigInteger)
+    _frame_dims = Column('frame_dims', Text, nullable=True)
+    _histograms = Column('histograms', Text)
+    _metadata_id = Column('metadata_id', Integer,
+                          ForeignKey('df_metadata.id'), unique=True)
+
+    def __init__(self,
+                 num_rows: int,
+                 frame_dims: List[int] = None,
+                 histograms: Dict[str, Dict] = None,
+                 metadata_id: int = None):
+        self._num_rows = num_rows
+        self._frame_dims = json.dumps(frame_dims) if frame_dims else None
+        self._histograms = json.dumps(histograms or {})
+        self._metadata_id = metadata_id
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    @property
+    def frame_dims(self) -> List[int]:
+        return json.loads(self._frame_dims) if self._frame_dims else None
+
+    @property
+    def histograms(self) -> Dict[str, Dict]:
+        return json.loads(self._histograms) if self._histograms else {}
+
+    @property
+    def metadata_id(self):
+        return self._metadata_id
+
+    @metadata_id.setter
+    def metadata_id(self, value):
+        self._metadata_id = value
+
+    def __str__(self):
+        return "Statistics: (%s rows, frames %s, histograms of %s)" % (
+            self._num_rows, self.frame_dims, list(self.histograms))
+
+    def __eq__(self, other):
+        return self.metadata_id == other.metadata_id and \
+            self.num_rows == other.num_rows and \
+            self.frame_dims == other.frame_dims and \
+            self.histograms == other.histograms
@@ -0,0 +1,104 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from sqlalchemy import Column, String, Integer, Float, LargeBinary, \
+    UniqueConstraint, ForeignKey
+
+from src.catalog.models.base_model import BaseModel
+
+
+class PPFilterMetadata(BaseModel):
+    """
+    Probabilistic predicate trained on a table for a label of a UDF
+    output: a cheap binary classifier telling whether a frame may hold the
+    label. `accuracy` is the fraction of the frames holding the label it
+    accepted on held out frames, `reduction` the fraction of all the held
+    out frames it rejected. The serialized classifier is in `model`.
+    """
+    __tablename__ = 'pp_filter'
+
+    _output = Column('output', String(100))
+    _label = Column('label', String(100))
+    _accuracy = Column('accuracy', Float)
+    _reduction = Column('reduction', Float)
+    _model = Column('model', LargeBinary)
+    _udf_id = Column('udf_id', Integer, ForeignKey('udf.id'))
+    _metadata_id = Column('metadata_id', Integer,
+                          ForeignKey('df_metadata.id'))
+
+    __table_args__ = (
+        UniqueConstraint('udf_id', 'metadata_id', 'output', 'label'), {}
+    )
+
+    def __init__(self,
+                 output: str,
+                 label: str,
+                 accuracy: float,
+                 reduction: float,
+                 model: bytes,
+                 udf_id: int = None,
+                 metadata_id: int = None):
+        self._output = output
+        self._label = label
+        self._accuracy = accuracy
+        self._reduction = reduction
+        self._model = model
+        self._udf_id = udf_id
+        self._metadata_id = metadata_id
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def output(self):
+        return self._output
+
+    @property
+    def label(self):
+        return self._label
+
+    @property
+    def accuracy(self):
+        return self._accuracy
+
+    @property
+    def reduction(self):
+        return self._reduction
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def udf_id(self):
+        return self._udf_id
+
+    @property
+    def metadata_id(self):
+        return self._metadata_id
+
+    def __str__(self):
+        return "PPFilter: (%s, %s, %s @> [%s], accuracy %.3f, " \
+               "reduction %.3f)" % (self._udf_id, self._metadata_id,
+                                    self._output, self._label,
+                                    self._accuracy, self._reduction)
+
+    def __eq__(self, other):
+        return self.udf_id == other.udf_id and \
+            self.metadata_id == other.metadata_id and \
+            self.output == other.output and \
+            self.label == other.label and \
+            self.accuracy == other.accuracy and \
+            self.reduction == other.reduction
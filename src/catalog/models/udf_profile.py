@@ -0,0 +1,117 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from sqlalchemy import Column, String, Integer, BigInteger, Float, \
+    UniqueConstraint, ForeignKey
+
+from src.catalog.models.base_model import BaseModel
+
+
+class UdfProfile(BaseModel):
+    """
+    Measured runtime of a UDF on a device. Every profiled call of the UDF
+    on a batch of n frames taking t ms is accumulated, and the runtime of a
+    call is fitted as t = ms_per_call + n * ms_per_frame by least squares,
+    so the cost model sees both the per frame cost and the benefit of
+    batching.
+    """
+    __tablename__ = 'udf_profile'
+
+    _device = Column('device', String(50))
+    _calls = Column('calls', Integer)
+    _frames = Column('frames', BigInteger)
+    _total_ms = Column('total_ms', Float)
+    _frames_sq = Column('frames_sq', Float)
+    _frames_ms = Column('frames_ms', Float)
+    _udf_id = Column('udf_id', Integer, ForeignKey('udf.id'))
+
+    __table_args__ = (
+        UniqueConstraint('udf_id', 'device'), {}
+    )
+
+    def __init__(self, device: str, udf_id: int = None):
+        self._device = device
+        self._udf_id = udf_id
+        self._calls = 0
+        self._frames = 0
+        self._total_ms = 0.0
+        self._frames_sq = 0.0
+        self._frames_ms = 0.0
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def device(self):
+        return self._device
+
+    @property
+    def udf_id(self):
+        return self._udf_id
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def frames(self):
+        return self._frames
+
+    def add_call(self, num_frames: int, elapsed_ms: float):
+        """Accumulates a call on num_frames frames that took elapsed_ms"""
+        self._calls += 1
+        self._frames += num_frames
+        self._total_ms += elapsed_ms
+        self._frames_sq += float(num_frames) ** 2
+        self._frames_ms += num_frames * elapsed_ms
+
+    @property
+    def ms_per_frame(self) -> float:
+        if not self._frames:
+            return 0.0
+        variance = self._calls * self._frames_sq - float(self._frames) ** 2
+        if variance > 0:
+            slope = (self._calls * self._frames_ms -
+                     self._frames * self._total_ms) / variance
+            if slope > 0:
+                return slope
+        # single batch size (or noise): no per call overhead to separate
+        return self._total_ms / self._frames
+
+    @property
+    def ms_per_call(self) -> float:
+        if not self._calls:
+            return 0.0
+        return max(0.0, (self._total_ms - self.ms_per_frame * self._frames)
+                   / self._calls)
+
+    def estimate_ms(self, num_frames: int, batch_size: int = 1) -> float:
+        """
+        Estimated runtime of the UDF on num_frames frames evaluated in
+        batches of batch_size frames
+        """
+        batch_size = max(1, batch_size)
+        num_calls = -(-num_frames // batch_size)
+        return num_calls * self.ms_per_call + num_frames * self.ms_per_frame
+
+    def __str__(self):
+        return "UdfProfile: (%s, %s, %.3f ms/call, %.3f ms/frame)" % (
+            self._udf_id, self._device, self.ms_per_call, self.ms_per_frame)
+
+    def __eq__(self, other):
+        return self.udf_id == other.udf_id and \
+            self.device == other.device and \
+            self.calls == other.calls and \
+            self.frames == other.frames
@@ -64,7 +64,7 @@ class SchemaUtils(object):
             np_type = NdArrayType.to_numpy_type(column_array_type)
             petastorm_column = UnischemaField(column_name,
                                               np_type,
-                                              column_array_dimensions,
+                                              tuple(column_array_dimensions),
                                               NdarrayCodec(),
                                               column_is_nullable)
         else:
@@ -0,0 +1,53 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import List
+
+from src.catalog.models.df_row_group import DataFrameRowGroup
+from src.catalog.services.base_service import BaseService
+
+
+class DatasetRowGroupService(BaseService):
+    def __init__(self):
+        super().__init__(DataFrameRowGroup)
+
+    def create_row_groups(self, row_groups: List[DataFrameRowGroup]):
+        saved_row_groups = []
+        for row_group in row_groups:
+            saved_row_groups.append(row_group.save())
+        return saved_row_groups
+
+    def row_groups_by_dataset_id(self,
+                                 dataset_id: int) -> List[DataFrameRowGroup]:
+        """return the row group statistics of the dataset
+
+        Arguments:
+            dataset_id {int} -- [metadata id of the table]
+
+        Returns:
+            List[self.model] -- [statistics ordered by file and row group]
+        """
+        return self.model.query \
+            .filter(self.model._metadata_id == dataset_id) \
+            .order_by(self.model._file_name, self.model._row_group) \
+            .all()
+
+    def delete_row_groups_by_dataset_id(self, dataset_id: int):
+        """drop the row group statistics of the dataset
+
+        Arguments:
+            dataset_id {int} -- [metadata id of the table]
+        """
+        for row_group in self.row_groups_by_dataset_id(dataset_id):
+            row_group.delete()
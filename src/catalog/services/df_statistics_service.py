@@ -0,0 +1,65 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Dict, List
+
+from sqlalchemy.orm.exc import NoResultFound
+
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.services.base_service import BaseService
+
+
+class DatasetStatisticsService(BaseService):
+    def __init__(self):
+        super().__init__(DataFrameStatistics)
+
+    def statistics_by_dataset_id(self, dataset_id: int) -> \
+            DataFrameStatistics:
+        """return the statistics of the dataset, None if there are none
+
+        Arguments:
+            dataset_id {int} -- [metadata id of the table]
+        """
+        try:
+            return self.model.query \
+                .filter(self.model._metadata_id == dataset_id).one()
+        except NoResultFound:
+            return None
+
+    def update_statistics(self, dataset_id: int, num_rows: int,
+                          frame_dims: List[int],
+                          histograms: Dict[str, Dict]) -> \
+            DataFrameStatistics:
+        """replace the statistics of the dataset
+
+        Arguments:
+            dataset_id {int} -- [metadata id of the table]
+            num_rows {int} -- [number of rows of the table]
+            frame_dims {List[int]} -- [dimensions of a frame, if any]
+            histograms {Dict[str, Dict]} -- [column name to histogram]
+        """
+        self.delete_statistics_by_dataset_id(dataset_id)
+        statistics = self.model(num_rows, frame_dims, histograms,
+                                metadata_id=dataset_id)
+        return statistics.save()
+
+    def delete_statistics_by_dataset_id(self, dataset_id: int):
+        """drop the statistics of the dataset
+
+        Arguments:
+            dataset_id {int} -- [metadata id of the table]
+        """
+        statistics = self.statistics_by_dataset_id(dataset_id)
+        if statistics is not None:
+            statistics.delete()
@@ -0,0 +1,85 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from sqlalchemy.orm.exc import NoResultFound
+
+from src.catalog.models.pp_filter import PPFilterMetadata
+from src.catalog.services.base_service import BaseService
+
+
+class PPFilterService(BaseService):
+    def __init__(self):
+        super().__init__(PPFilterMetadata)
+
+    def filter_by_udf_id(self, udf_id: int, dataset_id: int, output: str,
+                         label: str) -> PPFilterMetadata:
+        """return the filter trained on the dataset for the label of the
+           udf output, None if there is none
+
+        Arguments:
+            udf_id (int): id of the udf
+            dataset_id (int): metadata id of the table
+            output (str): output column of the udf
+            label (str): label the filter predicts
+        """
+        try:
+            return self.model.query \
+                .filter(self.model._udf_id == udf_id) \
+                .filter(self.model._metadata_id == dataset_id) \
+                .filter(self.model._output == output) \
+                .filter(self.model._label == label).one()
+        except NoResultFound:
+            return None
+
+    def update_filter(self, udf_id: int, dataset_id: int, output: str,
+                      label: str, accuracy: float, reduction: float,
+                      model: bytes) -> PPFilterMetadata:
+        """replace the filter trained on the dataset for the label of the
+           udf output
+
+        Arguments:
+            udf_id (int): id of the udf
+            dataset_id (int): metadata id of the table
+            output (str): output column of the udf
+            label (str): label the filter predicts
+            accuracy (float): fraction of the frames with the label passing
+            reduction (float): fraction of the frames filtered out
+            model (bytes): serialized classifier
+        """
+        pp_filter = self.filter_by_udf_id(udf_id, dataset_id, output, label)
+        if pp_filter is not None:
+            pp_filter.delete()
+        pp_filter = self.model(output, label, accuracy, reduction, model,
+                               udf_id=udf_id, metadata_id=dataset_id)
+        return pp_filter.save()
+
+    def delete_filters_by_udf_id(self, udf_id: int):
+        """drop the filters of the udf on every dataset
+
+        Arguments:
+            udf_id (int): id of the udf
+        """
+        for pp_filter in self.model.query \
+                .filter(self.model._udf_id == udf_id).all():
+            pp_filter.delete()
+
+    def delete_filters_by_dataset_id(self, dataset_id: int):
+        """drop the filters trained on the dataset
+
+        Arguments:
+            dataset_id (int): metadata id of the table
+        """
+        for pp_filter in self.model.query \
+                .filter(self.model._metadata_id == dataset_id).all():
+            pp_filter.delete()
@@ -0,0 +1,67 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import List, Tuple
+
+from sqlalchemy.orm.exc import NoResultFound
+
+from src.catalog.models.udf_profile import UdfProfile
+from src.catalog.services.base_service import BaseService
+
+
+class UdfProfileService(BaseService):
+    def __init__(self):
+        super().__init__(UdfProfile)
+
+    def profile_by_udf_id(self, udf_id: int, device: str) -> UdfProfile:
+        """return the profile of the udf on the device, None if the udf
+           was never profiled there
+
+        Arguments:
+            udf_id (int): id of the udf
+            device (str): device the udf ran on
+        """
+        try:
+            return self.model.query \
+                .filter(self.model._udf_id == udf_id) \
+                .filter(self.model._device == device).one()
+        except NoResultFound:
+            return None
+
+    def add_calls(self, udf_id: int, device: str,
+                  calls: List[Tuple[int, float]]) -> UdfProfile:
+        """accumulate profiled calls into the profile of the udf
+
+        Arguments:
+            udf_id (int): id of the udf
+            device (str): device the udf ran on
+            calls (List[Tuple[int, float]]): (number of frames, elapsed
+                milliseconds) of every call
+        """
+        profile = self.profile_by_udf_id(udf_id, device)
+        if profile is None:
+            profile = self.model(device, udf_id)
+        for num_frames, elapsed_ms in calls:
+            profile.add_call(num_frames, elapsed_ms)
+        return profile.save()
+
+    def delete_profiles_by_udf_id(self, udf_id: int):
+        """drop the profiles of the udf on every device
+
+        Arguments:
+            udf_id (int): id of the udf
+        """
+        for profile in self.model.query \
+                .filter(self.model._udf_id == udf_id).all():
+            profile.delete()
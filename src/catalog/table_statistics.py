@@ -0,0 +1,207 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Dict, List
+
+import numpy as np
+
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+
+NUM_BUCKETS = 32
+# values of every column kept to build its histogram
+SAMPLE_SIZE = 10000
+
+
+def build_histogram(values: np.ndarray, num_rows: int = None,
+                    low=None, high=None,
+                    num_buckets: int = NUM_BUCKETS) -> Dict:
+    """
+    Equi-width histogram of the values, scaled to num_rows if the values are
+    a sample. Integer columns get buckets of whole values over
+    [low, high + 1), so an equality is a range of width one.
+
+    Arguments:
+        values (np.ndarray): numeric values (or a sample of them)
+        num_rows (int): number of rows the values stand for
+        low, high: exact extremes of the column, the sample ones if None
+    """
+    values = np.asarray(values)
+    integer = values.dtype.kind in 'biu'
+    values = values.astype(np.float64)
+    low = float(values.min() if low is None else low)
+    high = float(values.max() if high is None else high)
+    if integer:
+        high += 1
+        num_buckets = int(min(num_buckets, high - low))
+    elif high == low:
+        high = low + 1
+    counts, bounds = np.histogram(values, bins=max(1, num_buckets),
+                                  range=(low, high))
+    counts = counts.astype(np.float64)
+    if num_rows is not None and len(values):
+        counts *= num_rows / len(values)
+    return {'bounds': bounds.tolist(), 'counts': counts.tolist(),
+            'integer': integer}
+
+
+def _overlap(bounds: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Fraction of every bucket inside [low, high)"""
+    widths = bounds[1:] - bounds[:-1]
+    inside = np.clip(np.minimum(bounds[1:], high) -
+                     np.maximum(bounds[:-1], low), 0, None)
+    return np.divide(inside, widths, out=np.zeros_like(widths),
+                     where=widths > 0)
+
+
+def merge_histograms(left: Dict, right: Dict,
+                     num_buckets: int = NUM_BUCKETS) -> Dict:
+    """
+    Histogram of the union of two columns: the buckets of both are spread
+    uniformly over equi-width buckets covering both ranges.
+    """
+    integer = left.get('integer', False) and right.get('integer', False)
+    low = min(left['bounds'][0], right['bounds'][0])
+    high = max(left['bounds'][-1], right['bounds'][-1])
+    if integer:
+        num_buckets = int(min(num_buckets, high - low))
+    bounds = np.linspace(low, high, max(1, num_buckets) + 1)
+    counts = np.zeros(len(bounds) - 1)
+    for histogram in [left, right]:
+        source_bounds = np.asarray(histogram['bounds'], dtype=np.float64)
+        for count, start, end in zip(histogram['counts'],
+                                     source_bounds[:-1], source_bounds[1:]):
+            if end > start:
+                counts += count * _overlap(bounds, start, end) * \
+                    (bounds[1:] - bounds[:-1]) / (end - start)
+            else:
+                counts[min(np.searchsorted(bounds, start, 'right') - 1,
+                           len(counts) - 1)] += count
+    return {'bounds': bounds.tolist(), 'counts': counts.tolist(),
+            'integer': integer}
+
+
+def estimate_rows_in_range(histogram: Dict, low=None, high=None) -> float:
+    """
+    Estimated number of rows with low <= value <= high, values being
+    uniform within a bucket. None bounds are open.
+    """
+    bounds = np.asarray(histogram['bounds'], dtype=np.float64)
+    counts = np.asarray(histogram['counts'], dtype=np.float64)
+    low = bounds[0] if low is None else float(low)
+    if high is None:
+        high = bounds[-1]
+    elif histogram.get('integer', False):
+        high = np.floor(float(high)) + 1
+        low = np.ceil(low)
+    else:
+        # an inclusive bound on a continuous column
+        high = np.nextafter(float(high), np.inf)
+    return float((counts * _overlap(bounds, low, high)).sum())
+
+
+def _column_names(batch: Batch) -> List[str]:
+    if isinstance(batch, ColumnarBatch):
+        return list(batch.columns)
+    return list(batch.frames.columns)
+
+
+def _column_values(batch: Batch, name: str):
+    if isinstance(batch, ColumnarBatch):
+        return batch.columns[name]
+    return batch.frames[name]
+
+
+class TableStatisticsCollector:
+    """
+    Collects the statistics of the rows written into a table: the row
+    count, the dimensions of the frames of the `data` column and a sample
+    of every numeric scalar column, turned into histograms once all the
+    batches were seen. Batches are not kept.
+
+    Arguments:
+        sample_size (int): values sampled per column, by reservoir sampling
+    """
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self._sample_size = sample_size
+        self._random = np.random.RandomState(0)
+        self.num_rows = 0
+        self.frame_dims = None
+        self._samples = {}
+        self._seen = {}
+        self._ranges = {}
+
+    def update(self, batch: Batch):
+        """Accounts for the rows of the batch"""
+        if batch.empty():
+            return
+        for name in _column_names(batch):
+            values = _column_values(batch, name)
+            first = values[0] if isinstance(values, np.ndarray) \
+                else values.iloc[0]
+            if isinstance(first, np.ndarray) and first.ndim:
+                if name == 'data' and self.frame_dims is None:
+                    self.frame_dims = list(first.shape)
+                continue
+            values = np.asarray(values)
+            if values.dtype.kind in 'biuf':
+                self._sample(name, values)
+        self.num_rows += len(batch)
+
+    def _sample(self, name: str, values: np.ndarray):
+        low, high = values.min(), values.max()
+        if name in self._ranges:
+            low = min(low, self._ranges[name][0])
+            high = max(high, self._ranges[name][1])
+        self._ranges[name] = (low, high)
+
+        seen = self._seen.get(name, 0)
+        sample = self._samples.get(name, values[:0])
+        free = max(0, self._sample_size - len(sample))
+        sample = np.concatenate([sample, values[:free]])
+        rest = values[free:]
+        if len(rest):
+            # reservoir sampling: value t replaces a random slot w.p. S / t
+            positions = np.arange(seen + free, seen + len(values)) + 1
+            slots = (self._random.random_sample(len(rest)) *
+                     positions).astype(np.int64)
+            kept = slots < self._sample_size
+            sample[slots[kept]] = rest[kept]
+        self._samples[name] = sample
+        self._seen[name] = seen + len(values)
+
+    def histograms(self) -> Dict[str, Dict]:
+        return {name: build_histogram(sample, self._seen[name],
+                                      *self._ranges[name])
+                for name, sample in self._samples.items() if len(sample)}
+
+    def merged_with(self, statistics: DataFrameStatistics):
+        """
+        (num_rows, frame_dims, histograms) of the collected rows appended
+        to a table with the given statistics, the collected ones if None
+        """
+        histograms = self.histograms()
+        if statistics is None:
+            return self.num_rows, self.frame_dims, histograms
+        for name, histogram in statistics.histograms.items():
+            if name in histograms:
+                histograms[name] = merge_histograms(histogram,
+                                                    histograms[name])
+            else:
+                histograms[name] = histogram
+        return (statistics.num_rows + self.num_rows,
+                statistics.frame_dims or self.frame_dims,
+                histograms)
@@ -0,0 +1,102 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import queue
+import threading
+from typing import Callable, Iterable
+
+# seconds a blocked producer waits before checking if the consumer left
+_POLL_SECONDS = 0.1
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class BackgroundIterator:
+    """
+    Iterates over the iterable returned by source in a background thread,
+    which puts the items in a bounded queue the consumer reads from.
+
+    Errors of the source are raised in the consumer. close() stops the
+    producer at its next item and closes the source.
+
+    Arguments:
+        source (Callable[[], Iterable]): creates the iterable, called in
+            the background thread
+        queue_size (int): items read ahead of the consumer
+        name (str): name of the background thread
+    """
+
+    def __init__(self, source: Callable[[], Iterable], queue_size: int,
+                 name: str = 'eva-background'):
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stopped = threading.Event()
+        self._done = False
+        self._producer = threading.Thread(target=self._produce,
+                                          args=(source,), name=name,
+                                          daemon=True)
+        self._producer.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get()
+
+    def get(self, timeout: float = None):
+        """
+        Next item of the source. Raises queue.Empty if none arrived within
+        timeout seconds, StopIteration at the end of the source.
+        """
+        if self._done:
+            raise StopIteration
+        item = self._queue.get(timeout=timeout)
+        if item is _END:
+            self._done = True
+            raise StopIteration
+        if isinstance(item, _Failure):
+            self._done = True
+            raise item.error
+        return item
+
+    def close(self):
+        self._stopped.set()
+
+    def _produce(self, source: Callable[[], Iterable]):
+        output = None
+        try:
+            output = source()
+            for item in output or []:
+                if not self._put(item):
+                    return
+            self._put(_END)
+        except BaseException as error:
+            self._put(_Failure(error))
+        finally:
+            if hasattr(output, 'close'):
+                output.close()
+
+    def _put(self, item) -> bool:
+        """Blocks until there is room for item, False if the consumer
+        stopped before"""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -18,6 +18,8 @@ from src.planner.create_plan import CreatePlan
 from src.executor.abstract_executor import AbstractExecutor
 from src.utils.generic_utils import generate_file_path
 from src.storage.storage_engine import StorageEngine
+from src.storage.buffer_pool import BufferPool
+from src.storage.udf_result_cache import UdfResultCache
 
 
 class CreateExecutor(AbstractExecutor):
@@ -45,3 +47,5 @@ class CreateExecutor(AbstractExecutor):
                                                     self.node.column_list)
 
         StorageEngine.create(table=metadata)
+        BufferPool().invalidate(metadata)
+        UdfResultCache().invalidate(metadata)
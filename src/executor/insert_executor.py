@@ -14,9 +14,12 @@
 # limitations under the License.
 
 from src.catalog.catalog_manager import CatalogManager
+from src.catalog.table_statistics import TableStatisticsCollector
 from src.planner.insert_plan import InsertPlan
 from src.executor.abstract_executor import AbstractExecutor
 from src.storage.storage_engine import StorageEngine
+from src.storage.buffer_pool import BufferPool
+from src.storage.udf_result_cache import UdfResultCache
 from src.models.storage.batch import Batch
 from src.catalog.schema_utils import SchemaUtils
 
@@ -49,3 +52,11 @@ class InsertExecutor(AbstractExecutor):
         batch.frames = SchemaUtils.petastorm_type_cast(
             metadata.schema.petastorm_schema, batch.frames)
         StorageEngine.write(metadata, batch)
+        BufferPool().invalidate(metadata)
+        UdfResultCache().invalidate(metadata)
+
+        statistics = TableStatisticsCollector()
+        statistics.update(batch)
+        CatalogManager().update_table_statistics(
+            table_id, *statistics.merged_with(
+                CatalogManager().get_table_statistics(table_id)))
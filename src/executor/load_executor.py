@@ -16,9 +16,13 @@
 import os
 import pandas as pd
 
+from src.catalog.catalog_manager import CatalogManager
+from src.catalog.table_statistics import TableStatisticsCollector
 from src.planner.load_data_plan import LoadDataPlan
 from src.executor.abstract_executor import AbstractExecutor
 from src.storage.storage_engine import StorageEngine
+from src.storage.buffer_pool import BufferPool
+from src.storage.udf_result_cache import UdfResultCache
 from src.readers.opencv_reader import OpenCVReader
 from src.models.storage.batch import Batch
 from src.configuration.configuration_manager import ConfigurationManager
@@ -48,13 +52,28 @@ class LoadDataExecutor(AbstractExecutor):
 
         # We currently use create to empty existing table.
         StorageEngine.create(self.node.table_metainfo)
+        BufferPool().invalidate(self.node.table_metainfo)
+        UdfResultCache().invalidate(self.node.table_metainfo)
         num_loaded_frames = 0
+        statistics = TableStatisticsCollector()
         video_reader = OpenCVReader(
             os.path.join(self.path_prefix, self.node.file_path),
             batch_mem_size=self.node.batch_mem_size)
-        for batch in video_reader.read():
-            StorageEngine.write(self.node.table_metainfo, batch)
-            num_loaded_frames += len(batch)
+
+        def count_frames(batches):
+            nonlocal num_loaded_frames
+            for batch in batches:
+                num_loaded_frames += len(batch)
+                statistics.update(batch)
+                yield batch
+
+        StorageEngine.bulk_write(self.node.table_metainfo,
+                                 count_frames(video_reader.read()))
+        # the table was recreated, its statistics are the loaded rows
+        table_id = getattr(self.node.table_metainfo, 'id', None)
+        if table_id is not None:
+            CatalogManager().update_table_statistics(
+                table_id, *statistics.merged_with(None))
 
         yield Batch(pd.DataFrame({'Video': str(self.node.file_path),
                                   'Num Loaded Frames': num_loaded_frames},
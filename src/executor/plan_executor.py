@@ -30,6 +30,10 @@ from src.executor.upload_executor import UploadExecutor
 from src.executor.storage_executor import StorageExecutor
 from src.executor.union_executor import UnionExecutor
 from src.executor.orderby_executor import OrderByExecutor
+from src.executor.prefetch_executor import PrefetchExecutor
+from src.executor.udf_cache_lookup_executor import UdfCacheLookupExecutor
+from src.executor.udf_residual_executor import UdfResidualExecutor
+from src.filters.pp_trainer import PPFilterTrainer
 
 
 class PlanExecutor:
@@ -85,6 +89,12 @@ class PlanExecutor:
             executor_node = LimitExecutor(node=plan)
         elif plan_opr_type == PlanOprType.SAMPLE:
             executor_node = SampleExecutor(node=plan)
+        elif plan_opr_type == PlanOprType.PREFETCH:
+            executor_node = PrefetchExecutor(node=plan)
+        elif plan_opr_type == PlanOprType.UDF_CACHE_LOOKUP:
+            executor_node = UdfCacheLookupExecutor(node=plan)
+        elif plan_opr_type == PlanOprType.UDF_RESIDUAL:
+            executor_node = UdfResidualExecutor(node=plan)
 
         # Build Executor Tree for children
         for children in plan.children:
@@ -103,9 +113,13 @@ class PlanExecutor:
 
     def execute_plan(self) -> Iterator[Batch]:
         """execute the plan tree
+
+        Once the plan ran to completion, the probabilistic predicates its
+        scans required are trained from the UDF outputs it cached.
         """
         execution_tree = self._build_execution_tree(self._plan)
         output = execution_tree.exec()
         if output is not None:
             yield from output
         self._clean_execution_tree(execution_tree)
+        PPFilterTrainer().train_plan(self._plan)
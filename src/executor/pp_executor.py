@@ -25,9 +25,8 @@ class PPExecutor(AbstractExecutor):
     Arguments:
         node (AbstractPlan): ...
 
-    Note: This look kind of redundant. This logic for now is similar to that
-    of sequential scan executor. Will decide to delete it depending on how
-    sequential scan evolves.
+    The predicate is a probabilistic predicate, cheap enough to evaluate on
+    every frame, placed below the sequential scan evaluating the exact one.
     """
 
     def __init__(self, node: PPScanPlan):
@@ -41,9 +40,8 @@ class PPExecutor(AbstractExecutor):
         child_executor = self.children[0]
         for batch in child_executor.exec():
             outcomes = self.predicate.evaluate(batch)
-            required_frame_ids = []
-            for i, outcome in enumerate(outcomes):
-                if outcome:
-                    required_frame_ids.append(i)
-
-            yield batch[required_frame_ids]
+            if isinstance(outcomes, Batch):
+                outcomes = outcomes.frames.to_numpy()
+            batch = batch.filter(outcomes)
+            if not batch.empty():
+                yield batch
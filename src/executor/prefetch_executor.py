@@ -0,0 +1,50 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Iterator
+
+from src.executor.abstract_executor import AbstractExecutor
+from src.executor.background_iterator import BackgroundIterator
+from src.models.storage.batch import Batch
+from src.planner.prefetch_plan import PrefetchPlan
+
+
+class PrefetchExecutor(AbstractExecutor):
+    """
+    Runs the child executor in a background thread, which puts its batches
+    in a bounded queue the parent executor reads from. Storage reads and
+    frame decoding below it overlap with the UDFs evaluated above it; the
+    queue bounds the batches held in memory.
+
+    Errors of the child are raised in the consumer. A consumer that stops
+    early, e.g. under a LIMIT, stops the producer at its next batch.
+
+    Arguments:
+        node (PrefetchPlan): The Prefetch Plan
+    """
+
+    def __init__(self, node: PrefetchPlan):
+        super().__init__(node)
+        self._queue_size = max(1, node.queue_size)
+
+    def validate(self):
+        pass
+
+    def exec(self) -> Iterator[Batch]:
+        batches = BackgroundIterator(self.children[0].exec,
+                                     self._queue_size, name='eva-prefetch')
+        try:
+            yield from batches
+        finally:
+            batches.close()
@@ -12,13 +12,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Iterator
+from typing import Iterable, Iterator
 
 from src.models.storage.batch import Batch
 from src.executor.abstract_executor import AbstractExecutor
 from src.planner.sample_plan import SamplePlan
 
 
+def sample_batches(batches: Iterable[Batch],
+                   sample_freq: int) -> Iterator[Batch]:
+    """Every sample_freq-th row of the batches, counted across batches"""
+    current = 0
+    for batch in batches:
+        yield batch[current::sample_freq]
+        current = (current - len(batch)) % sample_freq
+
+
 class SampleExecutor(AbstractExecutor):
     """
     Samples uniformly from the rows.
@@ -37,8 +46,4 @@ class SampleExecutor(AbstractExecutor):
 
     def exec(self) -> Iterator[Batch]:
         child_executor = self.children[0]
-
-        current = 0
-        for batch in child_executor.exec():
-            yield batch[current::self._sample_freq]
-            current = (current - len(batch)) % self._sample_freq
+        yield from sample_batches(child_executor.exec(), self._sample_freq)
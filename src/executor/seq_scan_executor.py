@@ -12,11 +12,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Iterator
+import queue
+import time
+from typing import Callable, Iterable, Iterator, List
 
+import numpy as np
+
+from src.configuration.configuration_manager import ConfigurationManager
 from src.models.storage.batch import Batch
 from src.executor.abstract_executor import AbstractExecutor
+from src.executor.background_iterator import BackgroundIterator
+from src.expression.expression_compiler import compile_expression
+from src.expression.expression_utils import function_expressions
 from src.planner.seq_scan_plan import SeqScanPlan
+from src.udfs.abstract_udfs import AbstractClassifierUDF
 import csv
 import uuid
 from datetime import datetime as dt
@@ -28,30 +37,132 @@ class SequentialScanExecutor(AbstractExecutor):
     Arguments:
         node (AbstractPlan): The SequentialScanPlan
 
+    Scans evaluating classifier UDFs micro batch their input with
+    `executor.inference_batch`: batches are accumulated until they hold
+    `size` rows, or `max_wait_ms` passed since the first one arrived, and
+    evaluated together, so that the models run on batches larger than the
+    storage batches. The rows are then split back into their input
+    batches, in order. The input is read in a background thread, so a
+    slow input does not hold the accumulated rows past `max_wait_ms`.
     """
 
     def __init__(self, node: SeqScanPlan):
         super().__init__(node)
-        self.predicate = node.predicate
+        # evaluated over numpy arrays, without a DataFrame per node
+        self.predicate = compile_expression(node.predicate)
         self.project_expr = node.columns
+        self._batch_rows, self._max_wait = self._inference_batch(node)
+
+    @staticmethod
+    def _inference_batch(node: SeqScanPlan):
+        """Rows and seconds to accumulate, (None, None) to evaluate every
+        batch on its own"""
+        exprs = list(node.columns or []) + [node.predicate]
+        if not any(isinstance(func_expr.function, AbstractClassifierUDF)
+                   for expr in exprs
+                   for func_expr in function_expressions(expr)):
+            return None, None
+        config = ConfigurationManager().get_value('executor',
+                                                  'inference_batch')
+        config = config if config else {}
+        size = config.get('size', 1)
+        if size <= 1:
+            return None, None
+        return size, config.get('max_wait_ms', 0) / 1000
 
     def validate(self):
         pass
 
     def exec(self) -> Iterator[Batch]:
         child_executor = self.children[0]
-        for batch in child_executor.exec():
-            # We do the predicate first
-            if not batch.empty() and self.predicate is not None:
-                outcomes = self.predicate.evaluate(batch).frames
-                batch = Batch(
-                    batch.frames[(outcomes > 0).to_numpy()].reset_index(
-                        drop=True))
-            # Then do project
-            if not batch.empty() and self.project_expr is not None:
-                # print("PROJECTION")
-                batches = [expr.evaluate(batch) for expr in self.project_expr]
-                batch = Batch.merge_column_wise(batches)
-
-            if not batch.empty():
+
+        def batches():
+            return (batch for batch in child_executor.exec()
+                    if not batch.empty())
+
+        if self._batch_rows is None:
+            for batch in batches():
+                batch = self._evaluate(batch)
+                if batch is not None:
+                    yield batch
+            return
+        for group in self._micro_batches(batches):
+            yield from self._evaluate_group(group)
+
+    def _evaluate(self, batch: Batch) -> Batch:
+        """Filtered and projected batch, None if no row is left"""
+        # We do the predicate first
+        if self.predicate is not None:
+            outcomes = self.predicate.values(batch)
+            batch = batch.filter(outcomes > 0)
+            if batch.empty():
+                return None
+        # Then do project
+        if self.project_expr is not None:
+            batches = [expr.evaluate(batch)
+                       for expr in self.project_expr]
+            batch = Batch.merge_column_wise(batches)
+        return None if batch.empty() else batch
+
+    def _micro_batches(self, batches: Callable[[], Iterable[Batch]]) -> \
+            Iterator[List[Batch]]:
+        """
+        Groups consecutive batches until they hold the inference batch
+        size, or max_wait passed since the first one arrived. The batches
+        are read in a background thread with a timeout of the time left,
+        so the group is flushed at the deadline even if no batch arrives.
+
+        Arguments:
+            batches (Callable[[], Iterable[Batch]]): creates the input
+                batches, called in the background thread
+        """
+        reader = BackgroundIterator(batches, queue_size=1,
+                                    name='eva-micro-batch')
+        group, rows, deadline = [], 0, None
+        try:
+            while True:
+                timeout = None
+                if group:
+                    timeout = max(0, deadline - time.monotonic())
+                try:
+                    batch = reader.get(timeout)
+                except queue.Empty:
+                    yield group
+                    group, rows = [], 0
+                    continue
+                except StopIteration:
+                    break
+                if not group:
+                    deadline = time.monotonic() + self._max_wait
+                group.append(batch)
+                rows += len(batch)
+                if rows >= self._batch_rows or time.monotonic() >= deadline:
+                    yield group
+                    group, rows = [], 0
+            if group:
+                yield group
+        finally:
+            reader.close()
+
+    def _evaluate_group(self, group: List[Batch]) -> Iterator[Batch]:
+        if len(group) == 1:
+            batch = self._evaluate(group[0])
+            if batch is not None:
                 yield batch
+            return
+        # input batch of every row, filtered along with the rows
+        origins = np.repeat(np.arange(len(group)),
+                            [len(batch) for batch in group])
+        batch = Batch.concat(group, copy=False)
+        if self.predicate is not None:
+            mask = self.predicate.values(batch) > 0
+            batch = batch.filter(mask)
+            origins = origins[mask]
+            if batch.empty():
+                return
+        if self.project_expr is not None:
+            batch = Batch.merge_column_wise(
+                [expr.evaluate(batch)
+                 for expr in self.project_expr])
+        for origin in np.unique(origins):
+            yield batch.filter(origins == origin)
@@ -15,8 +15,13 @@
 from typing import Iterator
 from src.models.storage.batch import Batch
 from src.executor.abstract_executor import AbstractExecutor
+from src.executor.sample_executor import sample_batches
 from src.planner.storage_plan import StoragePlan
 from src.storage.storage_engine import StorageEngine
+from src.storage.buffer_pool import BufferPool
+from src.expression.expression_utils import (get_columns_in_expression,
+                                             get_column_range,
+                                             to_row_predicate)
 
 
 class StorageExecutor(AbstractExecutor):
@@ -28,4 +33,39 @@ class StorageExecutor(AbstractExecutor):
         pass
 
     def exec(self) -> Iterator[Batch]:
+        step = self.node.skip_frames
+        if step and step > 1:
+            if StorageEngine.supports_positions:
+                # only the sampled rows are read
+                return StorageEngine.read(self.node.video,
+                                          self.node.batch_mem_size,
+                                          pos=slice(None, None, step),
+                                          **self._pushdown_args())
+            return sample_batches(self._read(), step)
+        return self._read()
+
+    def _read(self) -> Iterator[Batch]:
+        if self.node.predicate is not None or self.node.columns is not None:
+            # the buffer pool caches whole rows, pushed down reads bypass it
+            return StorageEngine.read(self.node.video,
+                                      self.node.batch_mem_size,
+                                      **self._pushdown_args())
+        buffer_pool = BufferPool()
+        if buffer_pool.enabled:
+            return buffer_pool.read(self.node.video,
+                                    self.node.batch_mem_size,
+                                    StorageEngine.read)
         return StorageEngine.read(self.node.video, self.node.batch_mem_size)
+
+    def _pushdown_args(self):
+        args = {'projection': self.node.columns}
+        if self.node.predicate is not None:
+            columns = sorted(get_columns_in_expression(self.node.predicate))
+            args['columns'] = columns
+            args['predicate_func'] = to_row_predicate(self.node.predicate,
+                                                      columns)
+            id_range = get_column_range(self.node.predicate,
+                                        self.node.video.identifier_column)
+            if id_range != (None, None):
+                args['id_range'] = id_range
+        return args
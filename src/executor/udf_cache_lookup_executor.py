@@ -0,0 +1,61 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Iterator
+
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.executor.abstract_executor import AbstractExecutor
+from src.planner.udf_cache_lookup_plan import UdfCacheLookupPlan
+from src.storage.udf_result_cache import UdfResultCache
+
+
+class UdfCacheLookupExecutor(AbstractExecutor):
+    """
+    Left outer joins the frames with the outputs of the UDF calls stored in
+    the UDF result cache, by frame id. The outputs of a call are attached
+    to the batch in a column named by its cache key, None for the frames
+    without stored outputs and for batches without frame ids.
+
+    Arguments:
+        node (UdfCacheLookupPlan): The UdfCacheLookup Plan
+    """
+
+    def __init__(self, node: UdfCacheLookupPlan):
+        super().__init__(node)
+        self.func_exprs = node.func_exprs
+
+    def validate(self):
+        pass
+
+    def exec(self) -> Iterator[Batch]:
+        child_executor = self.children[0]
+        for batch in child_executor.exec():
+            if not batch.empty():
+                yield self._lookup(batch)
+
+    def _lookup(self, batch: Batch) -> Batch:
+        frames = batch.frames.copy(deep=False)
+        for func_expr in self.func_exprs:
+            if 'id' in frames.columns:
+                outputs = UdfResultCache().lookup(func_expr.cache_key,
+                                                  func_expr.cache_table,
+                                                  frames['id'].to_numpy())
+            else:
+                outputs = [None] * len(frames)
+            frames[func_expr.cache_key] = pd.Series(outputs,
+                                                    index=frames.index,
+                                                    dtype=object)
+        return Batch(frames)
@@ -0,0 +1,71 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Iterator
+
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.executor.abstract_executor import AbstractExecutor
+from src.planner.udf_residual_plan import UdfResidualPlan
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+
+class UdfResidualExecutor(AbstractExecutor):
+    """
+    Runs the UDF calls on the residual frames a UdfCacheLookupExecutor
+    below found no stored outputs for, and fills their outputs in. The
+    outputs are stored in the UDF result cache by the calls.
+
+    Arguments:
+        node (UdfResidualPlan): The UdfResidual Plan
+    """
+
+    def __init__(self, node: UdfResidualPlan):
+        super().__init__(node)
+        self.func_exprs = node.func_exprs
+
+    def validate(self):
+        pass
+
+    def exec(self) -> Iterator[Batch]:
+        child_executor = self.children[0]
+        for batch in child_executor.exec():
+            if not batch.empty():
+                yield self._fill(batch)
+
+    def _fill(self, batch: Batch) -> Batch:
+        frames = batch.frames
+        for func_expr in self.func_exprs:
+            key = func_expr.cache_key
+            outputs = frames[key].tolist()
+            missing = [index for index, output in enumerate(outputs)
+                       if output is None]
+            if not missing:
+                continue
+            outcomes = func_expr.outputs(Batch(frames)[missing])
+            if len(outcomes) != len(missing):
+                message = 'UDF {} returned {} rows for {} frames, they ' \
+                    'can not be merged with its stored outputs'.format(
+                        key, len(outcomes), len(missing))
+                LoggingManager().log(message, LoggingLevel.ERROR)
+                raise ValueError(message)
+            for index, output in zip(missing,
+                                     pd.DataFrame(outcomes)
+                                     .to_dict('records')):
+                outputs[index] = output
+            frames = frames.copy(deep=False)
+            frames[key] = pd.Series(outputs, index=frames.index,
+                                    dtype=object)
+        return Batch(frames)
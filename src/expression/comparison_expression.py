@@ -15,9 +15,12 @@
 import pandas as pd
 import numpy as np
 
+from src.expression import label_bitset
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType, \
     ExpressionReturnType
+from src.expression.constant_value_expression import \
+    ConstantValueExpression
 from src.models.storage.batch import Batch
 
 
@@ -59,11 +62,17 @@ class ComparisonExpression(AbstractExpression):
         elif self.etype == ExpressionType.COMPARE_NEQ:
             return Batch(pd.DataFrame(lvalues != rvalues))
         elif self.etype == ExpressionType.COMPARE_CONTAINS:
+            if self._bitset_operands(lvalues):
+                return Batch(pd.DataFrame(label_bitset.contains(
+                    lvalues[:, 0], self.get_child(1).value)))
             res = [[all(x in p for x in q)
                     for p, q in zip(left, right)]
                    for left, right in zip(lvalues, rvalues)]
             return Batch(pd.DataFrame(res))
         elif self.etype == ExpressionType.COMPARE_IS_CONTAINED:
+            if self._bitset_operands(lvalues):
+                return Batch(pd.DataFrame(label_bitset.is_contained(
+                    lvalues[:, 0], self.get_child(1).value)))
             res = [[all(x in q for x in p)
                     for p, q in zip(left, right)]
                    for left, right in zip(lvalues, rvalues)]
@@ -71,6 +80,16 @@ class ComparisonExpression(AbstractExpression):
         else:
             raise NotImplementedError
 
+    def _bitset_operands(self, lvalues) -> bool:
+        """
+        True if the rows of lvalues are label lists compared with a
+        constant list of labels, evaluated over bitsets of the labels
+        """
+        right = self.get_child(1)
+        return isinstance(right, ConstantValueExpression) and \
+            lvalues.ndim == 2 and lvalues.shape[1] == 1 and \
+            label_bitset.supports(lvalues[:, 0], right.value)
+
     def __eq__(self, other):
         is_subtree_equal = super().__eq__(other)
         if not isinstance(other, ComparisonExpression):
@@ -0,0 +1,236 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from enum import IntEnum, auto
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.expression import label_bitset
+from src.expression.abstract_expression import (AbstractExpression,
+                                                ExpressionType)
+from src.expression.constant_value_expression import \
+    ConstantValueExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+
+
+class _LabelSetOperator:
+    """Containment of label lists in a constant list, over bitsets"""
+    nin = 2
+
+    def __init__(self, func):
+        self._func = func
+
+    def __call__(self, rows, labels):
+        if np.ndim(rows) != 1 or not label_bitset.supports(rows, labels):
+            raise TypeError('Expected label lists')
+        return self._func(rows, labels)
+
+
+_LABEL_SET_OPERATORS = {
+    ExpressionType.COMPARE_CONTAINS:
+        _LabelSetOperator(label_bitset.contains),
+    ExpressionType.COMPARE_IS_CONTAINED:
+        _LabelSetOperator(label_bitset.is_contained)
+}
+
+_UFUNCS = {
+    ExpressionType.COMPARE_EQUAL: np.equal,
+    ExpressionType.COMPARE_GREATER: np.greater,
+    ExpressionType.COMPARE_LESSER: np.less,
+    ExpressionType.COMPARE_GEQ: np.greater_equal,
+    ExpressionType.COMPARE_LEQ: np.less_equal,
+    ExpressionType.COMPARE_NEQ: np.not_equal,
+    ExpressionType.ARITHMETIC_ADD: np.add,
+    ExpressionType.ARITHMETIC_SUBTRACT: np.subtract,
+    ExpressionType.ARITHMETIC_MULTIPLY: np.multiply,
+    ExpressionType.ARITHMETIC_DIVIDE: np.true_divide,
+    ExpressionType.LOGICAL_AND: np.logical_and,
+    ExpressionType.LOGICAL_OR: np.logical_or,
+    ExpressionType.LOGICAL_NOT: np.logical_not,
+    **_LABEL_SET_OPERATORS
+}
+
+_SHORT_CIRCUIT = (ExpressionType.LOGICAL_AND, ExpressionType.LOGICAL_OR)
+
+
+class OpCode(IntEnum):
+    # push the array of a column
+    COLUMN = auto()
+    # push a scalar, or the label list of a label set operator
+    CONSTANT = auto()
+    # pop the arguments, push the ufunc (or label set operator) of them
+    UFUNC = auto()
+    # push the values of an expression evaluated by the interpreter
+    INTERPRET = auto()
+
+
+class NotVectorizable(Exception):
+    """The batch holds values the program can not evaluate row by row"""
+
+
+class CompiledExpression:
+    """
+    Expression tree compiled into a flat postfix program over NumPy arrays:
+    column references push views of the column arrays, constants push
+    scalars broadcast by the ufuncs comparisons, arithmetic and logic
+    operators compile to, CONTAINS and IS_CONTAINED with a constant list to
+    bitset operations. A batch is evaluated in one pass over the program,
+    without intermediate DataFrame or Batch objects.
+
+    Nodes the program can not express, e.g. functions, are
+    left to the interpreter (`AbstractExpression.evaluate`). So are AND
+    and OR over such nodes, the interpreter only evaluates the right side
+    on the rows the left side did not decide, sparing expensive UDFs; over
+    compiled operands both sides are evaluated on every row, which is
+    cheaper than masking. A batch the program can not evaluate row by row
+    falls back to the interpreter as a whole.
+
+    Arguments:
+        expr (AbstractExpression): bound expression tree
+    """
+
+    def __init__(self, expr: AbstractExpression):
+        self._expr = expr
+        self._program = []
+        self._emit(expr)
+
+    @property
+    def expression(self) -> AbstractExpression:
+        return self._expr
+
+    @property
+    def program(self) -> List[Tuple]:
+        return self._program
+
+    @property
+    def is_vectorized(self) -> bool:
+        """True if no node is left to the interpreter"""
+        return all(opcode != OpCode.INTERPRET for opcode, _ in self._program)
+
+    @staticmethod
+    def _compilable(expr) -> bool:
+        if isinstance(expr, TupleValueExpression):
+            return True
+        if isinstance(expr, ConstantValueExpression):
+            return np.isscalar(expr.value)
+        if not isinstance(expr, AbstractExpression) or \
+                expr.etype not in _UFUNCS or \
+                len(expr.children) != _UFUNCS[expr.etype].nin:
+            return False
+        if expr.etype in _SHORT_CIRCUIT:
+            return all(CompiledExpression._vectorized(child)
+                       for child in expr.children)
+        if expr.etype in _LABEL_SET_OPERATORS:
+            labels = expr.children[1]
+            return isinstance(labels, ConstantValueExpression) and \
+                isinstance(labels.value, (list, tuple))
+        return True
+
+    @staticmethod
+    def _vectorized(expr) -> bool:
+        return CompiledExpression._compilable(expr) and \
+            all(CompiledExpression._vectorized(child)
+                for child in expr.children)
+
+    def _emit(self, expr):
+        if not self._compilable(expr):
+            self._program.append((OpCode.INTERPRET, expr))
+        elif isinstance(expr, TupleValueExpression):
+            self._program.append((OpCode.COLUMN, expr.col_name))
+        elif isinstance(expr, ConstantValueExpression):
+            self._program.append((OpCode.CONSTANT, expr.value))
+        elif expr.etype in _LABEL_SET_OPERATORS:
+            left, labels = expr.children
+            self._emit(left)
+            self._program.append((OpCode.CONSTANT, labels.value))
+            self._program.append((OpCode.UFUNC, _UFUNCS[expr.etype]))
+        else:
+            for child in expr.children:
+                self._emit(child)
+            self._program.append((OpCode.UFUNC, _UFUNCS[expr.etype]))
+
+    @staticmethod
+    def _column(batch: Batch, name: str) -> np.ndarray:
+        columns = batch.columns if isinstance(batch, ColumnarBatch) \
+            else batch.frames
+        if name not in columns:
+            raise NotVectorizable()
+        values = columns[name]
+        return values if isinstance(values, np.ndarray) \
+            else values.to_numpy()
+
+    @staticmethod
+    def _interpret(expr: AbstractExpression, batch: Batch,
+                   **kwargs) -> np.ndarray:
+        frames = expr.evaluate(batch, **kwargs).frames
+        if len(frames.columns) != 1:
+            raise NotVectorizable()
+        return frames.iloc[:, 0].to_numpy()
+
+    def _run(self, batch: Batch, **kwargs) -> np.ndarray:
+        stack = []
+        for opcode, arg in self._program:
+            if opcode == OpCode.COLUMN:
+                stack.append(self._column(batch, arg))
+            elif opcode == OpCode.CONSTANT:
+                stack.append(arg)
+            elif opcode == OpCode.UFUNC:
+                args = stack[len(stack) - arg.nin:]
+                del stack[len(stack) - arg.nin:]
+                try:
+                    # as pandas, x / 0 is inf without a warning
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        stack.append(arg(*args))
+                except (TypeError, ValueError):
+                    raise NotVectorizable()
+            else:
+                stack.append(self._interpret(arg, batch, **kwargs))
+        values = stack.pop()
+        if np.ndim(values) == 0:
+            return np.full(len(batch), values)
+        if np.ndim(values) != 1 or len(values) != len(batch):
+            raise NotVectorizable()
+        return values
+
+    def values(self, batch: Batch, **kwargs) -> np.ndarray:
+        """
+        Values of the expression on the rows of the batch, a 1-D array.
+
+        Arguments:
+            batch (Batch): input batch
+            kwargs: passed to the nodes left to the interpreter; a `mask`
+                selects the rows the expression is evaluated on
+        """
+        if "mask" in kwargs:
+            batch = batch[kwargs.pop("mask")]
+        try:
+            return self._run(batch, **kwargs)
+        except NotVectorizable:
+            frames = self._expr.evaluate(batch, **kwargs).frames
+            return frames.iloc[:, 0].to_numpy()
+
+    def evaluate(self, batch: Batch, **kwargs) -> Batch:
+        """Drop in replacement of the expression evaluate"""
+        return Batch(pd.DataFrame({0: self.values(batch, **kwargs)}))
+
+
+def compile_expression(expr: AbstractExpression) -> CompiledExpression:
+    """Compiles the expression, None stays None"""
+    if expr is None:
+        return None
+    return CompiledExpression(expr)
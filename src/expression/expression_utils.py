@@ -12,3 +12,201 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import operator
+from typing import Callable, List, Set
+
+from src.expression.abstract_expression import (AbstractExpression,
+                                                ExpressionType)
+from src.expression.constant_value_expression import \
+    ConstantValueExpression
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+
+_ROW_OPERATORS = {
+    ExpressionType.COMPARE_EQUAL: operator.eq,
+    ExpressionType.COMPARE_GREATER: operator.gt,
+    ExpressionType.COMPARE_LESSER: operator.lt,
+    ExpressionType.COMPARE_GEQ: operator.ge,
+    ExpressionType.COMPARE_LEQ: operator.le,
+    ExpressionType.COMPARE_NEQ: operator.ne,
+    ExpressionType.ARITHMETIC_ADD: operator.add,
+    ExpressionType.ARITHMETIC_SUBTRACT: operator.sub,
+    ExpressionType.ARITHMETIC_MULTIPLY: operator.mul,
+    ExpressionType.ARITHMETIC_DIVIDE: operator.truediv,
+    ExpressionType.LOGICAL_NOT: operator.not_
+}
+
+
+def conjunction_list(expr: AbstractExpression) -> List[AbstractExpression]:
+    """
+    Splits a predicate on its top level ANDs.
+    a AND (b OR c) AND d -> [a, b OR c, d]
+    """
+    if expr is None:
+        return []
+    if isinstance(expr, AbstractExpression) and \
+            expr.etype == ExpressionType.LOGICAL_AND:
+        return [conjunct for child in expr.children
+                for conjunct in conjunction_list(child)]
+    return [expr]
+
+
+def and_(exprs: List[AbstractExpression]) -> AbstractExpression:
+    """ANDs the expressions back together, None for an empty list"""
+    result = None
+    for expr in exprs:
+        result = expr if result is None else \
+            LogicalExpression(ExpressionType.LOGICAL_AND, result, expr)
+    return result
+
+
+def disjunction_list(expr: AbstractExpression) -> List[AbstractExpression]:
+    """
+    Splits a predicate on its top level ORs.
+    a OR (b AND c) OR d -> [a, b AND c, d]
+    """
+    if expr is None:
+        return []
+    if isinstance(expr, AbstractExpression) and \
+            expr.etype == ExpressionType.LOGICAL_OR:
+        return [disjunct for child in expr.children
+                for disjunct in disjunction_list(child)]
+    return [expr]
+
+
+def or_(exprs: List[AbstractExpression]) -> AbstractExpression:
+    """ORs the expressions back together, None for an empty list"""
+    result = None
+    for expr in exprs:
+        result = expr if result is None else \
+            LogicalExpression(ExpressionType.LOGICAL_OR, result, expr)
+    return result
+
+
+def get_columns_in_expression(expr: AbstractExpression) -> Set[str]:
+    """
+    Names of the columns the expression reads. Returns None if it may read
+    columns it does not name, e.g. a function called without arguments
+    gets the whole batch.
+    """
+    if not isinstance(expr, AbstractExpression):
+        return None
+    if isinstance(expr, TupleValueExpression):
+        return {expr.col_name}
+    if expr.etype == ExpressionType.FUNCTION_EXPRESSION and \
+            not expr.children:
+        return None
+    columns = set()
+    for child in expr.children:
+        child_columns = get_columns_in_expression(child)
+        if child_columns is None:
+            return None
+        columns |= child_columns
+    return columns
+
+
+def is_row_predicate(expr: AbstractExpression) -> bool:
+    """
+    True if to_row_predicate can compile the expression: comparisons,
+    arithmetic and logical operators over columns and constants.
+    """
+    if isinstance(expr, (TupleValueExpression, ConstantValueExpression)):
+        return True
+    if not isinstance(expr, AbstractExpression):
+        return False
+    if expr.etype not in _ROW_OPERATORS and \
+            expr.etype not in (ExpressionType.LOGICAL_AND,
+                               ExpressionType.LOGICAL_OR):
+        return False
+    return len(expr.children) > 0 and \
+        all(is_row_predicate(child) for child in expr.children)
+
+
+def to_row_predicate(expr: AbstractExpression,
+                     columns: List[str]) -> Callable:
+    """
+    Compiles the expression into a function of the row values of columns,
+    in order, the contract of storage engine predicate functions
+    (petastorm `in_lambda`).
+
+    Arguments:
+        expr (AbstractExpression): expression accepted by is_row_predicate
+        columns (List[str]): order of the function arguments
+    """
+    if isinstance(expr, TupleValueExpression):
+        index = columns.index(expr.col_name)
+        return lambda *values: values[index]
+    if isinstance(expr, ConstantValueExpression):
+        value = expr.value
+        return lambda *values: value
+    children = [to_row_predicate(child, columns) for child in expr.children]
+    if expr.etype == ExpressionType.LOGICAL_AND:
+        left, right = children
+        return lambda *values: bool(left(*values)) and bool(right(*values))
+    if expr.etype == ExpressionType.LOGICAL_OR:
+        left, right = children
+        return lambda *values: bool(left(*values)) or bool(right(*values))
+    func = _ROW_OPERATORS[expr.etype]
+    return lambda *values: func(*[child(*values) for child in children])
+
+
+_FLIPPED_COMPARISONS = {
+    ExpressionType.COMPARE_GREATER: ExpressionType.COMPARE_LESSER,
+    ExpressionType.COMPARE_LESSER: ExpressionType.COMPARE_GREATER,
+    ExpressionType.COMPARE_GEQ: ExpressionType.COMPARE_LEQ,
+    ExpressionType.COMPARE_LEQ: ExpressionType.COMPARE_GEQ,
+    ExpressionType.COMPARE_EQUAL: ExpressionType.COMPARE_EQUAL
+}
+
+
+def get_column_range(expr: AbstractExpression, column: str):
+    """
+    Bounds on column implied by the top level conjuncts of the predicate
+    that compare it with a numeric constant. Strict comparisons give
+    inclusive bounds, the range may hold a few rows the predicate rejects
+    but never misses one it accepts.
+
+    Arguments:
+        expr (AbstractExpression): predicate
+        column (str): column name
+
+    Returns:
+        (low, high): inclusive bounds, None when unbounded
+    """
+    low, high = None, None
+    for conjunct in conjunction_list(expr):
+        if conjunct.etype not in _FLIPPED_COMPARISONS or \
+                len(conjunct.children) != 2:
+            continue
+        left, right = conjunct.children
+        etype = conjunct.etype
+        if isinstance(left, ConstantValueExpression):
+            left, right = right, left
+            etype = _FLIPPED_COMPARISONS[etype]
+        if not isinstance(left, TupleValueExpression) or \
+                left.col_name != column or \
+                not isinstance(right, ConstantValueExpression) or \
+                isinstance(right.value, bool) or \
+                not isinstance(right.value, (int, float)):
+            continue
+        value = right.value
+        if etype in (ExpressionType.COMPARE_GREATER,
+                     ExpressionType.COMPARE_GEQ,
+                     ExpressionType.COMPARE_EQUAL):
+            low = value if low is None else max(low, value)
+        if etype in (ExpressionType.COMPARE_LESSER,
+                     ExpressionType.COMPARE_LEQ,
+                     ExpressionType.COMPARE_EQUAL):
+            high = value if high is None else min(high, value)
+    return low, high
+
+
+def function_expressions(expr: AbstractExpression) -> List[AbstractExpression]:
+    """Every function expression in the tree, outermost first"""
+    if not isinstance(expr, AbstractExpression):
+        return []
+    found = [expr] if expr.etype == ExpressionType.FUNCTION_EXPRESSION \
+        else []
+    for child in expr.children:
+        found.extend(function_expressions(child))
+    return found
@@ -20,9 +20,16 @@ from src.constants import NO_GPU
 from src.executor.execution_context import Context
 from src.expression.abstract_expression import AbstractExpression, \
     ExpressionType
+from src.expression.constant_value_expression import \
+    ConstantValueExpression
+from src.expression.tuple_value_expression import TupleValueExpression
 from src.models.storage.batch import Batch
+from src.udfs.abstract_udfs import AbstractClassifierUDF
 from src.udfs.gpu_compatible import GPUCompatible
+from src.udfs.udf_profiler import UdfProfiler, udf_device
+from src.udfs.udf_registry import UdfRegistry
 from src.catalog.models.udf_io import UdfIO
+from src.storage.udf_result_cache import UdfResultCache, udf_key
 
 
 @unique
@@ -53,6 +60,13 @@ class FunctionExpression(AbstractExpression):
         output_obj(UdfIO): The catalog object corresponding to the func_output.
         To be populated by optimizer.
 
+        cache_table(str): key of the table the function is evaluated on,
+        see udf_result_cache.table_key. To be populated by optimizer,
+        enables the UDF result cache: the outputs are stored. Batches
+        holding a column named by the cache_key, attached by a
+        UdfCacheLookupPlan, carry the outputs of every row and the function
+        is not run.
+
     """
 
     def __init__(self, func: Callable,
@@ -70,6 +84,7 @@ class FunctionExpression(AbstractExpression):
         self._is_temp = is_temp
         self._output = output
         self._output_obj = None
+        self._cache_table = None
 
     @property
     def name(self):
@@ -87,6 +102,20 @@ class FunctionExpression(AbstractExpression):
     def output_obj(self, val: UdfIO):
         self._output_obj = val
 
+    @property
+    def cache_table(self):
+        return self._cache_table
+
+    @cache_table.setter
+    def cache_table(self, val: str):
+        self._cache_table = val
+
+    @property
+    def cache_key(self) -> str:
+        """Key of the outputs of this call in the UDF result cache"""
+        return udf_key(self._function,
+                       [_argument_key(child) for child in self.children])
+
     @property
     def function(self):
         return self._function
@@ -96,14 +125,14 @@ class FunctionExpression(AbstractExpression):
         self._function = func
 
     def evaluate(self, batch: Batch, **kwargs):
-        new_batch = batch
-        child_batches = \
-            [child.evaluate(batch, **kwargs) for child in self.children]
-        if len(child_batches):
-            new_batch = Batch.merge_column_wise(child_batches)
-
-        func = self._gpu_enabled_function()
-        outcomes = func(new_batch.frames)
+        key = self.cache_key
+        if key in batch.frames.columns:
+            # looked up and filled in below the scan
+            if "mask" in kwargs:
+                batch = batch[kwargs["mask"]]
+            outcomes = pd.DataFrame(batch.frames[key].tolist())
+        else:
+            outcomes = self.outputs(batch, **kwargs)
         outcomes = Batch(pd.DataFrame(outcomes))
 
         if self._output:
@@ -111,6 +140,44 @@ class FunctionExpression(AbstractExpression):
         else:
             return outcomes
 
+    def outputs(self, batch: Batch, **kwargs) -> pd.DataFrame:
+        """
+        Runs the function on the batch and returns all its outputs. They
+        are stored in the UDF result cache if the function is cached.
+        """
+        new_batch = batch
+        child_batches = \
+            [child.evaluate(batch, **kwargs) for child in self.children]
+        if len(child_batches):
+            new_batch = Batch.merge_column_wise(child_batches)
+
+        # instances shared by concurrent queries run one call at a time
+        with UdfRegistry().lock(self._function):
+            func = self._gpu_enabled_function()
+            if isinstance(self._function, AbstractClassifierUDF):
+                func = UdfProfiler().wrap(func, udf_device(self._function))
+            frame_ids = self._frame_ids(batch, len(new_batch), **kwargs)
+            if frame_ids is not None:
+                return UdfResultCache().evaluate(
+                    func, self._cache_table, frame_ids, new_batch.frames,
+                    lookup=False, key=self.cache_key)
+            return func(new_batch.frames)
+
+    def _frame_ids(self, batch: Batch, num_rows: int, **kwargs):
+        """
+        Frame ids of the rows the UDF runs on, None if its outputs can not
+        be cached
+        """
+        if self._cache_table is None or \
+                not isinstance(self._function, AbstractClassifierUDF) or \
+                not UdfResultCache().enabled:
+            return None
+        if "mask" in kwargs:
+            batch = batch[kwargs["mask"]]
+        if 'id' not in batch.frames.columns or len(batch) != num_rows:
+            return None
+        return batch.frames['id'].to_numpy()
+
     def _gpu_enabled_function(self):
         if isinstance(self._function, GPUCompatible):
             device = self._context.gpu_device()
@@ -126,3 +193,15 @@ class FunctionExpression(AbstractExpression):
                 and self.output == other.output
                 and self.output_obj == other.output_obj
                 and self.function == other.function)
+
+
+def _argument_key(expression: AbstractExpression) -> str:
+    """Identifies an argument of a UDF call in its cache key"""
+    if isinstance(expression, FunctionExpression):
+        return expression.cache_key
+    if isinstance(expression, TupleValueExpression):
+        return expression.col_name
+    if isinstance(expression, ConstantValueExpression):
+        return repr(expression.value)
+    return '{}({})'.format(expression.etype.name, ','.join(
+        _argument_key(child) for child in expression.children))
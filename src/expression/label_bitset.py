@@ -0,0 +1,79 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from itertools import chain
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+# one bit per query label and one for any other label
+MAX_LABELS = 63
+
+
+def _unique(labels: Iterable) -> List:
+    return list(dict.fromkeys(labels))
+
+
+def supports(rows, labels) -> bool:
+    """
+    True if the rows and labels can be encoded as bitsets: every row is a
+    list of labels, labels a list of at most MAX_LABELS distinct strings.
+    """
+    if not isinstance(labels, (list, tuple)) or \
+            len(_unique(labels)) > MAX_LABELS or \
+            not all(isinstance(label, str) for label in labels):
+        return False
+    return all(isinstance(row, (list, tuple, np.ndarray)) for row in rows)
+
+
+def label_bitsets(rows, labels) -> np.ndarray:
+    """
+    Encodes every row, a list of labels, as a uint64 bitset: bit i is set
+    if the row holds labels[i], bit len(labels) if it holds any label not
+    in labels. The labels of all the rows are coded at once against the
+    query labels, then OR-ed per row.
+
+    Arguments:
+        rows (array-like): a list of labels per row
+        labels (List[str]): query labels, see supports
+    """
+    labels = _unique(labels)
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64,
+                          count=len(rows))
+    bitsets = np.zeros(len(rows), dtype=np.uint64)
+    if not lengths.sum():
+        return bitsets
+    codes = pd.Categorical(list(chain.from_iterable(rows)),
+                           categories=labels).codes.astype(np.int64)
+    codes[codes < 0] = len(labels)
+    bits = np.left_shift(np.uint64(1), codes.astype(np.uint64))
+    starts = np.cumsum(lengths) - lengths
+    nonempty = lengths > 0
+    # empty rows have no segment, the segment of a row ends where the next
+    # non empty one starts
+    bitsets[nonempty] = np.bitwise_or.reduceat(bits, starts[nonempty])
+    return bitsets
+
+
+def contains(rows, labels) -> np.ndarray:
+    """True for the rows holding every label, `rows @> labels`"""
+    query = np.uint64((1 << len(_unique(labels))) - 1)
+    return label_bitsets(rows, labels) & query == query
+
+
+def is_contained(rows, labels) -> np.ndarray:
+    """True for the rows only holding labels, `rows <@ labels`"""
+    other = np.uint64(1 << len(_unique(labels)))
+    return label_bitsets(rows, labels) & other == 0
@@ -36,13 +36,18 @@ class LogicalExpression(AbstractExpression):
             if self.etype == ExpressionType.LOGICAL_AND:
                 if (~left_values).all().bool():  # check if all are false
                     return Batch(left_values)
-                kwargs["mask"] = left_values[left_values[0]].index.tolist()
+                rows = left_values[left_values[0]].index.tolist()
             elif self.etype == ExpressionType.LOGICAL_OR:
                 if left_values.all().bool():  # check if all are true
                     return Batch(left_values)
-                kwargs["mask"] = left_values[~left_values[0]].index.tolist()
+                rows = left_values[~left_values[0]].index.tolist()
+            # rows are positions in the rows this expression sees, the
+            # right child reads them from the batch through the mask
+            mask = kwargs.get("mask", None)
+            kwargs["mask"] = rows if mask is None else \
+                [mask[row] for row in rows]
             right_values = self.get_child(1).evaluate(*args, **kwargs).frames
-            left_values.iloc[kwargs["mask"]] = right_values
+            left_values.iloc[rows] = right_values
             return Batch(pd.DataFrame(left_values))
         else:
             values = self.get_child(0).evaluate(*args, **kwargs).frames
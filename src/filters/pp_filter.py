@@ -0,0 +1,240 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pickle
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.expression.abstract_expression import (AbstractExpression,
+                                                ExpressionType)
+from src.expression.expression_utils import conjunction_list
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+
+
+class PPFilter:
+    """
+    Probabilistic predicate: a binary classifier cheap enough to run on
+    every frame on the CPU, telling whether a frame may hold a label a UDF
+    would find in it. The frames it rejects are dropped before the UDF, at
+    the price of losing the few frames holding the label it rejects.
+
+    A frame is downsampled to about size x size pixels and described by
+    the normalized histogram of every color channel and the channel means,
+    classified with a logistic regression. The decision threshold is
+    calibrated on held out frames so that at least `accuracy` of the frames
+    holding the label pass.
+
+    Arguments:
+        bins (int): histogram buckets per color channel
+        size (int): side in pixels of the downsampled frames
+    """
+
+    def __init__(self, bins: int = 8, size: int = 32):
+        self.bins = bins
+        self.size = size
+        self.threshold = 0.0
+        self.accuracy = 0.0
+        self.reduction = 0.0
+        self._low = 0.0
+        self._high = 255.0
+        self._mean = None
+        self._std = None
+        self._weights = None
+        self._bias = 0.0
+
+    @property
+    def name(self) -> str:
+        return 'PPFilter'
+
+    def _pixels(self, frame) -> np.ndarray:
+        frame = np.asarray(frame)
+        if frame.ndim == 2:
+            frame = frame[..., np.newaxis]
+        step_h = max(1, frame.shape[0] // self.size)
+        step_w = max(1, frame.shape[1] // self.size)
+        pixels = frame[::step_h, ::step_w]
+        return pixels.reshape(-1, pixels.shape[-1]).astype(np.float32)
+
+    def features(self, frames: Iterable[np.ndarray]) -> np.ndarray:
+        """Color histogram features of the frames, a row per frame"""
+        scale = max(self._high - self._low, 1e-6)
+        rows = []
+        for frame in frames:
+            pixels = (self._pixels(frame) - self._low) / scale
+            buckets = np.clip((pixels * self.bins).astype(np.int64), 0,
+                              self.bins - 1)
+            histograms = [np.bincount(buckets[:, channel],
+                                      minlength=self.bins) / len(buckets)
+                          for channel in range(buckets.shape[1])]
+            rows.append(np.concatenate(histograms + [pixels.mean(axis=0)]))
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(rows).astype(np.float32)
+
+    def scores(self, frames: Iterable[np.ndarray]) -> np.ndarray:
+        """Logits of the frames holding the label"""
+        features = self.features(frames)
+        if not len(features):
+            return np.zeros(0)
+        return (features - self._mean) / self._std @ self._weights + \
+            self._bias
+
+    def predict(self, frames: Iterable[np.ndarray]) -> np.ndarray:
+        """True for the frames that may hold the label"""
+        return self.scores(frames) >= self.threshold
+
+    def fit(self, frames: Iterable[np.ndarray], labels: Iterable[bool],
+            accuracy: float = 0.95, holdout: float = 0.2,
+            epochs: int = 300, learning_rate: float = 0.5,
+            seed: int = 0) -> 'PPFilter':
+        """
+        Trains the classifier on frames labeled by the UDF and calibrates
+        its threshold on the held out ones.
+
+        Arguments:
+            frames (Iterable[np.ndarray]): training frames
+            labels (Iterable[bool]): True for the frames holding the label
+            accuracy (float): fraction of the held out frames holding the
+                label that must pass
+            holdout (float): fraction of the frames held out
+            epochs (int): gradient descent iterations
+            learning_rate (float): gradient descent step
+            seed (int): seed of the train / held out split
+
+        Returns:
+            self, with `accuracy` and `reduction` measured on the held out
+            frames
+        """
+        frames = list(frames)
+        labels = np.asarray(list(labels), dtype=bool)
+        if len(frames) != len(labels):
+            raise ValueError('Got %d frames and %d labels'
+                             % (len(frames), len(labels)))
+        if labels.all() or not labels.any():
+            raise ValueError('Training a filter needs frames with and '
+                             'without the label')
+
+        pixels = [self._pixels(frame) for frame in frames]
+        self._low = float(min(p.min() for p in pixels))
+        self._high = float(max(p.max() for p in pixels))
+        features = self.features(frames)
+
+        order = np.random.RandomState(seed).permutation(len(frames))
+        num_holdout = int(len(frames) * holdout)
+        holdout_rows, train_rows = order[:num_holdout], order[num_holdout:]
+        if not labels[holdout_rows].any() or \
+                not labels[train_rows].any() or labels[train_rows].all():
+            # too few frames to split, calibrate on the training frames
+            holdout_rows = train_rows = order
+
+        train, train_labels = features[train_rows], labels[train_rows]
+        self._mean = train.mean(axis=0)
+        self._std = train.std(axis=0)
+        self._std[self._std == 0] = 1.0
+        train = (train - self._mean) / self._std
+
+        # both classes weigh the same, the label is usually rare
+        positives = train_labels.sum()
+        sample_weights = np.where(
+            train_labels, len(train_labels) / (2.0 * positives),
+            len(train_labels) / (2.0 * (len(train_labels) - positives)))
+        targets = train_labels.astype(np.float64)
+        self._weights = np.zeros(train.shape[1])
+        self._bias = 0.0
+        for _ in range(epochs):
+            logits = np.clip(train @ self._weights + self._bias, -30, 30)
+            errors = sample_weights * (1.0 / (1.0 + np.exp(-logits)) -
+                                       targets)
+            self._weights -= learning_rate * (
+                train.T @ errors / len(train) + 1e-3 * self._weights)
+            self._bias -= learning_rate * errors.mean()
+
+        self.calibrate([frames[row] for row in holdout_rows],
+                       labels[holdout_rows], accuracy)
+        return self
+
+    def calibrate(self, frames: Iterable[np.ndarray], labels: Iterable[bool],
+                  accuracy: float):
+        """
+        Sets the threshold passing at least accuracy of the frames holding
+        the label and rejecting as many others as possible, halfway to the
+        next frame without the label to leave a margin, and measures the
+        accuracy and the reduction it achieves on the frames.
+        """
+        scores = self.scores(frames)
+        labels = np.asarray(list(labels), dtype=bool)
+        positive_scores = np.sort(scores[labels])
+        index = int(np.floor((1.0 - accuracy) * len(positive_scores)))
+        threshold = positive_scores[min(index, len(positive_scores) - 1)]
+        rejected = scores[~labels & (scores < threshold)]
+        if len(rejected):
+            threshold = (threshold + rejected.max()) / 2
+        self.threshold = float(threshold)
+        self.accuracy = float((positive_scores >= self.threshold).mean())
+        self.reduction = float((scores < self.threshold).mean())
+
+    def __call__(self, frames: pd.DataFrame) -> pd.DataFrame:
+        """
+        Evaluates the filter on the frames of the data column, else the
+        first one, as a UDF would. 'pp' is True for the frames that may hold
+        the label.
+        """
+        if not len(frames):
+            return pd.DataFrame({'pp': np.zeros(0, dtype=bool)})
+        column = frames['data'] if 'data' in frames.columns \
+            else frames.iloc[:, 0]
+        return pd.DataFrame({'pp': self.predict(column)})
+
+    def dumps(self) -> bytes:
+        """Serializes the trained filter"""
+        return pickle.dumps(self.__dict__)
+
+    @classmethod
+    def loads(cls, model: bytes) -> 'PPFilter':
+        """Restores a filter serialized by dumps"""
+        pp_filter = cls()
+        pp_filter.__dict__.update(pickle.loads(model))
+        return pp_filter
+
+
+def label_predicates(predicate: AbstractExpression) -> \
+        List[Tuple[AbstractExpression, str]]:
+    """
+    The labels the conjuncts of the predicate require in the output of a
+    classifier UDF, e.g. `Detector(data).label @> ['car']`, with the UDF
+    expression they require them of. A probabilistic predicate can stand
+    for every one of them.
+    """
+    required = []
+    for conjunct in conjunction_list(predicate):
+        if conjunct.etype not in (ExpressionType.COMPARE_EQUAL,
+                                  ExpressionType.COMPARE_CONTAINS) or \
+                len(conjunct.children) != 2:
+            continue
+        func_expr, labels = conjunct.children
+        if func_expr.etype != ExpressionType.FUNCTION_EXPRESSION or \
+                not isinstance(func_expr.function, AbstractClassifierUDF) or \
+                func_expr.output is None or \
+                labels.etype != ExpressionType.CONSTANT_VALUE:
+            continue
+        labels = labels.value
+        if isinstance(labels, str):
+            labels = [labels]
+        if not isinstance(labels, list) or \
+                not all(isinstance(label, str) for label in labels):
+            continue
+        required.extend((func_expr, label) for label in labels)
+    return required
@@ -0,0 +1,211 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+from typing import List
+
+import numpy as np
+
+from src.catalog.catalog_manager import CatalogManager
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.pp_filter import PPFilterMetadata
+from src.configuration.configuration_manager import ConfigurationManager
+from src.expression.abstract_expression import AbstractExpression
+from src.filters.pp_filter import PPFilter, label_predicates
+from src.planner.abstract_plan import AbstractPlan
+from src.planner.types import PlanOprType
+from src.storage.storage_engine import StorageEngine
+from src.storage.udf_result_cache import (UdfResultCache, table_key,
+                                          udf_key)
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.utils.logging_manager import LoggingLevel, LoggingManager
+
+
+def holds_label(value, label: str) -> bool:
+    """True if a UDF output value, a label or a list of labels, holds
+    label"""
+    if isinstance(value, str):
+        return value == label
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return label in list(value)
+    return False
+
+
+class PPFilterTrainer:
+    """
+    Trains probabilistic predicates from the outputs UDFs already computed:
+    the frames of a table with outputs of the UDF in the UDF result cache
+    are labeled by whether the outputs hold the label, and a PPFilter
+    trained on them is stored in the catalog, where the optimizer finds it.
+
+    After every query, train_plan() trains the filters its scans required
+    and did not find, once the cache holds enough outputs.
+
+    Configured by the `executor.pp_filters` section in eva.yml.
+    """
+    # (udf, table, output, label) -> cached outputs at the last attempt
+    _attempts = {}
+    _attempts_lock = threading.Lock()
+
+    def __init__(self):
+        config = ConfigurationManager().get_value('executor', 'pp_filters')
+        config = config if config else {}
+        self.enabled = config.get('enabled', False)
+        self.accuracy = config.get('accuracy', 0.95)
+        self.min_samples = config.get('min_samples', 100)
+        self.max_samples = config.get('max_samples', 5000)
+        batch_mem_size = ConfigurationManager().get_value(
+            'executor', 'batch_mem_size')
+        self.batch_mem_size = batch_mem_size if batch_mem_size \
+            else 30000000
+
+    def train_plan(self, plan: AbstractPlan) -> List[PPFilterMetadata]:
+        """
+        Trains the missing filters of the labels the predicates of the
+        sequential scans of an executed plan require.
+
+        Arguments:
+            plan (AbstractPlan): physical plan of the query
+
+        Returns:
+            The stored PPFilterMetadata of the trained filters
+        """
+        if not self.enabled or plan is None or \
+                not UdfResultCache().enabled:
+            return []
+        trained = []
+        plans = [plan]
+        while plans:
+            node = plans.pop()
+            plans.extend(node.children)
+            if node.opr_type != PlanOprType.SEQUENTIAL_SCAN or \
+                    node.predicate is None:
+                continue
+            table = self._scanned_table(node)
+            if table is not None:
+                trained.extend(self.train_missing(table, node.predicate))
+        return trained
+
+    @staticmethod
+    def _scanned_table(scan: AbstractPlan) -> DataFrameMetadata:
+        """Table read by the storage plan below the scan, through its
+        prefetch and probabilistic predicate plans"""
+        node = scan
+        while len(node.children) == 1:
+            node = node.children[0]
+            if node.opr_type == PlanOprType.STORAGE_PLAN:
+                return node.video
+        return None
+
+    def train_missing(self, table: DataFrameMetadata,
+                      predicate: AbstractExpression) -> List[PPFilterMetadata]:
+        """
+        Trains the filters of the labels the predicate requires that have no
+        accurate enough filter in the catalog. A label whose training was
+        skipped or failed is tried again once min_samples more outputs were
+        cached.
+
+        Arguments:
+            table (DataFrameMetadata): table the predicate was evaluated on
+            predicate (AbstractExpression): predicate of the scan
+
+        Returns:
+            The stored PPFilterMetadata of the trained filters
+        """
+        if not isinstance(getattr(table, 'id', None), int):
+            return []
+        cache = UdfResultCache()
+        cached_table = table_key(table)
+        trained = []
+        for func_expr, label in label_predicates(predicate):
+            udf, output = func_expr.function, func_expr.output
+            metadata = CatalogManager().get_pp_filter(udf.name, table.id,
+                                                      output, label)
+            if metadata is not None and metadata.accuracy >= self.accuracy:
+                continue
+            count = cache.count(udf_key(udf, ['data']), cached_table)
+            attempt = (udf.name, cached_table, output, label)
+            with self._attempts_lock:
+                last = self._attempts.get(attempt)
+                if count < self.min_samples or \
+                        (last is not None and count < last + self.min_samples):
+                    continue
+                self._attempts[attempt] = count
+            metadata = self.train(table, udf, output, label)
+            if metadata is not None:
+                trained.append(metadata)
+        return trained
+
+    def train(self,
+              table: DataFrameMetadata,
+              udf: AbstractClassifierUDF,
+              output: str,
+              label: str,
+              accuracy: float = None) -> PPFilterMetadata:
+        """
+        Trains the filter of the label of the udf output on the table.
+
+        Arguments:
+            table (DataFrameMetadata): table the udf was evaluated on
+            udf (AbstractClassifierUDF): udf producing the label
+            output (str): output column of the udf holding the labels
+            label (str): label the filter predicts
+            accuracy (float): fraction of the frames holding the label
+                that must pass the filter, the configured one if None
+
+        Returns:
+            The stored PPFilterMetadata, None if the cached outputs are too
+            few or never / always hold the label
+        """
+        accuracy = accuracy if accuracy is not None else self.accuracy
+        cache = UdfResultCache()
+        # the filters run on the frames, use the udf outputs over them
+        key, cached_table = udf_key(udf, ['data']), table_key(table)
+        frame_ids = cache.frame_ids(key, cached_table)
+        if len(frame_ids) < self.min_samples:
+            LoggingManager().log(
+                'Not training a filter for %s %s: %d cached frames, %d '
+                'needed' % (udf.name, label, len(frame_ids),
+                            self.min_samples), LoggingLevel.INFO)
+            return None
+        if len(frame_ids) > self.max_samples:
+            frame_ids = np.random.RandomState(0).choice(
+                frame_ids, self.max_samples, replace=False).tolist()
+        outputs = cache.get(key, cached_table, frame_ids)
+
+        frames, labels = [], []
+        for batch in StorageEngine.read(
+                table, self.batch_mem_size, columns=['id'],
+                predicate_func=lambda frame_id: frame_id in outputs,
+                projection=['id', 'data']):
+            for frame_id, frame in zip(batch.frames['id'],
+                                       batch.frames['data']):
+                frames.append(frame)
+                labels.append(holds_label(
+                    outputs[int(frame_id)].get(output), label))
+        if len(set(labels)) < 2:
+            LoggingManager().log(
+                'Not training a filter for %s %s: the label is in %d of %d '
+                'frames' % (udf.name, label, sum(labels), len(labels)),
+                LoggingLevel.INFO)
+            return None
+
+        pp_filter = PPFilter().fit(frames, labels, accuracy)
+        LoggingManager().log(
+            'Trained a filter for %s %s: accuracy %.3f, reduction %.3f'
+            % (udf.name, label, pp_filter.accuracy, pp_filter.reduction),
+            LoggingLevel.INFO)
+        return CatalogManager().add_pp_filter(
+            udf.name, table.id, output, label, pp_filter.accuracy,
+            pp_filter.reduction, pp_filter.dumps())
@@ -20,10 +20,7 @@ from typing import Iterable
 
 from pandas import DataFrame
 from src.utils.logging_manager import LoggingManager, LoggingLevel
-
-import csv
-import uuid
-from datetime import datetime as dt
+from src.utils.frame_tracer import FrameTracer, TraceEvent
 
 
 class BatchEncoder(json.JSONEncoder):
@@ -40,6 +37,17 @@ def as_batch(d):
         return d
 
 
+def _columnar_batch():
+    # imported lazily, columnar_batch depends on this module
+    from src.models.storage.columnar_batch import ColumnarBatch
+    return ColumnarBatch
+
+
+def _all_columnar(batches) -> bool:
+    columnar_batch = _columnar_batch()
+    return all(isinstance(batch, columnar_batch) for batch in batches)
+
+
 class Batch:
     """
     Data model used for storing a batch of frames
@@ -58,31 +66,12 @@ class Batch:
         # store the batch with columns sorted
         self.frames = frames
         self._identifier_column = identifier_column
-        if self.batch_size == 1 and 'id' in self.frames:
-            with open('trace.csv', 'a') as f:
-                row = []
-                row.append(uuid.uuid4())
-                row.append(True)
-                row.append(self.frames['id'].iloc[0])
-                # create the csv writer
-                row.append(dt.strftime(dt.now(), '%Y, %m, %d, %H, %M, %S'))
-                writer = csv.writer(f)
-                # write a row to the csv file
-                writer.writerow(row)
+        if FrameTracer.enabled and 'id' in self._frames:
+            FrameTracer().emit(TraceEvent.FIX, self._frames['id'].values)
 
     def __del__(self):
-        if self.batch_size == 1 and 'id' in self.frames:
-            with open('trace.csv', 'a') as f:
-                row = []
-                row.append(uuid.uuid4())
-                row.append(False)
-                row.append(self.frames['id'].iloc[0])
-                # create the csv writer
-                row.append(dt.strftime(dt.now(), '%Y, %m, %d, %H, %M, %S'))
-                writer = csv.writer(f)
-                # write a row to the csv file
-                writer.writerow(row)
-
+        if FrameTracer.enabled and 'id' in getattr(self, '_frames', ()):
+            FrameTracer().emit(TraceEvent.UNFIX, self._frames['id'].values)
 
     @property
     def frames(self):
@@ -168,6 +157,34 @@ class Batch:
         new_batch = Batch(new_frames)
         return new_batch
 
+    @staticmethod
+    def _as_mask(mask, num_rows: int) -> np.ndarray:
+        mask = np.asarray(mask)
+        if mask.ndim == 2 and mask.shape[1] == 1:
+            mask = mask[:, 0]
+        if mask.shape != (num_rows,):
+            raise ValueError('Expected a mask of {} rows, got shape {}'
+                             .format(num_rows, mask.shape))
+        return mask.astype(bool, copy=False)
+
+    def filter(self, mask) -> 'Batch':
+        """
+        Returns a batch with the rows where mask is True, selected by a
+        single boolean index and renumbered from 0. The frames are not
+        copied, the rows refer to the same arrays, and the batch itself is
+        returned if every row passes.
+
+        Arguments:
+            mask (array-like): a boolean per row, or a single column of
+                them, e.g. the outcomes of a predicate
+        """
+        mask = self._as_mask(mask, len(self))
+        if mask.all():
+            return self
+        frames = self._frames[mask]
+        frames.index = pd.RangeIndex(len(frames))
+        return Batch(frames, self._identifier_column)
+
     def sort(self, by=None):
         """
         in_place sort
@@ -238,6 +255,9 @@ class Batch:
 
         if not len(batches):
             return Batch()
+        if cls is Batch and _all_columnar(batches):
+            return _columnar_batch().merge_column_wise(batches,
+                                                       auto_renaming)
         frames = [batch.frames for batch in batches]
         new_frames = pd.concat(frames, axis=1, copy=False)
         if new_frames.columns.duplicated().any():
@@ -264,7 +284,8 @@ class Batch:
         if other.empty():
             return self
 
-        new_frames = self.frames.append(other.frames, ignore_index=True)
+        new_frames = pd.concat([self.frames, other.frames],
+                               ignore_index=True)
 
         return Batch(new_frames)
 
@@ -277,6 +298,9 @@ class Batch:
 
         # pd.concat will convert generator into list, so it does not hurt
         # if we convert ourselves.
+        batch_list = list(batch_list)
+        if cls is Batch and batch_list and _all_columnar(batch_list):
+            return _columnar_batch().concat(batch_list, copy=copy)
         frame_list = list([batch.frames for batch in batch_list])
         if len(frame_list) == 0:
             return Batch()
@@ -0,0 +1,322 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from pandas import DataFrame
+from src.models.storage.batch import Batch
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+from src.utils.frame_tracer import FrameTracer, TraceEvent
+
+
+def stack_column(values) -> np.ndarray:
+    """
+    Converts a column of values into a single typed ndarray. A column of
+    equally shaped ndarrays (e.g. decoded frames) becomes one contiguous
+    (N, ...) array; anything else goes through np.asarray.
+    """
+    values = np.asarray(values) if not isinstance(values, np.ndarray) \
+        else values
+    if values.dtype == object and len(values) and all(
+            isinstance(value, np.ndarray) for value in values):
+        first = values[0]
+        if all(value.shape == first.shape and value.dtype == first.dtype
+               for value in values):
+            return np.stack(values)
+    return values
+
+
+def join_views(arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Returns a view spanning the arrays if they are adjacent slices of the
+    same base buffer, None otherwise.
+    """
+    first = arrays[0]
+    if first.base is None or first.ndim == 0:
+        return None
+    stride = first.strides[0]
+    end = first.__array_interface__['data'][0] + len(first) * stride
+    for array in arrays[1:]:
+        if array.base is not first.base or \
+                array.dtype != first.dtype or \
+                array.shape[1:] != first.shape[1:] or \
+                array.strides != first.strides or \
+                array.__array_interface__['data'][0] != end:
+            return None
+        end += len(array) * stride
+    length = sum(len(array) for array in arrays)
+    return np.lib.stride_tricks.as_strided(
+        first, shape=(length,) + first.shape[1:], strides=first.strides,
+        writeable=False)
+
+
+class ColumnarBatch(Batch):
+    """
+    Batch stored column by column. Fixed-shape frame columns are kept as one
+    contiguous (N, H, W, C) ndarray and scalar columns as typed 1-D arrays.
+    Slicing, projection and reversing return views, concatenation re-joins
+    adjacent views of the same buffer without copying.
+
+    `frames` is a compatibility shim: it lazily builds a DataFrame whose
+    frame columns hold per-row views into the column arrays. Treat it as
+    read only, changes to it are not reflected in the columns.
+
+    Arguments:
+        columns (Dict[str, np.ndarray]): column name to array, all arrays
+            must have the same length along the first axis
+        identifier_column (str): A column used to uniquely a row
+    """
+
+    def __init__(self,
+                 columns: Dict[str, np.ndarray] = None,
+                 identifier_column='id'):
+        self._set_columns(columns if columns is not None else {})
+        self._identifier_column = identifier_column
+        if FrameTracer.enabled and 'id' in self._columns:
+            FrameTracer().emit(TraceEvent.FIX, self._columns['id'])
+
+    def __del__(self):
+        if FrameTracer.enabled and 'id' in getattr(self, '_columns', ()):
+            FrameTracer().emit(TraceEvent.UNFIX, self._columns['id'])
+
+    def _set_columns(self, columns: Dict[str, np.ndarray]):
+        self._columns = OrderedDict()
+        batch_size = None
+        for name, values in columns.items():
+            values = stack_column(values)
+            if batch_size is None:
+                batch_size = len(values)
+            elif len(values) != batch_size:
+                LoggingManager().log(
+                    'Column {} has {} rows, expected {}'.format(
+                        name, len(values), batch_size),
+                    LoggingLevel.ERROR)
+                raise ValueError(
+                    'Column {} has {} rows, expected {}'.format(
+                        name, len(values), batch_size))
+            self._columns[name] = values
+        self._batch_size = batch_size or 0
+        self._frames = None
+
+    @classmethod
+    def from_frames(cls, frames: DataFrame,
+                    identifier_column='id') -> 'ColumnarBatch':
+        """Builds a columnar batch out of a DataFrame"""
+        return cls(OrderedDict((column, frames[column].values)
+                               for column in frames.columns),
+                   identifier_column)
+
+    @classmethod
+    def from_batch(cls, batch: Batch) -> 'ColumnarBatch':
+        if isinstance(batch, ColumnarBatch):
+            return batch
+        return cls.from_frames(batch.frames, batch.identifier_column)
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        return self._columns
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            data = OrderedDict()
+            for name, values in self._columns.items():
+                if values.ndim > 1:
+                    column = np.empty(len(values), dtype=object)
+                    column[:] = list(values)
+                    values = column
+                data[name] = values
+            self._frames = pd.DataFrame(data, copy=False)
+        return self._frames
+
+    @frames.setter
+    def frames(self, values):
+        if not isinstance(values, DataFrame):
+            LoggingManager().log('Batch constructor not properly called!',
+                                 LoggingLevel.DEBUG)
+            raise ValueError('Batch constructor not properly called. \
+                Expected pandas.DataFrame')
+        self._set_columns(OrderedDict((column, values[column].values)
+                                      for column in values.columns))
+
+    def column_as_numpy_array(self, column_name='data'):
+        return self._columns[column_name]
+
+    def __eq__(self, other: 'Batch'):
+        if not isinstance(other, ColumnarBatch):
+            return super().__eq__(other)
+        if set(self._columns) != set(other._columns):
+            return False
+        return all(np.array_equal(values, other._columns[name])
+                   for name, values in self._columns.items())
+
+    def _take(self, indices) -> 'ColumnarBatch':
+        return ColumnarBatch(
+            OrderedDict((name, values[indices])
+                        for name, values in self._columns.items()),
+            self._identifier_column)
+
+    def __getitem__(self, indices) -> 'ColumnarBatch':
+        """
+        Slices return views, lists and ints gather (copy) the rows.
+        """
+        if isinstance(indices, slice):
+            return self._take(indices)
+        elif isinstance(indices, list):
+            return self._take(np.asarray(indices, dtype=np.int64))
+        elif isinstance(indices, int):
+            return self._take(slice(indices, indices + 1 or None))
+        else:
+            raise TypeError('Invalid argument type: {}'.format(type(indices)))
+
+    def filter(self, mask) -> 'ColumnarBatch':
+        """
+        Returns a batch with the rows where mask is True. A contiguous run
+        of rows is a view of the column arrays, other masks gather the rows
+        with a single boolean index per column.
+        """
+        mask = self._as_mask(mask, len(self))
+        if mask.all():
+            return self
+        rows = np.flatnonzero(mask)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return self._take(slice(rows[0], rows[-1] + 1))
+        return self._take(mask)
+
+    def _get_frames_from_indices(self, required_frame_ids):
+        return self._take(np.asarray(list(required_frame_ids),
+                                     dtype=np.int64))
+
+    def _reorder(self, order: np.ndarray):
+        self._set_columns(OrderedDict((name, values[order])
+                                      for name, values in
+                                      self._columns.items()))
+
+    def sort(self, by=None):
+        """
+        in_place sort
+        """
+        if by is None and self.identifier_column in self._columns:
+            by = [self.identifier_column]
+        if by is None:
+            return
+        order = self.frames[by].sort_values(by=by, kind='mergesort').index
+        self._reorder(order.to_numpy())
+
+    def sort_orderby(self, by, sort_type):
+        """
+        in_place sort for orderby
+
+        Args:
+            by: list of column names
+            sort_type: list of True/False if ASC for each column name in 'by'
+                i.e [True, False] means [ASC, DESC]
+        """
+        if sort_type is None:
+            sort_type = [True]
+
+        if by is not None:
+            for column in by:
+                if column not in self._columns:
+                    LoggingManager().log(
+                        'Can not orderby non-projected column: {}'.format(
+                            column),
+                        LoggingLevel.ERROR)
+                    raise KeyError(
+                        'Can not orderby non-projected column: {}'.format(
+                            column))
+            order = self.frames[by].sort_values(
+                by, ascending=sort_type, kind='mergesort').index
+            self._reorder(order.to_numpy())
+        else:
+            LoggingManager().log(
+                'Columns and Sort Type are required for orderby',
+                LoggingLevel.WARNING)
+
+    def project(self, cols: []) -> 'ColumnarBatch':
+        """
+        Takes as input the column list, returns the projection without
+        copying the column arrays.
+        """
+        verfied_cols = [c for c in cols if c in self._columns]
+        unknown_cols = list(set(cols) - set(verfied_cols))
+        if len(unknown_cols):
+            LoggingManager().log("Unexpected columns %s\n\
+                                 Frames: %s" % (unknown_cols,
+                                                list(self._columns)),
+                                 LoggingLevel.WARNING)
+        return ColumnarBatch(OrderedDict((c, self._columns[c])
+                                         for c in verfied_cols),
+                             self._identifier_column)
+
+    @classmethod
+    def merge_column_wise(cls,
+                          batches: ['ColumnarBatch'],
+                          auto_renaming=False) -> 'ColumnarBatch':
+        """
+        Merge list of batches column_wise without copying the columns.
+        Duplicated column names keep the last value.
+        """
+        if not len(batches):
+            return ColumnarBatch()
+        columns = OrderedDict()
+        for batch in batches:
+            for name, values in batch.columns.items():
+                if name in columns:
+                    LoggingManager().log(
+                        'Duplicated column name detected {}'.format(name),
+                        LoggingLevel.WARNING)
+                columns[name] = values
+        return ColumnarBatch(columns, batches[0].identifier_column)
+
+    def __add__(self, other: 'Batch'):
+        if not isinstance(other, Batch):
+            raise TypeError("Input should be of type Batch")
+        if self.empty():
+            return other
+        if other.empty():
+            return self
+        return ColumnarBatch.concat([self, ColumnarBatch.from_batch(other)])
+
+    @classmethod
+    def concat(cls, batch_list: Iterable['ColumnarBatch'],
+               copy=True) -> 'ColumnarBatch':
+        """
+        Concat a list of columnar batches. With copy=False, batches that are
+        adjacent slices of the same buffer are joined into a single view.
+        """
+        batch_list = [batch for batch in batch_list if not batch.empty()]
+        if len(batch_list) == 0:
+            return ColumnarBatch()
+        if len(batch_list) == 1 and not copy:
+            return batch_list[0]
+        columns = OrderedDict()
+        for name in batch_list[0].columns:
+            arrays = [batch.columns[name] for batch in batch_list]
+            joined = None if copy else join_views(arrays)
+            columns[name] = joined if joined is not None \
+                else np.concatenate(arrays)
+        return ColumnarBatch(columns, batch_list[0].identifier_column)
+
+    def reverse(self):
+        """ Reverses the rows, as views """
+        self._reorder(slice(None, None, -1))
+
+    def reset_index(self):
+        """ Columns have no index, only the cached DataFrame is dropped """
+        self._frames = None
@@ -0,0 +1,269 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+from typing import List, TYPE_CHECKING
+
+import numpy as np
+
+from src.catalog.catalog_manager import CatalogManager
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.table_statistics import estimate_rows_in_range
+from src.expression.abstract_expression import (AbstractExpression,
+                                                ExpressionType)
+from src.expression.expression_utils import (function_expressions,
+                                             get_column_range)
+from src.filters.pp_filter import PPFilter
+from src.planner.seq_scan_plan import SeqScanPlan
+from src.planner.types import PlanOprType
+from src.storage.udf_result_cache import UdfResultCache, table_key
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.udfs.udf_profiler import udf_device
+
+if TYPE_CHECKING:
+    from src.expression.function_expression import FunctionExpression
+    from src.optimizer.group_expression import GroupExpression
+
+MB = 1024 * 1024
+
+# assumed for tables and UDFs without statistics
+DEFAULT_CARDINALITY = 1000
+DEFAULT_FRAME_BYTES = 480 * 640 * 3
+DEFAULT_SELECTIVITY = 0.5
+DEFAULT_UDF_MS_PER_FRAME = 50.0
+
+# milliseconds to read a MB of frames, to evaluate an expression node and
+# a function that is not a classifier on a row, to look up and to store
+# the outputs of a frame in the UDF result cache, to run a probabilistic
+# predicate on a frame
+SCAN_MS_PER_MB = 2.0
+EXPRESSION_MS = 0.001
+FUNCTION_MS = 0.01
+CACHE_LOOKUP_MS = 0.05
+CACHE_STORE_MS = 0.05
+PP_FILTER_MS = 0.5
+
+
+class CostModel:
+    """
+    Estimates the runtime in milliseconds of a physical plan operator,
+    excluding its children. Operators without an estimate cost nothing, so
+    the optimizer keeps the first plan it generates for them.
+
+    Sequential scans are charged for reading the frames that pass the
+    storage predicate and sampling, estimated with the table statistics,
+    and for every classifier UDF they evaluate on them, estimated with the
+    UDF cost profile of the device at the batch size of the scan. With the UDF
+    result cache enabled, they also pay storing what the model computes.
+    Probabilistic predicates below the scan cost their runtime on every
+    frame read and spare the UDFs the frames they filter out.
+
+    UDF cache lookups pay a lookup for every frame of the table and every
+    call, and the residual calls above them pay the model and storing its
+    outputs for the frames expected without stored outputs.
+    """
+
+    def calculate_cost(self, grp_expr: GroupExpression) -> float:
+        plan = grp_expr.opr
+        if plan.opr_type == PlanOprType.SEQUENTIAL_SCAN:
+            return self._seq_scan_cost(plan)
+        if plan.opr_type == PlanOprType.UDF_CACHE_LOOKUP:
+            return self.udf_cache_lookup_cost(plan.table, plan.func_exprs)
+        if plan.opr_type == PlanOprType.UDF_RESIDUAL:
+            return self.udf_residual_cost(plan.table, plan.func_exprs)
+        return 0
+
+    def udf_cache_lookup_cost(self, table,
+                              func_exprs: List[FunctionExpression]) -> float:
+        """Runtime of looking up the stored outputs of the calls for every
+        frame of the table"""
+        rows = self.estimate_rows(table, self.table_statistics(table))
+        return rows * len(func_exprs) * CACHE_LOOKUP_MS
+
+    def udf_residual_cost(self, table,
+                          func_exprs: List[FunctionExpression]) -> float:
+        """Runtime of the calls on the frames of the table without stored
+        outputs, storing their outputs"""
+        rows = self.estimate_rows(table, self.table_statistics(table))
+        key = table_key(table)
+        cost = 0
+        for func_expr in func_exprs:
+            # the cached frames are assumed spread over the table
+            hit_ratio = min(1.0, UdfResultCache().count(
+                func_expr.cache_key, key) / max(1, rows))
+            misses = rows * (1 - hit_ratio)
+            cost += self._udf_ms(table, func_expr, misses) + \
+                misses * CACHE_STORE_MS
+        return cost
+
+    def udf_cache_lookup_saves(self, table,
+                               func_exprs: List[FunctionExpression]) -> bool:
+        """
+        True if looking up the stored outputs of the calls and running them
+        on the residual frames is cheaper than running them on every frame
+        of the table
+        """
+        rows = self.estimate_rows(table, self.table_statistics(table))
+        evaluate_cost = sum(self._udf_ms(table, func_expr, rows) +
+                            rows * CACHE_STORE_MS
+                            for func_expr in func_exprs)
+        return self.udf_cache_lookup_cost(table, func_exprs) + \
+            self.udf_residual_cost(table, func_exprs) < evaluate_cost
+
+    def _udf_ms(self, table, func_expr: FunctionExpression,
+                num_frames: float) -> float:
+        profile = self.udf_profile(func_expr.function) \
+            if self.in_catalog(table) else None
+        return self.udf_ms(profile, num_frames)
+
+    def _seq_scan_cost(self, plan: SeqScanPlan) -> float:
+        storage = plan.children[0] if plan.children else None
+        if storage is not None and \
+                storage.opr_type == PlanOprType.PREFETCH:
+            storage = storage.children[0] if storage.children else None
+        pp_filters = []
+        if storage is not None and \
+                storage.opr_type == PlanOprType.PP_FILTER:
+            pp_filters = [func_expr.function for func_expr in
+                          function_expressions(storage.predicate)
+                          if isinstance(func_expr.function, PPFilter)]
+            storage = storage.children[0] if storage.children else None
+        table = getattr(storage, 'video', None)
+        if table is None:
+            return 0
+        in_catalog = self.in_catalog(table)
+        statistics = self.table_statistics(table)
+
+        rows = self.estimate_rows(table, statistics)
+        rows_read = rows * self.estimate_selectivity(storage.predicate,
+                                                     statistics)
+        if storage.skip_frames and storage.skip_frames > 1:
+            rows_read /= storage.skip_frames
+        frame_bytes = DEFAULT_FRAME_BYTES
+        if statistics is not None and statistics.frame_dims:
+            frame_bytes = int(np.prod(statistics.frame_dims))
+        row_bytes = frame_bytes
+        if storage.columns is not None and 'data' not in storage.columns:
+            row_bytes = 8 * len(storage.columns)
+        cost = rows_read * row_bytes / MB * SCAN_MS_PER_MB
+        # the filters are assumed independent
+        cost += rows_read * len(pp_filters) * PP_FILTER_MS
+        for pp_filter in pp_filters:
+            rows_read *= 1 - pp_filter.reduction
+
+        batch_size = max(1, storage.batch_mem_size // max(1, frame_bytes))
+        for udf_expr in self._classifier_udfs(plan):
+            profile = self.udf_profile(udf_expr.function) \
+                if in_catalog else None
+            cost += self.udf_ms(profile, rows_read, batch_size)
+            if UdfResultCache().enabled:
+                cost += rows_read * CACHE_STORE_MS
+        return cost
+
+    def table_statistics(self, table) -> DataFrameStatistics:
+        """Statistics of the table, None if there are none"""
+        if not self.in_catalog(table):
+            return None
+        return CatalogManager().get_table_statistics(table.id)
+
+    @staticmethod
+    def udf_profile(udf: AbstractClassifierUDF):
+        """Cost profile of the udf on the device it runs on"""
+        return CatalogManager().get_udf_profile(udf.name, udf_device(udf))
+
+    @staticmethod
+    def udf_ms(profile, num_frames: float, batch_size: int = 1) -> float:
+        """Runtime of a udf with the profile on num_frames frames"""
+        if profile is not None and profile.calls:
+            return profile.estimate_ms(int(np.ceil(num_frames)), batch_size)
+        return num_frames * DEFAULT_UDF_MS_PER_FRAME
+
+    def expression_cost(self, expr: AbstractExpression,
+                        use_profiles: bool = False) -> float:
+        """
+        Runtime of the expression on a row: every node costs
+        EXPRESSION_MS, classifier UDFs their profiled runtime on a frame
+        and other functions FUNCTION_MS.
+
+        Arguments:
+            expr (AbstractExpression): expression to be evaluated
+            use_profiles (bool): read the UDF profiles from the catalog
+        """
+        if not isinstance(expr, AbstractExpression):
+            return 0.0
+        cost = EXPRESSION_MS
+        if expr.etype == ExpressionType.FUNCTION_EXPRESSION:
+            if isinstance(expr.function, AbstractClassifierUDF):
+                profile = self.udf_profile(expr.function) \
+                    if use_profiles else None
+                cost += self.udf_ms(profile, 1)
+            else:
+                cost += FUNCTION_MS
+        return cost + sum(self.expression_cost(child, use_profiles)
+                          for child in expr.children)
+
+    @staticmethod
+    def in_catalog(table) -> bool:
+        """False for tables not persisted in the catalog, they have no
+        statistics"""
+        return isinstance(getattr(table, 'id', None), int)
+
+    @staticmethod
+    def _classifier_udfs(plan: SeqScanPlan) -> List[FunctionExpression]:
+        exprs = list(plan.columns or []) + [plan.predicate]
+        return [func_expr for expr in exprs
+                for func_expr in function_expressions(expr)
+                if isinstance(func_expr.function, AbstractClassifierUDF)]
+
+    @staticmethod
+    def estimate_rows(table, statistics: DataFrameStatistics = None) -> int:
+        """
+        Rows of the table, from its statistics or else the row group
+        statistics recorded by the storage engine, DEFAULT_CARDINALITY if
+        there are none
+        """
+        if statistics is not None:
+            return statistics.num_rows
+        if not CostModel.in_catalog(table):
+            return DEFAULT_CARDINALITY
+        row_groups = CatalogManager().get_row_group_statistics(table.id)
+        rows = sum(row_group.num_rows for row_group in row_groups)
+        return rows if rows else DEFAULT_CARDINALITY
+
+    @staticmethod
+    def estimate_selectivity(predicate: AbstractExpression,
+                             statistics: DataFrameStatistics) -> float:
+        """
+        Fraction of the rows passing the predicate. The ranges its
+        conjuncts put on columns with a histogram are estimated as
+        independent, any other predicate passes DEFAULT_SELECTIVITY.
+        """
+        if predicate is None:
+            return 1.0
+        histograms = statistics.histograms if statistics is not None \
+            else {}
+        if not histograms or not statistics.num_rows:
+            return DEFAULT_SELECTIVITY
+        selectivity = None
+        for column, histogram in histograms.items():
+            low, high = get_column_range(predicate, column)
+            if low is None and high is None:
+                continue
+            fraction = estimate_rows_in_range(histogram, low, high) / \
+                statistics.num_rows
+            selectivity = fraction if selectivity is None \
+                else selectivity * fraction
+        if selectivity is None:
+            return DEFAULT_SELECTIVITY
+        return min(1.0, max(0.0, selectivity))
@@ -42,6 +42,8 @@ class OperatorType(IntEnum):
     LOGICALORDERBY = auto()
     LOGICALLIMIT = auto()
     LOGICALSAMPLE = auto()
+    LOGICALUDFCACHELOOKUP = auto()
+    LOGICALUDFRESIDUAL = auto()
     LOGICALDELIMITER = auto()
 
 
@@ -106,6 +108,7 @@ class LogicalGet(Operator):
         self._dataset_metadata = dataset_metadata
         self._predicate = None
         self._target_list = None
+        self._sample_freq = None
 
     @property
     def video(self):
@@ -131,6 +134,15 @@ class LogicalGet(Operator):
     def target_list(self, target_list):
         self._target_list = target_list
 
+    @property
+    def sample_freq(self):
+        """Every sample_freq-th row is read, all of them if None"""
+        return self._sample_freq
+
+    @sample_freq.setter
+    def sample_freq(self, sample_freq: int):
+        self._sample_freq = sample_freq
+
     def __eq__(self, other):
         is_subtree_equal = super().__eq__(other)
         if not isinstance(other, LogicalGet):
@@ -139,7 +151,8 @@ class LogicalGet(Operator):
                 and self.video == other.video
                 and self.dataset_metadata == other.dataset_metadata
                 and self.predicate == other.predicate
-                and self.target_list == other.target_list)
+                and self.target_list == other.target_list
+                and self.sample_freq == other.sample_freq)
 
 
 class LogicalQueryDerivedGet(Operator):
@@ -266,6 +279,77 @@ class LogicalSample(Operator):
                 and self.sample_freq == other.sample_freq)
 
 
+class LogicalUdfCacheLookup(Operator):
+    """
+    Left outer join of the frames of its child with the outputs of UDF
+    calls stored in the UDF result cache, by frame id. The outputs of a
+    call are attached to every frame in a column named by the cache key of
+    the call, None for the frames without stored outputs.
+
+    Arguments:
+        table (DataFrameMetadata): table the frames are read from
+        func_exprs (List[FunctionExpression]): UDF calls to look up
+    """
+
+    def __init__(self, table: DataFrameMetadata,
+                 func_exprs: List[AbstractExpression],
+                 children: List = None):
+        super().__init__(OperatorType.LOGICALUDFCACHELOOKUP, children)
+        self._table = table
+        self._func_exprs = func_exprs
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def func_exprs(self):
+        return self._func_exprs
+
+    def __eq__(self, other):
+        is_subtree_equal = super().__eq__(other)
+        if not isinstance(other, LogicalUdfCacheLookup):
+            return False
+        return (is_subtree_equal
+                and self.table == other.table
+                and self.func_exprs == other.func_exprs)
+
+
+class LogicalUdfResidual(Operator):
+    """
+    Runs the UDF calls looked up by a LogicalUdfCacheLookup below it on the
+    residual frames without stored outputs, stores their outputs and fills
+    them in.
+
+    Arguments:
+        table (DataFrameMetadata): table the frames are read from
+        func_exprs (List[FunctionExpression]): UDF calls to run
+    """
+
+    def __init__(self, table: DataFrameMetadata,
+                 func_exprs: List[AbstractExpression],
+                 children: List = None):
+        super().__init__(OperatorType.LOGICALUDFRESIDUAL, children)
+        self._table = table
+        self._func_exprs = func_exprs
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def func_exprs(self):
+        return self._func_exprs
+
+    def __eq__(self, other):
+        is_subtree_equal = super().__eq__(other)
+        if not isinstance(other, LogicalUdfResidual):
+            return False
+        return (is_subtree_equal
+                and self.table == other.table
+                and self.func_exprs == other.func_exprs)
+
+
 class LogicalUnion(Operator):
     def __init__(self, all: bool, children: List = None):
         super().__init__(OperatorType.LOGICALUNION, children)
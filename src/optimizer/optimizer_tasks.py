@@ -17,6 +17,7 @@ from enum import IntEnum, auto
 from src.optimizer.rules.rules import RulesManager
 from src.optimizer.group_expression import GroupExpression
 from src.optimizer.binder import Binder
+from src.optimizer.cost_model import CostModel
 from src.optimizer.property import PropertyType
 from src.utils.logging_manager import LoggingManager, LoggingLevel
 from typing import TYPE_CHECKING
@@ -264,7 +265,7 @@ class OptimizeInputs(OptimizerTask):
                          optimizer_context, OptimizerTaskType.OPTIMIZE_INPUTS)
 
     def execute(self):
-        cost = 0
+        cost = CostModel().calculate_cost(self.root_expr)
         grp = self.optimizer_context.memo.groups[self.root_id]
         for child_id in self.root_expr.children:
             child_grp = self.optimizer_context.memo.groups[child_id]
@@ -26,7 +26,8 @@ from src.expression.tuple_value_expression import ExpressionType, \
 
 from src.parser.create_statement import ColumnDefinition, \
     ColConstraintInfo
-from src.utils.generic_utils import path_to_class, generate_file_path
+from src.utils.generic_utils import generate_file_path
+from src.udfs.udf_registry import UdfRegistry
 
 from src.utils.logging_manager import LoggingLevel
 from src.utils.logging_manager import LoggingManager
@@ -131,7 +132,8 @@ def bind_function_expr(expr: FunctionExpression, column_mapping):
                 LoggingManager().log(
                     'Invalid output {} selected for UDF {}'.format(
                         expr.output, expr.name), LoggingLevel().ERROR)
-        expr.function = path_to_class(udf_obj.impl_file_path, udf_obj.name)()
+        expr.function = UdfRegistry().get(udf_obj.name,
+                                          udf_obj.impl_file_path)
 
 
 def create_column_metadata(col_list: List[ColumnDefinition]):
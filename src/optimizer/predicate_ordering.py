@@ -0,0 +1,99 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Tuple
+
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.expression.abstract_expression import (AbstractExpression,
+                                                ExpressionType)
+from src.expression.expression_utils import (and_, conjunction_list,
+                                             disjunction_list, or_)
+from src.expression.logical_expression import LogicalExpression
+from src.optimizer.cost_model import CostModel
+
+
+def _rank(cost: float, pass_ratio: float) -> float:
+    # cost per row removed from the rest of the chain
+    if pass_ratio >= 1:
+        return float('inf')
+    return cost / (1 - pass_ratio)
+
+
+def _chain(terms, short_circuit):
+    """
+    Orders the (expr, cost, selectivity) terms of a chain by rank and
+    returns them with the expected cost of the chain on a row, every term
+    only seeing the rows the previous ones let through.
+
+    Arguments:
+        short_circuit: fraction of its rows a term lets through
+    """
+    terms = sorted(terms, key=lambda term: _rank(term[1],
+                                                 short_circuit(term[2])))
+    cost, reaching = 0.0, 1.0
+    for _, term_cost, selectivity in terms:
+        cost += reaching * term_cost
+        reaching *= short_circuit(selectivity)
+    return [term[0] for term in terms], cost
+
+
+def _order(expr: AbstractExpression, cost_model: CostModel,
+           statistics: DataFrameStatistics,
+           use_profiles: bool) -> Tuple[AbstractExpression, float, float]:
+    if expr.etype == ExpressionType.LOGICAL_AND:
+        terms = [_order(term, cost_model, statistics, use_profiles)
+                 for term in conjunction_list(expr)]
+        exprs, cost = _chain(terms, lambda selectivity: selectivity)
+        selectivity = 1.0
+        for term in terms:
+            selectivity *= term[2]
+        return and_(exprs), cost, selectivity
+    if expr.etype == ExpressionType.LOGICAL_OR:
+        terms = [_order(term, cost_model, statistics, use_profiles)
+                 for term in disjunction_list(expr)]
+        exprs, cost = _chain(terms, lambda selectivity: 1 - selectivity)
+        rejected = 1.0
+        for term in terms:
+            rejected *= 1 - term[2]
+        return or_(exprs), cost, 1 - rejected
+    if expr.etype == ExpressionType.LOGICAL_NOT:
+        child, cost, selectivity = _order(expr.children[0], cost_model,
+                                          statistics, use_profiles)
+        if child is not expr.children[0]:
+            expr = LogicalExpression(ExpressionType.LOGICAL_NOT, child, None)
+        return expr, cost, 1 - selectivity
+    return (expr, cost_model.expression_cost(expr, use_profiles),
+            cost_model.estimate_selectivity(expr, statistics))
+
+
+def order_predicate(predicate: AbstractExpression,
+                    statistics: DataFrameStatistics = None,
+                    use_profiles: bool = False) -> AbstractExpression:
+    """
+    Reorders the AND and OR chains of a predicate so that the expensive
+    terms only see the rows the cheap ones let through. The chains are
+    flattened and their terms sorted by cost per row over the fraction of
+    rows they remove from the rest of the chain: cost / (1 - selectivity)
+    for an AND, cost / selectivity for an OR. Equal ranks keep the query
+    order. The chains are rebuilt left deep, the shape LogicalExpression
+    short-circuits.
+
+    Arguments:
+        predicate (AbstractExpression): predicate to be reordered
+        statistics (DataFrameStatistics): statistics of the scanned table
+        use_profiles (bool): read the UDF cost profiles from the catalog
+    """
+    if not isinstance(predicate, AbstractExpression):
+        return predicate
+    return _order(predicate, CostModel(), statistics, use_profiles)[0]
@@ -16,7 +16,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from enum import Flag, auto, IntEnum
-from typing import TYPE_CHECKING
+from typing import List, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.optimizer.optimizer_context import OptimizerContext
@@ -27,7 +27,7 @@ from src.optimizer.operators import (
     LogicalCreate, LogicalInsert, LogicalLoadData, LogicalUpload,
     LogicalCreateUDF, LogicalProject, LogicalGet, LogicalFilter,
     LogicalUnion, LogicalOrderBy, LogicalLimit, LogicalQueryDerivedGet,
-    LogicalSample)
+    LogicalSample, LogicalUdfCacheLookup, LogicalUdfResidual)
 from src.planner.create_plan import CreatePlan
 from src.planner.create_udf_plan import CreateUDFPlan
 from src.planner.insert_plan import InsertPlan
@@ -35,11 +35,28 @@ from src.planner.load_data_plan import LoadDataPlan
 from src.planner.upload_plan import UploadPlan
 from src.planner.seq_scan_plan import SeqScanPlan
 from src.planner.storage_plan import StoragePlan
+from src.planner.pp_plan import PPScanPlan
+from src.planner.prefetch_plan import PrefetchPlan
 from src.planner.union_plan import UnionPlan
 from src.planner.orderby_plan import OrderByPlan
 from src.planner.limit_plan import LimitPlan
 from src.planner.sample_plan import SamplePlan
+from src.planner.udf_cache_lookup_plan import UdfCacheLookupPlan
+from src.planner.udf_residual_plan import UdfResidualPlan
 from src.configuration.configuration_manager import ConfigurationManager
+from src.catalog.catalog_manager import CatalogManager
+from src.catalog.column_type import ColumnType
+from src.catalog.models.pp_filter import PPFilterMetadata
+from src.filters.pp_filter import PPFilter, label_predicates
+from src.optimizer.cost_model import CostModel
+from src.optimizer.predicate_ordering import order_predicate
+from src.storage.udf_result_cache import UdfResultCache, table_key
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.expression.function_expression import FunctionExpression
+from src.expression.expression_utils import (conjunction_list, and_,
+                                             function_expressions,
+                                             get_columns_in_expression,
+                                             is_row_predicate)
 
 
 class RuleType(Flag):
@@ -56,6 +73,8 @@ class RuleType(Flag):
     EMBED_PROJECT_INTO_DERIVED_GET = auto()
     PUSHDOWN_FILTER_THROUGH_SAMPLE = auto()
     PUSHDOWN_PROJECT_THROUGH_SAMPLE = auto()
+    EMBED_SAMPLE_INTO_GET = auto()
+    SPLIT_GET_INTO_UDF_CACHE_LOOKUP = auto()
 
     REWRITE_DELIMETER = auto()
 
@@ -69,8 +88,11 @@ class RuleType(Flag):
     LOGICAL_CREATE_TO_PHYSICAL = auto()
     LOGICAL_CREATE_UDF_TO_PHYSICAL = auto()
     LOGICAL_GET_TO_SEQSCAN = auto()
+    LOGICAL_GET_TO_PP_SCAN = auto()
     LOGICAL_SAMPLE_TO_UNIFORMSAMPLE = auto()
     LOGICAL_DERIVED_GET_TO_PHYSICAL = auto()
+    LOGICAL_UDF_CACHE_LOOKUP_TO_PHYSICAL = auto()
+    LOGICAL_UDF_RESIDUAL_TO_PHYSICAL = auto()
     IMPLEMENTATION_DELIMETER = auto()
 
 
@@ -91,7 +113,10 @@ class Promise(IntEnum):
     LOGICAL_CREATE_UDF_TO_PHYSICAL = auto()
     LOGICAL_SAMPLE_TO_UNIFORMSAMPLE = auto()
     LOGICAL_GET_TO_SEQSCAN = auto()
+    LOGICAL_GET_TO_PP_SCAN = auto()
     LOGICAL_DERIVED_GET_TO_PHYSICAL = auto()
+    LOGICAL_UDF_CACHE_LOOKUP_TO_PHYSICAL = auto()
+    LOGICAL_UDF_RESIDUAL_TO_PHYSICAL = auto()
     IMPLEMENTATION_DELIMETER = auto()
 
     # REWRITE RULES
@@ -101,6 +126,8 @@ class Promise(IntEnum):
     EMBED_PROJECT_INTO_DERIVED_GET = auto()
     PUSHDOWN_FILTER_THROUGH_SAMPLE = auto()
     PUSHDOWN_PROJECT_THROUGH_SAMPLE = auto()
+    EMBED_SAMPLE_INTO_GET = auto()
+    SPLIT_GET_INTO_UDF_CACHE_LOOKUP = auto()
 
 
 class Rule(ABC):
@@ -325,6 +352,98 @@ class PushdownProjectThroughSample(Rule):
         return sample
 
 
+class EmbedSampleIntoGet(Rule):
+    """
+    Samples the rows in the storage read of a get without a predicate, so
+    the rows left out are not read, decoded or evaluated by the UDFs of the
+    scan. Gets with a predicate sample the rows passing it, above the scan.
+    """
+
+    def __init__(self):
+        pattern = Pattern(OperatorType.LOGICALSAMPLE)
+        pattern.append_child(Pattern(OperatorType.LOGICALGET))
+        super().__init__(RuleType.EMBED_SAMPLE_INTO_GET, pattern)
+
+    def promise(self):
+        return Promise.EMBED_SAMPLE_INTO_GET
+
+    def check(self, before: LogicalSample, context: OptimizerContext):
+        logical_get = before.children[0]
+        sample_freq = getattr(before.sample_freq, 'value', None)
+        return logical_get.predicate is None and \
+            logical_get.sample_freq is None and \
+            isinstance(sample_freq, int) and sample_freq > 0
+
+    def apply(self, before: LogicalSample, context: OptimizerContext):
+        logical_get = before.children[0]
+        logical_get.sample_freq = before.sample_freq.value
+        return logical_get
+
+
+class SplitGetIntoUdfCacheLookup(Rule):
+    """
+    Splits a get evaluating classifier UDFs, when the UDF result cache holds
+    enough of their outputs for the table, into
+
+        derived get (UDF conjuncts of the predicate, target list)
+          UDF residual: runs the UDFs on the frames without outputs
+            UDF cache lookup: left outer join with the stored outputs
+              get (the other conjuncts, sample)
+
+    so the models only run on the frames without stored outputs. The
+    UDF calls above read the outputs filled in by the residual. The split
+    is costed by the CostModel against running the UDFs on every frame,
+    the memo keeps a single logical expression per group. Gets with
+    probabilistic predicates are left to LogicalGetToPPScan.
+    """
+
+    def __init__(self):
+        pattern = Pattern(OperatorType.LOGICALGET)
+        super().__init__(RuleType.SPLIT_GET_INTO_UDF_CACHE_LOOKUP, pattern)
+
+    def promise(self):
+        return Promise.SPLIT_GET_INTO_UDF_CACHE_LOOKUP
+
+    def check(self, before: LogicalGet, context: OptimizerContext):
+        table = before.dataset_metadata
+        if not UdfResultCache().enabled or before.target_list is None or \
+                getattr(table, 'file_url', None) is None:
+            return False
+        func_exprs = self._cached_calls(before)
+        if not func_exprs or LogicalGetToPPScan._pp_filters(before):
+            return False
+        return CostModel().udf_cache_lookup_saves(table, func_exprs)
+
+    def apply(self, before: LogicalGet, context: OptimizerContext):
+        LogicalGetToSeqScan._set_cache_table(before)
+        table = before.dataset_metadata
+        func_exprs = self._cached_calls(before)
+        conjuncts = conjunction_list(before.predicate)
+        logical_get = LogicalGet(before.video, table)
+        logical_get.predicate = and_([conjunct for conjunct in conjuncts
+                                      if not function_expressions(conjunct)])
+        logical_get.sample_freq = before.sample_freq
+        lookup = LogicalUdfCacheLookup(table, func_exprs, [logical_get])
+        residual = LogicalUdfResidual(table, func_exprs, [lookup])
+        after = LogicalQueryDerivedGet([residual])
+        after.predicate = and_([conjunct for conjunct in conjuncts
+                                if function_expressions(conjunct)])
+        after.target_list = before.target_list
+        return after
+
+    @staticmethod
+    def _cached_calls(before: LogicalGet) -> List[FunctionExpression]:
+        """Classifier UDF calls of the get over columns, one per cache
+        key"""
+        calls = {}
+        for func_expr in LogicalGetToSeqScan._function_expressions(before):
+            if isinstance(func_expr.function, AbstractClassifierUDF) and \
+                    not any(function_expressions(child)
+                            for child in func_expr.children):
+                calls.setdefault(func_expr.cache_key, func_expr)
+        return list(calls.values())
+
+
 # REWRITE RULES END
 ##############################################
 
@@ -435,10 +554,10 @@ class LogicalUploadToPhysical(Rule):
 
 
 class LogicalGetToSeqScan(Rule):
-    def __init__(self):
+    def __init__(self, rule_type: RuleType = RuleType.LOGICAL_GET_TO_SEQSCAN):
         pattern = Pattern(OperatorType.LOGICALGET)
         # pattern.append_child(Pattern(OperatorType.DUMMY))
-        super().__init__(RuleType.LOGICAL_GET_TO_SEQSCAN, pattern)
+        super().__init__(rule_type, pattern)
 
     def promise(self):
         return Promise.LOGICAL_GET_TO_SEQSCAN
@@ -456,11 +575,163 @@ class LogicalGetToSeqScan(Rule):
             "executor", "batch_mem_size")
         if config_batch_mem_size:
             batch_mem_size = config_batch_mem_size
-        after = SeqScanPlan(before.predicate, before.target_list)
-        after.append_child(StoragePlan(
-            before.dataset_metadata, batch_mem_size=batch_mem_size))
+        self._set_cache_table(before)
+        predicate, storage_predicate, columns = self._pushdown(before)
+        # cheap predicates first, expensive UDFs see the rows they pass
+        cost_model = CostModel()
+        predicate = order_predicate(
+            predicate, cost_model.table_statistics(before.dataset_metadata),
+            use_profiles=cost_model.in_catalog(before.dataset_metadata))
+        after = SeqScanPlan(predicate, before.target_list)
+        after.append_child(self._prefetch(before, self._scan_input(
+            before, StoragePlan(before.dataset_metadata,
+                                batch_mem_size=batch_mem_size,
+                                skip_frames=before.sample_freq or 0,
+                                columns=columns,
+                                predicate=storage_predicate))))
+        return after
+
+    def _scan_input(self, before: LogicalGet, storage: StoragePlan):
+        """Plan feeding the sequential scan with the rows read from
+        storage"""
+        return storage
+
+    @staticmethod
+    def _prefetch(before: LogicalGet, scan_input):
+        """
+        Runs the input of a scan evaluating functions in a background
+        thread, with `executor.prefetch`, so that reading and decoding the
+        next frames overlaps with the UDFs running on the current ones.
+        """
+        config = ConfigurationManager().get_value('executor', 'prefetch')
+        config = config if config else {}
+        if not config.get('enabled', False) or \
+                not LogicalGetToSeqScan._function_expressions(before):
+            return scan_input
+        prefetch = PrefetchPlan(config.get('batches', 2))
+        prefetch.append_child(scan_input)
+        return prefetch
+
+    @staticmethod
+    def _function_expressions(before: LogicalGet):
+        exprs = list(before.target_list or []) + [before.predicate]
+        return [func_expr for expr in exprs
+                for func_expr in function_expressions(expr)]
+
+    @staticmethod
+    def _set_cache_table(before: LogicalGet):
+        """
+        Tells the UDFs evaluated by the scan which table they run on, their
+        outputs are cached per (udf, table, frame id).
+        """
+        table = before.dataset_metadata
+        if getattr(table, 'file_url', None) is None:
+            return
+        key = table_key(table)
+        for func_expr in LogicalGetToSeqScan._function_expressions(before):
+            func_expr.cache_table = key
+
+    @staticmethod
+    def _pushdown(before: LogicalGet):
+        """
+        Splits the scan predicate into the conjuncts the storage engine can
+        evaluate on the non frame columns, without decoding any frame, and
+        the ones left to the sequential scan. Also computes the columns the
+        scan reads, None if all of them are needed.
+
+        Returns:
+            (scan predicate, storage predicate, storage columns)
+        """
+        schema = getattr(before.dataset_metadata, 'schema', None)
+        column_list = getattr(schema, 'column_list', None)
+        if not isinstance(column_list, list):
+            return before.predicate, None, None
+        names = [column.name for column in column_list]
+        scalar_names = set(column.name for column in column_list
+                           if column.type != ColumnType.NDARRAY)
+
+        pushed, remaining = [], []
+        for conjunct in conjunction_list(before.predicate):
+            conjunct_columns = get_columns_in_expression(conjunct)
+            if is_row_predicate(conjunct) and conjunct_columns and \
+                    conjunct_columns <= scalar_names:
+                pushed.append(conjunct)
+            else:
+                remaining.append(conjunct)
+        predicate = and_(remaining)
+
+        columns = None
+        if before.target_list is not None:
+            columns = set()
+            for expr in list(before.target_list) + remaining:
+                expr_columns = get_columns_in_expression(expr)
+                if expr_columns is None or not expr_columns <= set(names):
+                    columns = None
+                    break
+                columns |= expr_columns
+        if columns is not None and 'id' in names and \
+                LogicalGetToSeqScan._function_expressions(before):
+            # frame ids key the UDF result cache
+            columns.add('id')
+        if columns is not None:
+            columns = [name for name in names if name in columns]
+            if not columns or len(columns) == len(names):
+                columns = None
+        return predicate, and_(pushed), columns
+
+
+class LogicalGetToPPScan(LogicalGetToSeqScan):
+    """
+    Alternative scan of a get whose predicate requires a label in the
+    output of a classifier UDF, e.g. `Detector(data).label @> ['car']`,
+    when a probabilistic predicate of the label was trained on the table
+    with at least the accuracy of `executor.pp_filters`: the frames read
+    from storage are filtered by it before the UDF runs on them. The cost
+    model weighs the frames it filters out against its own runtime.
+    """
+
+    def __init__(self):
+        super().__init__(RuleType.LOGICAL_GET_TO_PP_SCAN)
+
+    def promise(self):
+        return Promise.LOGICAL_GET_TO_PP_SCAN
+
+    def check(self, before: LogicalGet, context: OptimizerContext):
+        return len(self._pp_filters(before)) > 0
+
+    def _scan_input(self, before: LogicalGet, storage: StoragePlan):
+        # the filters see the input of the UDF they stand for
+        predicate = and_([FunctionExpression(PPFilter.loads(metadata.model),
+                                             output='pp',
+                                             children=func_expr.children)
+                          for func_expr, metadata in
+                          self._pp_filters(before)])
+        after = PPScanPlan(predicate)
+        after.append_child(storage)
         return after
 
+    @staticmethod
+    def _pp_filters(before: LogicalGet) -> \
+            List[Tuple[FunctionExpression, PPFilterMetadata]]:
+        """
+        Filters of the labels the conjuncts of the predicate require, with
+        the UDF expression they stand for. The filters are not unpickled.
+        """
+        config = ConfigurationManager().get_value('executor', 'pp_filters')
+        config = config if config else {}
+        table = before.dataset_metadata
+        if not config.get('enabled', False) or \
+                not CostModel.in_catalog(table):
+            return []
+        accuracy = config.get('accuracy', 0.95)
+        pp_filters = []
+        for func_expr, label in label_predicates(before.predicate):
+            metadata = CatalogManager().get_pp_filter(
+                func_expr.function.name, table.id, func_expr.output, label)
+            if metadata is not None and metadata.accuracy >= accuracy:
+                pp_filters.append((func_expr, metadata))
+        return pp_filters
+
 
 class LogicalSampleToUniformSample(Rule):
     def __init__(self):
@@ -493,7 +764,44 @@ class LogicalDerivedGetToPhysical(Rule):
 
     def apply(self, before: LogicalQueryDerivedGet,
               context: OptimizerContext):
-        after = SeqScanPlan(before.predicate, before.target_list)
+        after = SeqScanPlan(order_predicate(before.predicate),
+                            before.target_list)
+        return after
+
+
+class LogicalUdfCacheLookupToPhysical(Rule):
+    def __init__(self):
+        pattern = Pattern(OperatorType.LOGICALUDFCACHELOOKUP)
+        pattern.append_child(Pattern(OperatorType.DUMMY))
+        super().__init__(RuleType.LOGICAL_UDF_CACHE_LOOKUP_TO_PHYSICAL,
+                         pattern)
+
+    def promise(self):
+        return Promise.LOGICAL_UDF_CACHE_LOOKUP_TO_PHYSICAL
+
+    def check(self, before: Operator, context: OptimizerContext):
+        return True
+
+    def apply(self, before: LogicalUdfCacheLookup,
+              context: OptimizerContext):
+        after = UdfCacheLookupPlan(before.table, before.func_exprs)
+        return after
+
+
+class LogicalUdfResidualToPhysical(Rule):
+    def __init__(self):
+        pattern = Pattern(OperatorType.LOGICALUDFRESIDUAL)
+        pattern.append_child(Pattern(OperatorType.DUMMY))
+        super().__init__(RuleType.LOGICAL_UDF_RESIDUAL_TO_PHYSICAL, pattern)
+
+    def promise(self):
+        return Promise.LOGICAL_UDF_RESIDUAL_TO_PHYSICAL
+
+    def check(self, before: Operator, context: OptimizerContext):
+        return True
+
+    def apply(self, before: LogicalUdfResidual, context: OptimizerContext):
+        after = UdfResidualPlan(before.table, before.func_exprs)
         return after
 
 
@@ -571,7 +879,9 @@ class RulesManager:
             EmbedFilterIntoDerivedGet(),
             EmbedProjectIntoDerivedGet(),
             PushdownFilterThroughSample(),
-            PushdownProjectThroughSample()
+            PushdownProjectThroughSample(),
+            EmbedSampleIntoGet(),
+            SplitGetIntoUdfCacheLookup()
         ]
 
         self._implementation_rules = [
@@ -582,7 +892,10 @@ class RulesManager:
             LogicalUploadToPhysical(),
             LogicalSampleToUniformSample(),
             LogicalGetToSeqScan(),
+            LogicalGetToPPScan(),
             LogicalDerivedGetToPhysical(),
+            LogicalUdfCacheLookupToPhysical(),
+            LogicalUdfResidualToPhysical(),
             LogicalUnionToPhysical(),
             LogicalOrderByToPhysical(),
             LogicalLimitToPhysical()
@@ -0,0 +1,35 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from src.planner.abstract_plan import AbstractPlan
+from src.planner.types import PlanOprType
+
+
+class PrefetchPlan(AbstractPlan):
+    """
+    Exchange operator: the child subtree runs in a background thread that
+    reads ahead up to queue_size batches while the parent operator
+    processes the previous ones.
+
+    Arguments:
+        queue_size (int): number of batches read ahead
+    """
+
+    def __init__(self, queue_size: int):
+        self._queue_size = queue_size
+        super().__init__(PlanOprType.PREFETCH)
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue_size
@@ -12,7 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from typing import List
+
 from src.catalog.models.df_metadata import DataFrameMetadata
+from src.expression.abstract_expression import AbstractExpression
 from src.planner.abstract_plan import AbstractPlan
 from src.planner.types import PlanOprType
 
@@ -25,11 +28,15 @@ class StoragePlan(AbstractPlan):
     Arguments:
         video (DataFrameMetadata): Required meta-data for fetching data
         batch_mem_size (int): memory size of the batch read from disk
-        skip_frames (int): skip frequency
+        skip_frames (int): skip frequency, every skip_frames-th row is
+            read, all of them if 0 or 1
         offset (int): storage offset for retrieving data
         limit (int): limit on data records to be retrieved
         total_shards (int): number of shards of data (if sharded)
         curr_shard (int): current curr_shard if data is sharded
+        columns (List[str]): columns to be read, all if None
+        predicate (AbstractExpression): row predicate over the non frame
+            columns evaluated by the storage engine
     """
 
     def __init__(self, video: DataFrameMetadata,
@@ -38,7 +45,9 @@ class StoragePlan(AbstractPlan):
                  offset: int = None,
                  limit: int = None,
                  total_shards: int = 0,
-                 curr_shard: int = 0):
+                 curr_shard: int = 0,
+                 columns: List[str] = None,
+                 predicate: AbstractExpression = None):
         super().__init__(PlanOprType.STORAGE_PLAN)
         self._video = video
         self._batch_mem_size = batch_mem_size
@@ -47,6 +56,8 @@ class StoragePlan(AbstractPlan):
         self._limit = limit
         self._total_shards = total_shards
         self._curr_shard = curr_shard
+        self._columns = columns
+        self._predicate = predicate
 
     @property
     def video(self):
@@ -75,3 +86,11 @@ class StoragePlan(AbstractPlan):
     @property
     def curr_shard(self):
         return self._curr_shard
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def predicate(self):
+        return self._predicate
@@ -29,4 +29,7 @@ class PlanOprType(IntEnum):
     ORDER_BY = auto()
     LIMIT = auto()
     SAMPLE = auto()
+    PREFETCH = auto()
+    UDF_CACHE_LOOKUP = auto()
+    UDF_RESIDUAL = auto()
     # add other types
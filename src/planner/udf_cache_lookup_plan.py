@@ -0,0 +1,46 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import List
+
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.expression.function_expression import FunctionExpression
+from src.planner.abstract_plan import AbstractPlan
+from src.planner.types import PlanOprType
+
+
+class UdfCacheLookupPlan(AbstractPlan):
+    """
+    Attaches the outputs of UDF calls stored in the UDF result cache to the
+    frames of its child, None for the frames without stored outputs, see
+    LogicalUdfCacheLookup.
+
+    Arguments:
+        table (DataFrameMetadata): table the frames are read from
+        func_exprs (List[FunctionExpression]): UDF calls to look up
+    """
+
+    def __init__(self, table: DataFrameMetadata,
+                 func_exprs: List[FunctionExpression]):
+        self._table = table
+        self._func_exprs = func_exprs
+        super().__init__(PlanOprType.UDF_CACHE_LOOKUP)
+
+    @property
+    def table(self) -> DataFrameMetadata:
+        return self._table
+
+    @property
+    def func_exprs(self) -> List[FunctionExpression]:
+        return self._func_exprs
@@ -15,11 +15,14 @@
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
 from typing import Iterator, Dict
+
+import numpy as np
 import pandas as pd
+
+from src.configuration.configuration_manager import ConfigurationManager
 from src.models.storage.batch import Batch
-import csv
-import uuid
-from datetime import datetime as dt
+from src.models.storage.columnar_batch import ColumnarBatch
+
 
 class AbstractReader(metaclass=ABCMeta):
     """
@@ -32,57 +35,88 @@ class AbstractReader(metaclass=ABCMeta):
         batch_mem_size (int): used to compute the #frames to
                                             read in batch from video
         offset (int, optional): Start frame location in video
+        columnar (bool, optional): yield ColumnarBatch objects whose frames
+            are decoded straight into a preallocated (N, H, W, C) buffer.
+            Defaults to `storage.columnar_reader` in eva.yml
         """
 
     def __init__(self, file_url: str, batch_mem_size: int,
-                 offset=None):
+                 offset=None, columnar=None):
         # Opencv doesn't support pathlib.Path so convert to raw str
         if isinstance(file_url, Path):
             file_url = str(file_url)
         self.file_url = file_url
         self.batch_mem_size = batch_mem_size
         self.offset = offset
+        if columnar is None:
+            columnar = ConfigurationManager().get_value('storage',
+                                                        'columnar_reader')
+        self.columnar = bool(columnar)
 
     def read(self) -> Iterator[Batch]:
         """
         This calls the sub class read implementation and
         yields the batch to the caller
         """
+        if self.columnar:
+            yield from self._read_columnar()
+            return
+
         data_batch = []
         row_size = None
         for data in self._read():
             if row_size is None:
-                row_size = data['data'].nbytes
+                row_size = self._row_size(data)
             data_batch.append(data)
             if len(data_batch) * row_size >= self.batch_mem_size:
-                # with open('trace.csv', 'a') as f:
-                #     row = []
-                #     row.append(uuid.uuid4())
-                #     row.append(True)
-                #     for frame in data_batch:
-                #         row.append(frame['id'])
-                #     # create the csv writer
-                #     row.append(dt.strftime(dt.now(), '%Y, %m, %d, %H, %M, %S'))
-                #     writer = csv.writer(f)
-                #     # write a row to the csv file
-                #     writer.writerow(row)
                 yield Batch(pd.DataFrame(data_batch))
                 data_batch = []
         if data_batch:
-            # with open('trace.csv', 'a') as f:
-            #     row = []
-            #     row.append(self.file_url)
-            #     for frame in data_batch:
-            #         row.append(frame['id'])
-            #     # create the csv writer
-            #     writer = csv.writer(f)
-            #     # write a row to the csv file
-            #     writer.writerow(row)
             yield Batch(pd.DataFrame(data_batch))
 
+    @staticmethod
+    def _row_size(row: Dict) -> int:
+        """Size of a row, measured on its frame data if it has any"""
+        if 'data' in row:
+            return row['data'].nbytes
+        return max(1, sum(np.asarray(value).nbytes for value in row.values()))
+
+    def _rows_per_batch(self, row_size: int) -> int:
+        """Number of rows of row_size bytes that fill batch_mem_size"""
+        return max(1, -(-self.batch_mem_size // max(1, row_size)))
+
+    def _read_columnar(self) -> Iterator[ColumnarBatch]:
+        """
+        Generic columnar read: copies the rows yielded by _read into
+        preallocated column arrays. Readers that can decode in place
+        override this.
+        """
+        columns = None
+        count = 0
+        for row in self._read():
+            if columns is None:
+                rows = self._rows_per_batch(self._row_size(row))
+                columns = {}
+                for name, value in row.items():
+                    value = np.asarray(value)
+                    dtype = object if value.dtype.kind in 'OSU' \
+                        else value.dtype
+                    columns[name] = np.empty((rows,) + value.shape, dtype)
+            for name, value in row.items():
+                columns[name][count] = value
+            count += 1
+            if count == rows:
+                yield ColumnarBatch(columns)
+                columns = {name: np.empty_like(values)
+                           for name, values in columns.items()}
+                count = 0
+        if count:
+            yield ColumnarBatch({name: values[:count]
+                                 for name, values in columns.items()})
+
     @abstractmethod
     def _read(self) -> Iterator[Dict]:
         """
         Every sub class implements it's own logic
         to read the file and yields an object iterator.
-        """
\ No newline at end of file
+        """
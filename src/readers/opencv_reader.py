@@ -13,17 +13,111 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing as mp
+from collections import deque
+
 import cv2
-from typing import Iterator, Dict
+import numpy as np
+import pandas as pd
+from typing import Iterator, Dict, List, Tuple
 
+from src.configuration.configuration_manager import ConfigurationManager
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
 from src.readers.abstract_reader import AbstractReader
 from src.utils.logging_manager import LoggingLevel
 from src.utils.logging_manager import LoggingManager
 
+# smallest segment handed to a decode worker, every segment costs a seek
+MIN_SEGMENT_FRAMES = 256
+# upper bound on the shared memory of one segment when frames are small
+SEGMENT_MEM_SIZE = 256 * 1024 * 1024
+
+# state of a decode worker process, set by _init_decode_worker
+_worker = {}
+
+
+def _keyframes(file_url: str) -> Tuple[int, List[int]]:
+    """
+    Number of frames of the video and frame numbers of its keyframes, read
+    from the packet flags of the container without decoding the frames.
+
+    Returns:
+        Tuple[int, List[int]]: (None, None) if the capture backend can not
+        return the packets
+    """
+    video = cv2.VideoCapture(file_url)
+    try:
+        # raw packets, only the FFmpeg backend supports it
+        if not video.isOpened() or not video.set(cv2.CAP_PROP_FORMAT, -1):
+            return None, None
+        keyframes = []
+        num_frames = 0
+        while video.grab():
+            if video.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(num_frames)
+            num_frames += 1
+        return num_frames, keyframes
+    finally:
+        video.release()
+
+
+def _segments(keyframes: List[int], start: int, end: int,
+              length: int) -> List[Tuple[int, int]]:
+    """
+    Splits the frames in [start, end) into (start, count) segments of at
+    least length frames, cut at keyframes so that a decoder seeking to the
+    start of a segment does not decode the frames before it.
+    """
+    segments = []
+    for keyframe in keyframes:
+        if keyframe - start >= length and keyframe < end:
+            segments.append((start, keyframe - start))
+            start = keyframe
+    segments.append((start, end - start))
+    return segments
+
+
+def _init_decode_worker(file_url, slots, frame_shape, dtype):
+    _worker['file_url'] = file_url
+    _worker['video'] = None
+    _worker['position'] = None
+    _worker['slots'] = [
+        np.frombuffer(slot, dtype=dtype).reshape((-1,) + frame_shape)
+        for slot in slots]
+
+
+def _decode_segment(slot_id: int, start: int, count: int) -> int:
+    """
+    Decodes count frames starting at frame start into the shared slot.
+    Consecutive segments handled by the same worker reuse the open capture
+    without seeking.
+
+    Returns:
+        int: number of frames decoded, smaller than count at end of video
+    """
+    if _worker['video'] is None:
+        _worker['video'] = cv2.VideoCapture(_worker['file_url'])
+    video = _worker['video']
+    if _worker['position'] != start:
+        video.set(cv2.CAP_PROP_POS_FRAMES, start)
+    buffer = _worker['slots'][slot_id]
+    decoded = 0
+    while decoded < count:
+        success, frame = video.read(image=buffer[decoded])
+        if not success or frame is None:
+            break
+        if not np.shares_memory(frame, buffer):
+            buffer[decoded] = frame
+        decoded += 1
+    _worker['position'] = start + decoded
+    return decoded
+
 
 class OpenCVReader(AbstractReader):
 
-    def __init__(self, *args, start_frame_id=0, **kwargs):
+    def __init__(self, *args, start_frame_id=0, decode_workers=None,
+                 **kwargs):
         """
             Reads video using OpenCV and yields frame data.
             It will use the `start_frame_id` while annotating the
@@ -35,10 +129,23 @@ class OpenCVReader(AbstractReader):
                     It is different from offset. Offset defines where in video
                     should we start reading. And start_frame_id defines the id
                     we assign to first read frame.
+                decode_workers (int): number of processes decoding segments
+                    of the video in parallel. Defaults to
+                    `storage.decode_workers` in eva.yml, 1 decodes inline
          """
         self._start_frame_id = start_frame_id
+        if decode_workers is None:
+            decode_workers = ConfigurationManager().get_value(
+                'storage', 'decode_workers')
+        self.decode_workers = decode_workers or 1
         super().__init__(*args, **kwargs)
 
+    def read(self) -> Iterator[Batch]:
+        if self.decode_workers > 1:
+            yield from self._read_parallel()
+        else:
+            yield from super().read()
+
     def _read(self) -> Iterator[Dict]:
         video = cv2.VideoCapture(self.file_url)
         video_offset = self.offset if self.offset else 0
@@ -53,3 +160,156 @@ class OpenCVReader(AbstractReader):
             yield {'id': frame_id, 'data': frame}
             _, frame = video.read()
             frame_id += 1
+
+    def _read_columnar(self) -> Iterator[ColumnarBatch]:
+        """
+        Decodes frames directly into a preallocated (N, H, W, C) buffer per
+        batch using VideoCapture.read(image=...), so no per-frame arrays or
+        row dicts are created.
+        """
+        video = cv2.VideoCapture(self.file_url)
+        video_offset = self.offset if self.offset else 0
+        video.set(cv2.CAP_PROP_POS_FRAMES, video_offset)
+
+        LoggingManager().log("Reading frames", LoggingLevel.INFO)
+
+        _, frame = video.read()
+        if frame is None:
+            return
+        rows = self._rows_per_batch(frame.nbytes)
+        data = np.empty((rows,) + frame.shape, dtype=frame.dtype)
+        data[0] = frame
+        count = 1
+        frame_id = self._start_frame_id
+
+        while True:
+            if count == rows:
+                yield ColumnarBatch({
+                    'id': np.arange(frame_id, frame_id + count),
+                    'data': data})
+                frame_id += count
+                data = np.empty_like(data)
+                count = 0
+            success, frame = video.read(image=data[count])
+            if not success or frame is None:
+                break
+            if not np.shares_memory(frame, data):
+                # decoder changed the frame layout, fall back to a copy
+                data[count] = frame
+            count += 1
+
+        if count:
+            yield ColumnarBatch({
+                'id': np.arange(frame_id, frame_id + count),
+                'data': data[:count]})
+
+    def _read_parallel(self) -> Iterator[Batch]:
+        """
+        Splits the video into one segment per worker, at least
+        MIN_SEGMENT_FRAMES long so the seek at the start of every segment
+        stays cheap, and decodes the segments in a pool of worker processes.
+        Segments start at keyframes, found in the packet flags of the
+        container; videos whose packets can not be read are decoded
+        inline. Every in-flight segment owns a shared memory slot the
+        worker decodes into. Decoded segments are copied into batches of
+        batch_mem_size, yielded in frame id order.
+
+        The frame count is the number of packets: the last segment may
+        come back short if its last packets do not decode, any other short
+        segment is an error.
+        """
+        video = cv2.VideoCapture(self.file_url)
+        video_offset = self.offset if self.offset else 0
+        video.set(cv2.CAP_PROP_POS_FRAMES, video_offset)
+        _, frame = video.read()
+        video.release()
+        if frame is None:
+            return
+        num_frames, keyframes = _keyframes(self.file_url)
+        if num_frames is None:
+            LoggingManager().log("Can not read the keyframes of {}, decoding "
+                                 "inline".format(self.file_url),
+                                 LoggingLevel.WARNING)
+            yield from super().read()
+            return
+
+        length = min(-(-(num_frames - video_offset) // self.decode_workers),
+                     SEGMENT_MEM_SIZE // frame.nbytes)
+        segments = _segments(keyframes, video_offset, num_frames,
+                             max(length, MIN_SEGMENT_FRAMES))
+        if len(segments) == 1:
+            # a single segment, nothing to decode in parallel
+            yield from super().read()
+            return
+
+        LoggingManager().log("Reading frames with {} workers".format(
+            self.decode_workers), LoggingLevel.INFO)
+
+        slot_frames = max(count for _, count in segments)
+        num_slots = min(self.decode_workers, len(segments))
+        slots = [mp.RawArray('B', slot_frames * frame.nbytes)
+                 for _ in range(num_slots)]
+        views = [np.frombuffer(slot, dtype=frame.dtype)
+                 .reshape((slot_frames,) + frame.shape) for slot in slots]
+
+        rows = self._rows_per_batch(frame.nbytes)
+        data = np.empty((rows,) + frame.shape, dtype=frame.dtype)
+        count = 0
+        frame_id = self._start_frame_id
+
+        def flush():
+            nonlocal data, count, frame_id
+            batch = self._make_batch(
+                np.arange(frame_id, frame_id + count), data[:count])
+            frame_id += count
+            data = np.empty_like(data)
+            count = 0
+            return batch
+
+        pool = mp.Pool(self.decode_workers,
+                       initializer=_init_decode_worker,
+                       initargs=(self.file_url, slots, frame.shape,
+                                 frame.dtype))
+        try:
+            pending = deque()
+            next_segment = 0
+            free_slots = list(range(num_slots))
+            while True:
+                while free_slots and next_segment < len(segments):
+                    slot_id = free_slots.pop()
+                    start, size = segments[next_segment]
+                    result = pool.apply_async(_decode_segment,
+                                              (slot_id, start, size))
+                    pending.append((result, slot_id, next_segment))
+                    next_segment += 1
+                if not pending:
+                    break
+                result, slot_id, segment_id = pending.popleft()
+                decoded = result.get()
+                start, size = segments[segment_id]
+                if decoded < size and segment_id < len(segments) - 1:
+                    message = "Decoded {} of the {} frames at frame {} " \
+                        "of {}".format(decoded, size, start, self.file_url)
+                    LoggingManager().log(message, LoggingLevel.ERROR)
+                    raise RuntimeError(message)
+                offset = 0
+                while offset < decoded:
+                    size = min(rows - count, decoded - offset)
+                    data[count:count + size] = \
+                        views[slot_id][offset:offset + size]
+                    count += size
+                    offset += size
+                    if count == rows:
+                        yield flush()
+                free_slots.append(slot_id)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        if count:
+            yield flush()
+
+    def _make_batch(self, frame_ids: np.ndarray, data: np.ndarray) -> Batch:
+        if self.columnar:
+            return ColumnarBatch({'id': frame_ids, 'data': data})
+        return Batch(pd.DataFrame({'id': frame_ids, 'data': list(data)}))
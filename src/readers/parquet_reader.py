@@ -0,0 +1,129 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import pickle
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from petastorm.codecs import ScalarCodec
+from petastorm.etl.dataset_metadata import UNISCHEMA_KEY
+
+from src.readers.abstract_reader import AbstractReader
+from src.storage.row_group_statistics import (collect_row_group_statistics,
+                                              overlaps, parquet_file_names)
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+
+def load_unischema(dataset_path: str):
+    """Loads the pickled unischema from the dataset _common_metadata"""
+    metadata = pq.read_schema(
+        os.path.join(dataset_path, '_common_metadata')).metadata
+    return pickle.loads(metadata[UNISCHEMA_KEY])
+
+
+class ParquetReader(AbstractReader):
+    def __init__(self, *args, columns: List[str] = None,
+                 predicate_func=None, projection: List[str] = None,
+                 id_range: Tuple = None, identifier_column: str = 'id',
+                 **kwargs):
+        """
+        Reads a petastorm materialized parquet dataset with pyarrow, in the
+        current process. Row groups are read one at a time; when a predicate
+        is given its columns are read and decoded first and row groups
+        without a matching row are skipped without touching the other
+        columns.
+
+        Attributes:
+            columns (List[str], optional): columns passed, in order, to
+                predicate_func
+            predicate_func (optional): customized predicate function
+                returning bool, same contract as petastorm `in_lambda`
+            projection (List[str], optional): columns to return, all the
+                columns of the schema if None
+            id_range (Tuple, optional): inclusive (low, high) bounds on
+                identifier_column, row groups whose footer statistics fall
+                outside are skipped
+            identifier_column (str, optional): column id_range applies to
+        """
+        super().__init__(*args, **kwargs)
+        self.columns = columns
+        self.predicate_func = predicate_func
+        self.projection = projection
+        self.id_range = id_range
+        self.identifier_column = identifier_column
+
+    @staticmethod
+    def _decode(field, column) -> np.ndarray:
+        if isinstance(field.codec, ScalarCodec):
+            return column.to_numpy(zero_copy_only=False)
+        values = np.empty(len(column), dtype=object)
+        values[:] = [None if value is None else
+                     field.codec.decode(field, value)
+                     for value in column.to_pylist()]
+        return values
+
+    def _read(self) -> Iterator[Dict]:
+        schema = load_unischema(self.file_url)
+        names = [name for name in schema.fields
+                 if self.projection is None or name in self.projection]
+        unknown = set(self.projection or []) - set(schema.fields)
+        if unknown:
+            LoggingManager().log('Unknown columns {}'.format(sorted(unknown)),
+                                 LoggingLevel.WARNING)
+        filter_names = self.columns if self.predicate_func and self.columns \
+            else []
+
+        skipped = set()
+        if self.id_range is not None:
+            skipped = set((row_group.file_name, row_group.row_group)
+                          for row_group in collect_row_group_statistics(
+                              self.file_url, self.identifier_column)
+                          if not overlaps(row_group.min_id, row_group.max_id,
+                                          self.id_range))
+
+        for file_name in parquet_file_names(self.file_url):
+            parquet_file = pq.ParquetFile(os.path.join(self.file_url,
+                                                       file_name))
+            for row_group in range(parquet_file.num_row_groups):
+                if (file_name, row_group) in skipped:
+                    continue
+                decoded = {}
+                mask = None
+                if filter_names:
+                    table = parquet_file.read_row_group(row_group,
+                                                        columns=filter_names)
+                    for name in filter_names:
+                        decoded[name] = self._decode(schema.fields[name],
+                                                     table.column(name))
+                    mask = np.fromiter(
+                        (bool(self.predicate_func(*values)) for values in
+                         zip(*[decoded[name] for name in filter_names])),
+                        dtype=bool, count=table.num_rows)
+                    if not mask.any():
+                        continue
+                remaining = [name for name in names if name not in decoded]
+                table = parquet_file.read_row_group(row_group,
+                                                    columns=remaining)
+                if mask is not None:
+                    table = table.filter(mask)
+                    decoded = {name: values[mask]
+                               for name, values in decoded.items()}
+                for name in remaining:
+                    decoded[name] = self._decode(schema.fields[name],
+                                                 table.column(name))
+                for index in range(table.num_rows):
+                    yield {name: decoded[name][index] for name in names}
@@ -21,7 +21,8 @@ from src.configuration.configuration_manager import ConfigurationManager
 
 class PetastormReader(AbstractReader):
     def __init__(self, *args, cur_shard=None, shard_count=None,
-                 predicate=None, **kwargs):
+                 predicate=None, schema_fields=None, rowgroup_selector=None,
+                 **kwargs):
         """
         Reads data from the petastorm parquet stores. Note this won't
         work for any arbitary parquet store apart from one materialized
@@ -35,6 +36,10 @@ class PetastormReader(AbstractReader):
                                       applicable
             predicate (PredicateBase, optional): instance of predicate object
                 to filter rows to be returned by reader
+            schema_fields (List[str], optional): columns to be read, all
+                the columns if None
+            rowgroup_selector (RowGroupSelectorBase, optional): selects the
+                row groups to be read
             cache_type (str): the cache type, if desired.
             Options are [None, ‘null’, ‘local-disk’] to either have a
             null/noop cache or a cache implemented using diskcache.
@@ -45,10 +50,14 @@ class PetastormReader(AbstractReader):
         self.cur_shard = cur_shard
         self.shard_count = shard_count
         self.predicate = predicate
+        self.schema_fields = schema_fields
+        self.rowgroup_selector = rowgroup_selector
         petastorm_config = ConfigurationManager().get_value('storage',
                                                             'petastorm')
-        # cache not allowed with predicates
-        if self.predicate or petastorm_config is None:
+        # cache not allowed with predicates, and its keys ignore the
+        # schema fields
+        if self.predicate or self.schema_fields is not None or \
+                petastorm_config is None:
             petastorm_config = {}
         self.cache_type = petastorm_config.get('cache_type', None)
         self.cache_location = petastorm_config.get('cache_location', None)
@@ -65,6 +74,8 @@ class PetastormReader(AbstractReader):
     def _read(self) -> Iterator[Dict]:
         # `Todo`: Generalize this reader
         with make_reader(self.file_url,
+                         schema_fields=self.schema_fields,
+                         rowgroup_selector=self.rowgroup_selector,
                          shard_count=self.shard_count,
                          cur_shard=self.cur_shard,
                          predicate=self.predicate,
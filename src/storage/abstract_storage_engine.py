@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Iterator
+from typing import Iterable, Iterator
 from abc import ABCMeta, abstractmethod
 
 from src.models.storage.batch import Batch
@@ -25,7 +25,11 @@ class AbstractStorageEngine(metaclass=ABCMeta):
     for handling data storage and retrieval tasks.
     This contains a minimal set of APIs that each engine should implement
 
+    Engines whose read accepts `pos`, the row positions to be returned,
+    set supports_positions.
     """
+    supports_positions = False
+
     @abstractmethod
     def create(self, table):
         """Interface that implements all the necessary task required for
@@ -55,6 +59,18 @@ class AbstractStorageEngine(metaclass=ABCMeta):
             rows : rows data to be written
         """
 
+    def bulk_write(self, table, batches: Iterable[Batch]):
+        """Interface for loading a stream of batches into a table in one
+        go. Engines that can write the whole stream more efficiently than
+        one `write` per batch override it.
+
+        Attributes:
+            table: storage unit to be written
+            batches: iterable of batches to be persisted
+        """
+        for batch in batches:
+            self.write(table, batch)
+
     @abstractmethod
     def _close(self, table):
         """Internal function responsible for closing table to free resouces.
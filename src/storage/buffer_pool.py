@@ -0,0 +1,462 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import random
+import sys
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.configuration.configuration_manager import ConfigurationManager
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+from src.utils.frame_tracer import FrameTracer, TraceEvent
+
+
+class EvictionPolicy(metaclass=ABCMeta):
+    """
+    Keeps track of the keys resident in the buffer pool and decides which
+    one should be evicted next. Pin counts are owned by the buffer pool, the
+    policy only orders the candidates.
+
+    The policies mirror the ones evaluated offline in
+    `CS4420_final_project/simulator.py`.
+    """
+
+    @abstractmethod
+    def admit(self, key: Hashable):
+        """Called when a new key is inserted into the pool"""
+
+    @abstractmethod
+    def touch(self, key: Hashable):
+        """Called on every hit of a resident key"""
+
+    @abstractmethod
+    def remove(self, key: Hashable):
+        """Called when a key leaves the pool (eviction or invalidation)"""
+
+    @abstractmethod
+    def candidates(self) -> Iterator[Hashable]:
+        """Yields the resident keys in eviction order"""
+
+
+class FIFOPolicy(EvictionPolicy):
+    def __init__(self):
+        self._queue = OrderedDict()
+
+    def admit(self, key):
+        self._queue[key] = None
+
+    def touch(self, key):
+        pass
+
+    def remove(self, key):
+        self._queue.pop(key, None)
+
+    def candidates(self):
+        return iter(list(self._queue))
+
+
+class LRUPolicy(FIFOPolicy):
+    def touch(self, key):
+        self._queue.move_to_end(key)
+
+
+class TwoQPolicy(EvictionPolicy):
+    """
+    Simplified 2Q: keys referenced once live in a FIFO queue, keys referenced
+    again are promoted to an LRU queue. The FIFO queue is drained first.
+    """
+
+    def __init__(self):
+        self._fifo = OrderedDict()
+        self._lru = OrderedDict()
+
+    def admit(self, key):
+        self._fifo[key] = None
+
+    def touch(self, key):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+        elif key in self._fifo:
+            del self._fifo[key]
+            self._lru[key] = None
+
+    def remove(self, key):
+        self._fifo.pop(key, None)
+        self._lru.pop(key, None)
+
+    def candidates(self):
+        return iter(list(self._fifo) + list(self._lru))
+
+
+class LFUPolicy(EvictionPolicy):
+    """
+    LFU with frequency buckets. Ties inside a bucket are broken by recency.
+    The access count of an evicted key is remembered, so a frame that comes
+    back resumes from its old frequency.
+    """
+
+    def __init__(self):
+        self._freq = {}
+        self._buckets: Dict[int, OrderedDict] = {}
+        self._history = Counter()
+
+    def _add_to_bucket(self, key, freq):
+        self._freq[key] = freq
+        self._buckets.setdefault(freq, OrderedDict())[key] = None
+
+    def _remove_from_bucket(self, key):
+        freq = self._freq.pop(key)
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+        return freq
+
+    def admit(self, key):
+        self._add_to_bucket(key, 1 + self._history.pop(key, 0))
+
+    def touch(self, key):
+        if key in self._freq:
+            self._add_to_bucket(key, self._remove_from_bucket(key) + 1)
+
+    def remove(self, key):
+        if key in self._freq:
+            self._history[key] = self._remove_from_bucket(key)
+
+    def candidates(self):
+        keys = []
+        for freq in sorted(self._buckets):
+            keys.extend(self._buckets[freq])
+        return iter(keys)
+
+
+class RandomPolicy(EvictionPolicy):
+    def __init__(self):
+        self._keys = []
+        self._index = {}
+
+    def admit(self, key):
+        self._index[key] = len(self._keys)
+        self._keys.append(key)
+
+    def touch(self, key):
+        pass
+
+    def remove(self, key):
+        idx = self._index.pop(key, None)
+        if idx is None:
+            return
+        last = self._keys.pop()
+        if idx < len(self._keys):
+            self._keys[idx] = last
+            self._index[last] = idx
+
+    def candidates(self):
+        keys = list(self._keys)
+        random.shuffle(keys)
+        return iter(keys)
+
+
+EVICTION_POLICIES = {
+    'FIFO': FIFOPolicy,
+    'LRU': LRUPolicy,
+    '2Q': TwoQPolicy,
+    'LFU': LFUPolicy,
+    'RANDOM': RandomPolicy
+}
+
+
+def row_nbytes(row: Dict) -> int:
+    """Approximate memory footprint of a decoded row"""
+    size = 0
+    for value in row.values():
+        if isinstance(value, np.ndarray):
+            size += value.nbytes
+        else:
+            size += sys.getsizeof(value)
+    return size
+
+
+class BufferPool:
+    """
+    Process wide cache of decoded rows (frames) sitting between the storage
+    engine and the executors. Rows are keyed by (table, frame id) and
+    accounted for in bytes. A row can be pinned with `fix` while an executor
+    holds it; pinned rows are never evicted. `unfix` releases the pin.
+
+    The pool also remembers the frame ids of every table it has scanned
+    completely, so later scans over the same table are served from memory and
+    only the evicted frames are fetched from storage.
+
+    Configured by the `storage.buffer_pool` section in eva.yml.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BufferPool, cls).__new__(cls)
+            config = ConfigurationManager().get_value('storage',
+                                                      'buffer_pool')
+            config = config if config else {}
+            cls._instance._lock = threading.RLock()
+            cls._instance.reset(capacity=config.get('size', 0),
+                                policy=config.get('policy', 'LRU'),
+                                enabled=config.get('enabled', False))
+        return cls._instance
+
+    def reset(self, capacity: int = None, policy: str = None,
+              enabled: bool = None):
+        """
+        Drops every cached row and counter. Optionally reconfigures the
+        capacity (bytes), eviction policy name and enabled flag.
+        """
+        with self._lock:
+            if capacity is not None:
+                self._capacity = capacity
+            if policy is not None:
+                policy_cls = EVICTION_POLICIES.get(policy.upper(), None)
+                if policy_cls is None:
+                    LoggingManager().log(
+                        'Unknown buffer pool policy {}'.format(policy),
+                        LoggingLevel.ERROR)
+                    raise KeyError(
+                        'Unknown buffer pool policy {}'.format(policy))
+                self._policy_cls = policy_cls
+            if enabled is not None:
+                self._enabled = enabled
+            self._policy = self._policy_cls()
+            self._rows = {}
+            self._sizes = {}
+            self._pins = Counter()
+            self._table_frame_ids = {}
+            self._table_ids = {}
+            self._used = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self._capacity > 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _table_key(self, table) -> str:
+        table_key = str(table.file_url)
+        if FrameTracer.enabled and table_key not in self._table_ids:
+            table_id = getattr(table, 'id', None)
+            self._table_ids[table_key] = -1 if table_id is None else table_id
+        return table_key
+
+    def _trace(self, event: TraceEvent, key):
+        FrameTracer().emit(event, key[1], self._table_ids.get(key[0], -1))
+
+    def fix(self, table, frame_id) -> Dict:
+        """
+        Pins the row and returns it. Returns None on a miss.
+        """
+        key = (self._table_key(table), frame_id)
+        with self._lock:
+            row = self._rows.get(key, None)
+            if row is None:
+                self.misses += 1
+                if FrameTracer.enabled:
+                    self._trace(TraceEvent.MISS, key)
+                return None
+            self.hits += 1
+            if FrameTracer.enabled:
+                self._trace(TraceEvent.HIT, key)
+            self._pins[key] += 1
+            self._policy.touch(key)
+            return row
+
+    def unfix(self, table, frame_id):
+        key = (self._table_key(table), frame_id)
+        with self._lock:
+            if self._pins[key] <= 1:
+                self._pins.pop(key, None)
+            else:
+                self._pins[key] -= 1
+
+    def put(self, table, frame_id, row: Dict, pin: bool = False) -> bool:
+        """
+        Inserts a row into the pool, evicting unpinned rows if required.
+
+        Returns:
+            bool: True if the row is resident (and pinned if requested)
+        """
+        key = (self._table_key(table), frame_id)
+        size = row_nbytes(row)
+        with self._lock:
+            if key in self._rows:
+                self._policy.touch(key)
+            else:
+                if size > self._capacity or not self._make_room(size):
+                    return False
+                self._rows[key] = row
+                self._sizes[key] = size
+                self._used += size
+                self._policy.admit(key)
+            if pin:
+                self._pins[key] += 1
+            return True
+
+    def _make_room(self, size: int) -> bool:
+        if self._used + size <= self._capacity:
+            return True
+        for victim in self._policy.candidates():
+            if self._pins[victim] > 0:
+                continue
+            self._evict(victim)
+            self.evictions += 1
+            if FrameTracer.enabled:
+                self._trace(TraceEvent.EVICT, victim)
+            if self._used + size <= self._capacity:
+                return True
+        return False
+
+    def _evict(self, key):
+        self._policy.remove(key)
+        del self._rows[key]
+        self._used -= self._sizes.pop(key)
+        self._pins.pop(key, None)
+
+    def invalidate(self, table):
+        """Drops all the cached rows of the table"""
+        table_key = self._table_key(table)
+        with self._lock:
+            self._table_frame_ids.pop(table_key, None)
+            for key in [k for k in self._rows if k[0] == table_key]:
+                self._evict(key)
+
+    def read(self,
+             table,
+             batch_mem_size: int,
+             storage_read: Callable[..., Iterator[Batch]]) -> Iterator[Batch]:
+        """
+        Reads the table through the pool.
+
+        Arguments:
+            table: table metadata object to read
+            batch_mem_size (int): memory size of the batches to yield
+            storage_read: storage engine read function, called as
+                storage_read(table, batch_mem_size, columns=...,
+                predicate_func=...) for the frames not in the pool
+        """
+        table_key = self._table_key(table)
+        identifier = table.identifier_column
+        with self._lock:
+            frame_ids = self._table_frame_ids.get(table_key, None)
+
+        if frame_ids is None:
+            seen_ids = []
+            for batch in storage_read(table, batch_mem_size):
+                seen_ids.extend(self._admit_batch(table, batch, identifier))
+                try:
+                    yield batch
+                finally:
+                    self._unfix_all(table, batch, identifier)
+            with self._lock:
+                self._table_frame_ids[table_key] = seen_ids
+            return
+
+        # the resident rows are pinned up front, so that admitting the
+        # missing ones can not evict them before they are reached
+        hits, missing = {}, set()
+        for frame_id in frame_ids:
+            row = self.fix(table, frame_id)
+            if row is None:
+                missing.add(frame_id)
+            else:
+                hits[frame_id] = row
+        misses = iter(())
+        if missing:
+            # storage returns the missing frames in the order of the scan
+            misses = self._stream_rows(storage_read(
+                table, batch_mem_size, columns=[identifier],
+                predicate_func=lambda fid: fid in missing))
+
+        rows, size = [], 0
+        try:
+            for frame_id in frame_ids:
+                row = hits.pop(frame_id, None)
+                if row is None:
+                    row = next(misses, None)
+                    if row is None:
+                        continue
+                    frame_id = row.get(identifier, None)
+                    if not self.put(table, frame_id, row, pin=True):
+                        # not pinned, nothing to release
+                        frame_id = None
+                rows.append((frame_id, row))
+                size += row_nbytes(row)
+                if size >= batch_mem_size:
+                    batch_rows, rows, size = rows, [], 0
+                    yield from self._yield_rows(table, batch_rows)
+            if rows:
+                batch_rows, rows = rows, []
+                yield from self._yield_rows(table, batch_rows)
+        finally:
+            # rows not handed out when the consumer stops early
+            for frame_id, _ in rows:
+                if frame_id is not None:
+                    self.unfix(table, frame_id)
+            for frame_id in hits:
+                self.unfix(table, frame_id)
+            if hasattr(misses, 'close'):
+                misses.close()
+
+    @staticmethod
+    def _stream_rows(batches: Iterator[Batch]) -> Iterator[Dict]:
+        for batch in batches:
+            if not batch.empty():
+                yield from batch.frames.to_dict('records')
+
+    def _yield_rows(self, table, rows: List):
+        try:
+            yield Batch(pd.DataFrame([row for _, row in rows]))
+        finally:
+            for frame_id, _ in rows:
+                if frame_id is not None:
+                    self.unfix(table, frame_id)
+
+    def _admit_batch(self, table, batch: Batch, identifier: str) -> List:
+        if batch.empty() or identifier not in batch.frames:
+            return []
+        records = batch.frames.to_dict('records')
+        frame_ids = batch.frames[identifier].tolist()
+        for frame_id, row in zip(frame_ids, records):
+            self.put(table, frame_id, row, pin=True)
+        return frame_ids
+
+    def _unfix_all(self, table, batch: Batch, identifier: str):
+        if batch.empty() or identifier not in batch.frames:
+            return
+        for frame_id in batch.frames[identifier].tolist():
+            self.unfix(table, frame_id)
@@ -0,0 +1,277 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.models.storage.columnar_batch import stack_column
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+INDEX_FILE = '_index.json'
+
+
+class FrameStore:
+    """
+    Directory of fixed size chunks of raw column data. Every column of a
+    chunk is a headerless file holding `rows` C-ordered values; dtype and
+    shape live in the index, together with the position of the first row of
+    every chunk. Chunks are opened with np.memmap, so reading a row or a
+    range of rows only touches the pages that hold them.
+
+    A store created with an identifier column also records the smallest
+    and largest identifier of every chunk and whether the chunk is sorted
+    on it. id_positions() maps an identifier range to row positions with
+    these, without reading the chunks outside the range.
+
+    Layout:
+        _index.json                  chunk_rows, identifier, chunk list
+        chunk-000000-<column>.bin    raw values of column for chunk 0
+        ...
+
+    Arguments:
+        path (str): directory of the store
+        chunk_rows (int): maximum number of rows in a chunk
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 1024):
+        self.path = Path(path)
+        self.chunk_rows = max(1, int(chunk_rows))
+        self._index = None
+
+    @property
+    def index(self) -> Dict:
+        if self._index is None:
+            with open(str(self.path / INDEX_FILE)) as index_file:
+                self._index = json.load(index_file)
+        return self._index
+
+    @property
+    def chunks(self) -> List[Dict]:
+        return self.index['chunks']
+
+    @property
+    def identifier(self) -> str:
+        return self.index.get('identifier')
+
+    @property
+    def num_rows(self) -> int:
+        if not self.chunks:
+            return 0
+        last = self.chunks[-1]
+        return last['start'] + last['rows']
+
+    def _save_index(self):
+        # write then rename, readers never see a half written index
+        tmp_path = self.path / (INDEX_FILE + '.tmp')
+        with open(str(tmp_path), 'w') as index_file:
+            json.dump(self._index, index_file)
+        os.replace(str(tmp_path), str(self.path / INDEX_FILE))
+
+    def _chunk_file(self, chunk_no: int, column: str) -> str:
+        return str(self.path / 'chunk-{:06d}-{}.bin'.format(chunk_no, column))
+
+    def create(self, identifier: str = None):
+        """
+        Creates an empty store, dropping the existing one.
+
+        Arguments:
+            identifier (str): column whose value ranges are indexed
+        """
+        shutil.rmtree(str(self.path), ignore_errors=True)
+        self.path.mkdir(parents=True)
+        self._index = {'chunk_rows': self.chunk_rows, 'chunks': [],
+                       'identifier': identifier}
+        self._save_index()
+
+    @staticmethod
+    def _layout(columns: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+        layout = {}
+        for name, values in columns.items():
+            if values.dtype.hasobject:
+                LoggingManager().log(
+                    'Column {} has no fixed width dtype'.format(name),
+                    LoggingLevel.ERROR)
+                raise TypeError(
+                    'Column {} has no fixed width dtype'.format(name))
+            layout[name] = {'dtype': values.dtype.str,
+                            'shape': list(values.shape[1:])}
+        return layout
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        """
+        Appends rows at the end of the store. The last chunk is filled up
+        first if the columns have the same dtypes and shapes.
+
+        Arguments:
+            columns (Dict[str, np.ndarray]): column name to values, every
+                column must have the same number of rows
+        """
+        columns = {name: np.ascontiguousarray(stack_column(values))
+                   for name, values in columns.items()}
+        if not columns:
+            return
+        num_rows = len(next(iter(columns.values())))
+        layout = self._layout(columns)
+        chunk_rows = self.index['chunk_rows']
+        written = 0
+        while written < num_rows:
+            last = self.chunks[-1] if self.chunks else None
+            if last is None or last['rows'] >= chunk_rows or \
+                    last['columns'] != layout:
+                last = {'start': self.num_rows, 'rows': 0, 'columns': layout}
+                self.chunks.append(last)
+            chunk_no = len(self.chunks) - 1
+            count = min(chunk_rows - last['rows'], num_rows - written)
+            for name, values in columns.items():
+                with open(self._chunk_file(chunk_no, name), 'ab') as chunk:
+                    chunk.write(values[written:written + count].tobytes())
+            if self.identifier in columns:
+                self._index_ids(last,
+                                columns[self.identifier][written:
+                                                         written + count])
+            last['rows'] += count
+            written += count
+        self._save_index()
+
+    @staticmethod
+    def _index_ids(chunk: Dict, ids: np.ndarray):
+        """Adds the identifiers appended to chunk to its range"""
+        low, high = ids.min().item(), ids.max().item()
+        bounds = chunk.get('ids')
+        if chunk['rows'] and bounds is None:
+            # rows written before the identifier was indexed
+            return
+        if not chunk['rows']:
+            chunk['ids'] = {'min': low, 'max': high,
+                            'sorted': bool(np.all(ids[1:] >= ids[:-1]))}
+            return
+        bounds['sorted'] = bounds['sorted'] and \
+            ids[0].item() >= bounds['max'] and \
+            bool(np.all(ids[1:] >= ids[:-1]))
+        bounds['min'] = min(bounds['min'], low)
+        bounds['max'] = max(bounds['max'], high)
+
+    def id_positions(self, identifier: str, low=None,
+                     high=None) -> np.ndarray:
+        """
+        Row positions, in order, of the rows whose identifier lies in the
+        inclusive range [low, high], None meaning unbounded. Chunks outside
+        the range are skipped, sorted chunks are binary searched and
+        chunks inside the range are taken whole; only chunks without a
+        recorded range have their identifiers scanned.
+
+        Arguments:
+            identifier (str): identifier column
+            low: smallest identifier, None if unbounded
+            high: largest identifier, None if unbounded
+        """
+        indexed = identifier == self.identifier
+        positions = []
+        for chunk_no, chunk in enumerate(self.chunks):
+            bounds = chunk.get('ids') if indexed else None
+            start = chunk['start']
+            if bounds is not None:
+                if (low is not None and bounds['max'] < low) or \
+                        (high is not None and bounds['min'] > high):
+                    continue
+                if (low is None or bounds['min'] >= low) and \
+                        (high is None or bounds['max'] <= high):
+                    positions.append(np.arange(start, start + chunk['rows']))
+                    continue
+            ids = self.chunk_columns(chunk_no, [identifier])[identifier]
+            if bounds is not None and bounds['sorted']:
+                first = 0 if low is None else \
+                    int(np.searchsorted(ids, low, side='left'))
+                last = len(ids) if high is None else \
+                    int(np.searchsorted(ids, high, side='right'))
+                positions.append(np.arange(start + first, start + last))
+                continue
+            mask = np.ones(len(ids), dtype=bool)
+            if low is not None:
+                mask &= ids >= low
+            if high is not None:
+                mask &= ids <= high
+            positions.append(np.flatnonzero(mask) + start)
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(positions).astype(np.int64)
+
+    def column_names(self) -> List[str]:
+        if not self.chunks:
+            return []
+        return list(self.chunks[0]['columns'])
+
+    def row_size(self, names: List[str]) -> int:
+        """Bytes of a row in the given columns, measured on data if present"""
+        if not self.chunks:
+            return 1
+        layout = self.chunks[0]['columns']
+        names = ['data'] if 'data' in names else names
+        return max(1, sum(np.dtype(layout[name]['dtype']).itemsize *
+                          int(np.prod(layout[name]['shape']))
+                          for name in names))
+
+    def chunk_columns(self, chunk_no: int,
+                      names: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Memory maps the columns of a chunk, copy on write: the returned
+        arrays can be modified without changing the store.
+        """
+        chunk = self.chunks[chunk_no]
+        columns = {}
+        for name in names:
+            layout = chunk['columns'][name]
+            columns[name] = np.memmap(
+                self._chunk_file(chunk_no, name), mode='c',
+                dtype=np.dtype(layout['dtype']),
+                shape=(chunk['rows'],) + tuple(layout['shape']))
+        return columns
+
+    def take(self, positions: np.ndarray,
+             names: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Gathers rows by position, reading only the chunks they live in.
+
+        Arguments:
+            positions (np.ndarray): row positions, in the output order
+            names (List[str]): columns to be read
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1)
+        if len(positions) and (positions.min() < 0 or
+                               positions.max() >= self.num_rows):
+            LoggingManager().log('Row position out of range',
+                                 LoggingLevel.ERROR)
+            raise IndexError('Row position out of range')
+        starts = np.array([chunk['start'] for chunk in self.chunks],
+                          dtype=np.int64)
+        chunk_nos = np.searchsorted(starts, positions, side='right') - 1
+        columns = None
+        for chunk_no in np.unique(chunk_nos):
+            selected = chunk_nos == chunk_no
+            chunk = self.chunk_columns(int(chunk_no), names)
+            if columns is None:
+                columns = {name: np.empty((len(positions),) +
+                                          values.shape[1:], values.dtype)
+                           for name, values in chunk.items()}
+            offsets = positions[selected] - starts[chunk_no]
+            for name, values in chunk.items():
+                columns[name][selected] = values[offsets]
+        if columns is None:
+            columns = {name: np.empty(0) for name in names}
+        return columns
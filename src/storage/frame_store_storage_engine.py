@@ -0,0 +1,183 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.configuration.configuration_manager import ConfigurationManager
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+from src.storage.abstract_storage_engine import AbstractStorageEngine
+from src.storage.frame_store import FrameStore
+from src.utils.logging_manager import LoggingLevel
+from src.utils.logging_manager import LoggingManager
+
+# column types without a fixed width numpy dtype, a frame store cannot hold
+_VARIABLE_WIDTH_TYPES = {ColumnType.TEXT, ColumnType.ANY}
+_VARIABLE_WIDTH_ARRAY_TYPES = {NdArrayType.UNICODE, NdArrayType.STR,
+                               NdArrayType.DECIMAL, NdArrayType.ANYTYPE}
+
+
+class FrameStoreStorageEngine(AbstractStorageEngine):
+    supports_positions = True
+
+    def __init__(self):
+        """
+        Stores every table as a FrameStore: fixed size chunks of raw frames
+        memory mapped on read. Rows are addressed by position, which for a
+        loaded video is the frame id, so `read(table, pos=...)` returns a
+        frame or a range of frames without decoding its neighbours. The
+        identifier ranges of the chunks are indexed on write, so
+        `read(table, id_range=...)` only maps the chunks holding the ids.
+        """
+        frame_store = ConfigurationManager().get_value('storage',
+                                                       'frame_store')
+        frame_store = frame_store if frame_store else {}
+        self.chunk_rows = frame_store.get('chunk_rows', 1024)
+
+    def _store(self, table: DataFrameMetadata) -> FrameStore:
+        return FrameStore(Path(table.file_url).resolve(), self.chunk_rows)
+
+    def create(self, table: DataFrameMetadata):
+        """
+        Create an empty frame store, dropping any existing one. Text and
+        object columns have no fixed width and are rejected.
+        """
+        columns = table.schema.column_list if table.schema else []
+        for column in columns:
+            if column.type in _VARIABLE_WIDTH_TYPES or \
+                    (column.type == ColumnType.NDARRAY and
+                     column.array_type in _VARIABLE_WIDTH_ARRAY_TYPES):
+                message = 'Frame store cannot hold column {} of type {}, ' \
+                    'only fixed width columns are supported'.format(
+                        column.name, column.type.name)
+                LoggingManager().log(message, LoggingLevel.ERROR)
+                raise TypeError(message)
+        self._store(table).create(identifier=table.identifier_column)
+
+    def write(self, table: DataFrameMetadata, rows: Batch):
+        """
+        Append rows at the end of the frame store.
+
+        Arguments:
+            table: table metadata object to write into
+            rows : batch to be persisted in the storage.
+        """
+        if rows.empty():
+            return
+        self._store(table).append(
+            ColumnarBatch.from_batch(rows).columns)
+
+    @staticmethod
+    def _predicate_mask(columns: Dict[str, np.ndarray],
+                        predicate_columns: List[str],
+                        predicate_func) -> np.ndarray:
+        return np.fromiter(
+            (bool(predicate_func(*values)) for values in
+             zip(*[columns[name] for name in predicate_columns])),
+            dtype=bool, count=len(columns[predicate_columns[0]]))
+
+    def read(self,
+             table: DataFrameMetadata,
+             batch_mem_size: int,
+             columns: List[str] = None,
+             predicate_func=None,
+             projection: List[str] = None,
+             pos=None,
+             id_range: Tuple = None) -> Iterator[Batch]:
+        """
+        Reads the table and return a batch iterator for the
+        tuples that passes the predicate func.
+
+        Argument:
+            table: table metadata object to write into
+            batch_mem_size (int): memory size of the batch read from storage
+            columns (List[str]): A list of column names to be
+                considered in predicate_func
+            predicate_func: customized predicate function returns bool
+            projection (List[str]): columns to be returned, all if None
+            pos (int, slice or List[int]): row positions to be returned,
+                the whole table if None
+            id_range (Tuple): inclusive (low, high) bounds on the
+                identifier column, None when unbounded. Mapped to the row
+                positions holding those ids with the chunk index, so only
+                their chunks are read
+
+        Return:
+            Iterator of ColumnarBatch read.
+        """
+        store = self._store(table)
+        names = store.column_names()
+        if projection is not None:
+            names = [name for name in names if name in projection]
+        predicate_columns = columns if predicate_func and columns else []
+        read_names = names + [name for name in predicate_columns
+                              if name not in names]
+        rows_per_batch = max(1, -(-batch_mem_size //
+                                  store.row_size(read_names)))
+
+        positions = None
+        if pos is not None:
+            if isinstance(pos, slice):
+                positions = np.arange(*pos.indices(store.num_rows))
+            else:
+                positions = np.asarray(pos, dtype=np.int64).reshape(-1)
+        if id_range is not None and \
+                table.identifier_column in store.column_names():
+            in_range = store.id_positions(table.identifier_column,
+                                          *id_range)
+            positions = in_range if positions is None else \
+                positions[np.isin(positions, in_range)]
+
+        if positions is None:
+            groups = self._chunk_slices(store, rows_per_batch)
+        else:
+            groups = (positions[start:start + rows_per_batch]
+                      for start in range(0, len(positions), rows_per_batch))
+
+        for group in groups:
+            if isinstance(group, tuple):
+                chunk_no, rows = group
+                data = store.chunk_columns(chunk_no, read_names)
+                data = {name: values[rows] for name, values in data.items()}
+            else:
+                data = store.take(group, read_names)
+            if predicate_columns:
+                mask = self._predicate_mask(data, predicate_columns,
+                                            predicate_func)
+                if not mask.any():
+                    continue
+                if not mask.all():
+                    data = {name: values[mask]
+                            for name, values in data.items()}
+            yield ColumnarBatch({name: data[name] for name in names})
+
+    @staticmethod
+    def _chunk_slices(store: FrameStore, rows_per_batch: int):
+        for chunk_no, chunk in enumerate(store.chunks):
+            for start in range(0, chunk['rows'], rows_per_batch):
+                yield chunk_no, slice(start, start + rows_per_batch)
+
+    def _open(self, table):
+        pass
+
+    def _close(self, table):
+        pass
+
+    def _read_init(self, table):
+        pass
@@ -0,0 +1,198 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import pickle
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from petastorm.codecs import ScalarCodec
+from petastorm.etl.dataset_metadata import (ROW_GROUPS_PER_FILE_KEY,
+                                            UNISCHEMA_KEY)
+from petastorm.etl.rowgroup_indexing import ROWGROUPS_INDEX_KEY
+from petastorm.unischema import Unischema
+from pyspark.sql.types import (BooleanType, DoubleType, FloatType,
+                               IntegerType, LongType, ShortType, StringType)
+
+from src.models.storage.batch import Batch
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+_SPARK_TO_ARROW = {
+    BooleanType: pa.bool_(),
+    ShortType: pa.int16(),
+    IntegerType: pa.int32(),
+    LongType: pa.int64(),
+    FloatType: pa.float32(),
+    DoubleType: pa.float64(),
+    StringType: pa.string()
+}
+
+MB = 1024 * 1024
+
+
+def arrow_schema(schema: Unischema) -> pa.Schema:
+    """
+    Arrow schema of the parquet files petastorm writes for the unischema.
+    Scalar fields use the type of their spark codec, every other codec
+    (ndarray, compressed image, ...) stores its encoded bytes.
+    """
+    fields = []
+    for field in schema.fields.values():
+        arrow_type = pa.binary()
+        if isinstance(field.codec, ScalarCodec):
+            arrow_type = _SPARK_TO_ARROW.get(type(field.codec.spark_dtype()),
+                                             None)
+            if arrow_type is None:
+                LoggingManager().log(
+                    'Unsupported scalar column type {}'.format(
+                        field.codec.spark_dtype()), LoggingLevel.ERROR)
+                raise TypeError('Unsupported scalar column type {}'.format(
+                    field.codec.spark_dtype()))
+        fields.append(pa.field(field.name, arrow_type, field.nullable))
+    return pa.schema(fields)
+
+
+def encode_column(field, values) -> List:
+    """Encodes a column with the field codec, keeping nulls as None"""
+    return [None if value is None else field.codec.encode(field, value)
+            for value in values]
+
+
+def write_petastorm_metadata(dataset_path: str, schema: Unischema):
+    """
+    Writes the _common_metadata file petastorm needs to read a dataset: the
+    pickled unischema and the number of row groups of every parquet file.
+    The row group counts are read from the parquet footers, so files
+    written by earlier appends are included. An empty row group index is
+    stored as well, petastorm only accepts row group selectors on datasets
+    that have one.
+    """
+    row_groups = {}
+    for name in sorted(os.listdir(dataset_path)):
+        if name.startswith(('_', '.')) or not name.endswith('.parquet'):
+            continue
+        path = os.path.join(dataset_path, name)
+        row_groups[name] = pq.read_metadata(path).num_row_groups
+    metadata = {UNISCHEMA_KEY: pickle.dumps(schema),
+                ROW_GROUPS_PER_FILE_KEY: json.dumps(row_groups),
+                ROWGROUPS_INDEX_KEY: pickle.dumps({})}
+    pq.write_metadata(arrow_schema(schema).with_metadata(metadata),
+                      os.path.join(dataset_path, '_common_metadata'))
+    crc_path = os.path.join(dataset_path, '._common_metadata.crc')
+    if os.path.exists(crc_path):
+        os.remove(crc_path)
+
+
+def add_row_group_index(dataset_path: str):
+    """
+    Adds an empty row group index to the _common_metadata materialized by
+    petastorm, which only accepts row group selectors on datasets that have
+    one. The rest of the metadata is kept as is and no parquet footer is
+    read.
+    """
+    path = os.path.join(str(dataset_path), '_common_metadata')
+    schema = pq.read_schema(path)
+    metadata = dict(schema.metadata or {})
+    if ROWGROUPS_INDEX_KEY in metadata:
+        return
+    metadata[ROWGROUPS_INDEX_KEY] = pickle.dumps({})
+    pq.write_metadata(schema.with_metadata(metadata), path)
+    crc_path = os.path.join(str(dataset_path), '._common_metadata.crc')
+    if os.path.exists(crc_path):
+        os.remove(crc_path)
+
+
+class ParquetDatasetWriter:
+    """
+    Streams batches into a petastorm compatible parquet dataset from the
+    current process, without Spark. Rows are encoded with the unischema
+    codecs and buffered until row_group_size_mb of encoded data is
+    collected, then written as one row group of a single parquet file.
+    The petastorm metadata is written once, on close.
+
+    Arguments:
+        dataset_path (str): directory of the dataset
+        schema (Unischema): petastorm schema of the table
+        row_group_size_mb (int): target size of a row group
+    """
+
+    def __init__(self, dataset_path: str, schema: Unischema,
+                 row_group_size_mb: int = 256):
+        self._dataset_path = str(dataset_path)
+        self._schema = schema
+        self._arrow_schema = arrow_schema(schema)
+        self._row_group_size = max(1, int(row_group_size_mb * MB))
+        self._writer = None
+        self._columns = self._empty_columns()
+        self._buffered_bytes = 0
+        self.num_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _empty_columns(self) -> Dict[str, List]:
+        return {name: [] for name in self._schema.fields}
+
+    def write(self, batch: Batch):
+        """Encodes the batch rows and buffers them for the next row group"""
+        if batch.empty():
+            return
+        for name, field in self._schema.fields.items():
+            values = batch.column_as_numpy_array(name)
+            encoded = encode_column(field, values)
+            self._columns[name].extend(encoded)
+            if not isinstance(field.codec, ScalarCodec):
+                self._buffered_bytes += sum(len(value) for value in encoded
+                                            if value is not None)
+            else:
+                self._buffered_bytes += np.asarray(values).nbytes
+        self.num_rows += len(batch)
+        if self._buffered_bytes >= self._row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not any(self._columns.values()):
+            return
+        if self._writer is None:
+            Path(self._dataset_path).mkdir(parents=True, exist_ok=True)
+            # timestamp prefix: file names sort in the order of the appends
+            file_name = 'part-{:020d}-{}.parquet'.format(time.time_ns(),
+                                                         uuid.uuid4())
+            self._writer = pq.ParquetWriter(
+                os.path.join(self._dataset_path, file_name),
+                self._arrow_schema)
+        table = pa.Table.from_pydict(self._columns, schema=self._arrow_schema)
+        # one write_table call with a large row_group_size is one row group
+        self._writer.write_table(table, row_group_size=len(table))
+        self._columns = self._empty_columns()
+        self._buffered_bytes = 0
+
+    def close(self):
+        """Writes the pending rows and materializes the petastorm metadata"""
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        Path(self._dataset_path).mkdir(parents=True, exist_ok=True)
+        write_petastorm_metadata(self._dataset_path, self._schema)
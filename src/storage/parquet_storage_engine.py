@@ -0,0 +1,122 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import shutil
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.configuration.configuration_manager import ConfigurationManager
+from src.models.storage.batch import Batch
+from src.readers.parquet_reader import ParquetReader
+from src.storage.abstract_storage_engine import AbstractStorageEngine
+from src.storage.parquet_dataset_writer import ParquetDatasetWriter
+
+
+class ParquetStorageEngine(AbstractStorageEngine):
+
+    def __init__(self):
+        """
+        Embedded storage engine for single node deployments. Tables are
+        petastorm compatible parquet datasets written and read with pyarrow
+        from the current process, so no Spark session (and JVM) is started.
+        """
+        bulk_ingest = ConfigurationManager().get_value('storage',
+                                                       'bulk_ingest')
+        bulk_ingest = bulk_ingest if bulk_ingest else {}
+        self.row_group_size_mb = bulk_ingest.get('row_group_size_mb', 256)
+
+    def _dataset_path(self, table: DataFrameMetadata) -> Path:
+        return Path(table.file_url).resolve()
+
+    def create(self, table: DataFrameMetadata):
+        """
+        Create an empty dataframe, dropping any existing one.
+        """
+        dataset_path = self._dataset_path(table)
+        shutil.rmtree(str(dataset_path), ignore_errors=True)
+        ParquetDatasetWriter(dataset_path,
+                             table.schema.petastorm_schema).close()
+
+    def write(self, table: DataFrameMetadata, rows: Batch):
+        """
+        Write rows into the dataframe. Every call appends a parquet file.
+
+        Arguments:
+            table: table metadata object to write into
+            rows : batch to be persisted in the storage.
+        """
+        if rows.empty():
+            return
+        with ParquetDatasetWriter(self._dataset_path(table),
+                                  table.schema.petastorm_schema,
+                                  self.row_group_size_mb) as writer:
+            writer.write(rows)
+
+    def bulk_write(self, table: DataFrameMetadata, batches: Iterable[Batch]):
+        """
+        Write a stream of batches into a single parquet file.
+
+        Arguments:
+            table: table metadata object to write into
+            batches: iterable of batches to be persisted
+        """
+        with ParquetDatasetWriter(self._dataset_path(table),
+                                  table.schema.petastorm_schema,
+                                  self.row_group_size_mb) as writer:
+            for batch in batches:
+                writer.write(batch)
+
+    def read(self,
+             table: DataFrameMetadata,
+             batch_mem_size: int,
+             columns: List[str] = None,
+             predicate_func=None,
+             projection: List[str] = None,
+             id_range: Tuple = None) -> Iterator[Batch]:
+        """
+        Reads the table and return a batch iterator for the
+        tuples that passes the predicate func.
+
+        Argument:
+            table: table metadata object to write into
+            batch_mem_size (int): memory size of the batch read from storage
+            columns (List[str]): A list of column names to be
+                considered in predicate_func
+            predicate_func: customized predicate function returns bool
+            projection (List[str]): columns to be returned, all if None
+            id_range (Tuple): inclusive (low, high) bounds on the identifier
+                column implied by the predicate, used to skip row groups
+
+        Return:
+            Iterator of Batch read.
+        """
+        reader = ParquetReader(str(self._dataset_path(table)),
+                               batch_mem_size=batch_mem_size,
+                               columns=columns,
+                               predicate_func=predicate_func,
+                               projection=projection,
+                               id_range=id_range,
+                               identifier_column=table.identifier_column)
+        for batch in reader.read():
+            yield batch
+
+    def _open(self, table):
+        pass
+
+    def _close(self, table):
+        pass
+
+    def _read_init(self, table):
+        pass
@@ -12,7 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Iterator, List
+from typing import Iterable, Iterator, List, Tuple
 from pathlib import Path
 
 from src.spark.session import Session
@@ -22,6 +22,12 @@ from src.storage.abstract_storage_engine import AbstractStorageEngine
 from src.readers.petastorm_reader import PetastormReader
 from src.models.storage.batch import Batch
 from src.configuration.configuration_manager import ConfigurationManager
+from src.storage.parquet_dataset_writer import (ParquetDatasetWriter,
+                                                add_row_group_index)
+from src.storage.row_group_statistics import (collect_row_group_statistics,
+                                              row_groups_in_range,
+                                              RowGroupListSelector)
+from src.catalog.catalog_manager import CatalogManager
 
 from petastorm.unischema import dict_to_spark_row
 from petastorm.predicates import in_lambda
@@ -37,6 +43,9 @@ class PetastormStorageEngine(AbstractStorageEngine):
         self.spark_session = self._spark.get_session()
         self.spark_context = self._spark.get_context()
         self.coalesce = ConfigurationManager().get_value('pyspark', 'coalesce')
+        bulk_ingest = ConfigurationManager().get_value('storage',
+                                                       'bulk_ingest')
+        self.bulk_ingest = bulk_ingest if bulk_ingest else {}
 
     def _spark_url(self, table: DataFrameMetadata) -> str:
         """
@@ -60,10 +69,16 @@ class PetastormStorageEngine(AbstractStorageEngine):
                 .write \
                 .mode('overwrite') \
                 .parquet(self._spark_url(table))
+        add_row_group_index(Path(table.file_url).resolve())
+        if table.id is not None:
+            CatalogManager().delete_row_group_statistics(table.id)
+        self._update_row_group_statistics(table)
 
     def write(self, table: DataFrameMetadata, rows: Batch):
         """
-        Write rows into the dataframe.
+        Write rows into the dataframe. The row group statistics are not
+        refreshed, bulk_write does it once per load; row groups without
+        statistics are always read.
 
         Arguments:
             table: table metadata object to write into
@@ -91,12 +106,56 @@ class PetastormStorageEngine(AbstractStorageEngine):
                 .write \
                 .mode('append') \
                 .parquet(self._spark_url(table))
+        add_row_group_index(Path(table.file_url).resolve())
+
+    def _update_row_group_statistics(self, table: DataFrameMetadata):
+        """
+        Records the id statistics of the parquet files not yet in the
+        catalog, only the footers of those files are read.
+        """
+        if table.id is None:
+            return
+        dataset_path = Path(table.file_url).resolve()
+        known_files = set(row_group.file_name for row_group in
+                          CatalogManager().get_row_group_statistics(table.id))
+        row_groups = collect_row_group_statistics(dataset_path,
+                                                  table.identifier_column,
+                                                  skip_files=known_files)
+        if row_groups:
+            CatalogManager().add_row_group_statistics(table.id, row_groups)
+
+    def bulk_write(self, table: DataFrameMetadata, batches: Iterable[Batch]):
+        """
+        Write a stream of batches into the dataframe. With
+        `storage.bulk_ingest` enabled, the batches are written as parquet
+        row groups from this process and the petastorm metadata is
+        materialized once at the end, instead of running one Spark job per
+        batch. The row group statistics are refreshed once, at the end.
+
+        Arguments:
+            table: table metadata object to write into
+            batches: iterable of batches to be persisted
+        """
+        if not self.bulk_ingest.get('enabled', False):
+            super().bulk_write(table, batches)
+            self._update_row_group_statistics(table)
+            return
+
+        with ParquetDatasetWriter(
+                Path(table.file_url).resolve(),
+                table.schema.petastorm_schema,
+                self.bulk_ingest.get('row_group_size_mb', 256)) as writer:
+            for batch in batches:
+                writer.write(batch)
+        self._update_row_group_statistics(table)
 
     def read(self,
              table: DataFrameMetadata,
              batch_mem_size: int,
              columns: List[str] = None,
-             predicate_func=None) -> Iterator[Batch]:
+             predicate_func=None,
+             projection: List[str] = None,
+             id_range: Tuple = None) -> Iterator[Batch]:
         """
         Reads the table and return a batch iterator for the
         tuples that passes the predicate func.
@@ -107,6 +166,11 @@ class PetastormStorageEngine(AbstractStorageEngine):
             columns (List[str]): A list of column names to be
                 considered in predicate_func
             predicate_func: customized predicate function returns bool
+            projection (List[str]): columns to be returned, all if None.
+                The frame data is not decoded when it is not projected
+            id_range (Tuple): inclusive (low, high) bounds on the identifier
+                column implied by the predicate. Row groups whose catalog
+                statistics fall outside are not read
 
         Return:
             Iterator of Batch read.
@@ -123,16 +187,36 @@ class PetastormStorageEngine(AbstractStorageEngine):
         if predicate_func and columns:
             predicate = in_lambda(columns, predicate_func)
 
+        # petastorm needs the predicate columns in the schema view
+        schema_fields = projection
+        if projection is not None and predicate is not None:
+            schema_fields = projection + [column for column in columns
+                                          if column not in projection]
+
+        rowgroup_selector = None
+        if id_range is not None and table.id is not None:
+            row_groups = row_groups_in_range(
+                Path(table.file_url).resolve(),
+                CatalogManager().get_row_group_statistics(table.id),
+                id_range)
+            if not row_groups:
+                return
+            rowgroup_selector = RowGroupListSelector(row_groups)
+
         # ToDo: Handle the sharding logic. We might have to maintain a
         # context for deciding which shard to read
         petastorm_reader = PetastormReader(
             self._spark_url(table),
             batch_mem_size=batch_mem_size,
-            predicate=predicate)
+            predicate=predicate,
+            schema_fields=schema_fields,
+            rowgroup_selector=rowgroup_selector)
         # print(petastorm_reader.batch_mem_size)
         for batch in petastorm_reader.read():
             # print(str(batch.frames))
             # print(str(len(batch.frames)))
+            if schema_fields is not projection:
+                batch = batch.project(projection)
             yield batch
 
     def _open(self, table):
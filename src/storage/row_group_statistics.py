@@ -0,0 +1,123 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+from typing import Iterable, List, Set, Tuple
+
+import pyarrow.parquet as pq
+
+from petastorm.etl.dataset_metadata import ROW_GROUPS_PER_FILE_KEY
+from petastorm.selectors import RowGroupSelectorBase
+
+from src.catalog.models.df_row_group import DataFrameRowGroup
+
+
+def parquet_file_names(dataset_path: str) -> List[str]:
+    """Data files of the dataset, in the order petastorm reads them"""
+    return sorted(name for name in os.listdir(str(dataset_path))
+                  if name.endswith('.parquet') and
+                  not name.startswith(('_', '.')))
+
+
+def collect_row_group_statistics(dataset_path: str, column: str,
+                                 skip_files: Iterable[str] = ()) \
+        -> List[DataFrameRowGroup]:
+    """
+    Reads the row count and the min/max of column of every row group from
+    the parquet footers. min/max are None when the writer did not store
+    statistics for the column.
+
+    Arguments:
+        dataset_path (str): directory of the dataset
+        column (str): identifier column
+        skip_files (Iterable[str]): files whose statistics are known
+    """
+    skip_files = set(skip_files)
+    row_groups = []
+    for file_name in parquet_file_names(dataset_path):
+        if file_name in skip_files:
+            continue
+        metadata = pq.read_metadata(os.path.join(str(dataset_path),
+                                                 file_name))
+        column_index = None
+        for index in range(metadata.num_columns):
+            if metadata.schema.column(index).path == column:
+                column_index = index
+        for row_group in range(metadata.num_row_groups):
+            row_group_metadata = metadata.row_group(row_group)
+            min_id, max_id = None, None
+            if column_index is not None:
+                statistics = row_group_metadata.column(
+                    column_index).statistics
+                if statistics is not None and statistics.has_min_max:
+                    min_id, max_id = statistics.min, statistics.max
+            row_groups.append(DataFrameRowGroup(
+                file_name, row_group, row_group_metadata.num_rows,
+                min_id, max_id))
+    return row_groups
+
+
+def overlaps(min_id, max_id, id_range: Tuple) -> bool:
+    """True if [min_id, max_id] may hold an id in the inclusive id_range"""
+    low, high = id_range
+    if min_id is None or max_id is None:
+        return True
+    return (low is None or max_id >= low) and \
+        (high is None or min_id <= high)
+
+
+def row_groups_in_range(dataset_path: str,
+                        row_groups: List[DataFrameRowGroup],
+                        id_range: Tuple) -> Set[int]:
+    """
+    Indexes, in petastorm piece order, of the row groups that may hold an
+    id in id_range. Row groups without statistics are always selected.
+
+    Arguments:
+        dataset_path (str): directory of the dataset
+        row_groups (List[DataFrameRowGroup]): known statistics
+        id_range (Tuple): inclusive (low, high), None when unbounded
+    """
+    statistics = {(row_group.file_name, row_group.row_group): row_group
+                  for row_group in row_groups}
+    metadata = pq.read_schema(os.path.join(str(dataset_path),
+                                           '_common_metadata')).metadata
+    row_groups_per_file = json.loads(metadata[ROW_GROUPS_PER_FILE_KEY])
+    selected = set()
+    piece_index = 0
+    for file_name in sorted(row_groups_per_file):
+        for row_group in range(row_groups_per_file[file_name]):
+            stats = statistics.get((file_name, row_group), None)
+            if stats is None or overlaps(stats.min_id, stats.max_id,
+                                         id_range):
+                selected.add(piece_index)
+            piece_index += 1
+    return selected
+
+
+class RowGroupListSelector(RowGroupSelectorBase):
+    """
+    Petastorm row group selector returning a precomputed set of row group
+    indexes, it does not need any petastorm row group index.
+    """
+
+    def __init__(self, row_groups: Set[int]):
+        self._row_groups = set(row_groups)
+
+    def get_index_names(self):
+        return []
+
+    def select_row_groups(self, index_dict):
+        return self._row_groups
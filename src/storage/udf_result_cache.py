@@ -0,0 +1,349 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.configuration.configuration_manager import ConfigurationManager
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS udf_result (
+    udf TEXT NOT NULL,
+    table_key TEXT NOT NULL,
+    frame_id INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (udf, table_key, frame_id)
+);
+CREATE INDEX IF NOT EXISTS udf_result_last_access
+    ON udf_result (last_access);
+"""
+
+# sqlite limits the number of host parameters of a statement
+_MAX_PARAMETERS = 900
+
+
+def udf_key(func, arguments: List[str] = ()) -> str:
+    """
+    Cache key of a UDF call: the UDF name and version and the columns it
+    is applied to, outputs over different columns are cached separately.
+    """
+    name = getattr(func, 'name', None) or type(func).__name__
+    return '{}:{}({})'.format(name, getattr(func, 'version', ''),
+                              ','.join(arguments))
+
+
+def table_key(table) -> str:
+    """
+    Cache key of a table: its file_url and the version of its stored files,
+    the latest of their modification times. Results of a table reloaded or
+    appended to in place are not reused, even without `invalidate`.
+    """
+    path = str(table.file_url)
+    return '{}@{}'.format(path, _table_version(path))
+
+
+def _table_version(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    version = os.stat(path).st_mtime_ns
+    if os.path.isdir(path):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                version = max(version, entry.stat().st_mtime_ns)
+    return version
+
+
+class UdfResultCache:
+    """
+    Persistent cache of UDF outputs, keyed by (udf name and version, table,
+    frame id). The outputs of a frame are stored as one pickled row of a
+    sqlite side table, so they survive restarts and are shared by all the
+    queries over the same table. Rows are accounted for in bytes and the
+    least recently used ones are evicted beyond the configured size.
+
+    A table's rows are dropped when it is created or reloaded, see
+    `invalidate`. Configured by the `storage.udf_result_cache` section in
+    eva.yml.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(UdfResultCache, cls).__new__(cls)
+            config = ConfigurationManager().get_value('storage',
+                                                      'udf_result_cache')
+            config = config if config else {}
+            cls._instance._lock = threading.RLock()
+            cls._instance._connection = None
+            cls._instance.reset(path=config.get('path', 'udf_cache.db'),
+                                capacity=config.get('size', 0),
+                                enabled=config.get('enabled', False))
+        return cls._instance
+
+    def reset(self, path: str = None, capacity: int = None,
+              enabled: bool = None):
+        """
+        Reconfigures the cache file, its capacity (bytes) and the enabled
+        flag. The cache file is opened lazily on first use.
+        """
+        with self._lock:
+            if path is not None:
+                self._close()
+                self._path = path
+            if capacity is not None:
+                self._capacity = capacity
+            if enabled is not None:
+                self._enabled = enabled
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self._capacity > 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def used(self) -> int:
+        """Bytes of cached results"""
+        with self._lock:
+            self._db()
+            return self._used
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self._path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self._path,
+                                               check_same_thread=False)
+            self._connection.executescript(_SCHEMA)
+            self._used = self._connection.execute(
+                'SELECT COALESCE(SUM(nbytes), 0) FROM udf_result'
+            ).fetchone()[0]
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def clear(self):
+        """Drops every cached result"""
+        with self._lock:
+            self._db().execute('DELETE FROM udf_result')
+            self._connection.commit()
+            self._used = 0
+
+    def invalidate(self, table):
+        """
+        Drops the cached results of every UDF over every version of the
+        table
+        """
+        with self._lock:
+            if self._connection is None and \
+                    not os.path.exists(self._path):
+                return
+            db = self._db()
+            prefix = str(table.file_url) + '@'
+            where = 'WHERE substr(table_key, 1, ?) = ?'
+            freed = db.execute(
+                'SELECT COALESCE(SUM(nbytes), 0) FROM udf_result ' + where,
+                (len(prefix), prefix)).fetchone()[0]
+            db.execute('DELETE FROM udf_result ' + where,
+                       (len(prefix), prefix))
+            db.commit()
+            self._used -= freed
+
+    def count(self, udf: str, table_key: str) -> int:
+        """Number of frames of the table with cached outputs of the udf"""
+        with self._lock:
+            if self._connection is None and \
+                    not os.path.exists(self._path):
+                return 0
+            return self._db().execute(
+                'SELECT COUNT(*) FROM udf_result '
+                'WHERE udf = ? AND table_key = ?',
+                (udf, table_key)).fetchone()[0]
+
+    def frame_ids(self, udf: str, table_key: str) -> List[int]:
+        """Ids of the frames of the table with cached outputs of the udf"""
+        with self._lock:
+            if self._connection is None and \
+                    not os.path.exists(self._path):
+                return []
+            return [frame_id for frame_id, in self._db().execute(
+                'SELECT frame_id FROM udf_result '
+                'WHERE udf = ? AND table_key = ? ORDER BY frame_id',
+                (udf, table_key)).fetchall()]
+
+    def get(self, udf: str, table_key: str,
+            frame_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Returns the cached outputs of the frames, frame id to a column name
+        to value dict. Missing frames are not in the result.
+        """
+        frame_ids = list(set(int(frame_id) for frame_id in frame_ids))
+        results = {}
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(frame_ids), _MAX_PARAMETERS):
+                chunk = frame_ids[start:start + _MAX_PARAMETERS]
+                rows = db.execute(
+                    'SELECT frame_id, value FROM udf_result '
+                    'WHERE udf = ? AND table_key = ? AND frame_id IN ({})'
+                    .format(','.join('?' * len(chunk))),
+                    [udf, table_key] + chunk).fetchall()
+                for frame_id, value in rows:
+                    results[frame_id] = pickle.loads(value)
+            if results:
+                now = time.time()
+                db.executemany(
+                    'UPDATE udf_result SET last_access = ? '
+                    'WHERE udf = ? AND table_key = ? AND frame_id = ?',
+                    [(now, udf, table_key, frame_id)
+                     for frame_id in results])
+                db.commit()
+        return results
+
+    def lookup(self, udf: str, table_key: str,
+               frame_ids) -> List[Optional[Dict]]:
+        """
+        Returns the cached outputs of every frame, in order, None for the
+        frames without. They are counted as hits and misses.
+        """
+        frame_ids = np.asarray(frame_ids).tolist()
+        cached = self.get(udf, table_key, frame_ids)
+        outputs = [cached.get(frame_id) for frame_id in frame_ids]
+        with self._lock:
+            self.misses += outputs.count(None)
+            self.hits += len(outputs) - outputs.count(None)
+        return outputs
+
+    def put(self, udf: str, table_key: str, frame_ids: List[int],
+            outcomes: pd.DataFrame):
+        """
+        Stores the outputs of the frames, row i of outcomes being the output
+        of frame_ids[i], then evicts the least recently used results beyond
+        the capacity.
+        """
+        now = time.time()
+        records = {}
+        for frame_id, row in zip(frame_ids, outcomes.to_dict('records')):
+            value = pickle.dumps(row,
+                                 protocol=pickle.HIGHEST_PROTOCOL)
+            records[int(frame_id)] = (udf, table_key, int(frame_id), value,
+                                      len(value), now)
+        frame_ids = list(records)
+        with self._lock:
+            db = self._db()
+            # bytes of the results being replaced
+            for start in range(0, len(frame_ids), _MAX_PARAMETERS):
+                chunk = frame_ids[start:start + _MAX_PARAMETERS]
+                self._used -= db.execute(
+                    'SELECT COALESCE(SUM(nbytes), 0) FROM udf_result '
+                    'WHERE udf = ? AND table_key = ? AND frame_id IN ({})'
+                    .format(','.join('?' * len(chunk))),
+                    [udf, table_key] + chunk).fetchone()[0]
+            db.executemany('INSERT OR REPLACE INTO udf_result '
+                           'VALUES (?, ?, ?, ?, ?, ?)', records.values())
+            self._used += sum(record[4] for record in records.values())
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        while self._used > self._capacity:
+            victims = db.execute(
+                'SELECT udf, table_key, frame_id, nbytes FROM udf_result '
+                'ORDER BY last_access LIMIT 64').fetchall()
+            if not victims:
+                self._used = 0
+                return
+            for udf, table_key, frame_id, nbytes in victims:
+                db.execute('DELETE FROM udf_result WHERE udf = ? AND '
+                           'table_key = ? AND frame_id = ?',
+                           (udf, table_key, frame_id))
+                self._used -= nbytes
+                self.evictions += 1
+                if self._used <= self._capacity:
+                    return
+
+    def evaluate(self, func: Callable, table_key: str, frame_ids,
+                 frames: pd.DataFrame, lookup: bool = True,
+                 key: str = None) -> pd.DataFrame:
+        """
+        Evaluates func on frames through the cache: cached outputs are
+        reused and func only runs on the frames that miss. func must return
+        one row per input frame, otherwise its output is not cached.
+
+        Arguments:
+            func: the UDF
+            table_key (str): key of the table the frames come from, see
+                table_key
+            frame_ids: frame id of every row of frames
+            frames (pd.DataFrame): UDF input
+            lookup (bool): reuse the cached outputs, otherwise func runs on
+                every frame and its outputs are only stored
+            key (str): cache key of the call, see udf_key. Defaults to the
+                key of func without arguments
+        """
+        udf = key if key is not None else udf_key(func)
+        frame_ids = np.asarray(frame_ids).tolist()
+        cached = self.get(udf, table_key, frame_ids) if lookup else {}
+        missing = [index for index, frame_id in enumerate(frame_ids)
+                   if frame_id not in cached]
+        with self._lock:
+            self.hits += len(frame_ids) - len(missing)
+            self.misses += len(missing)
+        if not cached:
+            outcomes = func(frames)
+            if len(outcomes) != len(frames):
+                LoggingManager().log(
+                    'UDF {} returned {} rows for {} frames, not cached'
+                    .format(udf, len(outcomes), len(frames)),
+                    LoggingLevel.WARNING)
+                return outcomes
+            self.put(udf, table_key, frame_ids, outcomes)
+            return outcomes
+
+        columns = None
+        if missing:
+            outcomes = func(frames.iloc[missing].reset_index(drop=True))
+            if len(outcomes) != len(missing):
+                # the rows can not be matched with the cached frames
+                message = 'UDF {} returned {} rows for {} frames, they ' \
+                    'can not be merged with its cached outputs'.format(
+                        udf, len(outcomes), len(missing))
+                LoggingManager().log(message, LoggingLevel.ERROR)
+                raise ValueError(message)
+            missing_ids = [frame_ids[index] for index in missing]
+            self.put(udf, table_key, missing_ids, outcomes)
+            columns = list(outcomes.columns)
+            for frame_id, row in zip(missing_ids,
+                                     outcomes.to_dict('records')):
+                cached[frame_id] = row
+        return pd.DataFrame([cached[frame_id] for frame_id in frame_ids],
+                            columns=columns)
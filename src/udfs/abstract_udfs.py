@@ -43,6 +43,15 @@ class AbstractClassifierUDF(metaclass=ABCMeta):
     def name(self) -> str:
         pass
 
+    @property
+    def version(self) -> str:
+        """
+        Returns:
+            str: version of the model, bump it when the model changes so
+            the cached outputs of the previous one are not reused
+        """
+        return '1'
+
     @property
     @abstractmethod
     def labels(self) -> List[str]:
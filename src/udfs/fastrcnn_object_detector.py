@@ -22,6 +22,7 @@ from torch import Tensor
 from src.models.catalog.frame_info import FrameInfo
 from src.models.catalog.properties import ColorSpace
 from src.udfs.pytorch_abstract_udf import PytorchAbstractUDF
+from src.udfs.udf_output_builder import UdfOutputBuilder
 
 
 class FastRCNNObjectDetector(PytorchAbstractUDF):
@@ -89,26 +90,16 @@ class FastRCNNObjectDetector(PytorchAbstractUDF):
 
         """
         predictions = self.model(frames)
-        outcome = pd.DataFrame()
+        labels = np.array(self.labels, dtype=object)
+        outcome = UdfOutputBuilder(['labels', 'scores', 'boxes'])
         for prediction in predictions:
-            pred_class = [str(self.labels[i]) for i in
-                          list(self.as_numpy(prediction['labels']))]
-            pred_boxes = [[[i[0], i[1]],
-                           [i[2], i[3]]]
-                          for i in
-                          list(self.as_numpy(prediction['boxes']))]
-            pred_score = list(self.as_numpy(prediction['scores']))
-            pred_t = \
-                [pred_score.index(x) for x in pred_score if
-                 x > self.threshold][-1]
-            pred_boxes = np.array(pred_boxes[:pred_t + 1])
-            pred_class = np.array(pred_class[:pred_t + 1])
-            pred_score = np.array(pred_score[:pred_t + 1])
-            outcome = outcome.append(
-                {
-                    "labels": pred_class,
-                    "scores": pred_score,
-                    "boxes": pred_boxes
-                },
-                ignore_index=True)
-        return outcome
+            pred_score = self.as_numpy(prediction['scores'])
+            # the scores are sorted, keep up to the last one above threshold
+            above = np.flatnonzero(pred_score > self.threshold)
+            pred_t = above[-1] + 1 if len(above) else 0
+            pred_class = labels[self.as_numpy(prediction['labels'])[:pred_t]]
+            pred_boxes = self.as_numpy(prediction['boxes'])[:pred_t]
+            outcome.add_frame(labels=pred_class.astype(str),
+                              scores=pred_score[:pred_t],
+                              boxes=pred_boxes.reshape(-1, 2, 2))
+        return outcome.build()
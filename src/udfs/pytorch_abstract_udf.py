@@ -14,7 +14,9 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -28,11 +30,86 @@ from src.udfs.gpu_compatible import GPUCompatible
 from src.configuration.configuration_manager import ConfigurationManager
 
 
+@lru_cache(maxsize=32)
+def _resample_matrix(in_size: int, out_size: int) -> np.ndarray:
+    """
+    Weights of the bilinear (triangle) filter PIL resizes an axis of
+    in_size pixels to out_size with, as an (out_size, in_size) matrix. When
+    downscaling, the filter is stretched by the scale, which antialiases
+    the output.
+    """
+    scale = in_size / out_size
+    filter_scale = max(scale, 1.0)
+    centers = (np.arange(out_size) + 0.5) * scale
+    starts = np.maximum((centers - filter_scale + 0.5).astype(np.int64), 0)
+    stops = np.minimum((centers + filter_scale + 0.5).astype(np.int64),
+                       in_size)
+    pixels = np.arange(in_size)
+    weights = np.maximum(
+        1 - np.abs((pixels - centers[:, None] + 0.5) / filter_scale), 0)
+    weights[(pixels < starts[:, None]) | (pixels >= stops[:, None])] = 0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return weights.astype(np.float32)
+
+
+def _resample(tensor: Tensor, out_size: int, axis: int) -> Tensor:
+    """
+    Resamples the width (axis -1) or height (axis -2) of a tensor of 0-255
+    pixels as PIL does
+    """
+    weights = torch.from_numpy(
+        _resample_matrix(tensor.shape[axis], out_size)).to(tensor.device)
+    if axis == -1:
+        tensor = torch.matmul(tensor, weights.t())
+    else:
+        tensor = torch.matmul(weights, tensor)
+    # PIL stores every pass as rounded uint8 pixels
+    return tensor.add_(0.5).floor_().clamp_(0, 255)
+
+
+def frames_to_tensor(frames: np.ndarray, size: Tuple[int, int] = None,
+                     device: torch.device = None) -> Tensor:
+    """
+    Converts a batch of frames decoded by opencv into the input of a model,
+    in a few tensor operations over the whole batch: the uint8 pixels are
+    moved to the device, the channels reversed from BGR to RGB, resized
+    and scaled to [0, 1]. The resize computes the bilinear filter of the
+    PIL resize torchvision uses on a frame, a horizontal then a vertical
+    pass, so both give the same pixels.
+
+    Arguments:
+        frames (np.ndarray): (N, H, W, C) uint8 BGR frames
+        size (Tuple[int, int]): (height, width) to resize to, None keeps
+            the frame size
+        device (torch.device): device of the output tensor
+
+    Returns:
+        Tensor: (N, C, height, width) float RGB tensor
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(frames))
+    if device is not None:
+        tensor = tensor.to(device)
+    tensor = tensor.permute(0, 3, 1, 2).flip(1).float()
+    if size is not None:
+        height, width = size
+        if tensor.shape[-1] != width:
+            tensor = _resample(tensor, width, axis=-1)
+        if tensor.shape[-2] != height:
+            tensor = _resample(tensor, height, axis=-2)
+    return tensor.div_(255)
+
+
 class PytorchAbstractUDF(AbstractClassifierUDF, nn.Module, GPUCompatible, ABC):
     """
     A pytorch based classifier. Used to make sure we make maximum
     utilization of features provided by pytorch without reinventing the wheel.
+
+    Frames are converted to tensors batch at a time by frames_to_tensor,
+    resized to input_size. UDFs overriding transforms get them applied
+    frame by frame instead, on `executor.preprocess_workers` threads.
     """
+    _preprocess_pool = None
+    _preprocess_workers = None
 
     def __init__(self):
         AbstractClassifierUDF.__init__(self)
@@ -41,19 +118,60 @@ class PytorchAbstractUDF(AbstractClassifierUDF, nn.Module, GPUCompatible, ABC):
     def get_device(self):
         return next(self.parameters()).device
 
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        """(height, width) the frames are resized to, None keeps them"""
+        return None
+
     @property
     def transforms(self) -> Compose:
-        return Compose([transforms.ToTensor()])
+        steps = [transforms.Resize(list(self.input_size))] \
+            if self.input_size else []
+        return Compose(steps + [transforms.ToTensor()])
 
     def transform(self, images: np.ndarray):
         # reverse the channels from opencv
         return self.transforms(Image.fromarray(images[:, :, ::-1]))\
             .unsqueeze(0)
 
+    def preprocess(self, frames: List[np.ndarray]) -> Tensor:
+        """
+        Converts the frames into the input tensor of the model, on its
+        device.
+
+        Arguments:
+            frames (List[np.ndarray]): HxWxC uint8 BGR frames, or one
+                NxHxWxC array
+        """
+        device = self.get_device()
+        if type(self).transforms is not PytorchAbstractUDF.transforms:
+            return torch.cat(self._map(self.transform, frames)).to(device)
+        if isinstance(frames, np.ndarray) and frames.ndim == 4:
+            return frames_to_tensor(frames, self.input_size, device)
+        if len(set(frame.shape for frame in frames)) == 1:
+            return frames_to_tensor(np.stack(frames), self.input_size,
+                                    device)
+        return torch.cat([frames_to_tensor(frame[np.newaxis],
+                                           self.input_size, device)
+                          for frame in frames])
+
+    def _map(self, func, frames) -> List:
+        workers = ConfigurationManager().get_value('executor',
+                                                   'preprocess_workers')
+        if not workers or workers <= 1 or len(frames) <= 1:
+            return [func(frame) for frame in frames]
+        pool = PytorchAbstractUDF._preprocess_pool
+        if pool is None or PytorchAbstractUDF._preprocess_workers != workers:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            pool = ThreadPoolExecutor(max_workers=workers,
+                                      thread_name_prefix='eva-preprocess')
+            PytorchAbstractUDF._preprocess_pool = pool
+            PytorchAbstractUDF._preprocess_workers = workers
+        return list(pool.map(func, frames))
+
     def forward(self, frames: List[np.ndarray]):
-        tens_batch = torch.cat([self.transform(x) for x in frames])\
-            .to(self.get_device())
-        return self.classify(tens_batch)
+        return self.classify(self.preprocess(frames))
 
     @abstractmethod
     def _get_predictions(self, frames: Tensor) -> pd.DataFrame:
@@ -80,11 +198,8 @@ class PytorchAbstractUDF(AbstractClassifierUDF, nn.Module, GPUCompatible, ABC):
 
         if gpu_batch_size:
             chunks = torch.split(frames, gpu_batch_size)
-            outcome = pd.DataFrame()
-            for tensor in chunks:
-                outcome = outcome.append(self._get_predictions(tensor),
-                                         ignore_index=True)
-            return outcome
+            return pd.concat([self._get_predictions(tensor)
+                              for tensor in chunks], ignore_index=True)
         else:
             return self._get_predictions(frames)
 
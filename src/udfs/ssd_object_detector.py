@@ -1,18 +1,19 @@
-import itertools
 import numpy as np
 import pandas as pd
 
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 from math import sqrt
 
 import torch
 import torch.nn.functional as F
 from torch import Tensor
-from torchvision.transforms import Compose, transforms
+from torchvision.ops import batched_nms
 
 from src.models.catalog.frame_info import FrameInfo
 from src.models.catalog.properties import ColorSpace
 from src.udfs.pytorch_abstract_udf import PytorchAbstractUDF
+from src.udfs.udf_output_builder import UdfOutputBuilder
 
 
 class SSDObjectDetector(PytorchAbstractUDF):
@@ -36,6 +37,7 @@ class SSDObjectDetector(PytorchAbstractUDF):
             map_location=torch.device("cpu"))["model"]
         self.model.load_state_dict(model_state_dict)
         self.model.eval()
+        self.encoder = Encoder(dboxes300_coco())
 
     @property
     def labels(self) -> List[str]:
@@ -69,54 +71,32 @@ class SSDObjectDetector(PytorchAbstractUDF):
         return FrameInfo(-1, -1, 3, ColorSpace.RGB)
 
     @property
-    def transforms(self) -> Compose:
-        return Compose([
-            transforms.Resize([300, 300]),
-            transforms.ToTensor(),
-        ])
+    def input_size(self) -> Tuple[int, int]:
+        return 300, 300
 
     def _get_predictions(self, frames: Tensor) -> pd.DataFrame:
         assert frames.size()[-1] == frames.size()[-2] == 300
 
         prediction = self.model(frames)
 
-        dboxes = dboxes300_coco()
-        encoder = Encoder(dboxes)
         ploc, plabel = [val.float() for val in prediction]
-        encoded = encoder.decode_batch(ploc, plabel, criteria=0.5)
-
-        res = pd.DataFrame()
+        encoded = self.encoder.decode_batch(ploc, plabel, criteria=0.5)
 
+        labels = np.array(self.labels, dtype=object)
+        res = UdfOutputBuilder(['label', 'pred_score', 'pred_boxes'],
+                               as_lists=True)
         for batch in encoded:
             bboxes, classes, confidences = [
                 x.detach().cpu().numpy() for x in batch]
-            best = np.argwhere(confidences > self.threshold).squeeze()
-
-            # deal with empty detection
-            if len(best.shape) == 0:
-                res = res.append({
-                    "label": [],
-                    "pred_score": [],
-                    "pred_boxes": []
-                }, ignore_index=True)
-                continue
-
-            label, bbox, conf = [], [], []
-            for idx in best:
-                left, top, right, bottom = bboxes[idx]
-                x, y, w, h = \
-                    [v * 300 for v in [left, top, right - left, bottom - top]]
-                label.append(self.labels[classes[idx]])
-                bbox.append([x, y, w, h])
-                conf.append(confidences[idx])
-
-            res = res.append({
-                "label": label,
-                "pred_score": conf,
-                "pred_boxes": bbox
-            }, ignore_index=True)
-
-        return res
+            best = confidences > self.threshold
+            # ltrb in [0, 1] to xywh in pixels
+            left, top, right, bottom = bboxes[best].reshape(-1, 4).T
+            boxes = np.stack([left, top, right - left, bottom - top],
+                             axis=1) * 300
+            res.add_frame(label=labels[classes[best].astype(int)],
+                          pred_score=confidences[best],
+                          pred_boxes=boxes)
+        return res.build()
 
     def classify(self, frames: Tensor) -> pd.DataFrame:
         return self._get_predictions(frames)
@@ -255,71 +235,59 @@ class Encoder(object):
                      bboxes_in,
                      scores_in,
                      criteria=0.45,
-                     max_output=200):
+                     max_output=200,
+                     max_num=200):
+        """
+            Non-maximum suppression of every class in every image of the
+            batch at once: the max_num best candidates of a class in an
+            image scoring above 0.05 are suppressed by batched_nms, keyed
+            by (image, class), and the max_output best detections of every
+            image are kept.
+            output: per image, (bboxes, labels, scores) by increasing score
+        """
         bboxes, probs = self.scale_back_batch(bboxes_in, scores_in)
+        num_images, _, num_classes = probs.shape
+
+        # skip background
+        images, boxes, labels = torch.nonzero(probs[:, :, 1:] > 0.05,
+                                              as_tuple=True)
+        labels = labels + 1
+        scores = probs[images, boxes, labels]
+        groups = images * num_classes + labels
+        keep = _top_k_per_group(groups, scores, max_num)
+        keep = keep[batched_nms(bboxes[images[keep], boxes[keep]],
+                                scores[keep], groups[keep], criteria)]
+        keep = keep[_top_k_per_group(images[keep], scores[keep],
+                                     max_output)]
+
+        # by image, then by increasing score
+        keep = keep[torch.argsort(scores[keep])]
+        keep = keep[_group_order(images[keep])]
+        counts = torch.bincount(images[keep],
+                                minlength=num_images).tolist()
+        return list(zip(bboxes[images[keep], boxes[keep]].split(counts),
+                        labels[keep].split(counts),
+                        scores[keep].split(counts)))
+
+
+def _group_order(groups):
+    """
+    Stable argsort of groups, the elements of a group keep their order.
+    The position breaks the ties of the key, so a plain argsort does:
+    its stable flag needs torch 1.13
+    """
+    positions = torch.arange(len(groups), device=groups.device)
+    return torch.argsort(groups * len(groups) + positions)
+
 
-        output = []
-        for bbox, prob in zip(bboxes.split(1, 0), probs.split(1, 0)):
-            bbox = bbox.squeeze(0)
-            prob = prob.squeeze(0)
-            output.append(self.decode_single(bbox, prob, criteria, max_output))
-        return output
-
-    # perform non-maximum suppression
-    def decode_single(self,
-                      bboxes_in,
-                      scores_in,
-                      criteria,
-                      max_output,
-                      max_num=200):
-        # Reference to https://github.com/amdegroot/ssd.pytorch
-
-        bboxes_out = []
-        scores_out = []
-        labels_out = []
-
-        for i, score in enumerate(scores_in.split(1, 1)):
-            # skip background
-            if i == 0:
-                continue
-
-            score = score.squeeze(1)
-            mask = score > 0.05
-
-            bboxes, score = bboxes_in[mask, :], score[mask]
-            if score.size(0) == 0:
-                continue
-
-            score_sorted, score_idx_sorted = score.sort(dim=0)
-
-            # select max_output indices
-            score_idx_sorted = score_idx_sorted[-max_num:]
-            candidates = []
-
-            while score_idx_sorted.numel() > 0:
-                idx = score_idx_sorted[-1].item()
-                bboxes_sorted = bboxes[score_idx_sorted, :]
-                bboxes_idx = bboxes[idx, :].unsqueeze(dim=0)
-                iou_sorted = calc_iou_tensor(
-                    bboxes_sorted, bboxes_idx).squeeze()
-                # we only need iou < criteria
-                score_idx_sorted = score_idx_sorted[iou_sorted < criteria]
-                candidates.append(idx)
-
-            bboxes_out.append(bboxes[candidates, :])
-            scores_out.append(score[candidates])
-            labels_out.extend([i] * len(candidates))
-
-        if not bboxes_out:
-            return [torch.tensor([]) for _ in range(3)]
-
-        bboxes_out, labels_out, scores_out = torch.cat(bboxes_out, dim=0), \
-            torch.tensor(labels_out, dtype=torch.long), \
-            torch.cat(scores_out, dim=0)
-
-        _, max_ids = scores_out.sort(dim=0)
-        max_ids = max_ids[-max_output:]
-        return bboxes_out[max_ids, :], labels_out[max_ids], scores_out[max_ids]
+def _top_k_per_group(groups, scores, k):
+    """Indices of the k highest scores of every group"""
+    order = torch.argsort(scores, descending=True)
+    order = order[_group_order(groups[order])]
+    sorted_groups = groups[order]
+    ranks = torch.arange(len(order), device=order.device) - \
+        torch.searchsorted(sorted_groups, sorted_groups)
+    return order[ranks < k]
 
 
 class DefaultBoxes(object):
@@ -340,7 +308,7 @@ class DefaultBoxes(object):
         fk = fig_size / np.array(steps)
         self.aspect_ratios = aspect_ratios
 
-        self.default_boxes = []
+        default_boxes = []
         # size of feature and number of feature
         for idx, sfeat in enumerate(self.feat_size):
             sk1 = scales[idx] / fig_size
@@ -352,10 +320,15 @@ class DefaultBoxes(object):
                 w, h = sk1 * sqrt(alpha), sk1 / sqrt(alpha)
                 all_sizes.append((w, h))
                 all_sizes.append((h, w))
+            # the centers of the feature map cells, row by row
+            i, j = np.meshgrid(np.arange(sfeat), np.arange(sfeat),
+                               indexing='ij')
+            cx, cy = (j.ravel() + 0.5) / fk[idx], (i.ravel() + 0.5) / fk[idx]
             for w, h in all_sizes:
-                for i, j in itertools.product(range(sfeat), repeat=2):
-                    cx, cy = (j + 0.5) / fk[idx], (i + 0.5) / fk[idx]
-                    self.default_boxes.append((cx, cy, w, h))
+                default_boxes.append(np.stack(
+                    [cx, cy, np.full_like(cx, w), np.full_like(cy, h)],
+                    axis=1))
+        self.default_boxes = np.concatenate(default_boxes)
 
         self.dboxes = torch.tensor(self.default_boxes, dtype=torch.float)
         self.dboxes.clamp_(min=0, max=1)
@@ -381,6 +354,7 @@ class DefaultBoxes(object):
             return self.dboxes
 
 
+@lru_cache(maxsize=None)
 def dboxes300_coco():
     figsize = 300
     feat_size = [38, 19, 10, 5, 3, 1]
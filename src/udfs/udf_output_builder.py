@@ -0,0 +1,75 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class UdfOutputBuilder:
+    """
+    Builds the output DataFrame of a UDF emitting a variable number of
+    values per frame, e.g. the labels, scores and boxes of the objects a
+    detector finds. The values of every frame are kept as arrays, along
+    with their count; build concatenates every column once and splits it
+    at the frame offsets into one row per frame.
+
+    Arguments:
+        columns (List[str]): output columns, in order
+        as_lists (bool): the rows hold lists instead of arrays
+    """
+
+    def __init__(self, columns: List[str], as_lists: bool = False):
+        self._columns = list(columns)
+        self._as_lists = as_lists
+        self._values = {column: [] for column in self._columns}
+        self._counts = []
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add_frame(self, **values):
+        """
+        Appends the outputs of a frame, the same number of values in every
+        column.
+
+        Arguments:
+            values: array-like per column
+        """
+        values = {column: np.asarray(values[column])
+                  for column in self._columns}
+        counts = set(len(value) for value in values.values())
+        if len(counts) > 1:
+            raise ValueError('Expected as many values in every column, '
+                             'got {}'.format(sorted(counts)))
+        self._counts.append(counts.pop() if counts else 0)
+        for column, value in values.items():
+            self._values[column].append(value)
+
+    def build(self) -> pd.DataFrame:
+        """DataFrame with a row per frame added"""
+        if not self._counts:
+            return pd.DataFrame(columns=self._columns)
+        offsets = np.cumsum(self._counts)[:-1]
+        data = {}
+        for column in self._columns:
+            # empty outputs carry no shape, e.g. no boxes as (0,)
+            values = [value for value in self._values[column] if len(value)]
+            flat = np.concatenate(values) if values else np.empty(0)
+            rows = np.split(flat, offsets)
+            if self._as_lists:
+                rows = [row.tolist() for row in rows]
+            data[column] = rows
+        return pd.DataFrame(data, columns=self._columns)
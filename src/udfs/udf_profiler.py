@@ -0,0 +1,111 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+from typing import Callable
+
+from src.catalog.catalog_manager import CatalogManager
+from src.configuration.configuration_manager import ConfigurationManager
+from src.constants import NO_GPU
+from src.executor.execution_context import Context
+from src.udfs.gpu_compatible import GPUCompatible
+
+
+def udf_device(udf) -> str:
+    """Kind of device the udf runs on in this process, cpu or gpu"""
+    if isinstance(udf, GPUCompatible) and Context().gpu_device() != NO_GPU:
+        return 'gpu'
+    return 'cpu'
+
+
+class _ProfiledUDF:
+    """Times the calls of a UDF, attributes are the UDF ones"""
+
+    def __init__(self, profiler: 'UdfProfiler', udf, device: str):
+        self._profiler = profiler
+        self._udf = udf
+        self._device = device
+
+    def __getattr__(self, name):
+        return getattr(self._udf, name)
+
+    def __call__(self, frames, *args, **kwargs):
+        start = time.perf_counter()
+        outcomes = self._udf(frames, *args, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._profiler.record(self._udf.name, self._device, len(frames),
+                              elapsed_ms)
+        return outcomes
+
+
+class UdfProfiler:
+    """
+    Measures the runtime of the first calls of every UDF on every device of
+    the process and adds them to the UDF cost profile in the catalog, where
+    the optimizer cost model reads them. The first call loads the model on
+    the device, it is not measured.
+
+    Configured by the `executor.udf_profiling` section in eva.yml.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(UdfProfiler, cls).__new__(cls)
+            config = ConfigurationManager().get_value('executor',
+                                                      'udf_profiling')
+            config = config if config else {}
+            cls._instance._lock = threading.Lock()
+            cls._instance.reset(calls=config.get('calls', 5),
+                                enabled=config.get('enabled', False))
+        return cls._instance
+
+    def reset(self, calls: int = None, enabled: bool = None):
+        """
+        Forgets the profiled UDFs. Optionally reconfigures the number of
+        calls measured per UDF and device, and the enabled flag.
+        """
+        with self._lock:
+            if calls is not None:
+                self._calls = calls
+            if enabled is not None:
+                self._enabled = enabled
+            self._pending = {}
+            self._done = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def wrap(self, udf, device: str) -> Callable:
+        """The udf, timed while it still has calls to be profiled"""
+        if not self._enabled or (udf.name, device) in self._done:
+            return udf
+        return _ProfiledUDF(self, udf, device)
+
+    def record(self, udf_name: str, device: str, num_frames: int,
+               elapsed_ms: float):
+        key = (udf_name, device)
+        with self._lock:
+            if key in self._done:
+                return
+            calls = self._pending.setdefault(key, [])
+            calls.append((num_frames, elapsed_ms))
+            # + 1: the warm up call
+            if len(calls) < self._calls + 1:
+                return
+            self._done.add(key)
+            del self._pending[key]
+        CatalogManager().add_udf_profile(udf_name, device, calls[1:])
@@ -0,0 +1,172 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List
+
+from src.catalog.catalog_manager import CatalogManager
+from src.configuration.configuration_manager import ConfigurationManager
+from src.utils.generic_utils import path_to_class
+from src.utils.logging_manager import LoggingLevel, LoggingManager
+
+
+def model_bytes(udf) -> int:
+    """Memory of the parameters and buffers of a pytorch UDF, 0 for other
+    UDFs"""
+    tensors = []
+    for attr in ('parameters', 'buffers'):
+        if callable(getattr(udf, attr, None)):
+            tensors.extend(getattr(udf, attr)())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+class UdfRegistry:
+    """
+    Instances of the UDFs shared by every query of the process, so that a
+    model is loaded once instead of on every query binding it. A UDF is
+    instantiated on first use and kept per (name, implementation file,
+    file modification time): an edited implementation is loaded again on
+    its next use. Once the parameters of the loaded models exceed the
+    capacity, the least recently used ones are evicted.
+
+    Every shared instance has a lock, held by the expressions evaluating it
+    (see lock()): concurrent queries call the same model one at a time.
+
+    Configured by the `executor.udf_registry` section in eva.yml.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(UdfRegistry, cls).__new__(cls)
+            config = ConfigurationManager().get_value('executor',
+                                                      'udf_registry')
+            config = config if config else {}
+            cls._instance._lock = threading.RLock()
+            # shared instance -> lock of its calls, kept while it is used
+            cls._instance._locks = weakref.WeakKeyDictionary()
+            cls._instance.reset(capacity=config.get('size', 0),
+                                enabled=config.get('enabled', False))
+        return cls._instance
+
+    def reset(self, capacity: int = None, enabled: bool = None):
+        """
+        Forgets the loaded UDFs. Optionally reconfigures the capacity in
+        bytes and the enabled flag.
+        """
+        with self._lock:
+            if capacity is not None:
+                self._capacity = capacity
+            if enabled is not None:
+                self._enabled = enabled
+            # (name, path) -> (mtime, udf, bytes), least recent first
+            self._udfs = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def __len__(self):
+        return len(self._udfs)
+
+    def get(self, name: str, impl_path: str):
+        """
+        Instance of the UDF class name implemented in impl_path, a new one
+        on every call if the registry is disabled.
+
+        Arguments:
+            name (str): class name of the UDF
+            impl_path (str): path of the file implementing it
+        """
+        if not self._enabled:
+            return path_to_class(impl_path, name)()
+        path = str(Path(impl_path).resolve())
+        key = (name, path)
+        mtime = _mtime(path)
+        with self._lock:
+            entry = self._udfs.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._udfs.move_to_end(key)
+                return entry[1]
+            if entry is not None:
+                LoggingManager().log('Reloading UDF {} from {}'
+                                     .format(name, path), LoggingLevel.INFO)
+            # loaded under the lock, concurrent bindings wait for it
+            udf = path_to_class(path, name)()
+            self._udfs.pop(key, None)
+            self._udfs[key] = (mtime, udf, model_bytes(udf))
+            self._locks[udf] = threading.Lock()
+            self._evict()
+            return udf
+
+    def lock(self, udf):
+        """
+        Lock to hold while calling udf, also while moving it to a device.
+        A no-op one for instances not shared through the registry.
+
+        Arguments:
+            udf: instance returned by get()
+        """
+        try:
+            lock = self._locks.get(udf)
+        except TypeError:
+            # not weakly referenceable, hence not one of ours
+            lock = None
+        return lock if lock is not None else nullcontext()
+
+    def _evict(self):
+        """Drops the least recently used UDFs above the capacity, the
+        last loaded one is kept"""
+        size = sum(num_bytes for _, _, num_bytes in self._udfs.values())
+        while size > self._capacity and len(self._udfs) > 1:
+            (name, _), (_, _, num_bytes) = self._udfs.popitem(last=False)
+            size -= num_bytes
+            LoggingManager().log('Evicted UDF {}'.format(name),
+                                 LoggingLevel.INFO)
+
+    def warm_up(self, names: List[str] = None):
+        """
+        Loads UDFs registered in the catalog before the first query uses
+        them.
+
+        Arguments:
+            names (List[str]): UDF names, by default the `warm_up` list of
+                the configuration
+        """
+        if names is None:
+            config = ConfigurationManager().get_value('executor',
+                                                      'udf_registry')
+            names = (config or {}).get('warm_up') or []
+        if not self._enabled:
+            return
+        catalog = CatalogManager()
+        for name in names:
+            udf_obj = catalog.get_udf_by_name(name)
+            if udf_obj is None:
+                LoggingManager().log('Can not warm up unknown UDF {}'
+                                     .format(name), LoggingLevel.WARNING)
+                continue
+            self.get(udf_obj.name, udf_obj.impl_file_path)
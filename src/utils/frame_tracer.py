@@ -0,0 +1,233 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import csv
+import queue
+import struct
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime as dt
+from enum import IntEnum
+
+import numpy as np
+
+from src.configuration.configuration_manager import ConfigurationManager
+from src.utils.logging_manager import LoggingManager, LoggingLevel
+
+
+class TraceEvent(IntEnum):
+    UNFIX = 0
+    FIX = 1
+    HIT = 2
+    MISS = 3
+    EVICT = 4
+
+
+# Layout of a trace file: a 32 byte header followed by packed records.
+# CS4420_final_project/simulator.py mirrors this layout, keep them in sync.
+TRACE_MAGIC = b'EVATRACE'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<8sIIQQ')
+TRACE_RECORD = np.dtype([('event', '<u1'),
+                         ('frame_id', '<i8'),
+                         ('table_id', '<i4'),
+                         ('timestamp', '<u8')])
+
+
+class FrameTracer:
+    """
+    Opt-in tracing of frame accesses. Events are written into a preallocated
+    ring of fixed-size binary records (event, frame id, table id, monotonic
+    ns); full chunks are handed to a background thread that appends them to
+    the trace file. The hot path never blocks on IO: if the writer falls
+    behind, records are dropped and counted.
+
+    Call sites guard on the class attribute `FrameTracer.enabled`, so a
+    disabled tracer costs a single attribute lookup.
+
+    Configured by the `tracing` section in eva.yml.
+    """
+    _instance = None
+    enabled = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FrameTracer, cls).__new__(cls)
+            config = ConfigurationManager().get_value('tracing', 'enabled')
+            cls._instance._lock = threading.Lock()
+            cls._instance._writer = None
+            atexit.register(cls._instance.stop)
+            if config:
+                cls._instance.start(
+                    ConfigurationManager().get_value('tracing', 'path'),
+                    ConfigurationManager().get_value('tracing',
+                                                     'buffer_records'))
+        return cls._instance
+
+    def start(self, path: str, buffer_records: int = None):
+        """
+        Starts tracing into path. The file is truncated and its header
+        records the wall clock and monotonic clock at start, so monotonic
+        timestamps can be converted back to wall clock time.
+
+        Arguments:
+            path (str): trace file to write
+            buffer_records (int): number of records per ring chunk
+        """
+        self.stop()
+        with self._lock:
+            self.path = path
+            self.dropped = 0
+            self._chunk_size = buffer_records or 65536
+            self._free = queue.Queue()
+            for _ in range(4):
+                self._free.put(np.empty(self._chunk_size, TRACE_RECORD))
+            self._full = queue.Queue()
+            self._chunk = self._free.get()
+            self._pos = 0
+            with open(path, 'wb') as trace_file:
+                trace_file.write(TRACE_HEADER.pack(
+                    TRACE_MAGIC, TRACE_VERSION, TRACE_RECORD.itemsize,
+                    time.time_ns(), time.monotonic_ns()))
+            self._writer = threading.Thread(target=self._write_loop,
+                                            name='FrameTracer', daemon=True)
+            self._writer.start()
+            FrameTracer.enabled = True
+
+    def stop(self):
+        """Flushes the pending records and stops the writer thread"""
+        with self._lock:
+            if self._writer is None:
+                return
+            FrameTracer.enabled = False
+            self._full.put((self._chunk, self._pos))
+            self._full.put(None)
+            writer, self._writer = self._writer, None
+        writer.join()
+
+    def flush(self):
+        """Blocks until every record emitted so far is on disk"""
+        with self._lock:
+            if self._writer is None:
+                return
+            self._hand_off()
+        self._full.join()
+
+    def emit(self, event: TraceEvent, frame_ids, table_id: int = -1):
+        """
+        Records one event per frame id. frame_ids can be a scalar or any
+        array-like; a whole batch is recorded with a single slice copy.
+        """
+        frame_ids = np.atleast_1d(frame_ids)
+        count = len(frame_ids)
+        timestamp = time.monotonic_ns()
+        with self._lock:
+            if self._writer is None:
+                return
+            start = 0
+            while start < count:
+                if self._chunk is None and not self._hand_off():
+                    self.dropped += count - start
+                    return
+                end = min(count - start, self._chunk_size - self._pos)
+                records = self._chunk[self._pos:self._pos + end]
+                records['event'] = event
+                records['frame_id'] = frame_ids[start:start + end]
+                records['table_id'] = table_id
+                records['timestamp'] = timestamp
+                self._pos += end
+                start += end
+                if self._pos == self._chunk_size:
+                    self._hand_off()
+
+    def _hand_off(self) -> bool:
+        """
+        Queues the current chunk for writing and grabs a free one. Returns
+        False if no free chunk is available.
+        """
+        if self._chunk is not None and self._pos:
+            self._full.put((self._chunk, self._pos))
+            self._chunk = None
+        if self._chunk is None:
+            try:
+                self._chunk = self._free.get_nowait()
+            except queue.Empty:
+                return False
+            self._pos = 0
+        return True
+
+    def _write_loop(self):
+        with open(self.path, 'ab') as trace_file:
+            while True:
+                item = self._full.get()
+                if item is None:
+                    self._full.task_done()
+                    break
+                chunk, size = item
+                if chunk is not None:
+                    trace_file.write(chunk[:size].tobytes())
+                    trace_file.flush()
+                    self._free.put(chunk)
+                self._full.task_done()
+        if self.dropped:
+            LoggingManager().log(
+                'Frame tracer dropped {} records'.format(self.dropped),
+                LoggingLevel.WARNING)
+
+
+def read_trace(path: str):
+    """
+    Loads a binary trace.
+
+    Returns:
+        (np.ndarray, int): records with the TRACE_RECORD dtype and the wall
+        clock offset (ns) to add to the monotonic timestamps
+    """
+    with open(path, 'rb') as trace_file:
+        magic, version, record_size, wall_ns, monotonic_ns = \
+            TRACE_HEADER.unpack(trace_file.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC or record_size != TRACE_RECORD.itemsize:
+        raise ValueError('{} is not a version {} frame trace'.format(
+            path, TRACE_VERSION))
+    records = np.fromfile(path, dtype=TRACE_RECORD, offset=TRACE_HEADER.size)
+    return records, wall_ns - monotonic_ns
+
+
+def convert_to_csv(trace_path: str, csv_path: str):
+    """
+    Converts the fix/unfix events of a binary trace into the CSV format
+    consumed by CS4420_final_project/trace_parser.py and simulator.py:
+    uuid, True|False, frame_id, "YYYY, mm, dd, HH, MM, SS"
+    """
+    records, offset = read_trace(trace_path)
+    records = records[records['event'] <= TraceEvent.FIX]
+    with open(csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        for event, frame_id, timestamp in zip(
+                records['event'].tolist(), records['frame_id'].tolist(),
+                records['timestamp'].tolist()):
+            wall = dt.fromtimestamp((timestamp + offset) / 1e9)
+            writer.writerow([uuid.uuid4(), event == TraceEvent.FIX, frame_id,
+                             dt.strftime(wall, '%Y, %m, %d, %H, %M, %S')])
+
+
+FrameTracer()
+
+
+if __name__ == '__main__':
+    # python -m src.utils.frame_tracer trace.bin trace.csv
+    convert_to_csv(sys.argv[1], sys.argv[2])
@@ -19,8 +19,11 @@ from src.catalog.column_type import ColumnType, NdArrayType
 from src.catalog.df_schema import DataFrameSchema
 from src.catalog.models.df_column import DataFrameColumn
 from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.df_statistics import DataFrameStatistics
 from src.catalog.models.udf import UdfMetadata
 from src.catalog.models.udf_io import UdfIO
+from src.catalog.models.udf_profile import UdfProfile
+from src.catalog.models.pp_filter import PPFilterMetadata
 
 
 class CatalogModelsTest(unittest.TestCase):
@@ -151,3 +154,51 @@ class CatalogModelsTest(unittest.TestCase):
         self.assertNotEqual(udf_io, udf_io2)
         udf_io2 = UdfIO('name', ColumnType.FLOAT, True, None, [2, 3], True, 2)
         self.assertNotEqual(udf_io, udf_io2)
+
+    def test_df_statistics(self):
+        histograms = {'id': {'bounds': [0, 5, 10], 'counts': [5, 5]}}
+        statistics = DataFrameStatistics(10, [2, 2, 3], histograms, 1)
+        self.assertEqual(statistics.num_rows, 10)
+        self.assertEqual(statistics.frame_dims, [2, 2, 3])
+        self.assertEqual(statistics.histograms, histograms)
+        self.assertEqual(statistics.metadata_id, 1)
+        self.assertEqual(statistics, DataFrameStatistics(10, [2, 2, 3],
+                                                         histograms, 1))
+        self.assertNotEqual(statistics, DataFrameStatistics(11, [2, 2, 3],
+                                                            histograms, 1))
+        self.assertIsNone(DataFrameStatistics(10).frame_dims)
+
+    def test_udf_profile_fits_call_and_frame_cost(self):
+        profile = UdfProfile('cpu', 1)
+        self.assertEqual(profile.estimate_ms(10), 0)
+        # 5 ms per call + 1 ms per frame
+        for num_frames in [1, 4, 8]:
+            profile.add_call(num_frames, 5.0 + num_frames)
+        self.assertAlmostEqual(profile.ms_per_frame, 1.0)
+        self.assertAlmostEqual(profile.ms_per_call, 5.0)
+        self.assertAlmostEqual(profile.estimate_ms(16, batch_size=8), 26.0)
+        self.assertAlmostEqual(profile.estimate_ms(16, batch_size=1), 96.0)
+
+    def test_udf_profile_with_single_batch_size(self):
+        profile = UdfProfile('gpu', 1)
+        profile.add_call(4, 8.0)
+        profile.add_call(4, 12.0)
+        self.assertAlmostEqual(profile.ms_per_frame, 2.5)
+        self.assertAlmostEqual(profile.ms_per_call, 0.0)
+        self.assertEqual(profile.calls, 2)
+        self.assertEqual(profile.frames, 8)
+
+    def test_pp_filter(self):
+        pp_filter = PPFilterMetadata('label', 'car', 0.96, 0.7, b'model', 1,
+                                     2)
+        self.assertEqual(pp_filter.output, 'label')
+        self.assertEqual(pp_filter.label, 'car')
+        self.assertEqual(pp_filter.accuracy, 0.96)
+        self.assertEqual(pp_filter.reduction, 0.7)
+        self.assertEqual(pp_filter.model, b'model')
+        self.assertEqual(pp_filter.udf_id, 1)
+        self.assertEqual(pp_filter.metadata_id, 2)
+        self.assertEqual(pp_filter, PPFilterMetadata(
+            'label', 'car', 0.96, 0.7, b'other', 1, 2))
+        self.assertNotEqual(pp_filter, PPFilterMetadata(
+            'label', 'bus', 0.96, 0.7, b'model', 1, 2))
@@ -0,0 +1,46 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from src.catalog.services.pp_filter_service import PPFilterService
+
+UDF_ID = 123
+DATASET_ID = 456
+
+
+class PPFilterServiceTest(TestCase):
+
+    @patch("src.catalog.services.pp_filter_service.PPFilterMetadata")
+    def test_update_filter_should_replace_existing_filter(self, mocked):
+        service = PPFilterService()
+        existing = mocked.query.filter.return_value.filter.return_value \
+            .filter.return_value.filter.return_value.one.return_value
+        actual = service.update_filter(UDF_ID, DATASET_ID, 'label', 'car',
+                                       0.96, 0.7, b'model')
+        existing.delete.assert_called_once()
+        mocked.assert_called_with('label', 'car', 0.96, 0.7, b'model',
+                                  udf_id=UDF_ID, metadata_id=DATASET_ID)
+        self.assertEqual(actual, mocked.return_value.save.return_value)
+
+    @patch("src.catalog.services.pp_filter_service.PPFilterMetadata")
+    def test_delete_filters_by_dataset_id(self, mocked):
+        service = PPFilterService()
+        filters = [MagicMock(), MagicMock()]
+        mocked.query.filter.return_value.all.return_value = filters
+        service.delete_filters_by_dataset_id(DATASET_ID)
+        for pp_filter in filters:
+            pp_filter.delete.assert_called_once()
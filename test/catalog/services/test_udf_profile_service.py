@@ -0,0 +1,46 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from mock import patch
+
+from src.catalog.services.udf_profile_service import UdfProfileService
+
+UDF_ID = 123
+
+
+class UdfProfileServiceTest(TestCase):
+
+    @patch("src.catalog.services.udf_profile_service.UdfProfile")
+    def test_add_calls_should_create_missing_profile(self, mocked):
+        service = UdfProfileService()
+        mocked.query.filter.return_value.filter.return_value.one \
+            .return_value = None
+        service.add_calls(UDF_ID, 'cpu', [(4, 10.0), (8, 18.0)])
+        mocked.assert_called_with('cpu', UDF_ID)
+        profile = mocked.return_value
+        profile.add_call.assert_any_call(4, 10.0)
+        profile.add_call.assert_any_call(8, 18.0)
+        profile.save.assert_called_once()
+
+    @patch("src.catalog.services.udf_profile_service.UdfProfile")
+    def test_add_calls_should_update_existing_profile(self, mocked):
+        service = UdfProfileService()
+        profile = mocked.query.filter.return_value.filter.return_value.one \
+            .return_value
+        actual = service.add_calls(UDF_ID, 'gpu', [(1, 2.0)])
+        mocked.assert_not_called()
+        profile.add_call.assert_called_once_with(1, 2.0)
+        self.assertEqual(actual, profile.save.return_value)
@@ -200,10 +200,14 @@ class CatalogManagerTests(unittest.TestCase):
             'udf', 'sample.py', 'classification')
         self.assertEqual(actual, udf_mock.return_value.create_udf.return_value)
 
+    @mock.patch('src.catalog.catalog_manager.PPFilterService')
+    @mock.patch('src.catalog.catalog_manager.DatasetStatisticsService')
+    @mock.patch('src.catalog.catalog_manager.DatasetRowGroupService')
     @mock.patch('src.catalog.catalog_manager.init_db')
     @mock.patch('src.catalog.catalog_manager.DatasetService')
     @mock.patch('src.catalog.catalog_manager.DatasetColumnService')
-    def test_delete_metadata(self, dcs_mock, ds_mock, initdb_mock):
+    def test_delete_metadata(self, dcs_mock, ds_mock, initdb_mock,
+                             drgs_mock, dss_mock, pps_mock):
         dataset_name = "name"
         catalog = CatalogManager()
         catalog.delete_metadata(dataset_name)
@@ -211,6 +215,83 @@ class CatalogManagerTests(unittest.TestCase):
         ds_id_mock.assert_called_with(dataset_name)
         ds_mock.return_value.delete_dataset_by_id.assert_called_with(
             ds_id_mock.return_value)
+        drgs_mock.return_value.delete_row_groups_by_dataset_id \
+            .assert_called_with(ds_id_mock.return_value)
+        dss_mock.return_value.delete_statistics_by_dataset_id \
+            .assert_called_with(ds_id_mock.return_value)
+        pps_mock.return_value.delete_filters_by_dataset_id \
+            .assert_called_with(ds_id_mock.return_value)
+
+    @mock.patch('src.catalog.catalog_manager.init_db')
+    @mock.patch('src.catalog.catalog_manager.DatasetRowGroupService')
+    def test_row_group_statistics(self, drgs_mock, initdb_mock):
+        catalog = CatalogManager()
+        row_groups = [mock.MagicMock(), mock.MagicMock()]
+        catalog.add_row_group_statistics(3, row_groups)
+        for row_group in row_groups:
+            self.assertEqual(row_group.metadata_id, 3)
+        drgs_mock.return_value.create_row_groups.assert_called_with(
+            row_groups)
+
+        actual = catalog.get_row_group_statistics(3)
+        drgs_mock.return_value.row_groups_by_dataset_id.assert_called_with(3)
+        self.assertEqual(
+            actual,
+            drgs_mock.return_value.row_groups_by_dataset_id.return_value)
+
+    @mock.patch('src.catalog.catalog_manager.init_db')
+    @mock.patch('src.catalog.catalog_manager.DatasetStatisticsService')
+    def test_table_statistics(self, dss_mock, initdb_mock):
+        catalog = CatalogManager()
+        histograms = {'id': {'bounds': [0, 10], 'counts': [10]}}
+        catalog.update_table_statistics(3, 10, [2, 2, 3], histograms)
+        dss_mock.return_value.update_statistics.assert_called_with(
+            3, 10, [2, 2, 3], histograms)
+
+        actual = catalog.get_table_statistics(3)
+        dss_mock.return_value.statistics_by_dataset_id.assert_called_with(3)
+        self.assertEqual(
+            actual,
+            dss_mock.return_value.statistics_by_dataset_id.return_value)
+
+    @mock.patch('src.catalog.catalog_manager.init_db')
+    @mock.patch('src.catalog.catalog_manager.UdfProfileService')
+    @mock.patch('src.catalog.catalog_manager.UdfService')
+    def test_udf_profile(self, udf_mock, profile_mock, initdb_mock):
+        catalog = CatalogManager()
+        udf_id = udf_mock.return_value.udf_by_name.return_value.id
+        catalog.add_udf_profile('udf', 'cpu', [(4, 10.0)])
+        profile_mock.return_value.add_calls.assert_called_with(
+            udf_id, 'cpu', [(4, 10.0)])
+
+        actual = catalog.get_udf_profile('udf', 'cpu')
+        profile_mock.return_value.profile_by_udf_id.assert_called_with(
+            udf_id, 'cpu')
+        self.assertEqual(
+            actual, profile_mock.return_value.profile_by_udf_id.return_value)
+
+        udf_mock.return_value.udf_by_name.return_value = None
+        self.assertIsNone(catalog.get_udf_profile('unknown', 'cpu'))
+
+    @mock.patch('src.catalog.catalog_manager.init_db')
+    @mock.patch('src.catalog.catalog_manager.PPFilterService')
+    @mock.patch('src.catalog.catalog_manager.UdfService')
+    def test_pp_filter(self, udf_mock, pp_filter_mock, initdb_mock):
+        catalog = CatalogManager()
+        udf_id = udf_mock.return_value.udf_by_name.return_value.id
+        service = pp_filter_mock.return_value
+        catalog.add_pp_filter('udf', 3, 'label', 'car', 0.96, 0.7, b'model')
+        service.update_filter.assert_called_with(
+            udf_id, 3, 'label', 'car', 0.96, 0.7, b'model')
+
+        actual = catalog.get_pp_filter('udf', 3, 'label', 'car')
+        service.filter_by_udf_id.assert_called_with(udf_id, 3, 'label',
+                                                    'car')
+        self.assertEqual(actual, service.filter_by_udf_id.return_value)
+
+        udf_mock.return_value.udf_by_name.return_value = None
+        self.assertIsNone(catalog.get_pp_filter('unknown', 3, 'label',
+                                                'car'))
 
     @mock.patch('src.catalog.catalog_manager.UdfService')
     def test_get_udf_by_name(self, udf_mock):
@@ -220,10 +301,18 @@ class CatalogManagerTests(unittest.TestCase):
         self.assertEqual(actual,
                          udf_mock.return_value.udf_by_name.return_value)
 
+    @mock.patch('src.catalog.catalog_manager.PPFilterService')
+    @mock.patch('src.catalog.catalog_manager.UdfProfileService')
     @mock.patch('src.catalog.catalog_manager.UdfService')
-    def test_delete_udf(self, udf_mock):
+    def test_delete_udf(self, udf_mock, profile_mock, pp_filter_mock):
         actual = CatalogManager().delete_udf('name')
+        pp_filter_mock.return_value.delete_filters_by_udf_id \
+            .assert_called_with(udf_mock.return_value.udf_by_name
+                                .return_value.id)
         udf_mock.return_value.delete_udf_by_name.assert_called_with('name')
+        profile_mock.return_value.delete_profiles_by_udf_id \
+            .assert_called_with(udf_mock.return_value.udf_by_name
+                                .return_value.id)
         self.assertEqual(
             udf_mock.return_value.delete_udf_by_name.return_value,
             actual)
@@ -62,7 +62,7 @@ class SchemaTests(unittest.TestCase):
         for array_type, np_type in zip(NdArrayType, expected_type):
             col = DataFrameColumn(col_name, ColumnType.NDARRAY, True,
                                   array_type, [10, 10])
-            petastorm_col = UnischemaField(col_name, np_type, [10, 10],
+            petastorm_col = UnischemaField(col_name, np_type, (10, 10),
                                            NdarrayCodec(), True)
             self.assertEqual(SchemaUtils.get_petastorm_column(col),
                              petastorm_col)
@@ -0,0 +1,102 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.table_statistics import (TableStatisticsCollector,
+                                          build_histogram,
+                                          estimate_rows_in_range,
+                                          merge_histograms)
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+
+NUM_FRAMES = 100
+
+
+def create_batches(batch_size=10):
+    for start in range(0, NUM_FRAMES, batch_size):
+        ids = np.arange(start, start + batch_size)
+        yield Batch(pd.DataFrame({
+            'id': ids,
+            'score': ids / 10.0,
+            'label': ['car'] * batch_size,
+            'data': [np.zeros((2, 4, 3), dtype=np.uint8)] * batch_size}))
+
+
+class TableStatisticsTest(unittest.TestCase):
+
+    def test_histogram_estimates_integer_ranges(self):
+        histogram = build_histogram(np.arange(NUM_FRAMES),
+                                    num_buckets=NUM_FRAMES)
+        self.assertAlmostEqual(estimate_rows_in_range(histogram), NUM_FRAMES)
+        self.assertAlmostEqual(estimate_rows_in_range(histogram, 10, 19), 10)
+        self.assertAlmostEqual(estimate_rows_in_range(histogram, 5, 5), 1)
+        self.assertAlmostEqual(estimate_rows_in_range(histogram, None, 49),
+                               50)
+        self.assertAlmostEqual(estimate_rows_in_range(histogram, 200, None),
+                               0)
+
+    def test_histogram_scales_sample_to_rows(self):
+        histogram = build_histogram(np.arange(0, NUM_FRAMES, 10),
+                                    num_rows=NUM_FRAMES, low=0,
+                                    high=NUM_FRAMES - 1)
+        self.assertAlmostEqual(sum(histogram['counts']), NUM_FRAMES)
+
+    def test_merge_histograms(self):
+        merged = merge_histograms(build_histogram(np.arange(50)),
+                                  build_histogram(np.arange(50, 100)))
+        self.assertAlmostEqual(estimate_rows_in_range(merged), NUM_FRAMES)
+        self.assertAlmostEqual(estimate_rows_in_range(merged, None, 49), 50,
+                               delta=2)
+
+    def test_collector_should_describe_rows(self):
+        collector = TableStatisticsCollector()
+        for batch in create_batches():
+            collector.update(batch)
+        num_rows, frame_dims, histograms = collector.merged_with(None)
+        self.assertEqual(num_rows, NUM_FRAMES)
+        self.assertEqual(frame_dims, [2, 4, 3])
+        # text and frame columns have no histogram
+        self.assertEqual(sorted(histograms), ['id', 'score'])
+        self.assertAlmostEqual(
+            estimate_rows_in_range(histograms['id'], 0, NUM_FRAMES - 1),
+            NUM_FRAMES)
+        self.assertAlmostEqual(
+            estimate_rows_in_range(histograms['score'], None, 4.95), 50,
+            delta=4)
+
+    def test_collector_should_sample_columnar_batches(self):
+        collector = TableStatisticsCollector(sample_size=20)
+        for batch in create_batches():
+            collector.update(ColumnarBatch.from_batch(batch))
+        histograms = collector.histograms()
+        self.assertAlmostEqual(sum(histograms['id']['counts']), NUM_FRAMES)
+        self.assertEqual(histograms['id']['bounds'][0], 0)
+        self.assertEqual(histograms['id']['bounds'][-1], NUM_FRAMES)
+
+    def test_collector_should_append_to_statistics(self):
+        previous = DataFrameStatistics(
+            NUM_FRAMES, [2, 4, 3],
+            {'id': build_histogram(np.arange(NUM_FRAMES))})
+        collector = TableStatisticsCollector()
+        collector.update(Batch(pd.DataFrame({'id': [NUM_FRAMES]})))
+        num_rows, frame_dims, histograms = collector.merged_with(previous)
+        self.assertEqual(num_rows, NUM_FRAMES + 1)
+        self.assertEqual(frame_dims, [2, 4, 3])
+        self.assertAlmostEqual(estimate_rows_in_range(histograms['id']),
+                               NUM_FRAMES + 1)
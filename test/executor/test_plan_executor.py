@@ -28,6 +28,7 @@ from src.planner.create_plan import CreatePlan
 from src.planner.create_udf_plan import CreateUDFPlan
 from src.planner.load_data_plan import LoadDataPlan
 from src.planner.upload_plan import UploadPlan
+from src.planner.prefetch_plan import PrefetchPlan
 from src.executor.load_executor import LoadDataExecutor
 from src.executor.upload_executor import UploadExecutor
 from src.executor.seq_scan_executor import SequentialScanExecutor
@@ -35,6 +36,7 @@ from src.executor.create_executor import CreateExecutor
 from src.executor.create_udf_executor import CreateUDFExecutor
 from src.executor.insert_executor import InsertExecutor
 from src.executor.pp_executor import PPExecutor
+from src.executor.prefetch_executor import PrefetchExecutor
 
 
 class PlanExecutorTest(unittest.TestCase):
@@ -116,6 +118,10 @@ class PlanExecutorTest(unittest.TestCase):
         executor = PlanExecutor(plan)._build_execution_tree(plan)
         self.assertIsInstance(executor, UploadExecutor)
 
+        plan = PrefetchPlan(2)
+        executor = PlanExecutor(plan)._build_execution_tree(plan)
+        self.assertIsInstance(executor, PrefetchExecutor)
+
     @patch('src.executor.plan_executor.PlanExecutor._build_execution_tree')
     @patch('src.executor.plan_executor.PlanExecutor._clean_execution_tree')
     def test_execute_plan_for_seq_scan_plan(
@@ -138,6 +144,21 @@ class PlanExecutorTest(unittest.TestCase):
         tree.exec.assert_called_once()
         self.assertEqual(actual, batch_list)
 
+    @patch('src.executor.plan_executor.PPFilterTrainer')
+    @patch('src.executor.plan_executor.PlanExecutor._build_execution_tree')
+    def test_should_train_pp_filters_after_execution(self, mock_build,
+                                                     trainer_mock):
+        plan = SeqScanPlan(None, [])
+        tree = MagicMock()
+        tree.exec.return_value = [Batch(pd.DataFrame([1]))]
+        mock_build.return_value = tree
+
+        output = PlanExecutor(plan).execute_plan()
+        next(output)
+        trainer_mock.return_value.train_plan.assert_not_called()
+        self.assertEqual(list(output), [])
+        trainer_mock.return_value.train_plan.assert_called_once_with(plan)
+
     @patch('src.executor.plan_executor.PlanExecutor._build_execution_tree')
     @patch('src.executor.plan_executor.PlanExecutor._clean_execution_tree')
     def test_execute_plan_for_pp_scan_plan(
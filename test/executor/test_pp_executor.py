@@ -14,6 +14,8 @@
 # limitations under the License.
 import unittest
 
+import pandas as pd
+
 from src.executor.pp_executor import PPExecutor
 from src.models.storage.batch import Batch
 from test.util import create_dataframe
@@ -32,6 +34,29 @@ class PPScanExecutorTest(unittest.TestCase):
         predicate_executor = PPExecutor(plan)
         predicate_executor.append_child(DummyExecutor([batch]))
 
-        expected = batch[[2]]
+        expected = Batch(frames=dataframe.iloc[[2]].reset_index(drop=True))
         filtered = list(predicate_executor.exec())[0]
         self.assertEqual(expected, filtered)
+
+    def test_should_filter_with_batch_outcomes(self):
+        dataframe = create_dataframe(4)
+        batch = Batch(frames=dataframe)
+        expression = type("AbstractExpression", (), {
+            "evaluate": lambda x: Batch(pd.DataFrame(
+                {'pp': [True, False, True, False]}))})
+        plan = type("PPScanPlan", (), {"predicate": expression})
+        predicate_executor = PPExecutor(plan)
+        predicate_executor.append_child(DummyExecutor([batch]))
+        expected = Batch(
+            frames=dataframe.iloc[[0, 2]].reset_index(drop=True))
+        self.assertEqual(list(predicate_executor.exec()), [expected])
+
+    def test_should_skip_batches_without_frames_passing(self):
+        batches = [Batch(frames=create_dataframe(2)) for _ in range(2)]
+        outcomes = iter([[False, False], [True, True]])
+        expression = type("AbstractExpression", (), {
+            "evaluate": lambda x: next(outcomes)})
+        plan = type("PPScanPlan", (), {"predicate": expression})
+        predicate_executor = PPExecutor(plan)
+        predicate_executor.append_child(DummyExecutor(batches))
+        self.assertEqual(list(predicate_executor.exec()), [batches[1]])
@@ -0,0 +1,148 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.executor.prefetch_executor import PrefetchExecutor
+from src.executor.seq_scan_executor import SequentialScanExecutor
+from src.expression.function_expression import FunctionExpression
+from src.models.storage.batch import Batch
+from src.planner.prefetch_plan import PrefetchPlan
+from src.planner.seq_scan_plan import SeqScanPlan
+from src.udfs.udf_registry import UdfRegistry
+from test.executor.utils import DummyExecutor
+
+# fails the queries if two calls on the instance overlap
+EXCLUSIVE_UDF_SOURCE = '''
+import threading
+import time
+
+import pandas as pd
+
+
+class Exclusive:
+    def __init__(self):
+        self.calls = threading.Semaphore(1)
+
+    def __call__(self, frames):
+        if not self.calls.acquire(blocking=False):
+            raise RuntimeError('concurrent call')
+        time.sleep(0.001)
+        self.calls.release()
+        return pd.DataFrame({'label': frames['id'] % 2})
+'''
+
+
+class PrefetchExecutorTest(unittest.TestCase):
+
+    def _batches(self, num_batches):
+        return [Batch(pd.DataFrame({'id': np.arange(i * 10, (i + 1) * 10)}))
+                for i in range(num_batches)]
+
+    def test_should_return_child_batches_in_order(self):
+        batches = self._batches(10)
+        executor = PrefetchExecutor(PrefetchPlan(2))
+        executor.append_child(DummyExecutor(batches))
+        self.assertEqual(list(executor.exec()), batches)
+
+    def test_should_read_ahead_in_background(self):
+        batches = self._batches(4)
+        threads = []
+
+        class ThreadExecutor(DummyExecutor):
+            def exec(self):
+                for batch in super().exec():
+                    threads.append(threading.current_thread())
+                    yield batch
+
+        executor = PrefetchExecutor(PrefetchPlan(2))
+        executor.append_child(ThreadExecutor(batches))
+        output = executor.exec()
+        self.assertEqual(next(output), batches[0])
+        self.assertNotIn(threading.current_thread(), threads)
+        output.close()
+
+    def test_should_raise_child_errors(self):
+        class FailingExecutor(DummyExecutor):
+            def exec(self):
+                yield from super().exec()
+                raise RuntimeError('read failed')
+
+        executor = PrefetchExecutor(PrefetchPlan(1))
+        executor.append_child(FailingExecutor(self._batches(3)))
+        output = executor.exec()
+        self.assertEqual(len([next(output) for _ in range(3)]), 3)
+        with self.assertRaises(RuntimeError):
+            next(output)
+
+    def test_should_stop_child_when_consumer_stops(self):
+        closed = threading.Event()
+
+        class EndlessExecutor(DummyExecutor):
+            def exec(self):
+                try:
+                    while True:
+                        yield from super().exec()
+                finally:
+                    closed.set()
+
+        executor = PrefetchExecutor(PrefetchPlan(1))
+        executor.append_child(EndlessExecutor(self._batches(1)))
+        output = executor.exec()
+        next(output)
+        output.close()
+        self.assertTrue(closed.wait(5))
+
+    def test_should_share_registry_udfs_between_prefetching_scans(self):
+        # regression: shared UDF instances were called by concurrent scans
+        udf_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, udf_dir, ignore_errors=True)
+        path = os.path.join(udf_dir, 'exclusive.py')
+        with open(path, 'w') as udf_file:
+            udf_file.write(EXCLUSIVE_UDF_SOURCE)
+        registry = UdfRegistry()
+        self.addCleanup(registry.reset, enabled=registry.enabled)
+        registry.reset(enabled=True)
+        batches = self._batches(20)
+        results, errors = [], []
+
+        def query():
+            label = FunctionExpression(registry.get('Exclusive', path),
+                                       output='label')
+            scan_executor = SequentialScanExecutor(SeqScanPlan(None, [label]))
+            prefetch = PrefetchExecutor(PrefetchPlan(2))
+            prefetch.append_child(DummyExecutor(batches))
+            scan_executor.append_child(prefetch)
+            try:
+                results.append(list(scan_executor.exec()))
+            except Exception as error:
+                errors.append(error)
+
+        queries = [threading.Thread(target=query) for _ in range(4)]
+        for thread in queries:
+            thread.start()
+        for thread in queries:
+            thread.join()
+        self.assertEqual(errors, [])
+        expected = [Batch(pd.DataFrame({'label': batch.frames['id'] % 2}))
+                    for batch in batches]
+        self.assertEqual(results, [expected] * 4)
@@ -12,17 +12,34 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
 import unittest
+from unittest.mock import MagicMock, patch
+
 import pandas as pd
 
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
 from src.executor.seq_scan_executor import SequentialScanExecutor
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
 from src.models.storage.batch import Batch
+from src.planner.seq_scan_plan import SeqScanPlan
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from src.udfs.udf_profiler import UdfProfiler
 from test.util import create_dataframe
 from test.executor.utils import DummyExecutor
 
 
 class SeqScanExecutorTest(unittest.TestCase):
 
+    def setUp(self):
+        # profiling would wrap the mocked UDFs
+        self.addCleanup(UdfProfiler().reset, enabled=UdfProfiler().enabled)
+        UdfProfiler().reset(enabled=False)
+
     def test_should_return_only_frames_satisfy_predicate(self):
         dataframe = create_dataframe(3)
         batch = Batch(frames=dataframe)
@@ -71,3 +88,81 @@ class SeqScanExecutorTest(unittest.TestCase):
 
         actual = list(proj_executor.exec())[0]
         self.assertEqual(proj_batch, actual)
+
+    def test_should_skip_projection_when_no_frame_satisfies_predicate(self):
+        batches = [Batch(frames=create_dataframe(2)) for _ in range(2)]
+        outcomes = iter([[False, False], [False, True]])
+        expression = type("AbstractExpression", (),
+                          {"evaluate": lambda x: Batch(
+                              pd.DataFrame(next(outcomes)))})
+        projection = MagicMock()
+        projection.evaluate.side_effect = lambda batch: batch
+        plan = type("ScanPlan", (), {"predicate": expression,
+                                     "columns": [projection]})
+        scan_executor = SequentialScanExecutor(plan)
+        scan_executor.append_child(DummyExecutor(batches))
+
+        actual = list(scan_executor.exec())
+        projection.evaluate.assert_called_once()
+        expected = Batch(batches[1][[1]].frames.reset_index(drop=True))
+        self.assertEqual(actual, [expected])
+
+    @patch('src.executor.seq_scan_executor.ConfigurationManager')
+    def test_should_run_udfs_on_micro_batches(self, config_mock):
+        config_mock.return_value.get_value.return_value = \
+            {'size': 4, 'max_wait_ms': 10000}
+        calls = []
+
+        def classify(frames):
+            calls.append(len(frames))
+            return pd.DataFrame({'label': frames['id'] % 3})
+
+        udf = MagicMock(spec=AbstractClassifierUDF, side_effect=classify)
+        label = FunctionExpression(udf, output='label',
+                                   children=[TupleValueExpression('id')])
+        predicate = ComparisonExpression(ExpressionType.COMPARE_GREATER,
+                                         label, ConstantValueExpression(0))
+        plan = SeqScanPlan(predicate, [TupleValueExpression('id')])
+        scan_executor = SequentialScanExecutor(plan)
+        batches = [Batch(pd.DataFrame({'id': [i]})) for i in range(10)]
+        scan_executor.append_child(DummyExecutor(batches))
+
+        actual = list(scan_executor.exec())
+        self.assertEqual(calls, [4, 4, 2])
+        # the rows passing stay in their own batches
+        self.assertEqual([batch.frames['id'].tolist() for batch in actual],
+                         [[i] for i in range(10) if i % 3])
+
+    @patch('src.executor.seq_scan_executor.ConfigurationManager')
+    def test_should_flush_micro_batch_at_deadline(self, config_mock):
+        config_mock.return_value.get_value.return_value = \
+            {'size': 4, 'max_wait_ms': 50}
+        evaluated = threading.Event()
+        waited = []
+
+        def classify(frames):
+            evaluated.set()
+            return pd.DataFrame({'label': frames['id'] + 1})
+
+        def slow_child():
+            yield Batch(pd.DataFrame({'id': [0]}))
+            # the next batch only arrives after the first one is evaluated
+            waited.append(evaluated.wait(timeout=5))
+            yield Batch(pd.DataFrame({'id': [1]}))
+
+        udf = MagicMock(spec=AbstractClassifierUDF, side_effect=classify)
+        label = FunctionExpression(udf, output='label',
+                                   children=[TupleValueExpression('id')])
+        predicate = ComparisonExpression(ExpressionType.COMPARE_GREATER,
+                                         label, ConstantValueExpression(0))
+        plan = SeqScanPlan(predicate, [TupleValueExpression('id')])
+        scan_executor = SequentialScanExecutor(plan)
+        child = MagicMock()
+        child.exec.side_effect = slow_child
+        scan_executor.append_child(child)
+
+        actual = list(scan_executor.exec())
+        self.assertEqual(waited, [True])
+        self.assertEqual(udf.call_count, 2)
+        self.assertEqual([batch.frames['id'].tolist() for batch in actual],
+                         [[0], [1]])
@@ -0,0 +1,50 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from src.executor.storage_executor import StorageExecutor
+from src.models.storage.batch import Batch
+from src.planner.storage_plan import StoragePlan
+
+
+class StorageExecutorTest(unittest.TestCase):
+
+    def _batches(self):
+        return [Batch(pd.DataFrame({'id': range(start, start + 4)}))
+                for start in range(0, 12, 4)]
+
+    @patch('src.executor.storage_executor.StorageEngine')
+    def test_should_read_sampled_positions(self, engine_mock):
+        engine_mock.supports_positions = True
+        engine_mock.read.return_value = iter([])
+        table = MagicMock()
+        list(StorageExecutor(StoragePlan(table, 100, skip_frames=3)).exec())
+        engine_mock.read.assert_called_once_with(
+            table, 100, pos=slice(None, None, 3), projection=None)
+
+    @patch('src.executor.storage_executor.BufferPool')
+    @patch('src.executor.storage_executor.StorageEngine')
+    def test_should_sample_batches_without_positions(self, engine_mock,
+                                                     pool_mock):
+        engine_mock.supports_positions = False
+        engine_mock.read.return_value = iter(self._batches())
+        pool_mock.return_value.enabled = False
+        batches = StorageExecutor(
+            StoragePlan(MagicMock(), 100, skip_frames=3)).exec()
+        self.assertEqual(Batch.concat(list(batches)).frames['id'].tolist(),
+                         [0, 3, 6, 9])
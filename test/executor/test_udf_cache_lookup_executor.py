@@ -0,0 +1,102 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.executor.udf_cache_lookup_executor import UdfCacheLookupExecutor
+from src.executor.udf_residual_executor import UdfResidualExecutor
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import Batch
+from src.planner.udf_cache_lookup_plan import UdfCacheLookupPlan
+from src.planner.udf_residual_plan import UdfResidualPlan
+from src.storage.udf_result_cache import UdfResultCache
+from test.executor.utils import DummyExecutor
+from test.storage.test_udf_result_cache import (TABLE_KEY, CountingUDF,
+                                                FakeTable, create_frames)
+
+
+def create_batch(ids):
+    frames = create_frames(ids)
+    frames['id'] = list(ids)
+    return Batch(frames)
+
+
+class UdfCacheLookupExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = UdfResultCache()
+        self.cache.reset(path=os.path.join(self.cache_dir, 'udf.db'),
+                         capacity=10 ** 6, enabled=True)
+        self.udf = CountingUDF()
+        self.udf_expr = FunctionExpression(
+            self.udf, output='scores', children=[TupleValueExpression('data')])
+        self.udf_expr.cache_table = TABLE_KEY
+
+    def tearDown(self):
+        self.cache.reset(path='udf_cache.db', enabled=False)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def lookup(self, batches):
+        executor = UdfCacheLookupExecutor(
+            UdfCacheLookupPlan(FakeTable(), [self.udf_expr]))
+        executor.append_child(DummyExecutor(batches))
+        return executor
+
+    def residual(self, batches):
+        executor = UdfResidualExecutor(
+            UdfResidualPlan(FakeTable(), [self.udf_expr]))
+        executor.append_child(self.lookup(batches))
+        return executor
+
+    def test_should_attach_stored_outputs(self):
+        self.cache.put(self.udf_expr.cache_key, TABLE_KEY, [1],
+                       pd.DataFrame({'scores': [1.0]}))
+        batches = list(self.lookup([create_batch([0, 1])]).exec())
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].frames[self.udf_expr.cache_key].tolist(),
+                         [None, {'scores': 1.0}])
+        self.assertEqual(self.udf.frames_seen, [])
+
+    def test_should_run_udf_on_residual_frames(self):
+        list(self.residual([create_batch([0, 1, 2])]).exec())
+        self.udf.frames_seen = []
+        batches = list(self.residual([create_batch([1, 2, 3, 4]),
+                                      create_batch([5])]).exec())
+        self.assertEqual(self.udf.frames_seen, [3, 4, 5])
+        batch = Batch.concat(batches)
+        # the call reads the outputs filled in, without running the udf
+        self.assertEqual(self.udf_expr.evaluate(batch).frames['scores']
+                         .tolist(), [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(self.udf.frames_seen, [3, 4, 5])
+        self.assertEqual(self.cache.count(self.udf_expr.cache_key,
+                                          TABLE_KEY), 6)
+
+    def test_should_not_look_up_batches_without_frame_ids(self):
+        batch = Batch(create_frames([0, 1]))
+        batches = list(self.residual([batch]).exec())
+        self.assertEqual(self.udf.frames_seen, [0, 1])
+        self.assertEqual(self.udf_expr.evaluate(batches[0]).frames['scores']
+                         .tolist(), [0.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
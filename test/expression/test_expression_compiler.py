@@ -0,0 +1,159 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.expression.abstract_expression import ExpressionType
+from src.expression.arithmetic_expression import ArithmeticExpression
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.expression_compiler import (OpCode, compile_expression)
+from src.expression.function_expression import FunctionExpression
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+
+NUM_ROWS = 20
+
+
+def column(name):
+    return TupleValueExpression(col_name=name)
+
+
+def constant(value):
+    return ConstantValueExpression(value)
+
+
+def compare(etype, left, right):
+    return ComparisonExpression(etype, left, right)
+
+
+def create_batch():
+    return Batch(pd.DataFrame({'id': np.arange(NUM_ROWS),
+                               'score': np.linspace(0, 1, NUM_ROWS),
+                               'label': ['car', 'bus'] * (NUM_ROWS // 2)}))
+
+
+class ExpressionCompilerTest(unittest.TestCase):
+
+    def assert_same_as_interpreter(self, expr, batch):
+        expected = expr.evaluate(batch).frames.iloc[:, 0].tolist()
+        compiled = compile_expression(expr)
+        self.assertEqual(compiled.values(batch).tolist(), expected)
+        return compiled
+
+    def test_should_compile_comparisons_arithmetic_and_logic(self):
+        # (id * id - id > 15 AND score <= 0.9) OR NOT label = 'car'
+        arithmetic = ArithmeticExpression(
+            ExpressionType.ARITHMETIC_SUBTRACT,
+            ArithmeticExpression(ExpressionType.ARITHMETIC_MULTIPLY,
+                                 column('id'), column('id')),
+            column('id'))
+        expr = LogicalExpression(
+            ExpressionType.LOGICAL_OR,
+            LogicalExpression(
+                ExpressionType.LOGICAL_AND,
+                compare(ExpressionType.COMPARE_GREATER, arithmetic,
+                        constant(15)),
+                compare(ExpressionType.COMPARE_LEQ, column('score'),
+                        constant(0.9))),
+            LogicalExpression(
+                ExpressionType.LOGICAL_NOT,
+                compare(ExpressionType.COMPARE_EQUAL, column('label'),
+                        constant('car')), None))
+        batch = create_batch()
+        compiled = self.assert_same_as_interpreter(expr, batch)
+        self.assertTrue(compiled.is_vectorized)
+        self.assertEqual(compiled.program[0], (OpCode.COLUMN, 'id'))
+        self.assertEqual(compiled.program[-1][1], np.logical_or)
+
+        columnar = ColumnarBatch.from_batch(batch)
+        self.assertEqual(compiled.values(columnar).tolist(),
+                         compiled.values(batch).tolist())
+
+        # constants broadcast instead of aligning DataFrame columns
+        divide = ArithmeticExpression(ExpressionType.ARITHMETIC_DIVIDE,
+                                      column('id'), constant(4))
+        np.testing.assert_array_equal(compile_expression(divide)
+                                      .values(batch),
+                                      np.arange(NUM_ROWS) / 4)
+
+    def test_should_broadcast_constants(self):
+        expr = compare(ExpressionType.COMPARE_LESSER, constant(1),
+                       constant(2))
+        self.assertEqual(compile_expression(expr).values(create_batch())
+                         .tolist(), [True] * NUM_ROWS)
+
+    def test_should_interpret_functions(self):
+        calls = []
+
+        def scores(frames):
+            calls.append(len(frames))
+            return pd.DataFrame({'doubled': frames['score'] * 2})
+
+        function = FunctionExpression(scores, output='doubled',
+                                      children=[column('score')])
+        # the function is left to the interpreter, its output compared
+        expr = compare(ExpressionType.COMPARE_GREATER, function,
+                       constant(1.0))
+        compiled = self.assert_same_as_interpreter(expr, create_batch())
+        self.assertFalse(compiled.is_vectorized)
+        self.assertEqual(compiled.program[0][0], OpCode.INTERPRET)
+
+        # AND over a function keeps the interpreter short circuit, the
+        # function only sees the rows passing the left side
+        calls.clear()
+        conjunction = LogicalExpression(
+            ExpressionType.LOGICAL_AND,
+            compare(ExpressionType.COMPARE_LESSER, column('id'),
+                    constant(5)), expr)
+        compiled = compile_expression(conjunction)
+        self.assertEqual(compiled.program, [(OpCode.INTERPRET, conjunction)])
+        self.assertEqual(compiled.values(create_batch()).tolist(),
+                         [False] * NUM_ROWS)
+        self.assertEqual(calls, [5])
+
+    def test_should_fall_back_on_unsupported_values(self):
+        batch = Batch(pd.DataFrame({'id': np.arange(3),
+                                    'label': [['car'], ['bus'], ['car']]}))
+        contains = compare(ExpressionType.COMPARE_CONTAINS, column('label'),
+                           constant(['car']))
+        compiled = self.assert_same_as_interpreter(contains, batch)
+        self.assertTrue(compiled.is_vectorized)
+        self.assertEqual(compiled.program[1], (OpCode.CONSTANT, ['car']))
+
+        # label sets only cover lists, strings are left to the interpreter
+        names = Batch(pd.DataFrame({'label': ['car', 'bus', 'cab']}))
+        letters = compare(ExpressionType.COMPARE_CONTAINS, column('label'),
+                          constant(['a', 'c']))
+        self.assert_same_as_interpreter(letters, names)
+        function = FunctionExpression(lambda frames: frames, output='label',
+                                      children=[column('label')])
+        contains = compare(ExpressionType.COMPARE_CONTAINS, function,
+                           column('label'))
+        compiled = self.assert_same_as_interpreter(contains, batch)
+        self.assertEqual(compiled.program, [(OpCode.INTERPRET, contains)])
+
+        # a mask selects the rows as in the interpreter
+        id_predicate = compare(ExpressionType.COMPARE_GEQ, column('id'),
+                               constant(1))
+        self.assertEqual(compile_expression(id_predicate)
+                         .values(batch, mask=[0, 2]).tolist(),
+                         [False, True])
+        self.assertIsNone(compile_expression(None))
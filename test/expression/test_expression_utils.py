@@ -0,0 +1,109 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from mock import MagicMock
+
+from src.expression.abstract_expression import ExpressionType
+from src.expression.arithmetic_expression import ArithmeticExpression
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.expression_utils import (conjunction_list, and_,
+                                             get_columns_in_expression,
+                                             get_column_range,
+                                             is_row_predicate,
+                                             to_row_predicate)
+from src.expression.function_expression import FunctionExpression
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+
+
+def compare(etype, left, right):
+    return ComparisonExpression(etype, left, right)
+
+
+class ExpressionUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        # id > 2 AND (label = 'car' OR NOT id * 2 < 4)
+        self.id_greater = compare(ExpressionType.COMPARE_GREATER,
+                                  TupleValueExpression('id'),
+                                  ConstantValueExpression(2))
+        self.label_or = LogicalExpression(
+            ExpressionType.LOGICAL_OR,
+            compare(ExpressionType.COMPARE_EQUAL,
+                    TupleValueExpression('label'),
+                    ConstantValueExpression('car')),
+            LogicalExpression(
+                ExpressionType.LOGICAL_NOT,
+                compare(ExpressionType.COMPARE_LESSER,
+                        ArithmeticExpression(
+                            ExpressionType.ARITHMETIC_MULTIPLY,
+                            TupleValueExpression('id'),
+                            ConstantValueExpression(2)),
+                        ConstantValueExpression(4)), None))
+        self.predicate = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                           self.id_greater, self.label_or)
+
+    def test_conjunction_list(self):
+        self.assertEqual(conjunction_list(self.predicate),
+                         [self.id_greater, self.label_or])
+        self.assertEqual(conjunction_list(None), [])
+        self.assertEqual(and_(conjunction_list(self.predicate)),
+                         self.predicate)
+        self.assertIsNone(and_([]))
+
+    def test_get_columns_in_expression(self):
+        self.assertEqual(get_columns_in_expression(self.predicate),
+                         {'id', 'label'})
+        func = FunctionExpression(MagicMock(),
+                                  children=[TupleValueExpression('data')])
+        self.assertEqual(get_columns_in_expression(func), {'data'})
+        # a udf without arguments reads the whole batch
+        self.assertIsNone(get_columns_in_expression(
+            FunctionExpression(MagicMock())))
+
+    def test_to_row_predicate(self):
+        self.assertTrue(is_row_predicate(self.predicate))
+        func = to_row_predicate(self.predicate, ['id', 'label'])
+        self.assertFalse(func(2, 'car'))
+        self.assertTrue(func(3, 'car'))
+        self.assertTrue(func(3, 'bus'))
+        self.assertFalse(func(1, 'bus'))
+
+        udf = compare(ExpressionType.COMPARE_EQUAL,
+                      FunctionExpression(MagicMock()),
+                      ConstantValueExpression(1))
+        self.assertFalse(is_row_predicate(udf))
+
+    def test_get_column_range(self):
+        self.assertEqual(get_column_range(self.predicate, 'id'), (2, None))
+        self.assertEqual(get_column_range(self.predicate, 'label'),
+                         (None, None))
+        # 1000 < id AND id <= 2000 AND id = 1500
+        predicate = and_([
+            compare(ExpressionType.COMPARE_LESSER,
+                    ConstantValueExpression(1000),
+                    TupleValueExpression('id')),
+            compare(ExpressionType.COMPARE_LEQ,
+                    TupleValueExpression('id'),
+                    ConstantValueExpression(2000))])
+        self.assertEqual(get_column_range(predicate, 'id'), (1000, 2000))
+        predicate = and_([predicate,
+                          compare(ExpressionType.COMPARE_EQUAL,
+                                  TupleValueExpression('id'),
+                                  ConstantValueExpression(1500))])
+        self.assertEqual(get_column_range(predicate, 'id'), (1500, 1500))
+        self.assertEqual(get_column_range(None, 'id'), (None, None))
@@ -0,0 +1,74 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.column_type import ColumnType
+from src.expression import label_bitset
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import Batch
+
+
+class LabelBitsetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [['car', 'bus'], [], ['car'], ['person', 'car', 'car'],
+                     ['bus'], np.array(['bus', 'car'])]
+
+    def test_should_match_list_semantics(self):
+        for labels in (['car'], ['car', 'bus'], ['bus', 'bus'], ['truck'],
+                       []):
+            self.assertEqual(
+                label_bitset.contains(self.rows, labels).tolist(),
+                [all(label in row for label in labels)
+                 for row in self.rows])
+            self.assertEqual(
+                label_bitset.is_contained(self.rows, labels).tolist(),
+                [all(label in labels for label in row)
+                 for row in self.rows])
+
+    def test_should_encode_other_labels(self):
+        bitsets = label_bitset.label_bitsets(self.rows, ['car', 'bus'])
+        self.assertEqual(bitsets.tolist(), [3, 0, 1, 5, 2, 3])
+        self.assertEqual(label_bitset.label_bitsets([[], []], ['car'])
+                         .tolist(), [0, 0])
+
+    def test_should_only_support_string_label_lists(self):
+        self.assertTrue(label_bitset.supports(self.rows, ['car']))
+        self.assertFalse(label_bitset.supports(['car', 'bus'], ['car']))
+        self.assertFalse(label_bitset.supports(self.rows, 'car'))
+        self.assertFalse(label_bitset.supports(self.rows, [1, 2]))
+        labels = ['label%d' % i for i in range(label_bitset.MAX_LABELS + 1)]
+        self.assertFalse(label_bitset.supports(self.rows, labels))
+        self.assertTrue(label_bitset.supports(self.rows, labels[1:]))
+
+    def test_should_evaluate_comparisons_over_bitsets(self):
+        batch = Batch(pd.DataFrame({'labels': self.rows}))
+        labels = ConstantValueExpression(['car', 'bus'], ColumnType.NDARRAY)
+        contains = ComparisonExpression(ExpressionType.COMPARE_CONTAINS,
+                                        TupleValueExpression('labels'),
+                                        labels)
+        self.assertEqual(contains.evaluate(batch).frames[0].tolist(),
+                         [True, False, False, False, False, True])
+        is_contained = ComparisonExpression(
+            ExpressionType.COMPARE_IS_CONTAINED,
+            TupleValueExpression('labels'), labels)
+        self.assertEqual(is_contained.evaluate(batch).frames[0].tolist(),
+                         [True, True, True, False, True, True])
@@ -203,3 +203,27 @@ class LogicalExpressionsTest(unittest.TestCase):
             logical_exp.evaluate(tuples).frames[0].tolist()
         )
         comp_exp_r.evaluate.assert_called_once_with(tuples, mask=[0, 1])
+
+    def test_nested_logical_expression_composes_masks(self):
+        # 0 > 2 AND (0 < 8 OR 1 == 0), the OR only sees the rows passing
+        # the left side and its right side only the ones it did not accept
+        def compare(etype, column, value):
+            return ComparisonExpression(etype,
+                                        TupleValueExpression(col_name=column),
+                                        ConstantValueExpression(value))
+
+        right_of_or = compare(ExpressionType.COMPARE_EQUAL, 1, 0)
+        disjunction = LogicalExpression(
+            ExpressionType.LOGICAL_OR,
+            compare(ExpressionType.COMPARE_LESSER, 0, 8),
+            right_of_or)
+        logical_exp = LogicalExpression(
+            ExpressionType.LOGICAL_AND,
+            compare(ExpressionType.COMPARE_GREATER, 0, 2),
+            disjunction)
+
+        tuples = Batch(pd.DataFrame({0: list(range(10)),
+                                     1: [0, 1] * 5}))
+        expected = [2 < i < 8 or (i > 2 and i % 2 == 0) for i in range(10)]
+        self.assertEqual(expected,
+                         logical_exp.evaluate(tuples).frames[0].tolist())
@@ -0,0 +1,75 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.filters.pp_filter import PPFilter
+
+NUM_FRAMES = 200
+
+
+def create_frames(num_frames=NUM_FRAMES, seed=0):
+    """Noisy frames, the ones holding the label are redder"""
+    random = np.random.RandomState(seed)
+    labels = random.rand(num_frames) < 0.3
+    frames = []
+    for holds_label in labels:
+        frame = random.randint(0, 150, size=(16, 16, 3))
+        if holds_label:
+            frame[..., 0] += 100
+        frames.append(frame.astype(np.uint8))
+    return frames, labels
+
+
+class PPFilterTest(unittest.TestCase):
+
+    def test_should_filter_frames_without_the_label(self):
+        frames, labels = create_frames()
+        pp_filter = PPFilter().fit(frames, labels, accuracy=0.9)
+        self.assertGreaterEqual(pp_filter.accuracy, 0.9)
+        self.assertGreater(pp_filter.reduction, 0.5)
+
+        frames, labels = create_frames(seed=1)
+        passed = pp_filter.predict(frames)
+        self.assertGreaterEqual(passed[labels].mean(), 0.9)
+        self.assertLess(passed[~labels].mean(), 0.2)
+
+    def test_should_evaluate_as_udf(self):
+        frames, labels = create_frames()
+        pp_filter = PPFilter().fit(frames, labels)
+        outcomes = pp_filter(pd.DataFrame({'id': range(NUM_FRAMES),
+                                           'data': frames}))
+        self.assertEqual(list(outcomes.columns), ['pp'])
+        self.assertEqual(outcomes['pp'].tolist(),
+                         pp_filter.predict(frames).tolist())
+        self.assertTrue(pp_filter(pd.DataFrame({'data': []})).empty)
+
+    def test_should_serialize(self):
+        frames, labels = create_frames()
+        pp_filter = PPFilter().fit(frames, labels)
+        restored = PPFilter.loads(pp_filter.dumps())
+        self.assertEqual(restored.accuracy, pp_filter.accuracy)
+        self.assertEqual(restored.reduction, pp_filter.reduction)
+        np.testing.assert_array_equal(restored.scores(frames),
+                                      pp_filter.scores(frames))
+
+    def test_should_need_frames_with_and_without_label(self):
+        frames, _ = create_frames(10)
+        with self.assertRaises(ValueError):
+            PPFilter().fit(frames, [True] * 10)
+        with self.assertRaises(ValueError):
+            PPFilter().fit(frames, [False] * 9)
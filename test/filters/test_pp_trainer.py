@@ -0,0 +1,211 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.pp_filter import PPFilterMetadata
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.configuration.configuration_manager import ConfigurationManager
+from src.executor.pp_executor import PPExecutor
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.filters.pp_filter import PPFilter
+from src.filters.pp_trainer import PPFilterTrainer, holds_label
+from src.models.storage.batch import Batch
+from src.optimizer.operators import LogicalGet
+from src.optimizer.rules.rules import LogicalGetToPPScan
+from src.planner.seq_scan_plan import SeqScanPlan
+from src.planner.storage_plan import StoragePlan
+from src.planner.types import PlanOprType
+from src.storage.udf_result_cache import (UdfResultCache, table_key,
+                                          udf_key)
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+from test.executor.utils import DummyExecutor
+from test.filters.test_pp_filter import NUM_FRAMES, create_frames
+
+
+class PPFilterTrainerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = UdfResultCache()
+        self.cache.reset(path=os.path.join(self.cache_dir, 'udf.db'),
+                         capacity=10 ** 8, enabled=True)
+        self.table = DataFrameMetadata('dataset', 'dataset')
+        self.table._id = 1
+        self.udf = MagicMock(spec=AbstractClassifierUDF)
+        self.udf.name = 'classifier'
+        self.udf.version = '1'
+        self.frames, self.labels = create_frames()
+        self.addCleanup(PPFilterTrainer._attempts.clear)
+
+    def tearDown(self):
+        self.cache.reset(path='udf_cache.db', enabled=False)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def read(self, table, batch_mem_size, columns, predicate_func,
+             projection):
+        rows = [(i, frame) for i, frame in enumerate(self.frames)
+                if predicate_func(i)]
+        yield Batch(pd.DataFrame({'id': [i for i, _ in rows],
+                                  'data': [frame for _, frame in rows]}))
+
+    def cache_outputs(self, frame_ids):
+        self.cache.put(udf_key(self.udf, ['data']), table_key(self.table),
+                       frame_ids,
+                       pd.DataFrame({'label': [
+                           ['car'] if self.labels[i] else ['person']
+                           for i in frame_ids]}))
+
+    @patch('src.filters.pp_trainer.CatalogManager')
+    @patch('src.filters.pp_trainer.StorageEngine')
+    def test_should_train_from_cached_outputs(self, storage_mock,
+                                              catalog_mock):
+        storage_mock.read.side_effect = self.read
+        self.cache_outputs(list(range(NUM_FRAMES)))
+        trainer = PPFilterTrainer()
+        trainer.min_samples = 100
+
+        metadata = trainer.train(self.table, self.udf, 'label', 'car',
+                                 accuracy=0.9)
+        self.assertEqual(metadata, catalog_mock.return_value
+                         .add_pp_filter.return_value)
+        args = catalog_mock.return_value.add_pp_filter.call_args[0]
+        self.assertEqual(args[:4], ('classifier', 1, 'label', 'car'))
+        self.assertGreaterEqual(args[4], 0.9)
+        pp_filter = PPFilter.loads(args[6])
+        self.assertEqual((pp_filter.accuracy, pp_filter.reduction),
+                         args[4:6])
+
+    @patch('src.filters.pp_trainer.CatalogManager')
+    @patch('src.filters.pp_trainer.StorageEngine')
+    def test_should_not_train_without_enough_outputs(self, storage_mock,
+                                                     catalog_mock):
+        storage_mock.read.side_effect = self.read
+        trainer = PPFilterTrainer()
+        trainer.min_samples = 100
+        self.cache_outputs(list(range(50)))
+        self.assertIsNone(trainer.train(self.table, self.udf, 'label',
+                                        'car'))
+
+        # the label is never found
+        self.cache_outputs(list(range(NUM_FRAMES)))
+        self.assertIsNone(trainer.train(self.table, self.udf, 'label',
+                                        'truck'))
+        catalog_mock.return_value.add_pp_filter.assert_not_called()
+
+    def label_predicate(self):
+        label = FunctionExpression(self.udf, output='label',
+                                   children=[TupleValueExpression('data')])
+        return ComparisonExpression(ExpressionType.COMPARE_CONTAINS, label,
+                                    ConstantValueExpression(['car']))
+
+    @patch('src.optimizer.cost_model.CatalogManager')
+    @patch('src.optimizer.rules.rules.CatalogManager')
+    @patch('src.filters.pp_trainer.CatalogManager')
+    @patch('src.filters.pp_trainer.StorageEngine')
+    def test_should_scan_with_trained_filter(self, storage_mock,
+                                             catalog_mock, rules_catalog_mock,
+                                             cost_catalog_mock):
+        storage_mock.read.side_effect = self.read
+        filters = {}
+
+        def add_pp_filter(udf_name, table_id, output, label, accuracy,
+                          reduction, model):
+            filters[(udf_name, table_id, output, label)] = \
+                PPFilterMetadata(output, label, accuracy, reduction, model)
+            return filters[(udf_name, table_id, output, label)]
+
+        catalog = catalog_mock.return_value
+        catalog.add_pp_filter.side_effect = add_pp_filter
+        catalog.get_pp_filter.side_effect = lambda *key: filters.get(key)
+        rules_catalog_mock.return_value = catalog
+        cost_catalog_mock.return_value.get_table_statistics.return_value = \
+            None
+        cost_catalog_mock.return_value.get_udf_profile.return_value = None
+        self.table.schema = [
+            DataFrameColumn('id', ColumnType.INTEGER, False),
+            DataFrameColumn('data', ColumnType.NDARRAY, False,
+                            NdArrayType.UINT8, [16, 16, 3])]
+        predicate = self.label_predicate()
+        # the query evaluating the predicate cached the outputs
+        self.cache_outputs(list(range(NUM_FRAMES)))
+        scan = SeqScanPlan(predicate, None)
+        scan.append_child(StoragePlan(self.table, 30000000))
+
+        config = ConfigurationManager().get_value('executor', 'pp_filters')
+        with patch.dict(config, {'enabled': True, 'accuracy': 0.9,
+                                 'min_samples': 100}):
+            trained = PPFilterTrainer().train_plan(scan)
+            self.assertEqual(len(trained), 1)
+            self.assertEqual(list(filters), [('classifier', 1, 'label',
+                                              'car')])
+            # trained once
+            self.assertEqual(PPFilterTrainer().train_plan(scan), [])
+            storage_mock.read.assert_called_once()
+
+            logi_get = LogicalGet(MagicMock(), self.table)
+            logi_get.predicate = predicate
+            rule = LogicalGetToPPScan()
+            self.assertTrue(rule.check(logi_get, MagicMock()))
+            pp_scan = rule.apply(logi_get, MagicMock())
+        while pp_scan.opr_type != PlanOprType.PP_FILTER:
+            pp_scan = pp_scan.children[0]
+
+        # frames the filter was not trained on
+        frames, labels = create_frames(seed=1)
+        executor = PPExecutor(pp_scan)
+        executor.append_child(DummyExecutor([Batch(pd.DataFrame(
+            {'id': np.arange(NUM_FRAMES), 'data': frames}))]))
+        passed = np.isin(np.arange(NUM_FRAMES), np.concatenate(
+            [batch.frames['id'].to_numpy() for batch in executor.exec()]))
+        self.assertGreaterEqual(passed[labels].mean(), 0.9)
+        self.assertLess(passed[~labels].mean(), 0.2)
+
+    @patch('src.filters.pp_trainer.CatalogManager')
+    @patch('src.filters.pp_trainer.StorageEngine')
+    def test_should_retry_training_with_more_outputs(self, storage_mock,
+                                                     catalog_mock):
+        storage_mock.read.side_effect = self.read
+        catalog_mock.return_value.get_pp_filter.return_value = None
+        trainer = PPFilterTrainer()
+        trainer.min_samples = 50
+        predicate = self.label_predicate()
+        self.cache_outputs(list(range(60)))
+        with patch.object(trainer, 'train', return_value=None) as train:
+            trainer.train_missing(self.table, predicate)
+            trainer.train_missing(self.table, predicate)
+            self.assertEqual(train.call_count, 1)
+            self.cache_outputs(list(range(110)))
+            trainer.train_missing(self.table, predicate)
+            self.assertEqual(train.call_count, 2)
+
+    def test_holds_label(self):
+        self.assertTrue(holds_label(['car', 'person'], 'car'))
+        self.assertTrue(holds_label('car', 'car'))
+        self.assertFalse(holds_label(['person'], 'car'))
+        self.assertFalse(holds_label(None, 'car'))
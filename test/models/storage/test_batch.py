@@ -133,3 +133,18 @@ class BatchTest(unittest.TestCase):
     def test_should_return_empty_dataframe(self):
         batch = Batch()
         self.assertEqual(batch, Batch(create_dataframe(0)))
+
+    def test_filter_should_select_rows_by_mask(self):
+        batch = Batch(frames=create_dataframe(4))
+        filtered = batch.filter(np.array([True, False, True, False]))
+        expected = create_dataframe(4).iloc[[0, 2]].reset_index(drop=True)
+        self.assertEqual(filtered, Batch(frames=expected))
+        # the frames are shared, not copied
+        self.assertIs(filtered.frames['data'][1], batch.frames['data'][2])
+        # a single column of outcomes is accepted
+        self.assertEqual(batch.filter(pd.DataFrame([True, False, True,
+                                                    False])), filtered)
+        self.assertIs(batch.filter([True] * 4), batch)
+        self.assertTrue(batch.filter([False] * 4).empty())
+        with self.assertRaises(ValueError):
+            batch.filter([True, False])
@@ -0,0 +1,127 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.models.storage.columnar_batch import ColumnarBatch
+
+NUM_FRAMES = 10
+
+
+def create_columnar_batch(num_frames=NUM_FRAMES):
+    data = np.arange(num_frames * 2 * 2 * 3, dtype=np.uint8)
+    return ColumnarBatch({'id': np.arange(num_frames),
+                          'data': data.reshape(num_frames, 2, 2, 3)})
+
+
+class ColumnarBatchTest(unittest.TestCase):
+
+    def test_frame_columns_are_stacked(self):
+        frames = pd.DataFrame({'id': [0, 1],
+                               'data': [np.zeros((2, 2, 3), np.uint8),
+                                        np.ones((2, 2, 3), np.uint8)]})
+        batch = ColumnarBatch.from_frames(frames)
+        data = batch.column_as_numpy_array('data')
+        self.assertEqual(data.shape, (2, 2, 2, 3))
+        self.assertEqual(data.dtype, np.uint8)
+        self.assertTrue(data.flags['C_CONTIGUOUS'])
+        self.assertEqual(batch, ColumnarBatch.from_batch(Batch(frames)))
+
+    def test_frames_shim(self):
+        batch = create_columnar_batch()
+        frames = batch.frames
+        self.assertEqual(list(frames.columns), ['id', 'data'])
+        self.assertEqual(len(frames), NUM_FRAMES)
+        self.assertTrue(np.shares_memory(frames['data'][3],
+                                         batch.columns['data']))
+        self.assertEqual(Batch(frames), batch)
+
+    def test_slicing_and_projection_do_not_copy(self):
+        batch = create_columnar_batch()
+        data = batch.columns['data']
+        self.assertTrue(np.shares_memory(batch[2:5].columns['data'], data))
+        self.assertTrue(np.shares_memory(batch.project(['data'])
+                                         .columns['data'], data))
+        self.assertEqual(batch[-1].columns['id'].tolist(), [NUM_FRAMES - 1])
+        self.assertEqual(batch[[4, 1]].columns['id'].tolist(), [4, 1])
+
+    def test_concat_rejoins_adjacent_views(self):
+        batch = create_columnar_batch()
+        data = batch.columns['data']
+        parts = [batch[0:3], batch[3:7], batch[7:]]
+
+        joined = Batch.concat(parts, copy=False)
+        self.assertIsInstance(joined, ColumnarBatch)
+        self.assertTrue(np.shares_memory(joined.columns['data'], data))
+        self.assertEqual(joined, batch)
+
+        copied = Batch.concat(parts, copy=True)
+        self.assertFalse(np.shares_memory(copied.columns['data'], data))
+        self.assertEqual(copied, batch)
+
+        shuffled = Batch.concat([parts[1], parts[0]], copy=False)
+        self.assertEqual(shuffled.columns['id'].tolist(),
+                         [3, 4, 5, 6, 0, 1, 2])
+
+    def test_merge_column_wise(self):
+        batch = create_columnar_batch()
+        merged = Batch.merge_column_wise([batch.project(['id']),
+                                          batch.project(['data'])])
+        self.assertIsInstance(merged, ColumnarBatch)
+        self.assertEqual(merged, batch)
+        mixed = Batch.merge_column_wise([batch.project(['id']),
+                                         Batch(pd.DataFrame(
+                                             {'label': ['a'] * NUM_FRAMES}))])
+        self.assertEqual(list(mixed.frames.columns), ['id', 'label'])
+
+    def test_sort_and_reverse(self):
+        batch = create_columnar_batch()
+        batch.reverse()
+        self.assertEqual(batch.columns['id'].tolist(),
+                         list(reversed(range(NUM_FRAMES))))
+        batch.sort()
+        self.assertEqual(batch, create_columnar_batch())
+        batch.sort_orderby(['id'], [False])
+        self.assertEqual(batch.columns['id'][0], NUM_FRAMES - 1)
+        with self.assertRaises(KeyError):
+            batch.sort_orderby(['label'], [True])
+
+    def test_add(self):
+        batch = create_columnar_batch()
+        self.assertEqual(batch[:4] + batch[4:], batch)
+        self.assertEqual(ColumnarBatch() + batch, batch)
+
+    def test_mismatched_column_lengths(self):
+        with self.assertRaises(ValueError):
+            ColumnarBatch({'id': np.arange(3), 'label': np.arange(2)})
+
+    def test_filter(self):
+        batch = create_columnar_batch()
+        data = batch.columns['data']
+        ids = np.arange(NUM_FRAMES)
+        # a contiguous run of rows is a view
+        run = batch.filter((ids >= 2) & (ids < 5))
+        self.assertIsInstance(run, ColumnarBatch)
+        self.assertEqual(run.columns['id'].tolist(), [2, 3, 4])
+        self.assertTrue(np.shares_memory(run.columns['data'], data))
+
+        even = batch.filter(pd.DataFrame(ids % 2 == 0))
+        self.assertEqual(even.columns['id'].tolist(), [0, 2, 4, 6, 8])
+        np.testing.assert_array_equal(even.columns['data'], data[::2])
+        self.assertIs(batch.filter(ids >= 0), batch)
+        self.assertTrue(batch.filter(ids < 0).empty())
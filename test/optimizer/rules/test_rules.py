@@ -1,15 +1,21 @@
+import os
+import tempfile
 import unittest
 
-from mock import MagicMock
+import pandas as pd
+from mock import MagicMock, patch
 
 from src.optimizer.operators import (LogicalGet, LogicalProject, LogicalFilter,
                                      LogicalQueryDerivedGet, LogicalSample,
-                                     Dummy)
+                                     LogicalUdfCacheLookup,
+                                     LogicalUdfResidual, Dummy)
 from src.optimizer.rules.rules import (EmbedProjectIntoGet, EmbedFilterIntoGet,
                                        EmbedFilterIntoDerivedGet,
                                        EmbedProjectIntoDerivedGet,
                                        PushdownFilterThroughSample,
                                        PushdownProjectThroughSample,
+                                       EmbedSampleIntoGet,
+                                       SplitGetIntoUdfCacheLookup,
                                        LogicalCreateToPhysical,
                                        LogicalCreateUDFToPhysical,
                                        LogicalInsertToPhysical,
@@ -17,11 +23,30 @@ from src.optimizer.rules.rules import (EmbedProjectIntoGet, EmbedFilterIntoGet,
                                        LogicalUploadToPhysical,
                                        LogicalSampleToUniformSample,
                                        LogicalGetToSeqScan,
+                                       LogicalGetToPPScan,
                                        LogicalDerivedGetToPhysical,
+                                       LogicalUdfCacheLookupToPhysical,
+                                       LogicalUdfResidualToPhysical,
                                        LogicalUnionToPhysical,
                                        LogicalOrderByToPhysical,
                                        LogicalLimitToPhysical)
 from src.optimizer.rules.rules import Promise, RulesManager
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.models.pp_filter import PPFilterMetadata
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.configuration.configuration_manager import ConfigurationManager
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.expression.logical_expression import LogicalExpression
+from src.filters.pp_filter import PPFilter
+from src.planner.types import PlanOprType
+from src.storage.udf_result_cache import UdfResultCache, table_key
+from src.udfs.abstract_udfs import AbstractClassifierUDF
 
 
 class TestRules(unittest.TestCase):
@@ -36,6 +61,10 @@ class TestRules(unittest.TestCase):
                         Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.PUSHDOWN_PROJECT_THROUGH_SAMPLE >
                         Promise.IMPLEMENTATION_DELIMETER)
+        self.assertTrue(Promise.EMBED_SAMPLE_INTO_GET >
+                        Promise.IMPLEMENTATION_DELIMETER)
+        self.assertTrue(Promise.SPLIT_GET_INTO_UDF_CACHE_LOOKUP >
+                        Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.EMBED_FILTER_INTO_GET >
                         Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.EMBED_PROJECT_INTO_GET >
@@ -50,6 +79,12 @@ class TestRules(unittest.TestCase):
                         Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.LOGICAL_GET_TO_SEQSCAN <
                         Promise.IMPLEMENTATION_DELIMETER)
+        self.assertTrue(Promise.LOGICAL_UDF_CACHE_LOOKUP_TO_PHYSICAL <
+                        Promise.IMPLEMENTATION_DELIMETER)
+        self.assertTrue(Promise.LOGICAL_UDF_RESIDUAL_TO_PHYSICAL <
+                        Promise.IMPLEMENTATION_DELIMETER)
+        self.assertTrue(Promise.LOGICAL_GET_TO_PP_SCAN <
+                        Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.LOGICAL_INSERT_TO_PHYSICAL <
                         Promise.IMPLEMENTATION_DELIMETER)
         self.assertTrue(Promise.LOGICAL_LIMIT_TO_PHYSICAL <
@@ -72,7 +107,9 @@ class TestRules(unittest.TestCase):
                                    EmbedFilterIntoDerivedGet(),
                                    EmbedProjectIntoDerivedGet(),
                                    PushdownFilterThroughSample(),
-                                   PushdownProjectThroughSample()]
+                                   PushdownProjectThroughSample(),
+                                   EmbedSampleIntoGet(),
+                                   SplitGetIntoUdfCacheLookup()]
         self.assertEqual(len(supported_rewrite_rules),
                          len(RulesManager().rewrite_rules))
         # check all the rule instance exists
@@ -88,7 +125,10 @@ class TestRules(unittest.TestCase):
             LogicalUploadToPhysical(),
             LogicalSampleToUniformSample(),
             LogicalGetToSeqScan(),
+            LogicalGetToPPScan(),
             LogicalDerivedGetToPhysical(),
+            LogicalUdfCacheLookupToPhysical(),
+            LogicalUdfResidualToPhysical(),
             LogicalUnionToPhysical(),
             LogicalOrderByToPhysical(),
             LogicalLimitToPhysical()]
@@ -175,3 +215,250 @@ class TestRules(unittest.TestCase):
         rewrite_opr = rule.apply(logi_project, MagicMock())
         self.assertEqual(rewrite_opr, sample)
         self.assertEqual(rewrite_opr.children[0].target_list, target_list)
+
+    # EmbedSampleIntoGet
+    def test_embed_sample_into_get(self):
+        rule = EmbedSampleIntoGet()
+        logi_get = LogicalGet(MagicMock(), MagicMock())
+        sample = LogicalSample(ConstantValueExpression(7), [logi_get])
+        self.assertTrue(rule.check(sample, MagicMock()))
+
+        rewrite_opr = rule.apply(sample, MagicMock())
+        self.assertEqual(rewrite_opr, logi_get)
+        self.assertEqual(rewrite_opr.sample_freq, 7)
+
+        # the rows passing a predicate are sampled above the scan
+        logi_get = LogicalGet(MagicMock(), MagicMock())
+        logi_get.predicate = MagicMock()
+        sample = LogicalSample(ConstantValueExpression(7), [logi_get])
+        self.assertFalse(rule.check(sample, MagicMock()))
+
+    # LogicalGetToSeqScan
+    def _create_table(self):
+        table = DataFrameMetadata('dataset', 'dataset')
+        table.schema = [DataFrameColumn('id', ColumnType.INTEGER, False),
+                        DataFrameColumn('data', ColumnType.NDARRAY, False,
+                                        NdArrayType.UINT8, [2, 2, 3])]
+        return table
+
+    def test_get_to_seq_scan_pushes_down_id_predicate_and_projection(self):
+        id_predicate = ComparisonExpression(ExpressionType.COMPARE_LESSER,
+                                            TupleValueExpression('id'),
+                                            ConstantValueExpression(100))
+        logi_get = LogicalGet(MagicMock(), self._create_table())
+        logi_get.predicate = id_predicate
+        logi_get.target_list = [TupleValueExpression('id')]
+
+        seq_scan = LogicalGetToSeqScan().apply(logi_get, MagicMock())
+        storage_plan = seq_scan.children[0]
+        self.assertIsNone(seq_scan.predicate)
+        self.assertEqual(storage_plan.predicate, id_predicate)
+        self.assertEqual(storage_plan.columns, ['id'])
+        self.assertEqual(storage_plan.skip_frames, 0)
+
+    def test_get_to_seq_scan_samples_in_storage(self):
+        logi_get = LogicalGet(MagicMock(), self._create_table())
+        logi_get.sample_freq = 5
+        seq_scan = LogicalGetToSeqScan().apply(logi_get, MagicMock())
+        self.assertEqual(seq_scan.children[0].skip_frames, 5)
+
+    def test_get_to_seq_scan_keeps_frame_predicates_in_scan(self):
+        id_predicate = ComparisonExpression(ExpressionType.COMPARE_GREATER,
+                                            TupleValueExpression('id'),
+                                            ConstantValueExpression(3))
+        udf_predicate = ComparisonExpression(
+            ExpressionType.COMPARE_EQUAL,
+            FunctionExpression(MagicMock(),
+                               children=[TupleValueExpression('data')]),
+            ConstantValueExpression(1))
+        logi_get = LogicalGet(MagicMock(), self._create_table())
+        logi_get.predicate = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                               id_predicate, udf_predicate)
+        logi_get.target_list = [TupleValueExpression('id')]
+
+        seq_scan = LogicalGetToSeqScan().apply(logi_get, MagicMock())
+        # frames are read ahead of the udf
+        prefetch = seq_scan.children[0]
+        self.assertEqual(prefetch.opr_type, PlanOprType.PREFETCH)
+        storage_plan = prefetch.children[0]
+        self.assertEqual(seq_scan.predicate, udf_predicate)
+        self.assertEqual(storage_plan.predicate, id_predicate)
+        # data is still needed by the udf, nothing to project
+        self.assertIsNone(storage_plan.columns)
+
+    @patch('src.optimizer.rules.rules.ConfigurationManager')
+    def test_get_to_seq_scan_prefetch_is_configurable(self, config_mock):
+        udf_expr = FunctionExpression(MagicMock(),
+                                      children=[TupleValueExpression('data')])
+        logi_get = LogicalGet(MagicMock(), self._create_table())
+        logi_get.target_list = [udf_expr]
+        config_mock.return_value.get_value.side_effect = \
+            lambda section, key: {'batch_mem_size': 1,
+                                  'prefetch': {'enabled': True,
+                                               'batches': 4}}[key]
+        prefetch = LogicalGetToSeqScan().apply(logi_get,
+                                               MagicMock()).children[0]
+        self.assertEqual(prefetch.queue_size, 4)
+        self.assertEqual(prefetch.children[0].opr_type,
+                         PlanOprType.STORAGE_PLAN)
+
+        config_mock.return_value.get_value.side_effect = \
+            lambda section, key: {'batch_mem_size': 1,
+                                  'prefetch': {'enabled': False}}[key]
+        self.assertEqual(LogicalGetToSeqScan().apply(logi_get, MagicMock())
+                         .children[0].opr_type, PlanOprType.STORAGE_PLAN)
+
+    def _classifier_call(self):
+        udf = MagicMock(spec=AbstractClassifierUDF)
+        udf.name = 'classifier'
+        udf.version = '1'
+        return FunctionExpression(udf, output='label',
+                                  children=[TupleValueExpression('data')])
+
+    def _udf_cache(self, cache_dir, enabled=True):
+        cache = UdfResultCache()
+        cache.reset(path=os.path.join(cache_dir, 'udf.db'),
+                    capacity=10 ** 8, enabled=enabled)
+        self.addCleanup(cache.reset, path='udf_cache.db', enabled=False)
+        return cache
+
+    def test_split_get_into_udf_cache_lookup(self):
+        id_predicate = ComparisonExpression(ExpressionType.COMPARE_LESSER,
+                                            TupleValueExpression('id'),
+                                            ConstantValueExpression(100))
+        udf_predicate = ComparisonExpression(
+            ExpressionType.COMPARE_CONTAINS, self._classifier_call(),
+            ConstantValueExpression(['car']))
+        udf_expr = udf_predicate.children[0]
+        target_list = [TupleValueExpression('id'), self._classifier_call()]
+        table = self._create_table()
+        logi_get = LogicalGet(MagicMock(), table)
+        logi_get.predicate = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                               id_predicate, udf_predicate)
+        logi_get.target_list = target_list
+        logi_get.sample_freq = 2
+        rule = SplitGetIntoUdfCacheLookup()
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = self._udf_cache(cache_dir)
+            # nothing to reuse
+            self.assertFalse(rule.check(logi_get, MagicMock()))
+            cache.put(udf_expr.cache_key, table_key(table), range(1000),
+                      pd.DataFrame({'label': [['car']] * 1000}))
+            self.assertTrue(rule.check(logi_get, MagicMock()))
+            cache.reset(enabled=False)
+            self.assertFalse(rule.check(logi_get, MagicMock()))
+
+        derived_get = rule.apply(logi_get, MagicMock())
+        self.assertIsInstance(derived_get, LogicalQueryDerivedGet)
+        self.assertEqual(derived_get.predicate, udf_predicate)
+        self.assertEqual(derived_get.target_list, target_list)
+        residual = derived_get.children[0]
+        self.assertIsInstance(residual, LogicalUdfResidual)
+        lookup = residual.children[0]
+        self.assertIsInstance(lookup, LogicalUdfCacheLookup)
+        # the call in the predicate and the target list is looked up once
+        self.assertEqual(len(residual.func_exprs), 1)
+        self.assertEqual(residual.func_exprs[0].cache_key, udf_expr.cache_key)
+        self.assertEqual(lookup.func_exprs, residual.func_exprs)
+        self.assertEqual(udf_expr.cache_table, table_key(table))
+        self.assertEqual(target_list[1].cache_table, table_key(table))
+        scan = lookup.children[0]
+        self.assertEqual(scan.predicate, id_predicate)
+        self.assertIsNone(scan.target_list)
+        self.assertEqual(scan.sample_freq, 2)
+        # the get left has no call to split
+        self.assertFalse(rule.check(scan, MagicMock()))
+
+    def test_split_get_into_udf_cache_lookup_needs_classifier_udf(self):
+        logi_get = LogicalGet(MagicMock(), self._create_table())
+        logi_get.target_list = [TupleValueExpression('id')]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self._udf_cache(cache_dir)
+            self.assertFalse(
+                SplitGetIntoUdfCacheLookup().check(logi_get, MagicMock()))
+
+    def test_udf_cache_lookup_and_residual_to_physical(self):
+        table = self._create_table()
+        func_exprs = [self._classifier_call()]
+        lookup = LogicalUdfCacheLookupToPhysical().apply(
+            LogicalUdfCacheLookup(table, func_exprs), MagicMock())
+        self.assertEqual(lookup.opr_type, PlanOprType.UDF_CACHE_LOOKUP)
+        residual = LogicalUdfResidualToPhysical().apply(
+            LogicalUdfResidual(table, func_exprs), MagicMock())
+        self.assertEqual(residual.opr_type, PlanOprType.UDF_RESIDUAL)
+        for plan in [lookup, residual]:
+            self.assertEqual(plan.table, table)
+            self.assertEqual(plan.func_exprs, func_exprs)
+
+    @staticmethod
+    def _pp_filters_enabled():
+        return patch.dict(
+            ConfigurationManager().get_value('executor', 'pp_filters'),
+            {'enabled': True})
+
+    def _label_get(self):
+        udf = MagicMock(spec=AbstractClassifierUDF)
+        udf.name = 'classifier'
+        data = TupleValueExpression('data')
+        label_predicate = ComparisonExpression(
+            ExpressionType.COMPARE_CONTAINS,
+            FunctionExpression(udf, output='label', children=[data]),
+            ConstantValueExpression(['car']))
+        id_predicate = ComparisonExpression(ExpressionType.COMPARE_GREATER,
+                                            TupleValueExpression('id'),
+                                            ConstantValueExpression(3))
+        table = self._create_table()
+        table._id = 1
+        logi_get = LogicalGet(MagicMock(), table)
+        logi_get.predicate = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                               id_predicate, label_predicate)
+        logi_get.target_list = [TupleValueExpression('id')]
+        return logi_get, id_predicate
+
+    @patch('src.optimizer.cost_model.CatalogManager')
+    @patch('src.optimizer.rules.rules.CatalogManager')
+    def test_get_to_pp_scan_filters_frames_before_udf(self, catalog_mock,
+                                                      cost_catalog_mock):
+        cost_catalog_mock.return_value.get_table_statistics.return_value = \
+            None
+        cost_catalog_mock.return_value.get_udf_profile.return_value = None
+        logi_get, id_predicate = self._label_get()
+        get_pp_filter = catalog_mock.return_value.get_pp_filter
+        get_pp_filter.return_value = PPFilterMetadata(
+            'label', 'car', 0.97, 0.8, PPFilter().dumps())
+        rule = LogicalGetToPPScan()
+        self.assertFalse(rule.check(logi_get, MagicMock()))
+
+        rule = LogicalGetToPPScan()
+        with self._pp_filters_enabled(), \
+                patch('src.optimizer.rules.rules.PPFilter.loads',
+                      wraps=PPFilter.loads) as loads:
+            self.assertTrue(rule.check(logi_get, MagicMock()))
+            loads.assert_not_called()
+            seq_scan = rule.apply(logi_get, MagicMock())
+        # looked up by check and again by apply
+        self.assertEqual(get_pp_filter.call_count, 2)
+        get_pp_filter.assert_called_with('classifier', 1, 'label', 'car')
+        pp_scan = seq_scan.children[0].children[0]
+        self.assertEqual(pp_scan.opr_type, PlanOprType.PP_FILTER)
+        self.assertIsInstance(pp_scan.predicate.function, PPFilter)
+        self.assertEqual(pp_scan.predicate.children,
+                         [TupleValueExpression('data')])
+        self.assertEqual(pp_scan.children[0].predicate, id_predicate)
+        # the exact predicate is still evaluated by the scan
+        self.assertEqual(seq_scan.predicate.etype,
+                         ExpressionType.COMPARE_CONTAINS)
+
+    @patch('src.optimizer.rules.rules.CatalogManager')
+    def test_get_to_pp_scan_needs_accurate_filter(self, catalog_mock):
+        logi_get, _ = self._label_get()
+        get_pp_filter = catalog_mock.return_value.get_pp_filter
+        get_pp_filter.return_value = None
+        with self._pp_filters_enabled():
+            self.assertFalse(
+                LogicalGetToPPScan().check(logi_get, MagicMock()))
+            get_pp_filter.return_value = PPFilterMetadata(
+                'label', 'car', 0.5, 0.9, PPFilter().dumps())
+            self.assertFalse(
+                LogicalGetToPPScan().check(logi_get, MagicMock()))
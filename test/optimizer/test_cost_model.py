@@ -0,0 +1,150 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.catalog.models.udf_profile import UdfProfile
+from src.catalog.table_statistics import build_histogram
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.optimizer.cost_model import (CostModel, CACHE_LOOKUP_MS,
+                                      CACHE_STORE_MS, DEFAULT_CARDINALITY,
+                                      MB, SCAN_MS_PER_MB)
+from src.filters.pp_filter import PPFilter
+from src.optimizer.group_expression import GroupExpression
+from src.planner.pp_plan import PPScanPlan
+from src.planner.seq_scan_plan import SeqScanPlan
+from src.planner.storage_plan import StoragePlan
+from src.planner.udf_cache_lookup_plan import UdfCacheLookupPlan
+from src.planner.udf_residual_plan import UdfResidualPlan
+from src.storage.udf_result_cache import (UdfResultCache, table_key,
+                                          udf_key)
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+
+
+class CostModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = UdfResultCache()
+        self.cache.reset(path=os.path.join(self.cache_dir, 'udf.db'),
+                         capacity=10 ** 8, enabled=True)
+        self.table = DataFrameMetadata('dataset', 'dataset')
+        self.udf = MagicMock(spec=AbstractClassifierUDF)
+        self.udf.name = 'classifier'
+        self.udf.version = '1'
+
+    def tearDown(self):
+        self.cache.reset(path='udf_cache.db', enabled=False)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def udf_expr(self):
+        return FunctionExpression(self.udf,
+                                  children=[TupleValueExpression('data')])
+
+    def scan_cost(self, storage_predicate=None, pp_reduction=None,
+                  skip_frames=0):
+        plan = SeqScanPlan(None, [self.udf_expr()])
+        storage = StoragePlan(self.table, batch_mem_size=1,
+                              skip_frames=skip_frames,
+                              predicate=storage_predicate)
+        if pp_reduction is not None:
+            pp_filter = PPFilter()
+            pp_filter.reduction = pp_reduction
+            pp_scan = PPScanPlan(FunctionExpression(pp_filter, output='pp'))
+            pp_scan.append_child(storage)
+            storage = pp_scan
+        plan.append_child(storage)
+        return CostModel().calculate_cost(GroupExpression(plan))
+
+    def lookup_costs(self):
+        return [CostModel().calculate_cost(GroupExpression(
+            plan(self.table, [self.udf_expr()])))
+            for plan in [UdfCacheLookupPlan, UdfResidualPlan]]
+
+    def cache_frames(self, num_frames):
+        self.cache.put(udf_key(self.udf, ['data']), table_key(self.table),
+                       list(range(num_frames)),
+                       pd.DataFrame({'label': ['car'] * num_frames}))
+
+    def test_should_not_look_up_without_cached_results(self):
+        self.assertFalse(CostModel().udf_cache_lookup_saves(
+            self.table, [self.udf_expr()]))
+
+    def test_should_look_up_cached_results(self):
+        self.cache_frames(DEFAULT_CARDINALITY // 2)
+        self.assertTrue(CostModel().udf_cache_lookup_saves(
+            self.table, [self.udf_expr()]))
+
+    def test_should_cost_lookup_and_residual_frames(self):
+        lookup, residual = self.lookup_costs()
+        self.assertAlmostEqual(lookup, DEFAULT_CARDINALITY * CACHE_LOOKUP_MS)
+        self.cache_frames(DEFAULT_CARDINALITY // 2)
+        self.assertEqual(self.lookup_costs()[0], lookup)
+        self.assertAlmostEqual(self.lookup_costs()[1], residual / 2)
+
+    def test_should_cost_storing_udf_outputs(self):
+        cached = self.scan_cost()
+        self.cache.reset(enabled=False)
+        self.assertGreater(self.scan_cost(), 0)
+        self.assertAlmostEqual(cached - self.scan_cost(),
+                               DEFAULT_CARDINALITY * CACHE_STORE_MS)
+
+    @patch('src.optimizer.cost_model.CatalogManager')
+    def test_should_use_table_statistics_and_udf_profile(self, catalog_mock):
+        self.cache.reset(enabled=False)
+        self.table._id = 1
+        catalog = catalog_mock.return_value
+        catalog.get_table_statistics.return_value = DataFrameStatistics(
+            100, [2, 2, 3],
+            {'id': build_histogram(np.arange(100), num_buckets=100)})
+        profile = UdfProfile('cpu', 1)
+        profile.add_call(1, 10.0)
+        profile.add_call(4, 16.0)
+        catalog.get_udf_profile.return_value = profile
+
+        # 8 ms per call, 2 ms per frame; batches of 1 frame
+        self.assertAlmostEqual(self.scan_cost(),
+                               100 * (8 + 2) + 100 * 12 / MB * SCAN_MS_PER_MB)
+        id_predicate = ComparisonExpression(ExpressionType.COMPARE_LEQ,
+                                            TupleValueExpression('id'),
+                                            ConstantValueExpression(9))
+        self.assertAlmostEqual(
+            self.scan_cost(id_predicate),
+            10 * (8 + 2) + 10 * 12 / MB * SCAN_MS_PER_MB)
+
+    def test_should_weigh_pp_filters(self):
+        self.cache.reset(enabled=False)
+        self.assertLess(self.scan_cost(pp_reduction=0.5),
+                        self.scan_cost())
+        self.assertGreater(self.scan_cost(pp_reduction=0.0),
+                           self.scan_cost())
+
+    def test_should_cost_sampled_frames(self):
+        self.cache.reset(enabled=False)
+        self.assertAlmostEqual(self.scan_cost(skip_frames=4),
+                               self.scan_cost() / 4)
@@ -46,8 +46,8 @@ class OptimizerUtilsTest(unittest.TestCase):
         self.assertEqual(tuple_expr.col_object, column_map['col1'])
 
     @patch('src.optimizer.optimizer_utils.CatalogManager')
-    @patch('src.optimizer.optimizer_utils.path_to_class')
-    def test_bind_function_value_expr(self, mock_str_path, mock_catalog):
+    @patch('src.optimizer.optimizer_utils.UdfRegistry')
+    def test_bind_function_value_expr(self, mock_registry, mock_catalog):
         func_expr = FunctionExpression(None, name='temp')
         mock_output = MagicMock()
         mock_output.name = 'name'
@@ -56,9 +56,9 @@ class OptimizerUtilsTest(unittest.TestCase):
         bind_function_expr(func_expr, None)
 
         mock_catalog.return_value.get_udf_by_name.assert_called_with('temp')
-        mock_str_path.assert_called_with('path', 'name')
+        mock_registry.return_value.get.assert_called_with('name', 'path')
         self.assertEqual(func_expr.function,
-                         mock_str_path.return_value.return_value)
+                         mock_registry.return_value.get.return_value)
 
     def test_column_definition_to_udf_io(self):
         col = ColumnDefinition('data', ColumnType.NDARRAY, NdArrayType.UINT8,
@@ -0,0 +1,116 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+from mock import MagicMock
+
+from src.catalog.models.df_statistics import DataFrameStatistics
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.catalog.table_statistics import build_histogram
+from src.expression.abstract_expression import ExpressionType
+from src.expression.comparison_expression import ComparisonExpression
+from src.expression.constant_value_expression import ConstantValueExpression
+from src.expression.expression_utils import (conjunction_list,
+                                             disjunction_list)
+from src.expression.function_expression import FunctionExpression
+from src.expression.logical_expression import LogicalExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.storage.batch import Batch
+from src.optimizer.predicate_ordering import order_predicate
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+
+NUM_FRAMES = 100
+
+
+def compare(etype, left, value):
+    return ComparisonExpression(etype, left, ConstantValueExpression(value))
+
+
+def column(name):
+    return TupleValueExpression(col_name=name)
+
+
+class PredicateOrderingTest(unittest.TestCase):
+
+    def udf_predicate(self):
+        udf = MagicMock(spec=AbstractClassifierUDF)
+        udf.name = 'classifier'
+        self.frames_seen = []
+
+        def classify(frames):
+            self.frames_seen.extend(frames['id'].tolist())
+            return pd.DataFrame({'label': frames['id'] % 2})
+        udf.side_effect = classify
+        func_expr = FunctionExpression(udf, output='label',
+                                       children=[column('id')])
+        return compare(ExpressionType.COMPARE_EQUAL, func_expr, 0)
+
+    def test_should_evaluate_cheap_conjuncts_before_udfs(self):
+        udf_predicate = self.udf_predicate()
+        id_predicate = compare(ExpressionType.COMPARE_LESSER, column('id'),
+                               10)
+        predicate = LogicalExpression(ExpressionType.LOGICAL_AND,
+                                      udf_predicate, id_predicate)
+
+        ordered = order_predicate(predicate)
+        self.assertEqual(conjunction_list(ordered),
+                         [id_predicate, udf_predicate])
+
+        batch = Batch(pd.DataFrame({'id': list(range(NUM_FRAMES))}))
+        outcome = ordered.evaluate(batch).frames[0].tolist()
+        self.assertEqual(outcome, [i < 10 and i % 2 == 0
+                                   for i in range(NUM_FRAMES)])
+        # the model only saw the frames passing the id predicate
+        self.assertEqual(self.frames_seen, list(range(10)))
+
+    def test_should_order_disjuncts_by_cost(self):
+        udf_predicate = self.udf_predicate()
+        id_predicate = compare(ExpressionType.COMPARE_GREATER, column('id'),
+                               90)
+        predicate = LogicalExpression(ExpressionType.LOGICAL_OR,
+                                      udf_predicate, id_predicate)
+        ordered = order_predicate(predicate)
+        self.assertEqual(disjunction_list(ordered),
+                         [id_predicate, udf_predicate])
+
+    def test_should_order_by_selectivity_with_statistics(self):
+        statistics = DataFrameStatistics(NUM_FRAMES, histograms={
+            'id': build_histogram(np.arange(NUM_FRAMES)),
+            'score': build_histogram(np.arange(NUM_FRAMES) / 10.0)})
+        score_predicate = compare(ExpressionType.COMPARE_LESSER,
+                                  column('score'), 9.0)
+        id_predicate = compare(ExpressionType.COMPARE_LESSER, column('id'),
+                               10)
+        nested = LogicalExpression(
+            ExpressionType.LOGICAL_AND, score_predicate,
+            LogicalExpression(ExpressionType.LOGICAL_AND,
+                              self.udf_predicate(), id_predicate))
+        ordered = order_predicate(nested, statistics)
+        terms = conjunction_list(ordered)
+        self.assertEqual(terms[:2], [id_predicate, score_predicate])
+        self.assertEqual(terms[2].etype, ExpressionType.COMPARE_EQUAL)
+        # rebuilt left deep
+        self.assertEqual(ordered.children[1], terms[2])
+
+    def test_should_keep_query_order_on_ties(self):
+        first = compare(ExpressionType.COMPARE_LESSER, column('a'), 1)
+        second = compare(ExpressionType.COMPARE_LESSER, column('b'), 1)
+        predicate = LogicalExpression(ExpressionType.LOGICAL_AND, first,
+                                      second)
+        self.assertEqual(conjunction_list(order_predicate(predicate)),
+                         [first, second])
+        self.assertIsNone(order_predicate(None))
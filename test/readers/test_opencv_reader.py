@@ -15,7 +15,11 @@
 import os
 import unittest
 
-from src.readers.opencv_reader import OpenCVReader
+import numpy as np
+from mock import patch
+
+from src.models.storage.columnar_batch import ColumnarBatch
+from src.readers.opencv_reader import OpenCVReader, _keyframes, _segments
 
 from test.util import create_sample_video
 from test.util import create_dummy_batches
@@ -89,3 +93,122 @@ class VideoLoaderTest(unittest.TestCase):
         expected = list(create_dummy_batches(
             filters=[i for i in range(1, NUM_FRAMES)], start_id=2))
         self.assertTrue(batches, expected)
+
+    def test_columnar_read_should_match_row_read(self):
+        for batch_mem_size in [FRAME_SIZE, FRAME_SIZE * 3,
+                               FRAME_SIZE * NUM_FRAMES]:
+            video_loader = OpenCVReader(
+                file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+                batch_mem_size=batch_mem_size,
+                offset=1,
+                start_frame_id=2,
+                columnar=True)
+            batches = list(video_loader.read())
+            expected = list(OpenCVReader(
+                file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+                batch_mem_size=batch_mem_size,
+                offset=1,
+                start_frame_id=2,
+                columnar=False).read())
+            self.assertEqual(len(batches), len(expected))
+            for batch, expected_batch in zip(batches, expected):
+                self.assertIsInstance(batch, ColumnarBatch)
+                self.assertEqual(batch, expected_batch)
+
+    def test_columnar_read_should_fill_contiguous_buffer(self):
+        video_loader = OpenCVReader(
+            file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+            batch_mem_size=FRAME_SIZE * NUM_FRAMES,
+            columnar=True)
+        batch = next(video_loader.read())
+        data = batch.column_as_numpy_array('data')
+        self.assertEqual(data.shape[0], NUM_FRAMES)
+        self.assertEqual(data.dtype, np.uint8)
+        self.assertTrue(data.flags['C_CONTIGUOUS'])
+        self.assertEqual(batch.column_as_numpy_array('id').tolist(),
+                         list(range(NUM_FRAMES)))
+
+    @patch('src.readers.opencv_reader.MIN_SEGMENT_FRAMES', 2)
+    def test_parallel_decode_should_match_sequential_decode(self):
+        for batch_mem_size in [FRAME_SIZE, FRAME_SIZE * 3,
+                               FRAME_SIZE * NUM_FRAMES]:
+            for columnar in [True, False]:
+                kwargs = {'file_url': os.path.join(PATH_PREFIX, 'dummy.avi'),
+                          'batch_mem_size': batch_mem_size,
+                          'offset': 1,
+                          'start_frame_id': 2,
+                          'columnar': columnar}
+                batches = list(OpenCVReader(decode_workers=3,
+                                            **kwargs).read())
+                expected = list(OpenCVReader(decode_workers=1,
+                                             **kwargs).read())
+                self.assertEqual(len(batches), len(expected))
+                for batch, expected_batch in zip(batches, expected):
+                    self.assertEqual(batch, expected_batch)
+
+    def test_should_read_keyframes_from_packets(self):
+        # every MJPG frame is a keyframe
+        self.assertEqual(
+            _keyframes(os.path.join(PATH_PREFIX, 'dummy.avi')),
+            (NUM_FRAMES, list(range(NUM_FRAMES))))
+
+    def test_segments_should_start_at_keyframes(self):
+        self.assertEqual(_segments([0, 5, 12, 20, 30], 0, 40, 8),
+                         [(0, 12), (12, 8), (20, 10), (30, 10)])
+        # the first segment starts at the offset, past the last keyframe
+        # the video is one segment
+        self.assertEqual(_segments([0, 5, 12], 3, 20, 4), [(3, 9), (12, 8)])
+        self.assertEqual(_segments([0], 0, 20, 4), [(0, 20)])
+
+    @patch('src.readers.opencv_reader.MIN_SEGMENT_FRAMES', 2)
+    def test_parallel_decode_should_end_at_short_last_segment(self):
+        kwargs = {'file_url': os.path.join(PATH_PREFIX, 'dummy.avi'),
+                  'batch_mem_size': FRAME_SIZE * 3}
+        # the last packet does not decode
+        keyframes = (NUM_FRAMES + 1, list(range(NUM_FRAMES + 1)))
+        for columnar in [True, False]:
+            with patch('src.readers.opencv_reader._keyframes',
+                       return_value=keyframes):
+                batches = list(OpenCVReader(decode_workers=2,
+                                            columnar=columnar,
+                                            **kwargs).read())
+            expected = list(OpenCVReader(decode_workers=1,
+                                         columnar=columnar,
+                                         **kwargs).read())
+            self.assertEqual(
+                [i for batch in batches
+                 for i in batch.column_as_numpy_array('id')],
+                list(range(NUM_FRAMES)))
+            self.assertEqual(len(batches), len(expected))
+            for batch, expected_batch in zip(batches, expected):
+                self.assertEqual(batch, expected_batch)
+
+    @patch('src.readers.opencv_reader.MIN_SEGMENT_FRAMES', 2)
+    def test_parallel_decode_should_fail_on_short_segments(self):
+        # segments past the real end of the video decode nothing
+        keyframes = (NUM_FRAMES * 2, list(range(NUM_FRAMES * 2)))
+        with patch('src.readers.opencv_reader._keyframes',
+                   return_value=keyframes):
+            reader = OpenCVReader(
+                file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+                batch_mem_size=FRAME_SIZE, decode_workers=4)
+            with self.assertRaises(RuntimeError):
+                list(reader.read())
+
+    def test_should_decode_inline_without_keyframes(self):
+        with patch('src.readers.opencv_reader._keyframes',
+                   return_value=(None, None)), \
+                patch('src.readers.opencv_reader.mp.Pool') as pool:
+            batches = list(OpenCVReader(
+                file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+                batch_mem_size=FRAME_SIZE, decode_workers=3).read())
+        pool.assert_not_called()
+        self.assertEqual(len(batches), NUM_FRAMES)
+
+    def test_short_videos_should_decode_inline(self):
+        with patch('src.readers.opencv_reader.mp.Pool') as pool:
+            batches = list(OpenCVReader(
+                file_url=os.path.join(PATH_PREFIX, 'dummy.avi'),
+                batch_mem_size=FRAME_SIZE, decode_workers=3).read())
+        pool.assert_not_called()
+        self.assertEqual(len(batches), NUM_FRAMES)
@@ -0,0 +1,164 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.storage.buffer_pool import (BufferPool, LFUPolicy, LRUPolicy,
+                                     TwoQPolicy, RandomPolicy, row_nbytes)
+
+NUM_FRAMES = 10
+
+
+class FakeTable:
+    file_url = 'dataset'
+    identifier_column = 'id'
+
+
+class FakeStorage:
+    def __init__(self):
+        self.reads = []
+
+    def read(self, table, batch_mem_size, columns=None, predicate_func=None):
+        self.reads.append(predicate_func)
+        for i in range(NUM_FRAMES):
+            if predicate_func and not predicate_func(i):
+                continue
+            yield Batch(pd.DataFrame(
+                [{'id': i, 'data': np.full((2, 2, 3), i, dtype=np.uint8)}]))
+
+
+class BufferPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeTable()
+        self.storage = FakeStorage()
+        self.pool = BufferPool()
+        self.pool.reset(capacity=NUM_FRAMES * 1000, policy='LRU',
+                        enabled=True)
+
+    def tearDown(self):
+        self.pool.reset(enabled=False)
+
+    def read_ids(self):
+        ids = []
+        for batch in self.pool.read(self.table, 1, self.storage.read):
+            ids.extend(batch.frames['id'].tolist())
+        return ids
+
+    def test_second_scan_is_served_from_pool(self):
+        self.assertEqual(self.read_ids(), list(range(NUM_FRAMES)))
+        self.assertEqual(len(self.storage.reads), 1)
+        self.assertEqual(len(self.pool), NUM_FRAMES)
+
+        self.assertEqual(self.read_ids(), list(range(NUM_FRAMES)))
+        self.assertEqual(len(self.storage.reads), 1)
+        self.assertEqual(self.pool.hits, NUM_FRAMES)
+
+    def test_evicted_frames_are_fetched_again(self):
+        row = {'id': 0, 'data': np.zeros((2, 2, 3), dtype=np.uint8)}
+        self.pool.reset(capacity=4 * row_nbytes(row))
+        self.read_ids()
+        self.assertEqual(len(self.pool), 4)
+        self.assertEqual(self.pool.evictions, NUM_FRAMES - 4)
+
+        # the misses are interleaved with the hits in scan order
+        ids = self.read_ids()
+        self.assertEqual(ids, list(range(NUM_FRAMES)))
+        self.assertEqual(len(self.storage.reads), 2)
+        self.assertFalse(self.storage.reads[1](NUM_FRAMES - 1))
+        self.assertTrue(self.storage.reads[1](0))
+
+    def test_stopped_scans_release_their_pins(self):
+        scan = self.pool.read(self.table, 1, self.storage.read)
+        next(scan)
+        scan.close()
+        self.assertEqual(sum(self.pool._pins.values()), 0)
+
+        self.read_ids()
+        row = {'id': 0, 'data': np.zeros((2, 2, 3), dtype=np.uint8)}
+        self.pool.reset(capacity=4 * row_nbytes(row))
+        self.read_ids()
+        self.read_ids()
+        scan = self.pool.read(self.table, 1, self.storage.read)
+        next(scan)
+        scan.close()
+        self.assertEqual(sum(self.pool._pins.values()), 0)
+
+    def test_pinned_rows_are_not_evicted(self):
+        row = {'id': 0, 'data': np.zeros((2, 2, 3), dtype=np.uint8)}
+        self.pool.reset(capacity=1)
+        self.assertFalse(self.pool.put(self.table, 0, row))
+
+        self.pool.reset(capacity=row_nbytes(row))
+        self.assertTrue(self.pool.put(self.table, 0, row, pin=True))
+        self.assertFalse(self.pool.put(self.table, 1, row))
+        self.pool.unfix(self.table, 0)
+        self.assertTrue(self.pool.put(self.table, 1, row))
+        self.assertIsNone(self.pool.fix(self.table, 0))
+
+    def test_invalidate(self):
+        self.read_ids()
+        self.pool.invalidate(self.table)
+        self.assertEqual(len(self.pool), 0)
+        self.assertEqual(self.pool.used, 0)
+        self.read_ids()
+        self.assertEqual(len(self.storage.reads), 2)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(KeyError):
+            self.pool.reset(policy='MRU')
+
+
+class EvictionPolicyTest(unittest.TestCase):
+
+    def test_lru(self):
+        policy = LRUPolicy()
+        for key in [1, 2, 3]:
+            policy.admit(key)
+        policy.touch(1)
+        self.assertEqual(list(policy.candidates()), [2, 3, 1])
+        policy.remove(3)
+        self.assertEqual(list(policy.candidates()), [2, 1])
+
+    def test_two_q(self):
+        policy = TwoQPolicy()
+        for key in [1, 2, 3]:
+            policy.admit(key)
+        policy.touch(2)
+        policy.touch(1)
+        self.assertEqual(list(policy.candidates()), [3, 2, 1])
+
+    def test_lfu(self):
+        policy = LFUPolicy()
+        for key in [1, 2, 3]:
+            policy.admit(key)
+        policy.touch(1)
+        policy.touch(1)
+        policy.touch(3)
+        self.assertEqual(list(policy.candidates()), [2, 3, 1])
+        policy.remove(1)
+        policy.admit(1)
+        self.assertEqual(list(policy.candidates())[-1], 1)
+
+    def test_random(self):
+        policy = RandomPolicy()
+        for key in range(5):
+            policy.admit(key)
+        policy.remove(0)
+        policy.remove(4)
+        self.assertEqual(sorted(policy.candidates()), [1, 2, 3])
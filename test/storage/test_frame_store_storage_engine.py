@@ -0,0 +1,155 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.storage.frame_store_storage_engine import FrameStoreStorageEngine
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.models.storage.batch import Batch
+
+NUM_FRAMES = 10
+
+
+def create_batches(num_frames=NUM_FRAMES, batch_size=3):
+    for start in range(0, num_frames, batch_size):
+        ids = list(range(start, min(start + batch_size, num_frames)))
+        yield Batch(pd.DataFrame({
+            'id': ids,
+            'data': [np.full((2, 2, 3), i, dtype=np.uint8) for i in ids]}))
+
+
+class FrameStoreStorageEngineTest(unittest.TestCase):
+
+    def create_sample_table(self):
+        table_info = DataFrameMetadata("dataset", 'dataset')
+        column_1 = DataFrameColumn("id", ColumnType.INTEGER, False)
+        column_2 = DataFrameColumn(
+            "data", ColumnType.NDARRAY, False, NdArrayType.UINT8, [
+                2, 2, 3])
+        table_info.schema = [column_1, column_2]
+        return table_info
+
+    def setUp(self):
+        self.table = self.create_sample_table()
+        self.engine = FrameStoreStorageEngine()
+        self.engine.chunk_rows = 4
+        self.engine.create(self.table)
+        for batch in create_batches():
+            self.engine.write(self.table, batch)
+
+    def tearDown(self):
+        shutil.rmtree('dataset', ignore_errors=True)
+
+    def read(self, **kwargs):
+        return Batch.concat(self.engine.read(self.table, batch_mem_size=30,
+                                             **kwargs))
+
+    def test_should_create_empty_table(self):
+        self.engine.create(self.table)
+        records = list(self.engine.read(self.table, batch_mem_size=3000))
+        self.assertEqual(records, [])
+
+    def test_should_write_rows_in_fixed_size_chunks(self):
+        self.assertEqual(self.read(), Batch.concat(create_batches()))
+        chunks = [name for name in os.listdir('dataset')
+                  if name.endswith('-data.bin')]
+        self.assertEqual(len(chunks), 3)
+
+    def test_should_read_rows_by_position(self):
+        frame = self.read(pos=5)
+        self.assertEqual(frame.frames['id'].tolist(), [5])
+        self.assertTrue(np.array_equal(frame.frames['data'][0],
+                                       np.full((2, 2, 3), 5, np.uint8)))
+        self.assertEqual(self.read(pos=slice(2, 9, 3)).frames['id'].tolist(),
+                         [2, 5, 8])
+        self.assertEqual(self.read(pos=[9, 0, 4]).frames['id'].tolist(),
+                         [9, 0, 4])
+        with self.assertRaises(IndexError):
+            self.read(pos=[NUM_FRAMES])
+
+    def test_should_read_rows_in_id_range(self):
+        self.assertEqual(self.read(id_range=(3, 6)).frames['id'].tolist(),
+                         [3, 4, 5, 6])
+        self.assertEqual(
+            self.read(id_range=(None, 1)).frames['id'].tolist(), [0, 1])
+        self.assertEqual(
+            self.read(id_range=(8, None)).frames['id'].tolist(), [8, 9])
+        self.assertEqual(self.read(id_range=(20, None)).frames.empty, True)
+        self.assertEqual(
+            self.read(id_range=(2, 7), pos=[7, 1, 3]).frames['id'].tolist(),
+            [7, 3])
+        read_batch = self.read(id_range=(2, 7), columns=['id'],
+                               predicate_func=lambda id: id % 2 == 0)
+        self.assertEqual(read_batch.frames['id'].tolist(), [2, 4, 6])
+
+    def test_should_index_id_ranges_of_chunks(self):
+        store = self.engine._store(self.table)
+        self.assertEqual(store.identifier, 'id')
+        self.assertEqual([chunk['ids'] for chunk in store.chunks],
+                         [{'min': 0, 'max': 3, 'sorted': True},
+                          {'min': 4, 'max': 7, 'sorted': True},
+                          {'min': 8, 'max': 9, 'sorted': True}])
+        with patch.object(store, 'chunk_columns',
+                          wraps=store.chunk_columns) as chunk_columns:
+            # chunks inside or outside the range are not read
+            self.assertEqual(store.id_positions('id', 4, 7).tolist(),
+                             [4, 5, 6, 7])
+            chunk_columns.assert_not_called()
+            self.assertEqual(store.id_positions('id', 2, 8).tolist(),
+                             list(range(2, 9)))
+            self.assertEqual([call.args[0] for call in
+                              chunk_columns.call_args_list], [0, 2])
+
+        # unsorted chunks are scanned
+        self.engine.write(self.table, Batch(pd.DataFrame({
+            'id': [15, 11],
+            'data': [np.zeros((2, 2, 3), dtype=np.uint8)] * 2})))
+        store = self.engine._store(self.table)
+        self.assertEqual(store.chunks[-1]['ids'],
+                         {'min': 8, 'max': 15, 'sorted': False})
+        self.assertEqual(self.read(id_range=(9, 12)).frames['id'].tolist(),
+                         [9, 11])
+
+    def test_should_reject_variable_width_columns(self):
+        table = self.create_sample_table()
+        table.schema = table.schema.column_list + [
+            DataFrameColumn("label", ColumnType.TEXT, False)]
+        with self.assertRaises(TypeError):
+            self.engine.create(table)
+        table = self.create_sample_table()
+        table.schema = table.schema.column_list + [DataFrameColumn(
+            "labels", ColumnType.NDARRAY, False, NdArrayType.STR, [5])]
+        with self.assertRaises(TypeError):
+            self.engine.create(table)
+
+    def test_should_apply_predicate_and_projection(self):
+        read_batch = self.read(columns=['id'],
+                               predicate_func=lambda id: id % 2 == 0,
+                               projection=['data'])
+        self.assertEqual(list(read_batch.frames.columns), ['data'])
+        self.assertEqual([int(data[0, 0, 0]) for data in
+                          read_batch.frames['data']], [0, 2, 4, 6, 8])
+
+    def test_batches_do_not_write_through(self):
+        batch = next(self.engine.read(self.table, batch_mem_size=30))
+        batch.columns['data'][:] = 255
+        self.assertEqual(self.read(pos=0), Batch.concat(create_batches())[0])
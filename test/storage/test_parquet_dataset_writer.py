@@ -0,0 +1,125 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from petastorm.etl.dataset_metadata import ROW_GROUPS_PER_FILE_KEY
+from petastorm.etl.rowgroup_indexing import ROWGROUPS_INDEX_KEY
+from src.catalog.models.df_metadata import DataFrameMetadata  # noqa: F401
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.catalog.schema_utils import SchemaUtils
+from src.models.storage.batch import Batch
+from src.readers.petastorm_reader import PetastormReader
+from src.storage.parquet_dataset_writer import (ParquetDatasetWriter,
+                                                add_row_group_index)
+
+NUM_FRAMES = 10
+
+
+def create_batches(num_frames=NUM_FRAMES, batch_size=2):
+    for start in range(0, num_frames, batch_size):
+        ids = list(range(start, min(start + batch_size, num_frames)))
+        yield Batch(pd.DataFrame({
+            'id': ids,
+            'data': [np.full((2, 2, 3), i, dtype=np.uint8) for i in ids]}))
+
+
+class ParquetDatasetWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset_path = tempfile.mkdtemp()
+        columns = [DataFrameColumn('id', ColumnType.INTEGER, False),
+                   DataFrameColumn('data', ColumnType.NDARRAY, False,
+                                   NdArrayType.UINT8, [2, 2, 3])]
+        self.schema = SchemaUtils.get_petastorm_schema('dataset', columns)
+
+    def tearDown(self):
+        shutil.rmtree(self.dataset_path, ignore_errors=True)
+
+    def read_rows(self):
+        reader = PetastormReader(Path(self.dataset_path).as_uri(),
+                                 batch_mem_size=NUM_FRAMES * 100,
+                                 cur_shard=None,
+                                 shard_count=None,
+                                 predicate=None)
+        frames = Batch.concat(reader.read()).frames
+        return frames.sort_values('id').reset_index(drop=True)
+
+    def test_should_write_petastorm_readable_dataset(self):
+        with ParquetDatasetWriter(self.dataset_path, self.schema) as writer:
+            for batch in create_batches():
+                writer.write(batch)
+        self.assertEqual(writer.num_rows, NUM_FRAMES)
+
+        frames = self.read_rows()
+        self.assertEqual(frames['id'].tolist(), list(range(NUM_FRAMES)))
+        for frame_id, data in zip(frames['id'], frames['data']):
+            self.assertTrue(np.array_equal(
+                data, np.full((2, 2, 3), frame_id, dtype=np.uint8)))
+
+    def test_should_stream_into_single_file_with_row_groups(self):
+        # ~1KB row groups, every encoded frame is a couple hundred bytes
+        with ParquetDatasetWriter(self.dataset_path, self.schema,
+                                  row_group_size_mb=0.001) as writer:
+            for batch in create_batches():
+                writer.write(batch)
+
+        files = [name for name in os.listdir(self.dataset_path)
+                 if name.endswith('.parquet')]
+        self.assertEqual(len(files), 1)
+        num_row_groups = pq.read_metadata(
+            os.path.join(self.dataset_path, files[0])).num_row_groups
+        self.assertGreater(num_row_groups, 1)
+
+        metadata = pq.read_schema(
+            os.path.join(self.dataset_path, '_common_metadata')).metadata
+        self.assertEqual(json.loads(metadata[ROW_GROUPS_PER_FILE_KEY]),
+                         {files[0]: num_row_groups})
+        self.assertEqual(len(self.read_rows()), NUM_FRAMES)
+
+    def test_appends_are_included_in_metadata(self):
+        for _ in range(2):
+            with ParquetDatasetWriter(self.dataset_path,
+                                      self.schema) as writer:
+                for batch in create_batches():
+                    writer.write(batch)
+        self.assertEqual(len(self.read_rows()), 2 * NUM_FRAMES)
+
+    def test_row_group_index_keeps_materialized_metadata(self):
+        path = os.path.join(self.dataset_path, '_common_metadata')
+        schema = pa.schema([('id', pa.int64())])
+        pq.write_metadata(schema.with_metadata(
+            {ROW_GROUPS_PER_FILE_KEY: '{"part-0.parquet": 3}'}), path)
+
+        add_row_group_index(self.dataset_path)
+        metadata = pq.read_schema(path).metadata
+        self.assertIn(ROWGROUPS_INDEX_KEY, metadata)
+        self.assertEqual(json.loads(metadata[ROW_GROUPS_PER_FILE_KEY]),
+                         {'part-0.parquet': 3})
+        self.assertEqual(pq.read_schema(path).names, ['id'])
+
+        modified = os.path.getmtime(path)
+        add_row_group_index(self.dataset_path)
+        self.assertEqual(os.path.getmtime(path), modified)
@@ -0,0 +1,100 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import shutil
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.df_metadata import DataFrameMetadata
+from src.storage.parquet_storage_engine import ParquetStorageEngine
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.models.storage.batch import Batch
+
+NUM_FRAMES = 10
+
+
+def create_batches(num_frames=NUM_FRAMES, batch_size=2):
+    for start in range(0, num_frames, batch_size):
+        ids = list(range(start, min(start + batch_size, num_frames)))
+        # the INTEGER column round trips as int32, as with petastorm
+        yield Batch(pd.DataFrame({
+            'id': np.array(ids, dtype=np.int32),
+            'data': [np.full((2, 2, 3), i, dtype=np.uint8) for i in ids]}))
+
+
+class ParquetStorageEngineTest(unittest.TestCase):
+
+    def create_sample_table(self):
+        table_info = DataFrameMetadata("dataset", 'dataset')
+        column_1 = DataFrameColumn("id", ColumnType.INTEGER, False)
+        column_2 = DataFrameColumn(
+            "data", ColumnType.NDARRAY, False, NdArrayType.UINT8, [
+                2, 2, 3])
+        table_info.schema = [column_1, column_2]
+        return table_info
+
+    def setUp(self):
+        self.table = self.create_sample_table()
+        self.engine = ParquetStorageEngine()
+        self.engine.create(self.table)
+
+    def tearDown(self):
+        shutil.rmtree('dataset', ignore_errors=True)
+
+    def read(self, **kwargs):
+        return Batch.concat(self.engine.read(self.table, batch_mem_size=3000,
+                                             **kwargs), copy=False)
+
+    def test_should_create_empty_table(self):
+        records = list(self.engine.read(self.table, batch_mem_size=3000))
+        self.assertEqual(records, [])
+
+    def test_should_write_rows_to_table(self):
+        dummy_batches = list(create_batches())
+        for batch in dummy_batches:
+            self.engine.write(self.table, batch)
+        self.assertEqual(self.read(), Batch.concat(dummy_batches))
+
+        # create drops the existing rows
+        self.engine.create(self.table)
+        self.assertTrue(self.read().empty())
+
+    def test_should_bulk_write_rows_to_table(self):
+        self.engine.bulk_write(self.table, create_batches())
+        self.assertEqual(self.read(), Batch.concat(create_batches()))
+
+    def test_should_return_even_frames(self):
+        self.engine.bulk_write(self.table, create_batches())
+        read_batch = self.read(columns=['id'],
+                               predicate_func=lambda id: id % 2 == 0)
+        expected = [batch[[0]] for batch in create_batches()]
+        self.assertEqual(read_batch, Batch.concat(expected))
+
+    def test_should_project_columns(self):
+        self.engine.bulk_write(self.table, create_batches())
+        read_batch = self.read(columns=['id'],
+                               predicate_func=lambda id: id > 6,
+                               projection=['id'])
+        self.assertEqual(list(read_batch.frames.columns), ['id'])
+        self.assertEqual(read_batch.frames['id'].tolist(), [7, 8, 9])
+
+    def test_should_skip_row_groups_outside_id_range(self):
+        # one row group per written batch of 2 frames
+        self.engine.row_group_size_mb = 0.0001
+        self.engine.bulk_write(self.table, create_batches())
+        read_batch = self.read(id_range=(3, 4))
+        self.assertEqual(read_batch.frames['id'].tolist(), [2, 3, 4, 5])
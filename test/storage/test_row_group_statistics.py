@@ -0,0 +1,87 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.df_metadata import DataFrameMetadata  # noqa: F401
+from src.catalog.models.df_column import DataFrameColumn
+from src.catalog.column_type import ColumnType, NdArrayType
+from src.catalog.schema_utils import SchemaUtils
+from src.models.storage.batch import Batch
+from src.readers.petastorm_reader import PetastormReader
+from src.storage.parquet_dataset_writer import ParquetDatasetWriter
+from src.storage.row_group_statistics import (collect_row_group_statistics,
+                                              row_groups_in_range,
+                                              RowGroupListSelector)
+
+NUM_FRAMES = 10
+
+
+class RowGroupStatisticsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset_path = tempfile.mkdtemp()
+        columns = [DataFrameColumn('id', ColumnType.INTEGER, False),
+                   DataFrameColumn('data', ColumnType.NDARRAY, False,
+                                   NdArrayType.UINT8, [2, 2, 3])]
+        schema = SchemaUtils.get_petastorm_schema('dataset', columns)
+        # one row group per written batch of 2 frames
+        with ParquetDatasetWriter(self.dataset_path, schema,
+                                  row_group_size_mb=0.0001) as writer:
+            for start in range(0, NUM_FRAMES, 2):
+                ids = [start, start + 1]
+                writer.write(Batch(pd.DataFrame({
+                    'id': ids,
+                    'data': [np.full((2, 2, 3), i, np.uint8)
+                             for i in ids]})))
+
+    def tearDown(self):
+        shutil.rmtree(self.dataset_path, ignore_errors=True)
+
+    def test_should_collect_id_range_of_every_row_group(self):
+        row_groups = collect_row_group_statistics(self.dataset_path, 'id')
+        self.assertEqual([(row_group.row_group, row_group.num_rows,
+                           row_group.min_id, row_group.max_id)
+                          for row_group in row_groups],
+                         [(index, 2, 2 * index, 2 * index + 1)
+                          for index in range(NUM_FRAMES // 2)])
+        file_name = row_groups[0].file_name
+        self.assertEqual(collect_row_group_statistics(
+            self.dataset_path, 'id', skip_files=[file_name]), [])
+
+    def test_should_select_row_groups_in_range(self):
+        row_groups = collect_row_group_statistics(self.dataset_path, 'id')
+        self.assertEqual(row_groups_in_range(self.dataset_path, row_groups,
+                                             (3, 6)), {1, 2, 3})
+        self.assertEqual(row_groups_in_range(self.dataset_path, row_groups,
+                                             (None, 1)), {0})
+        self.assertEqual(row_groups_in_range(self.dataset_path, row_groups,
+                                             (20, None)), set())
+        # row groups without statistics are always read
+        self.assertEqual(row_groups_in_range(self.dataset_path,
+                                             row_groups[1:], (8, 9)), {0, 4})
+
+    def test_petastorm_reads_only_selected_row_groups(self):
+        reader = PetastormReader(Path(self.dataset_path).as_uri(),
+                                 batch_mem_size=3000,
+                                 rowgroup_selector=RowGroupListSelector(
+                                     {1, 3}))
+        frames = Batch.concat(reader.read()).frames
+        self.assertEqual(sorted(frames['id'].tolist()), [2, 3, 6, 7])
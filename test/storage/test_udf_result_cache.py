@@ -0,0 +1,223 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.expression.function_expression import FunctionExpression
+from src.expression.tuple_value_expression import TupleValueExpression
+from src.models.catalog.frame_info import FrameInfo
+from src.models.storage.batch import Batch
+from src.storage.udf_result_cache import (UdfResultCache, table_key,
+                                          udf_key)
+from src.udfs.abstract_udfs import AbstractClassifierUDF
+
+NUM_FRAMES = 10
+
+
+class FakeTable:
+    file_url = 'dataset'
+
+
+TABLE_KEY = table_key(FakeTable())
+
+
+class CountingUDF(AbstractClassifierUDF):
+    def __init__(self):
+        self.frames_seen = []
+
+    @property
+    def input_format(self) -> FrameInfo:
+        return FrameInfo(-1, -1, 3, None)
+
+    @property
+    def name(self) -> str:
+        return 'counting'
+
+    @property
+    def labels(self):
+        return []
+
+    def classify(self, frames: pd.DataFrame) -> pd.DataFrame:
+        values = frames['data'].tolist()
+        self.frames_seen.extend(int(value[0, 0]) for value in values)
+        return pd.DataFrame({'labels': [['car'] * int(value[0, 0])
+                                        for value in values],
+                             'scores': [float(value[0, 0])
+                                        for value in values]})
+
+
+def create_frames(ids):
+    return pd.DataFrame({'data': [np.full((2, 2), i) for i in ids]})
+
+
+class UdfResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = UdfResultCache()
+        self.cache.reset(path=os.path.join(self.cache_dir, 'udf.db'),
+                         capacity=10 ** 6, enabled=True)
+        self.udf = CountingUDF()
+
+    def tearDown(self):
+        self.cache.reset(path='udf_cache.db', enabled=False)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def evaluate(self, ids):
+        return self.cache.evaluate(self.udf, TABLE_KEY, ids,
+                                   create_frames(ids))
+
+    def test_should_only_run_udf_on_missing_frames(self):
+        first = self.evaluate([0, 1, 2])
+        second = self.evaluate([1, 2, 3, 4])
+        self.assertEqual(self.udf.frames_seen, [0, 1, 2, 3, 4])
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 5)
+        self.assertEqual(second['scores'].tolist(), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(second['labels'].tolist(),
+                         [['car'] * i for i in [1, 2, 3, 4]])
+        self.assertEqual(list(first.columns), list(second.columns))
+
+    def test_should_persist_results(self):
+        self.evaluate([0, 1])
+        path = os.path.join(self.cache_dir, 'udf.db')
+        self.cache.reset(path=path)
+        self.evaluate([0, 1])
+        self.assertEqual(self.udf.frames_seen, [0, 1])
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_should_key_on_udf_version_and_table(self):
+        self.evaluate([0])
+        self.cache.evaluate(self.udf, 'other', [0], create_frames([0]))
+        self.assertEqual(self.udf.frames_seen, [0, 0])
+
+    def test_should_key_on_udf_arguments(self):
+        keys = []
+        for column in ['data', 'thumbnail']:
+            expression = FunctionExpression(self.udf, output='scores')
+            expression.append_child(TupleValueExpression(column))
+            keys.append(expression.cache_key)
+        self.assertNotEqual(keys[0], keys[1])
+        for key in keys:
+            self.cache.evaluate(self.udf, TABLE_KEY, [0], create_frames([0]),
+                                key=key)
+        self.assertEqual(self.udf.frames_seen, [0, 0])
+
+    def test_should_raise_when_misses_do_not_match_cached_rows(self):
+        self.evaluate([0])
+
+        def duplicating_udf(frames):
+            return pd.concat([self.udf(frames)] * 2, ignore_index=True)
+        with self.assertRaises(ValueError):
+            self.cache.evaluate(duplicating_udf, TABLE_KEY, [0, 1],
+                                create_frames([0, 1]), key=udf_key(self.udf))
+        self.assertEqual(self.udf.frames_seen, [0, 1])
+
+    def test_should_account_replaced_results_once(self):
+        self.evaluate([0, 1])
+        used = self.cache.used
+        outcomes = self.udf(create_frames([0, 1, 1]))
+        self.cache.put(udf_key(self.udf), TABLE_KEY, [0, 1, 1], outcomes)
+        self.assertEqual(self.cache.used, used)
+        self.assertEqual(self.cache.count(udf_key(self.udf), TABLE_KEY), 2)
+
+    def test_should_keep_column_types(self):
+        def typed_udf(frames):
+            return pd.DataFrame({'count': np.arange(len(frames)),
+                                 'score': np.full(len(frames), 0.5)})
+        fresh = self.cache.evaluate(typed_udf, TABLE_KEY, [0, 1],
+                                    create_frames([0, 1]), key='typed')
+        cached = self.cache.evaluate(typed_udf, TABLE_KEY, [0, 1],
+                                     create_frames([0, 1]), key='typed')
+        self.assertEqual(self.cache.hits, 2)
+        for outcomes in [fresh, cached]:
+            self.assertTrue(pd.api.types.is_integer_dtype(outcomes['count']))
+        self.assertEqual(cached['count'].tolist(), [0, 1])
+
+    def test_table_key_changes_with_stored_files(self):
+        table = FakeTable()
+        table.file_url = os.path.join(self.cache_dir, 'table')
+        os.makedirs(table.file_url)
+        first = table_key(table)
+        self.assertEqual(table_key(table), first)
+        path = os.path.join(table.file_url, 'part-0')
+        with open(path, 'w') as part:
+            part.write('rows')
+        os.utime(path, ns=(10 ** 19, 10 ** 19))
+        self.assertNotEqual(table_key(table), first)
+
+        # every version of the table is invalidated
+        self.cache.put(udf_key(self.udf), first, [0],
+                       self.udf(create_frames([0])))
+        self.cache.put(udf_key(self.udf), table_key(table), [0],
+                       self.udf(create_frames([0])))
+        self.cache.invalidate(table)
+        self.assertEqual(self.cache.used, 0)
+
+    def test_invalidate_drops_table_results(self):
+        self.evaluate(list(range(NUM_FRAMES)))
+        self.assertGreater(self.cache.used, 0)
+        self.cache.invalidate(FakeTable())
+        self.assertEqual(self.cache.used, 0)
+        self.evaluate([0])
+        self.assertEqual(self.udf.frames_seen,
+                         list(range(NUM_FRAMES)) + [0])
+
+    def test_should_evict_least_recently_used_results(self):
+        self.evaluate([0])
+        row_size = self.cache.used
+        self.cache.reset(capacity=3 * row_size)
+        self.evaluate([1, 2])
+        self.evaluate([0])
+        self.evaluate([3])
+        self.assertGreater(self.cache.evictions, 0)
+        self.assertLessEqual(self.cache.used, 3 * row_size)
+        self.udf.frames_seen = []
+        self.evaluate([0, 3])
+        self.assertEqual(self.udf.frames_seen, [])
+
+    def test_function_expression_should_use_cache(self):
+        expression = FunctionExpression(self.udf, output='scores')
+        expression.append_child(TupleValueExpression('data'))
+        expression.cache_table = TABLE_KEY
+        batch = Batch(pd.DataFrame({
+            'id': list(range(3)),
+            'data': create_frames(range(3))['data']}))
+        # outputs are stored by every evaluation
+        for _ in range(2):
+            outcome = expression.evaluate(batch)
+            self.assertEqual(outcome.frames['scores'].tolist(),
+                             [0.0, 1.0, 2.0])
+        self.assertEqual(self.udf.frames_seen, [0, 1, 2] * 2)
+        # and reused when looked up
+        batch.frames[expression.cache_key] = self.cache.lookup(
+            expression.cache_key, TABLE_KEY, [0, 1, 2])
+        outcome = expression.evaluate(batch)
+        self.assertEqual(outcome.frames['scores'].tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(self.udf.frames_seen, [0, 1, 2] * 2)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_should_look_up_outputs_of_frames(self):
+        self.evaluate([0, 2])
+        outputs = self.cache.lookup(udf_key(self.udf), TABLE_KEY, [2, 1, 0])
+        self.assertEqual(outputs, [{'labels': ['car'] * 2, 'scores': 2.0},
+                                   None, {'labels': [], 'scores': 0.0}])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
@@ -14,9 +14,11 @@
 # limitations under the License.
 import os
 import unittest
+from unittest.mock import MagicMock, patch
 
 import cv2
 import pandas as pd
+import torch
 
 from src.models.storage.batch import Batch
 from src.udfs.fastrcnn_object_detector import FastRCNNObjectDetector
@@ -46,3 +48,21 @@ class FastRCNNObjectDetectorTest(unittest.TestCase):
 
         self.assertEqual(["dog"], result[0].labels)
         self.assertEqual(["cat", "dog"], result[1].labels)
+
+    @patch('torchvision.models.detection.fasterrcnn_resnet50_fpn')
+    def test_should_keep_detections_above_threshold(self, model_mock):
+        model_mock.return_value = MagicMock(return_value=[
+            {'labels': torch.tensor([18, 17, 3]),
+             'scores': torch.tensor([0.95, 0.9, 0.5]),
+             'boxes': torch.arange(12.).reshape(3, 4)},
+            {'labels': torch.tensor([3]),
+             'scores': torch.tensor([0.3]),
+             'boxes': torch.ones(1, 4)}])
+        detector = FastRCNNObjectDetector()
+        outcome = detector._get_predictions(torch.zeros(2, 3, 4, 4))
+
+        self.assertEqual([row.tolist() for row in outcome['labels']],
+                         [['dog', 'cat'], []])
+        self.assertEqual(outcome['boxes'][0].tolist(),
+                         [[[0, 1], [2, 3]], [[4, 5], [6, 7]]])
+        self.assertEqual(len(outcome['scores'][1]), 0)
@@ -0,0 +1,127 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import torch
+from PIL import Image
+from torch import nn
+from torchvision.transforms import Compose, transforms
+
+from src.udfs.pytorch_abstract_udf import (PytorchAbstractUDF,
+                                           frames_to_tensor)
+
+
+class MeanUDF(PytorchAbstractUDF):
+
+    def __init__(self, size=None):
+        super().__init__()
+        self.size = size
+        self.scale = nn.Parameter(torch.ones(1))
+
+    @property
+    def name(self):
+        return 'mean'
+
+    @property
+    def labels(self):
+        return []
+
+    @property
+    def input_format(self):
+        return None
+
+    @property
+    def input_size(self):
+        return self.size
+
+    def _get_predictions(self, frames):
+        return pd.DataFrame({'mean': (frames * self.scale)
+                             .mean(dim=(1, 2, 3)).tolist()})
+
+
+class CroppingUDF(MeanUDF):
+
+    @property
+    def transforms(self):
+        return Compose([transforms.CenterCrop(4), transforms.ToTensor()])
+
+
+class PytorchAbstractUDFTest(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+        self.frames = [random.randint(0, 256, (12, 16, 3), dtype=np.uint8)
+                       for _ in range(3)]
+
+    def per_frame(self, udf):
+        return torch.cat([udf.transform(frame) for frame in self.frames])
+
+    def test_should_convert_batches_as_per_frame_transforms(self):
+        udf = MeanUDF()
+        expected = self.per_frame(udf)
+        self.assertTrue(torch.equal(udf.preprocess(self.frames), expected))
+        self.assertTrue(torch.equal(udf.preprocess(np.stack(self.frames)),
+                                    expected))
+        # channels reversed from opencv
+        self.assertTrue(torch.equal(expected[0, 0],
+                                    torch.from_numpy(self.frames[0][..., 2])
+                                    .float() / 255))
+
+    def test_should_resize_batches(self):
+        udf = MeanUDF(size=(6, 8))
+        tensor = udf.preprocess(self.frames)
+        self.assertEqual(tuple(tensor.shape), (3, 3, 6, 8))
+        # the PIL resize of torchvision, up to its fixed point rounding
+        self.assertLessEqual((tensor - self.per_frame(udf)).abs().max(),
+                             1.0001 / 255)
+
+        frames = self.frames + [np.zeros((6, 8, 3), dtype=np.uint8)]
+        self.assertEqual(tuple(udf.preprocess(frames).shape), (4, 3, 6, 8))
+
+    def test_batched_resize_should_match_per_frame_pil_resize(self):
+        random = np.random.RandomState(1)
+        frames = random.randint(0, 256, (2, 45, 60, 3), dtype=np.uint8)
+        for size in [(45, 60), (15, 20), (20, 7), (90, 61), (30, 90)]:
+            resize = Compose([transforms.Resize(size),
+                              transforms.ToTensor()])
+            expected = torch.stack([resize(Image.fromarray(frame[..., ::-1]))
+                                    for frame in frames])
+            tensor = frames_to_tensor(frames, size)
+            self.assertEqual(tensor.shape, expected.shape)
+            self.assertLessEqual((tensor - expected).abs().max(),
+                                 1.0001 / 255)
+            self.assertLess((tensor - expected).abs().mean(), 0.1 / 255)
+
+    @patch('src.udfs.pytorch_abstract_udf.ConfigurationManager')
+    def test_should_apply_custom_transforms_on_threads(self, config_mock):
+        config_mock.return_value.get_value.return_value = 2
+        udf = CroppingUDF()
+        tensor = udf.preprocess(self.frames)
+        self.assertTrue(torch.equal(tensor, self.per_frame(udf)))
+        self.assertIsNotNone(PytorchAbstractUDF._preprocess_pool)
+        self.assertEqual(PytorchAbstractUDF._preprocess_workers, 2)
+        pool = PytorchAbstractUDF._preprocess_pool
+
+        config_mock.return_value.get_value.return_value = 3
+        udf.preprocess(self.frames)
+        self.assertIsNot(PytorchAbstractUDF._preprocess_pool, pool)
+        self.assertEqual(PytorchAbstractUDF._preprocess_workers, 3)
+
+        config_mock.return_value.get_value.return_value = None
+        outcome = udf(pd.DataFrame({'data': self.frames}))
+        self.assertEqual(len(outcome), 3)
@@ -0,0 +1,82 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from unittest.mock import MagicMock
+
+import torch
+from torchvision.ops import box_iou
+
+from src.udfs.pytorch_abstract_udf import PytorchAbstractUDF
+from src.udfs.ssd_object_detector import (Encoder, SSDObjectDetector,
+                                          _top_k_per_group, dboxes300_coco)
+
+NUM_BOXES = 8732
+
+
+class SSDObjectDetectorTest(unittest.TestCase):
+
+    def _detector(self, plabel):
+        # skips the model download of the constructor
+        detector = SSDObjectDetector.__new__(SSDObjectDetector)
+        PytorchAbstractUDF.__init__(detector)
+        detector.threshold = 0.5
+        detector.encoder = Encoder(dboxes300_coco())
+        detector.model = MagicMock(return_value=(
+            torch.zeros(len(plabel), 4, NUM_BOXES), plabel))
+        return detector
+
+    def test_should_return_a_row_per_frame(self):
+        plabel = torch.zeros(2, 81, NUM_BOXES)
+        # a confident car in the first default box of the first frame
+        plabel[0, 3, 0] = 10
+        detector = self._detector(plabel)
+        outcome = detector._get_predictions(torch.zeros(2, 3, 300, 300))
+
+        self.assertEqual(outcome['label'].tolist(), [['car'], []])
+        self.assertEqual(len(outcome['pred_boxes'][0]), 1)
+        self.assertEqual(len(outcome['pred_boxes'][0][0]), 4)
+        self.assertGreater(outcome['pred_score'][0][0], 0.5)
+        self.assertEqual(outcome['pred_score'][1], [])
+
+    def test_should_suppress_overlapping_detections(self):
+        self.assertIs(dboxes300_coco(), dboxes300_coco())
+        self.assertEqual(tuple(dboxes300_coco()('ltrb').shape),
+                         (NUM_BOXES, 4))
+        torch.manual_seed(0)
+        ploc = torch.randn(2, 4, NUM_BOXES) * 0.5
+        plabel = torch.randn(2, 81, NUM_BOXES) * 3
+        plabel[1] = -10
+        encoder = Encoder(dboxes300_coco())
+        decoded = encoder.decode_batch(ploc, plabel, criteria=0.5,
+                                       max_output=50)
+
+        bboxes, labels, scores = decoded[0]
+        self.assertEqual(len(scores), 50)
+        self.assertTrue(torch.all(scores[1:] >= scores[:-1]))
+        self.assertTrue(torch.all(labels > 0))
+        for label in labels.unique():
+            ious = box_iou(bboxes[labels == label], bboxes[labels == label])
+            self.assertTrue(torch.all(ious.fill_diagonal_(0) <= 0.5))
+        # nothing above the candidate threshold
+        self.assertEqual([len(values) for values in decoded[1]], [0, 0, 0])
+
+    def test_top_k_per_group_keeps_best_scores_in_order(self):
+        groups = torch.tensor([2, 0, 2, 1, 0, 2, 0])
+        scores = torch.tensor([0.5, 0.125, 1.0, 0.25, 0.75, 0.5, 0.75])
+        keep = _top_k_per_group(groups, scores, 2)
+        # by group, then by decreasing score
+        self.assertEqual(groups[keep].tolist(), [0, 0, 1, 2, 2])
+        self.assertEqual(scores[keep].tolist(),
+                         [0.75, 0.75, 0.25, 1.0, 0.5])
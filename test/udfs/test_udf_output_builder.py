@@ -0,0 +1,52 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+
+from src.udfs.udf_output_builder import UdfOutputBuilder
+
+
+class UdfOutputBuilderTest(unittest.TestCase):
+
+    def test_should_build_a_row_per_frame(self):
+        builder = UdfOutputBuilder(['labels', 'scores', 'boxes'])
+        builder.add_frame(labels=['car', 'bus'], scores=[0.9, 0.8],
+                          boxes=np.ones((2, 2, 2)))
+        builder.add_frame(labels=[], scores=[], boxes=[])
+        builder.add_frame(labels=['person'], scores=[0.7],
+                          boxes=np.zeros((1, 2, 2)))
+        self.assertEqual(len(builder), 3)
+
+        outcome = builder.build()
+        self.assertEqual(list(outcome.columns), ['labels', 'scores', 'boxes'])
+        self.assertEqual([row.tolist() for row in outcome['labels']],
+                         [['car', 'bus'], [], ['person']])
+        self.assertEqual([row.shape for row in outcome['boxes']],
+                         [(2, 2, 2), (0, 2, 2), (1, 2, 2)])
+        np.testing.assert_array_equal(outcome['scores'][0], [0.9, 0.8])
+
+    def test_should_build_lists(self):
+        builder = UdfOutputBuilder(['label', 'pred_boxes'], as_lists=True)
+        builder.add_frame(label=['car'], pred_boxes=[[1, 2, 3, 4]])
+        outcome = builder.build()
+        self.assertEqual(outcome['label'].tolist(), [['car']])
+        self.assertEqual(outcome['pred_boxes'].tolist(), [[[1, 2, 3, 4]]])
+
+    def test_should_check_column_lengths(self):
+        builder = UdfOutputBuilder(['labels', 'scores'])
+        with self.assertRaises(ValueError):
+            builder.add_frame(labels=['car'], scores=[])
+        self.assertTrue(builder.build().empty)
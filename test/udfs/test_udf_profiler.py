@@ -0,0 +1,53 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import pandas as pd
+from mock import patch, MagicMock
+
+from src.udfs.udf_profiler import UdfProfiler
+
+
+class UdfProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = UdfProfiler()
+        self.profiler.reset(calls=2, enabled=True)
+        self.udf = MagicMock(return_value='outcomes')
+        self.udf.name = 'udf'
+
+    def tearDown(self):
+        self.profiler.reset(enabled=False)
+
+    @patch('src.udfs.udf_profiler.CatalogManager')
+    def test_should_record_calls_after_warm_up(self, catalog_mock):
+        frames = pd.DataFrame({'data': [1, 2, 3]})
+        for _ in range(3):
+            profiled = self.profiler.wrap(self.udf, 'cpu')
+            self.assertEqual(profiled(frames), 'outcomes')
+            self.assertEqual(profiled.name, 'udf')
+        add_profile = catalog_mock.return_value.add_udf_profile
+        add_profile.assert_called_once()
+        name, device, calls = add_profile.call_args[0]
+        self.assertEqual((name, device), ('udf', 'cpu'))
+        self.assertEqual([num_frames for num_frames, _ in calls], [3, 3])
+
+        # profiled enough, the udf is no longer timed
+        self.assertIs(self.profiler.wrap(self.udf, 'cpu'), self.udf)
+        self.assertIsNot(self.profiler.wrap(self.udf, 'gpu'), self.udf)
+
+    def test_disabled_profiler_should_not_wrap(self):
+        self.profiler.reset(enabled=False)
+        self.assertIs(self.profiler.wrap(self.udf, 'cpu'), self.udf)
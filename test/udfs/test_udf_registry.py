@@ -0,0 +1,162 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from src.catalog.models.udf import UdfMetadata  # noqa: F401
+from src.expression.function_expression import FunctionExpression
+from src.models.storage.batch import Batch
+from src.udfs.udf_registry import UdfRegistry
+
+UDF_SOURCE = '''
+import torch
+from torch import nn
+
+
+class {name}(nn.Module):
+    version = {version}
+
+    def __init__(self):
+        super().__init__()
+        self.weights = nn.Parameter(torch.zeros({size}))
+'''
+
+# counts the calls running at once on the instance
+COUNTING_UDF_SOURCE = '''
+import threading
+import time
+
+import pandas as pd
+
+
+class Counting:
+    def __init__(self):
+        self.running = 0
+        self.most_running = 0
+        self.counter = threading.Lock()
+
+    def __call__(self, frames):
+        with self.counter:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.01)
+        with self.counter:
+            self.running -= 1
+        return pd.DataFrame({'label': frames['id']})
+'''
+
+
+class UdfRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.udf_dir = tempfile.mkdtemp()
+        self.registry = UdfRegistry()
+        self.registry.reset(capacity=10 ** 6, enabled=True)
+
+    def tearDown(self):
+        self.registry.reset(capacity=4 * 10 ** 9, enabled=True)
+        shutil.rmtree(self.udf_dir, ignore_errors=True)
+
+    def write_udf(self, name, version=1, size=10, mtime=None):
+        path = os.path.join(self.udf_dir, name.lower() + '.py')
+        with open(path, 'w') as udf_file:
+            udf_file.write(UDF_SOURCE.format(name=name, version=version,
+                                             size=size))
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_should_load_udfs_once(self):
+        path = self.write_udf('Classifier', mtime=1000)
+        udf = self.registry.get('Classifier', path)
+        self.assertIs(self.registry.get('Classifier', path), udf)
+
+        self.registry.reset(enabled=False)
+        self.assertIsNot(self.registry.get('Classifier', path),
+                         self.registry.get('Classifier', path))
+
+    def test_should_reload_changed_implementations(self):
+        path = self.write_udf('Classifier', mtime=1000)
+        self.assertEqual(self.registry.get('Classifier', path).version, 1)
+        self.write_udf('Classifier', version=2, mtime=2000)
+        self.assertEqual(self.registry.get('Classifier', path).version, 2)
+        self.assertEqual(len(self.registry), 1)
+
+    def test_should_evict_least_recently_used_models(self):
+        # 4 bytes per float parameter
+        self.registry.reset(capacity=1000)
+        first = self.write_udf('First', size=100)
+        second = self.write_udf('Second', size=100)
+        third = self.write_udf('Third', size=100)
+        first_udf = self.registry.get('First', first)
+        self.registry.get('Second', second)
+        self.registry.get('First', first)
+        self.registry.get('Third', third)
+        self.assertEqual(len(self.registry), 2)
+        self.assertIs(self.registry.get('First', first), first_udf)
+
+        # a model above the capacity is still kept while used
+        huge = self.write_udf('Huge', size=1000)
+        self.registry.get('Huge', huge)
+        self.assertEqual(len(self.registry), 1)
+
+    @patch('src.udfs.udf_registry.CatalogManager')
+    def test_should_warm_up_catalog_udfs(self, catalog_mock):
+        udf_obj = MagicMock()
+        udf_obj.name = 'Classifier'
+        udf_obj.impl_file_path = self.write_udf('Classifier')
+        catalog_mock.return_value.get_udf_by_name.side_effect = \
+            lambda name: udf_obj if name == 'Classifier' else None
+        self.registry.warm_up(['Classifier', 'Missing'])
+        self.assertEqual(len(self.registry), 1)
+
+    def test_should_call_shared_instances_one_at_a_time(self):
+        path = os.path.join(self.udf_dir, 'counting.py')
+        with open(path, 'w') as udf_file:
+            udf_file.write(COUNTING_UDF_SOURCE)
+        udf = self.registry.get('Counting', path)
+        batch = Batch(pd.DataFrame({'id': [1, 2, 3]}))
+        errors = []
+
+        def query():
+            # every query binds its own expression to the shared instance
+            expr = FunctionExpression(self.registry.get('Counting', path),
+                                      output='label')
+            try:
+                for _ in range(5):
+                    self.assertEqual(expr.evaluate(batch), Batch(
+                        pd.DataFrame({'label': [1, 2, 3]})))
+            except Exception as error:
+                errors.append(error)
+
+        queries = [threading.Thread(target=query) for _ in range(4)]
+        for thread in queries:
+            thread.start()
+        for thread in queries:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(udf.most_running, 1)
+
+        # unshared instances are not locked
+        self.registry.reset(enabled=False)
+        unshared = self.registry.get('Counting', path)
+        self.assertIsInstance(self.registry.lock(unshared), nullcontext)
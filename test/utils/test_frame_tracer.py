@@ -0,0 +1,87 @@
+# coding=utf-8
+# Copyright 2018-2020 EVA
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.models.storage.batch import Batch
+from src.utils.frame_tracer import (FrameTracer, TraceEvent, read_trace,
+                                    convert_to_csv)
+
+
+class FrameTracerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'trace.bin')
+
+    def tearDown(self):
+        FrameTracer().stop()
+        for name in os.listdir(self.tmp_dir):
+            os.remove(os.path.join(self.tmp_dir, name))
+        os.rmdir(self.tmp_dir)
+
+    def test_disabled_by_default(self):
+        self.assertFalse(FrameTracer.enabled)
+        Batch(pd.DataFrame({'id': [1, 2]}))
+
+    def test_batch_fix_unfix_events(self):
+        FrameTracer().start(self.path, buffer_records=4)
+        batch = Batch(pd.DataFrame({'id': [1, 2, 3]}))
+        del batch
+        FrameTracer().emit(TraceEvent.HIT, 7, table_id=3)
+        FrameTracer().stop()
+
+        records, _ = read_trace(self.path)
+        self.assertEqual(records['event'].tolist(),
+                         [TraceEvent.FIX] * 3 + [TraceEvent.UNFIX] * 3 +
+                         [TraceEvent.HIT])
+        self.assertEqual(records['frame_id'].tolist(), [1, 2, 3, 1, 2, 3, 7])
+        self.assertEqual(records['table_id'].tolist(), [-1] * 6 + [3])
+        self.assertTrue(np.all(np.diff(records['timestamp'].astype(
+            np.int64)) >= 0))
+
+    def test_full_ring_drops_records(self):
+        FrameTracer().start(self.path, buffer_records=2)
+        tracer = FrameTracer()
+        # hold the writer back by taking every free chunk
+        free = [tracer._free.get() for _ in range(tracer._free.qsize())]
+        tracer.emit(TraceEvent.FIX, np.arange(5))
+        self.assertEqual(tracer.dropped, 3)
+        for chunk in free:
+            tracer._free.put(chunk)
+        tracer.stop()
+        records, _ = read_trace(self.path)
+        self.assertEqual(records['frame_id'].tolist(), [0, 1])
+
+    def test_convert_to_csv(self):
+        FrameTracer().start(self.path)
+        FrameTracer().emit(TraceEvent.FIX, [4, 5])
+        FrameTracer().emit(TraceEvent.MISS, 4)
+        FrameTracer().emit(TraceEvent.UNFIX, 4)
+        FrameTracer().flush()
+        FrameTracer().stop()
+
+        csv_path = os.path.join(self.tmp_dir, 'trace.csv')
+        convert_to_csv(self.path, csv_path)
+        with open(csv_path) as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertEqual([(row[1], row[2]) for row in rows],
+                         [('True', '4'), ('True', '5'), ('False', '4')])
+        self.assertEqual(len(rows[0][3].split(',')), 6)